@@ -1,41 +1,89 @@
-import ast
+import asyncio
+import httpx
 import logging
-import subprocess
-import re
 
 from datetime import date, datetime, timedelta
 
+from .dap_client import DapCollector, DapError, DapHttpError, DapTimeoutError, Vdaf
+from .parse import AdvertiserConfig
+
 DAP_LEADER = "https://dap-09-3.api.divviup.org"
+DAP_DRAFT = "dap-09"
 VDAF = "histogram"
-PROCESS_TIMEOUT = 1200  # 20 mins
+COLLECTION_TIMEOUT = 1200  # 20 mins
 
 
-def get_aggregated_results(
+async def get_aggregated_results(
+    collector: DapCollector,
     process_date: date,
     batch_start: date,
     batch_end: date,
     task_id: str,
     vdaf_length: int,
     collector_duration: int,
-    bearer_token: str,
-    hpke_config: str,
-    hpke_private_key: str,
-) -> dict:
+) -> dict | None:
     process_batch = _should_collect_batch(process_date, batch_end)
 
     if process_batch:
         # Step 4 Collect DAP results.
-        aggregated_results = collect_dap_result(
+        aggregated_results = await collect_dap_result(
+            collector=collector,
             task_id=task_id,
             vdaf_length=vdaf_length,
             batch_start=batch_start,
             duration=collector_duration,
-            bearer_token=bearer_token,
-            hpke_config=hpke_config,
-            hpke_private_key=hpke_private_key,
         )
 
         return aggregated_results
+    return None
+
+
+def get_all_aggregated_results(
+    process_date: date,
+    batches: list[tuple[AdvertiserConfig, date, date]],
+    bearer_token: str,
+    hpke_config: str,
+    hpke_private_key: str,
+    http_client: httpx.AsyncClient | None = None,
+) -> list[dict | Exception | None]:
+    """Get the aggregated results of all the advertisers' batches.
+
+    The batches are collected concurrently, sharing one connection to the leader.
+    A batch that fails doesn't stop the others, since a batch can only be collected
+    once, so the results of the batches that succeeded can still be stored.
+
+    :param batches: (advertiser config, batch start, batch end) of each batch.
+    :param http_client: Client to send DAP requests with, by default an HTTP/2 client.
+    :returns: The aggregated results of each batch, or the exception it failed with,
+              in the same order.
+    """
+
+    async def collect_batches() -> list[dict | Exception | None]:
+        async with DapCollector(
+            DAP_LEADER,
+            bearer_token,
+            hpke_config,
+            hpke_private_key,
+            draft=DAP_DRAFT,
+            http_client=http_client,
+        ) as collector:
+            return await asyncio.gather(
+                *(
+                    get_aggregated_results(
+                        collector=collector,
+                        process_date=process_date,
+                        batch_start=batch_start,
+                        batch_end=batch_end,
+                        task_id=advertiser_config.partner.task_id,
+                        vdaf_length=advertiser_config.partner.length,
+                        collector_duration=advertiser_config.collector_duration,
+                    )
+                    for advertiser_config, batch_start, batch_end in batches
+                ),
+                return_exceptions=True,
+            )
+
+    return asyncio.run(collect_batches())
 
 
 def current_batch_start(
@@ -86,105 +134,53 @@ def _correct_wraparound(num: int) -> int:
     return num
 
 
-def _parse_histogram(histogram_str: str) -> dict:
-    parsed_list = ast.literal_eval(histogram_str)
-    return {i: _correct_wraparound(val) for i, val in enumerate(parsed_list)}
-
-
-def _parse_http_error(text: str) -> tuple[int, str, str | None] | None:
-    """
-    Returns (status_code, status_text, error_message)
-    or None if the pattern is not found.
-    """
-    ERROR_RE = re.compile(
-        r"HTTP response status\s+(\d+)\s+([A-Za-z ]+)(?:\s+-\s+(.*))?$"
-    )
-    match = ERROR_RE.search(text)
-    if not match:
-        return None
-
-    status_code = int(match.group(1))
-    status_text = match.group(2).strip()
-    error_message = match.group(3).strip() if match.group(3) else None
-    return status_code, status_text, error_message
+def _histogram_entries(histogram: list[int]) -> dict:
+    return {i: _correct_wraparound(val) for i, val in enumerate(histogram)}
 
 
 # DAP functions
-def collect_dap_result(
+async def collect_dap_result(
+    collector: DapCollector,
     task_id: str,
     vdaf_length: int,
     batch_start: date,
     duration: int,
-    bearer_token: str,
-    hpke_config: str,
-    hpke_private_key: str,
-) -> dict:
-    # Beware! This command string reveals secrets. Use logging only for
-    # debugging in local dev.
-
+) -> dict | None:
     batch_start_epoch = int(
         datetime.combine(batch_start, datetime.min.time()).timestamp()
     )
 
     try:
-        result = subprocess.run(
-            [
-                "./collect",
-                "--task-id",
-                task_id,
-                "--leader",
-                DAP_LEADER,
-                "--vdaf",
-                VDAF,
-                "--length",
-                f"{vdaf_length}",
-                "--authorization-bearer-token",
-                bearer_token,
-                "--batch-interval-start",
-                f"{batch_start_epoch}",
-                "--batch-interval-duration",
-                f"{duration}",
-                "--hpke-config",
-                hpke_config,
-                "--hpke-private-key",
-                hpke_private_key,
-            ],
-            capture_output=True,
-            text=True,
-            check=True,
-            timeout=PROCESS_TIMEOUT,
+        collection = await collector.collect(
+            task_id,
+            Vdaf(VDAF, length=vdaf_length),
+            batch_start_epoch,
+            duration,
+            timeout=COLLECTION_TIMEOUT,
         )
-        for line in result.stdout.splitlines():
-            if line.startswith("Aggregation result:"):
-                entries = _parse_histogram(line[21:-1])
-                return entries
-        # Beware! Exceptions thrown by the subprocess reveal secrets.
-        # Log them and include traceback only for debugging in local dev.
-    except subprocess.CalledProcessError as e:
-        result = _parse_http_error(e.stderr)
-        if result is None:
-            logging.error(e)
-            raise Exception(
-                f"Collection failed for {task_id}, {e.returncode}, stderr: {e.stderr}"
-            ) from None
+    except DapHttpError as e:
+        if e.status_code == 400:
+            logging.info(
+                f"Collection failed for {task_id}, {e.status_code} {e.reason}"
+                f" {e.title}"
+            )
+        elif e.status_code == 404:
+            detail = (
+                e.title
+                if e.title is not None
+                else "Verify start date is not more than 14 days ago."
+            )
+            logging.info(
+                f"Collection failed for {task_id}, {e.status_code} {e.reason} "
+                f"{detail}"
+            )
         else:
-            status_code, status_text, error_message = result
-            if status_code == 400:
-                logging.info(
-                    f"Collection failed for {task_id}, {status_code} {status_text}"
-                    f" {error_message}"
-                )
-            elif status_code == 404:
-                detail = (
-                    error_message
-                    if error_message is not None
-                    else "Verify start date is not more than 14 days ago."
-                )
-                logging.info(
-                    f"Collection failed for {task_id}, {status_code} {status_text} "
-                    f"{detail}"
-                )
-    except subprocess.TimeoutExpired as e:
+            logging.error(f"Collection failed for {task_id}, {e}")
+        return None
+    except DapTimeoutError:
         raise Exception(
-            f"Collection timed out for {task_id}, {e.timeout}, stderr: {e.stderr}"
+            f"Collection timed out for {task_id}, {COLLECTION_TIMEOUT}"
         ) from None
+    except (DapError, httpx.HTTPError) as e:
+        raise Exception(f"Collection failed for {task_id}, {e}") from None
+    return _histogram_entries(collection.aggregate_result)
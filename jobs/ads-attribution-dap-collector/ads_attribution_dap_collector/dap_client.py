@@ -0,0 +1,602 @@
+"""In-process client for collecting aggregate results from a DAP leader.
+
+This implements the collector side of the Distributed Aggregation Protocol
+(https://datatracker.ietf.org/doc/draft-ietf-ppm-dap/) for time interval queries
+and the Prio3 VDAFs used by our tasks, replacing calls to the Janus `collect`
+binary. A single HTTP/2 connection pool is shared by all the collections made
+through a `DapCollector`, and collection jobs are polled asynchronously, so many
+collections can be in flight at once.
+
+A leader only lets each batch be collected once, so if a Collection can't be
+decoded or decrypted, the raw Collection is kept on the raised `DapError` and
+logged, so that it isn't lost.
+
+The ads-attribution-dap-collector and ads-incrementality-dap-collector jobs
+keep copies of this file, so that each image builds on its own. Change the
+copy in the dap-collector job, where it's tested, and copy it over; the
+repository's tests/test_vendored_files.py checks that the copies match.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import base64
+import dataclasses
+import hashlib
+import hmac
+import logging
+import secrets
+import struct
+import time
+from typing import List, Optional, Tuple, Union
+
+import httpx
+from cryptography.exceptions import InvalidTag
+from cryptography.hazmat.primitives.asymmetric.x25519 import (
+    X25519PrivateKey,
+    X25519PublicKey,
+)
+from cryptography.hazmat.primitives.ciphers.aead import AESGCM, ChaCha20Poly1305
+from cryptography.hazmat.primitives.serialization import Encoding, PublicFormat
+
+FIELD64_PRIME = 18446744069414584321
+FIELD128_PRIME = 340282366920938462946865773367900766209
+
+# DAP drafts whose messages this module can encode and decode
+SUPPORTED_DRAFTS = ("dap-07", "dap-09")
+
+ROLE_COLLECTOR = 0
+ROLE_LEADER = 2
+ROLE_HELPER = 3
+
+QUERY_TYPE_TIME_INTERVAL = 1
+
+MEDIA_TYPE_COLLECT_REQ = "application/dap-collect-req"
+MEDIA_TYPE_COLLECTION = "application/dap-collection"
+
+PROBLEM_INVALID_BATCH_SIZE = "urn:ietf:params:ppm:dap:error:invalidBatchSize"
+
+KEM_X25519_HKDF_SHA256 = 0x0020
+KDF_HKDF_SHA256 = 0x0001
+AEAD_AES_128_GCM = 0x0001
+AEAD_AES_256_GCM = 0x0002
+AEAD_CHACHA20_POLY1305 = 0x0003
+
+# AEAD id: (key length, AEAD class)
+AEADS = {
+    AEAD_AES_128_GCM: (16, AESGCM),
+    AEAD_AES_256_GCM: (32, AESGCM),
+    AEAD_CHACHA20_POLY1305: (32, ChaCha20Poly1305),
+}
+NONCE_LENGTH = 12
+
+
+class DapError(Exception):
+    # The raw Collection from the leader, if it couldn't be decoded or decrypted
+    collection: Optional[bytes] = None
+
+
+class DapHttpError(DapError):
+    """The leader responded with an error.
+
+    The message matches the errors printed by the Janus `collect` binary."""
+
+    def __init__(
+        self,
+        status_code: int,
+        reason: str,
+        problem_type: Optional[str] = None,
+        title: Optional[str] = None,
+    ):
+        message = f"HTTP response status {status_code} {reason}"
+        if title:
+            message += f" - {title}"
+        super().__init__(message)
+        self.status_code = status_code
+        self.reason = reason
+        self.problem_type = problem_type
+        self.title = title
+
+    @property
+    def is_invalid_batch_size(self) -> bool:
+        return self.problem_type == PROBLEM_INVALID_BATCH_SIZE
+
+    @classmethod
+    def from_response(cls, response: httpx.Response) -> "DapHttpError":
+        problem_type = None
+        title = None
+        if response.headers.get("content-type", "").startswith(
+            "application/problem+json"
+        ):
+            try:
+                problem = response.json()
+                problem_type = problem.get("type")
+                title = problem.get("title")
+            except ValueError:
+                pass
+        return cls(response.status_code, response.reason_phrase, problem_type, title)
+
+
+class DapTimeoutError(DapError):
+    pass
+
+
+def b64decode(value: str) -> bytes:
+    """Decode unpadded URL-safe base64, as used for DAP ids and keys."""
+    return base64.urlsafe_b64decode(value + "=" * (-len(value) % 4))
+
+
+def b64encode(value: bytes) -> str:
+    return base64.urlsafe_b64encode(value).rstrip(b"=").decode("ascii")
+
+
+class Decoder:
+    """Reads the TLS presentation language encoding used by DAP messages."""
+
+    def __init__(self, data: bytes):
+        self.data = data
+        self.offset = 0
+
+    def read(self, length: int) -> bytes:
+        if self.offset + length > len(self.data):
+            raise DapError("Message is truncated")
+        value = self.data[self.offset : self.offset + length]
+        self.offset += length
+        return value
+
+    def u8(self) -> int:
+        return self.read(1)[0]
+
+    def u16(self) -> int:
+        return struct.unpack(">H", self.read(2))[0]
+
+    def u32(self) -> int:
+        return struct.unpack(">I", self.read(4))[0]
+
+    def u64(self) -> int:
+        return struct.unpack(">Q", self.read(8))[0]
+
+    def opaque16(self) -> bytes:
+        return self.read(self.u16())
+
+    def opaque32(self) -> bytes:
+        return self.read(self.u32())
+
+    def finish(self) -> None:
+        if self.offset != len(self.data):
+            raise DapError(f"{len(self.data) - self.offset} unexpected trailing bytes")
+
+
+def opaque16(value: bytes) -> bytes:
+    return struct.pack(">H", len(value)) + value
+
+
+def opaque32(value: bytes) -> bytes:
+    return struct.pack(">I", len(value)) + value
+
+
+@dataclasses.dataclass(frozen=True)
+class HpkeConfig:
+    id: int
+    kem_id: int
+    kdf_id: int
+    aead_id: int
+    public_key: bytes
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> "HpkeConfig":
+        decoder = Decoder(data)
+        config = cls(
+            decoder.u8(),
+            decoder.u16(),
+            decoder.u16(),
+            decoder.u16(),
+            decoder.opaque16(),
+        )
+        decoder.finish()
+        return config
+
+    @classmethod
+    def from_base64(cls, value: str) -> "HpkeConfig":
+        return cls.from_bytes(b64decode(value))
+
+    def to_bytes(self) -> bytes:
+        return struct.pack(
+            ">BHHH", self.id, self.kem_id, self.kdf_id, self.aead_id
+        ) + opaque16(self.public_key)
+
+    def check_supported(self) -> None:
+        if self.kem_id != KEM_X25519_HKDF_SHA256:
+            raise DapError(f"Unsupported HPKE KEM {self.kem_id:#06x}")
+        if self.kdf_id != KDF_HKDF_SHA256:
+            raise DapError(f"Unsupported HPKE KDF {self.kdf_id:#06x}")
+        if self.aead_id not in AEADS:
+            raise DapError(f"Unsupported HPKE AEAD {self.aead_id:#06x}")
+
+
+def _labeled_extract(suite_id: bytes, salt: bytes, label: bytes, ikm: bytes) -> bytes:
+    return hmac.new(salt, b"HPKE-v1" + suite_id + label + ikm, hashlib.sha256).digest()
+
+
+def _labeled_expand(
+    suite_id: bytes, prk: bytes, label: bytes, info: bytes, length: int
+) -> bytes:
+    labeled_info = struct.pack(">H", length) + b"HPKE-v1" + suite_id + label + info
+    output = b""
+    block = b""
+    counter = 1
+    while len(output) < length:
+        block = hmac.new(
+            prk, block + labeled_info + bytes([counter]), hashlib.sha256
+        ).digest()
+        output += block
+        counter += 1
+    return output[:length]
+
+
+def _hpke_context(
+    config: HpkeConfig, dh: bytes, kem_context: bytes, info: bytes
+) -> Tuple[bytes, bytes]:
+    """Derive the AEAD key and nonce for HPKE base mode (RFC 9180)."""
+    config.check_supported()
+    kem_suite_id = b"KEM" + struct.pack(">H", config.kem_id)
+    eae_prk = _labeled_extract(kem_suite_id, b"", b"eae_prk", dh)
+    shared_secret = _labeled_expand(
+        kem_suite_id, eae_prk, b"shared_secret", kem_context, 32
+    )
+
+    suite_id = b"HPKE" + struct.pack(
+        ">HHH", config.kem_id, config.kdf_id, config.aead_id
+    )
+    psk_id_hash = _labeled_extract(suite_id, b"", b"psk_id_hash", b"")
+    info_hash = _labeled_extract(suite_id, b"", b"info_hash", info)
+    key_schedule_context = b"\x00" + psk_id_hash + info_hash
+    secret = _labeled_extract(suite_id, shared_secret, b"secret", b"")
+    key_length = AEADS[config.aead_id][0]
+    key = _labeled_expand(suite_id, secret, b"key", key_schedule_context, key_length)
+    nonce = _labeled_expand(
+        suite_id, secret, b"base_nonce", key_schedule_context, NONCE_LENGTH
+    )
+    return key, nonce
+
+
+def _public_bytes(key: Union[X25519PrivateKey, X25519PublicKey]) -> bytes:
+    if isinstance(key, X25519PrivateKey):
+        key = key.public_key()
+    return key.public_bytes(Encoding.Raw, PublicFormat.Raw)
+
+
+def hpke_open(
+    config: HpkeConfig,
+    private_key: bytes,
+    enc: bytes,
+    ciphertext: bytes,
+    info: bytes,
+    aad: bytes,
+) -> bytes:
+    """Decrypt a single HPKE base mode message."""
+    recipient_key = X25519PrivateKey.from_private_bytes(private_key)
+    dh = recipient_key.exchange(X25519PublicKey.from_public_bytes(enc))
+    key, nonce = _hpke_context(config, dh, enc + _public_bytes(recipient_key), info)
+    return AEADS[config.aead_id][1](key).decrypt(nonce, ciphertext, aad)
+
+
+def hpke_seal(
+    config: HpkeConfig, plaintext: bytes, info: bytes, aad: bytes
+) -> Tuple[bytes, bytes]:
+    """Encrypt a single HPKE base mode message to config.public_key.
+
+    :returns: A tuple of (encapsulated key, ciphertext)."""
+    ephemeral_key = X25519PrivateKey.generate()
+    enc = _public_bytes(ephemeral_key)
+    dh = ephemeral_key.exchange(X25519PublicKey.from_public_bytes(config.public_key))
+    key, nonce = _hpke_context(config, dh, enc + config.public_key, info)
+    return enc, AEADS[config.aead_id][1](key).encrypt(nonce, plaintext, aad)
+
+
+@dataclasses.dataclass(frozen=True)
+class Vdaf:
+    """A Prio3 VDAF, as named by the Janus `collect` binary."""
+
+    name: str
+    length: Optional[int] = None
+    bits: Optional[int] = None
+    chunk_length: Optional[int] = None
+
+    VECTOR_TYPES = ("countvec", "sumvec", "histogram")
+    SCALAR_TYPES = ("count", "sum")
+
+    def __post_init__(self):
+        if self.name not in self.VECTOR_TYPES + self.SCALAR_TYPES:
+            raise DapError(f"Unknown VDAF: {self.name}")
+        if self.name in self.VECTOR_TYPES and self.length is None:
+            raise DapError(f"VDAF {self.name} requires a length")
+
+    @classmethod
+    def from_args(cls, name: str, args: dict) -> "Vdaf":
+        """Build a VDAF from `collect` style arguments, e.g. {"length": 20}."""
+        kwargs = {}
+        for key, value in args.items():
+            key = key.replace("-", "_")
+            if key in ("length", "bits", "chunk_length"):
+                kwargs[key] = int(value)
+        return cls(name, **kwargs)
+
+    @property
+    def field_prime(self) -> int:
+        return FIELD64_PRIME if self.name == "count" else FIELD128_PRIME
+
+    @property
+    def element_size(self) -> int:
+        return 8 if self.name == "count" else 16
+
+    @property
+    def output_length(self) -> int:
+        return 1 if self.name in self.SCALAR_TYPES else self.length
+
+    def decode_agg_share(self, data: bytes) -> List[int]:
+        size = self.element_size
+        if len(data) != self.output_length * size:
+            raise DapError(
+                f"Aggregate share has {len(data)} bytes, expected "
+                f"{self.output_length * size}"
+            )
+        return [
+            int.from_bytes(data[offset : offset + size], "little")
+            for offset in range(0, len(data), size)
+        ]
+
+    def encode_agg_share(self, values: List[int]) -> bytes:
+        return b"".join(value.to_bytes(self.element_size, "little") for value in values)
+
+    def unshard(self, agg_shares: List[bytes]) -> Union[int, List[int]]:
+        """Combine the aggregate shares into the aggregate result.
+
+        Values are returned as field elements, i.e. negative values wrap around
+        the field prime, as with the `collect` binary."""
+        total = [0] * self.output_length
+        for agg_share in agg_shares:
+            for i, value in enumerate(self.decode_agg_share(agg_share)):
+                total[i] = (total[i] + value) % self.field_prime
+        if self.name in self.SCALAR_TYPES:
+            return total[0]
+        return total
+
+
+@dataclasses.dataclass
+class Collection:
+    report_count: int
+    interval_start: int
+    interval_duration: int
+    aggregate_result: Union[int, List[int]]
+
+
+def encode_interval(start: int, duration: int) -> bytes:
+    return struct.pack(">QQ", start, duration)
+
+
+def encode_collection_req(batch_start: int, batch_duration: int) -> bytes:
+    # Query for a time interval, followed by an empty aggregation parameter
+    return (
+        bytes([QUERY_TYPE_TIME_INTERVAL])
+        + encode_interval(batch_start, batch_duration)
+        + opaque32(b"")
+    )
+
+
+def aggregate_share_aad(
+    draft: str, task_id: bytes, batch_start: int, batch_duration: int
+) -> bytes:
+    """Encode the AggregateShareAad used to encrypt aggregate shares.
+
+    DAP-07 and DAP-09 both define it as the task id, the aggregation parameter
+    and the batch selector, so the encoding is the same for either draft."""
+    if draft not in SUPPORTED_DRAFTS:
+        raise DapError(f"Unsupported DAP draft: {draft}")
+    batch_selector = bytes([QUERY_TYPE_TIME_INTERVAL]) + encode_interval(
+        batch_start, batch_duration
+    )
+    return task_id + opaque32(b"") + batch_selector
+
+
+def aggregate_share_info(draft: str, server_role: int) -> bytes:
+    return f"{draft} aggregate share".encode("ascii") + bytes(
+        [server_role, ROLE_COLLECTOR]
+    )
+
+
+def encode_collection(
+    report_count: int,
+    batch_start: int,
+    batch_duration: int,
+    encrypted_agg_shares: List[Tuple[int, bytes, bytes]],
+) -> bytes:
+    """Encode a Collection message, as sent by the leader.
+
+    :param encrypted_agg_shares: The (HPKE config id, encapsulated key, ciphertext)
+                                 for the leader and the helper."""
+    data = bytes([QUERY_TYPE_TIME_INTERVAL]) + struct.pack(">Q", report_count)
+    data += encode_interval(batch_start, batch_duration)
+    for config_id, enc, payload in encrypted_agg_shares:
+        data += bytes([config_id]) + opaque16(enc) + opaque32(payload)
+    return data
+
+
+def decode_collection(
+    data: bytes,
+) -> Tuple[int, int, int, List[Tuple[int, bytes, bytes]]]:
+    """Decode a Collection message for a time interval query.
+
+    :returns: A tuple of (report count, interval start, interval duration, and
+              the (HPKE config id, encapsulated key, ciphertext) for the
+              leader and the helper)."""
+    decoder = Decoder(data)
+    query_type = decoder.u8()
+    if query_type != QUERY_TYPE_TIME_INTERVAL:
+        raise DapError(f"Unsupported query type {query_type}")
+    report_count = decoder.u64()
+    interval_start = decoder.u64()
+    interval_duration = decoder.u64()
+    encrypted_agg_shares = [
+        (decoder.u8(), decoder.opaque16(), decoder.opaque32()) for _ in range(2)
+    ]
+    decoder.finish()
+    return report_count, interval_start, interval_duration, encrypted_agg_shares
+
+
+class DapCollector:
+    """Collects aggregate results from a DAP leader.
+
+    :param leader: Base URL of the leader.
+    :param bearer_token: Token used to authenticate to the leader.
+    :param hpke_config: Base64 encoded HPKE config of the collector.
+    :param hpke_private_key: Base64 encoded private key matching hpke_config.
+    :param draft: DAP draft spoken by the leader, one of SUPPORTED_DRAFTS.
+    :param http_client: Client to use for requests, e.g. with a fake transport for
+                        testing. By default an HTTP/2 client is created.
+    :param poll_interval: Initial delay between polls of a collection job, unless
+                          the leader sends a Retry-After header.
+    :param max_poll_interval: Maximum delay between polls.
+    """
+
+    def __init__(
+        self,
+        leader: str,
+        bearer_token: str,
+        hpke_config: str,
+        hpke_private_key: str,
+        draft: str = "dap-09",
+        http_client: Optional[httpx.AsyncClient] = None,
+        poll_interval: float = 1,
+        max_poll_interval: float = 30,
+    ):
+        if draft not in SUPPORTED_DRAFTS:
+            raise DapError(f"Unsupported DAP draft: {draft}")
+        self.leader = leader.rstrip("/")
+        self.bearer_token = bearer_token
+        self.hpke_config_base64 = hpke_config
+        self.hpke_config = HpkeConfig.from_base64(hpke_config)
+        self.hpke_config.check_supported()
+        self.hpke_private_key_base64 = hpke_private_key
+        self.hpke_private_key = b64decode(hpke_private_key)
+        self.draft = draft
+        if http_client is None:
+            http_client = httpx.AsyncClient(http2=True, timeout=60)
+        self.http_client = http_client
+        self.poll_interval = poll_interval
+        self.max_poll_interval = max_poll_interval
+
+    async def __aenter__(self) -> "DapCollector":
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        await self.aclose()
+
+    async def aclose(self) -> None:
+        await self.http_client.aclose()
+
+    def _headers(self, content_type: Optional[str] = None) -> dict:
+        headers = {"Authorization": f"Bearer {self.bearer_token}"}
+        if content_type is not None:
+            headers["Content-Type"] = content_type
+        return headers
+
+    async def collect(
+        self,
+        task_id: str,
+        vdaf: Vdaf,
+        batch_start: int,
+        batch_duration: int,
+        timeout: Optional[float] = None,
+    ) -> Collection:
+        """Collect the aggregate result of a task for a batch interval.
+
+        Creates a collection job, then polls it until the leader returns the
+        encrypted aggregate shares, and decrypts and combines them. If that
+        fails, the raw Collection is set as the error's `collection`.
+
+        :param task_id: Base64 encoded task id.
+        :param timeout: Seconds to wait for the collection job to finish."""
+        job_url = (
+            f"{self.leader}/tasks/{task_id}/collection_jobs/"
+            f"{b64encode(secrets.token_bytes(16))}"
+        )
+        response = await self.http_client.put(
+            job_url,
+            content=encode_collection_req(batch_start, batch_duration),
+            headers=self._headers(MEDIA_TYPE_COLLECT_REQ),
+        )
+        if response.status_code not in (200, 201):
+            raise DapHttpError.from_response(response)
+
+        deadline = None if timeout is None else time.monotonic() + timeout
+        delay = self.poll_interval
+        while True:
+            response = await self.http_client.post(job_url, headers=self._headers())
+            if response.status_code == 200:
+                break
+            if response.status_code != 202:
+                raise DapHttpError.from_response(response)
+
+            wait = delay
+            retry_after = response.headers.get("Retry-After")
+            if retry_after is not None and retry_after.isdigit():
+                wait = int(retry_after)
+            delay = min(delay * 2, self.max_poll_interval)
+            if deadline is not None and time.monotonic() + wait > deadline:
+                raise DapTimeoutError(
+                    f"Collection job for task {task_id} didn't finish in {timeout}s"
+                )
+            await asyncio.sleep(wait)
+
+        try:
+            return self.decrypt_collection(
+                task_id, vdaf, batch_start, batch_duration, response.content
+            )
+        except DapError as e:
+            # The batch can't be collected again, so keep what the leader sent
+            e.collection = response.content
+            logging.error(
+                f"Couldn't decode the Collection for task {task_id}, batch "
+                f"{batch_start}: {e}. Raw Collection: {b64encode(response.content)}"
+            )
+            raise
+
+    def decrypt_collection(
+        self,
+        task_id: str,
+        vdaf: Vdaf,
+        batch_start: int,
+        batch_duration: int,
+        data: bytes,
+    ) -> Collection:
+        report_count, interval_start, interval_duration, encrypted = decode_collection(
+            data
+        )
+        aad = aggregate_share_aad(
+            self.draft, b64decode(task_id), batch_start, batch_duration
+        )
+        agg_shares = []
+        for role, (config_id, enc, payload) in zip(
+            (ROLE_LEADER, ROLE_HELPER), encrypted
+        ):
+            if config_id != self.hpke_config.id:
+                raise DapError(f"Aggregate share uses unknown HPKE config {config_id}")
+            try:
+                agg_shares.append(
+                    hpke_open(
+                        self.hpke_config,
+                        self.hpke_private_key,
+                        enc,
+                        payload,
+                        aggregate_share_info(self.draft, role),
+                        aad,
+                    )
+                )
+            except InvalidTag as e:
+                raise DapError(
+                    f"Couldn't decrypt the aggregate share for role {role}"
+                ) from e
+        return Collection(
+            report_count, interval_start, interval_duration, vdaf.unshard(agg_shares)
+        )
@@ -7,7 +7,11 @@ from google.cloud import bigquery, storage
 from datetime import datetime
 
 from .parse import get_config, extract_advertisers_with_partners_and_ads
-from .collect import get_aggregated_results, current_batch_start, current_batch_end
+from .collect import (
+    get_all_aggregated_results,
+    current_batch_start,
+    current_batch_end,
+)
 from .persist import create_bq_table_if_not_exists, create_bq_row, insert_into_bq
 
 
@@ -84,6 +88,7 @@ def main(
         hpke_config, config = extract_advertisers_with_partners_and_ads(json_config)
 
         # Step 2b Get the hpke_config
+        batches = []
         for advertiser_config in config:
             #  Step 3 Get processing date range.
             batch_start = current_batch_start(
@@ -101,19 +106,27 @@ def main(
             batch_end = current_batch_end(
                 batch_start, advertiser_config.collector_duration
             )
+            batches.append((advertiser_config, batch_start, batch_end))
+
+        all_aggregated_results = get_all_aggregated_results(
+            process_date=process_date,
+            batches=batches,
+            bearer_token=bearer_token,
+            hpke_config=hpke_config,
+            hpke_private_key=hpke_private_key,
+        )
 
-            aggregated_results = get_aggregated_results(
-                process_date=process_date,
-                batch_start=batch_start,
-                batch_end=batch_end,
-                task_id=advertiser_config.partner.task_id,
-                vdaf_length=advertiser_config.partner.length,
-                collector_duration=advertiser_config.collector_duration,
-                bearer_token=bearer_token,
-                hpke_config=hpke_config,
-                hpke_private_key=hpke_private_key,
-            )
-
+        errors = []
+        for (advertiser_config, batch_start, batch_end), aggregated_results in zip(
+            batches, all_aggregated_results
+        ):
+            if isinstance(aggregated_results, Exception):
+                logging.error(
+                    f"Collection failed for advertiser: {advertiser_config.name}. "
+                    f"Error: {aggregated_results}"
+                )
+                errors.append(aggregated_results)
+                continue
             if aggregated_results is None:
                 logging.info(
                     f"No results available for advertiser: {advertiser_config.name} "
@@ -135,6 +148,11 @@ def main(
 
                 insert_into_bq(row, bq_client, full_table_id)
 
+        # Only fail once the rows of the batches that were collected are stored, as
+        # they can't be collected again
+        if errors:
+            raise errors[0]
+
     except Exception as e:
         logging.error(f"Collector job failed. Error: {e}\n{traceback.format_exc()}")
         raise e
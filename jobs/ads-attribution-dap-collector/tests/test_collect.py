@@ -1,17 +1,18 @@
+import asyncio
 from datetime import date
+from types import SimpleNamespace
 
 from unittest import TestCase
-from unittest.mock import patch
 
 from ads_attribution_dap_collector.collect import (
     current_batch_start,
     current_batch_end,
     _should_collect_batch,
-    _parse_http_error,
     _correct_wraparound,
-    _parse_histogram,
+    _histogram_entries,
     collect_dap_result,
     get_aggregated_results,
+    get_all_aggregated_results,
 )
 
 from tests.test_mocks import (
@@ -19,8 +20,15 @@ from tests.test_mocks import (
     DURATION_3_DAYS,
     DURATION_7_DAYS,
     DURATION_1_DAY,
-    mock_dap_subprocess_success,
+    FakeDapLeader,
+    mock_dap_leader_success,
+    mock_dap_collector,
+    mock_dap_http_client,
+    MOCK_BEARER_TOKEN,
+    MOCK_HPKE_CONFIG,
+    MOCK_HPKE_PRIVATE_KEY,
     MOCK_TASK_ID_1,
+    MOCK_TASK_ID_2,
 )
 
 
@@ -156,89 +164,167 @@ class TestHelpers(TestCase):
         process_date = date(2026, 1, 1)
         self.assertFalse(_should_collect_batch(process_date, batch_end))
 
-    def test_parse_http_error_400(self):
-        msg = (
-            "HTTP response status 400 Bad Request - "
-            "The number of reports included in the batch is invalid."
-        )
-
-        status_code, status_text, error_message = _parse_http_error(msg)
-
-        self.assertEqual(status_code, 400)
-        self.assertEqual(status_text, "Bad Request")
-        self.assertEqual(
-            error_message, "The number of reports included in the batch is invalid."
-        )
-
-    def test_parse_http_error_404(self):
-        msg = "HTTP response status 404 Not Found"
-
-        status_code, status_text, error_message = _parse_http_error(msg)
-
-        self.assertEqual(status_code, 404)
-        self.assertEqual(status_text, "Not Found")
-        self.assertIsNone(error_message)
-
     def test_correct_wraparound(self):
         wrapped = _correct_wraparound(340282366920938462946865773367900766210)
         self.assertEqual(wrapped, 1)
 
-    def test_parse_histogram(self):
-        histogram_string = "5,3, 6,0, 8"
-        parse_dict = _parse_histogram(histogram_string)
+    def test_histogram_entries(self):
+        parse_dict = _histogram_entries([5, 3, 6, 0, 8])
         self.assertEqual(parse_dict[0], 5)
         self.assertEqual(parse_dict[1], 3)
         self.assertEqual(parse_dict[2], 6)
         self.assertEqual(parse_dict[3], 0)
         self.assertEqual(parse_dict[4], 8)
 
-    @patch("subprocess.run", side_effect=mock_dap_subprocess_success)
-    def test_collect_dap_result_success(self, mock_dap_subprocess_success):
+    def test_collect_dap_result_success(self):
+        leader = mock_dap_leader_success()
         task_id = MOCK_TASK_ID_1
-        collected_tasks = collect_dap_result(
-            task_id=task_id,
-            vdaf_length=4,
-            batch_start=date(2026, 1, 1),
-            duration=123,
-            bearer_token="token",
-            hpke_config="config",
-            hpke_private_key="private_key",
-        )
-        self.assertEqual(1, mock_dap_subprocess_success.call_count)
+        collected_tasks = asyncio.run(
+            collect_dap_result(
+                collector=mock_dap_collector(leader),
+                task_id=task_id,
+                vdaf_length=4,
+                batch_start=date(2026, 1, 1),
+                duration=123,
+            )
+        )
+        # Create the collection job, then poll it twice
+        self.assertEqual(["PUT", "POST", "POST"], [r.method for r in leader.requests])
         self.assertEqual(len(collected_tasks), 4)
         self.assertEqual(collected_tasks[1], 11)
         self.assertEqual(collected_tasks[2], 22)
         self.assertEqual(collected_tasks[3], 33)
 
-    @patch("subprocess.run", side_effect=mock_dap_subprocess_success)
-    def test_get_aggregated_results(self, mock_dap_subprocess_success):
+    def test_collect_dap_result_http_error(self):
+        for status_code, title in [
+            (400, "The number of reports included in the batch is invalid."),
+            (404, None),
+        ]:
+            leader = FakeDapLeader([], status_code=status_code, title=title)
+            with self.assertLogs(level="INFO") as logs:
+                collected_tasks = asyncio.run(
+                    collect_dap_result(
+                        collector=mock_dap_collector(leader),
+                        task_id=MOCK_TASK_ID_1,
+                        vdaf_length=4,
+                        batch_start=date(2026, 1, 1),
+                        duration=123,
+                    )
+                )
+            self.assertIsNone(collected_tasks)
+            self.assertIn(f"Collection failed for {MOCK_TASK_ID_1}", logs.output[-1])
+            self.assertIn(
+                title or "Verify start date is not more than 14 days ago.",
+                logs.output[-1],
+            )
+
+    def test_collect_dap_result_raise(self):
+        # The histogram doesn't have the length of the task
+        leader = FakeDapLeader([50])
+        with self.assertRaisesRegex(
+            Exception, f"Collection failed for {MOCK_TASK_ID_1}, Aggregate share"
+        ):
+            asyncio.run(
+                collect_dap_result(
+                    collector=mock_dap_collector(leader),
+                    task_id=MOCK_TASK_ID_1,
+                    vdaf_length=4,
+                    batch_start=date(2026, 1, 1),
+                    duration=123,
+                )
+            )
+
+    def test_get_aggregated_results(self):
         task_id = MOCK_TASK_ID_1
         process_date = date(2026, 1, 7)
         batch_end = current_batch_end(batch_start=JAN_1_2026, duration=DURATION_7_DAYS)
 
-        aggregated_results = get_aggregated_results(
-            process_date=process_date,
-            task_id=task_id,
-            vdaf_length=4,
-            batch_start=JAN_1_2026,
-            batch_end=batch_end,
-            collector_duration=DURATION_7_DAYS,
-            bearer_token="token",
-            hpke_config="config",
-            hpke_private_key="private_key",
+        aggregated_results = asyncio.run(
+            get_aggregated_results(
+                collector=mock_dap_collector(mock_dap_leader_success()),
+                process_date=process_date,
+                task_id=task_id,
+                vdaf_length=4,
+                batch_start=JAN_1_2026,
+                batch_end=batch_end,
+                collector_duration=DURATION_7_DAYS,
+            )
         )
         self.assertIsNotNone(aggregated_results)
 
         process_date = date(2026, 1, 8)
-        aggregated_results = get_aggregated_results(
-            process_date=process_date,
-            task_id=task_id,
-            vdaf_length=4,
-            batch_start=JAN_1_2026,
-            batch_end=batch_end,
-            collector_duration=DURATION_7_DAYS,
-            bearer_token="token",
-            hpke_config="config",
-            hpke_private_key="private_key",
+        leader = mock_dap_leader_success()
+        aggregated_results = asyncio.run(
+            get_aggregated_results(
+                collector=mock_dap_collector(leader),
+                process_date=process_date,
+                task_id=task_id,
+                vdaf_length=4,
+                batch_start=JAN_1_2026,
+                batch_end=batch_end,
+                collector_duration=DURATION_7_DAYS,
+            )
         )
         self.assertIsNone(aggregated_results)
+        self.assertEqual([], leader.requests)
+
+    def test_get_all_aggregated_results(self):
+        leader = mock_dap_leader_success()
+        batch_end = current_batch_end(batch_start=JAN_1_2026, duration=DURATION_7_DAYS)
+        batches = [
+            (
+                SimpleNamespace(
+                    partner=SimpleNamespace(task_id=task_id, length=4),
+                    collector_duration=DURATION_7_DAYS,
+                ),
+                JAN_1_2026,
+                batch_end,
+            )
+            for task_id in [MOCK_TASK_ID_1, MOCK_TASK_ID_2]
+        ]
+
+        all_aggregated_results = get_all_aggregated_results(
+            process_date=batch_end,
+            batches=batches,
+            bearer_token=MOCK_BEARER_TOKEN,
+            hpke_config=MOCK_HPKE_CONFIG,
+            hpke_private_key=MOCK_HPKE_PRIVATE_KEY,
+            http_client=mock_dap_http_client(leader),
+        )
+
+        self.assertEqual(
+            [{0: 50, 1: 11, 2: 22, 3: 33}, {0: 50, 1: 11, 2: 22, 3: 33}],
+            all_aggregated_results,
+        )
+        self.assertEqual(2, len(leader.jobs))
+
+    def test_get_all_aggregated_results_failed_batch(self):
+        leader = mock_dap_leader_success()
+        batch_end = current_batch_end(batch_start=JAN_1_2026, duration=DURATION_7_DAYS)
+        # The second batch's histogram doesn't have the length of its task
+        batches = [
+            (
+                SimpleNamespace(
+                    partner=SimpleNamespace(task_id=task_id, length=length),
+                    collector_duration=DURATION_7_DAYS,
+                ),
+                JAN_1_2026,
+                batch_end,
+            )
+            for task_id, length in [(MOCK_TASK_ID_1, 4), (MOCK_TASK_ID_2, 3)]
+        ]
+
+        all_aggregated_results = get_all_aggregated_results(
+            process_date=batch_end,
+            batches=batches,
+            bearer_token=MOCK_BEARER_TOKEN,
+            hpke_config=MOCK_HPKE_CONFIG,
+            hpke_private_key=MOCK_HPKE_PRIVATE_KEY,
+            http_client=mock_dap_http_client(leader),
+        )
+
+        self.assertEqual({0: 50, 1: 11, 2: 22, 3: 33}, all_aggregated_results[0])
+        self.assertIsInstance(all_aggregated_results[1], Exception)
+        self.assertIn(
+            f"Collection failed for {MOCK_TASK_ID_2}", str(all_aggregated_results[1])
+        )
@@ -1,10 +1,25 @@
 from google.cloud import bigquery
 from collections.abc import Mapping, Sequence
-from subprocess import CompletedProcess
+import httpx
+import random
+import struct
 from typing import Any
 from uuid import uuid4
 from datetime import date
 
+from ads_attribution_dap_collector.dap_client import (
+    ROLE_HELPER,
+    ROLE_LEADER,
+    DapCollector,
+    HpkeConfig,
+    Vdaf,
+    aggregate_share_aad,
+    aggregate_share_info,
+    b64decode,
+    encode_collection,
+    hpke_seal,
+)
+
 JAN_1_2026 = date(2026, 1, 1)
 JAN_7_2026 = date(2026, 1, 7)
 JAN_15_2026 = date(2026, 1, 5)
@@ -19,6 +34,10 @@ MOCK_PARTNER_ID_2 = uuid4()
 MOCK_TASK_ID_1 = "0QqFBHvuEk1_y4v4GIa9bTaa3vXXtLjsK64QeifzHp1"
 MOCK_TASK_ID_2 = "0QqFBHvuEk1_y4v4GIa9bTaa3vXXtLjsK64QeifzHp2"
 
+MOCK_BEARER_TOKEN = "ssh_secret_token"
+MOCK_HPKE_CONFIG = "AQAgAAEAAQAgj0DFrbaPJWJK5bIU6nZ6bslNgp09e14a0bpvPiE4KF8"
+MOCK_HPKE_PRIVATE_KEY = "AAECAwQFBgcICQoLDA0ODxAREhMUFRYXGBkaGxwdHh8"
+
 
 def mock_get_valid_config() -> dict[str, Any]:
     return {
@@ -154,37 +173,95 @@ def mock_get_config_invalid_duration_value() -> dict[str, Any]:
     }
 
 
-def mock_dap_subprocess_success(
-    args: list[str], capture_output: bool, text: bool, check: bool, timeout: int
-) -> CompletedProcess:
-    return CompletedProcess(
-        args=[
-            "./collect",
-            "--task-id",
-            MOCK_TASK_ID_1,
-            "--leader",
-            "https://dap-leader-url",
-            "--vdaf",
-            "histogram",
-            "--length",
-            "4",
-            "--authorization-bearer-token",
-            "ssh_secret_token",
-            "--batch-interval-start",
-            "1768780800",
-            "--batch-interval-duration",
-            "604800",
-            "--hpke-config",
-            "AQAgAAEAAQAgpdceoGiuWvIiogA8SPCdprkhWMNtLq_y0GSePI7EhXE",
-            "--hpke-private-key",
-            "ssh-secret-private-key",
-        ],
-        returncode=0,
-        stdout="Number of reports: 150\nInterval start: 2026-01-19 00:00:00 UTC\nInterval end: 2026-01-25 00:00:00 UTC\nInterval length: 120s\nAggregation result: [50, 11, 22, 33]\n",  # noqa: E501
-        stderr="",
+class FakeDapLeader:
+    """Fake DAP leader, for use with httpx.MockTransport.
+
+    Collection jobs are pending for the first poll, then return the aggregate
+    result split into encrypted leader and helper shares. If status_code is set,
+    creating collection jobs fails with that status instead."""
+
+    def __init__(
+        self,
+        aggregate_result: list[int],
+        report_count: int = 150,
+        status_code: int | None = None,
+        title: str | None = None,
+    ):
+        self.aggregate_result = aggregate_result
+        self.report_count = report_count
+        self.status_code = status_code
+        self.title = title
+        self.jobs = {}
+        self.requests = []
+
+    def __call__(self, request: httpx.Request) -> httpx.Response:
+        self.requests.append(request)
+        assert request.headers["Authorization"] == f"Bearer {MOCK_BEARER_TOKEN}"
+        task_id = request.url.path.split("/")[2]
+        if request.method == "PUT":
+            if self.status_code is not None:
+                return httpx.Response(
+                    self.status_code,
+                    headers={"Content-Type": "application/problem+json"},
+                    json={"title": self.title} if self.title else {},
+                )
+            # Query type, followed by the batch interval
+            _, batch_start, duration = struct.unpack(">BQQ", request.content[:17])
+            self.jobs[request.url.path] = [batch_start, duration, 0]
+            return httpx.Response(201)
+
+        job = self.jobs[request.url.path]
+        job[2] += 1
+        if job[2] == 1:
+            return httpx.Response(202, headers={"Retry-After": "0"})
+        batch_start, duration, _ = job
+        return httpx.Response(
+            200, content=self.collection(task_id, batch_start, duration)
+        )
+
+    def collection(self, task_id: str, batch_start: int, duration: int) -> bytes:
+        vdaf = Vdaf("histogram", length=len(self.aggregate_result))
+        helper_share = [
+            random.randrange(vdaf.field_prime) for _ in self.aggregate_result
+        ]
+        leader_share = [
+            (value - share) % vdaf.field_prime
+            for value, share in zip(self.aggregate_result, helper_share)
+        ]
+        hpke_config = HpkeConfig.from_base64(MOCK_HPKE_CONFIG)
+        aad = aggregate_share_aad("dap-09", b64decode(task_id), batch_start, duration)
+        encrypted_shares = []
+        for role, share in [(ROLE_LEADER, leader_share), (ROLE_HELPER, helper_share)]:
+            enc, payload = hpke_seal(
+                hpke_config,
+                vdaf.encode_agg_share(share),
+                aggregate_share_info("dap-09", role),
+                aad,
+            )
+            encrypted_shares.append((hpke_config.id, enc, payload))
+        return encode_collection(
+            self.report_count, batch_start, duration, encrypted_shares
+        )
+
+
+def mock_dap_leader_success() -> FakeDapLeader:
+    return FakeDapLeader([50, 11, 22, 33])
+
+
+def mock_dap_collector(leader: FakeDapLeader) -> DapCollector:
+    return DapCollector(
+        "https://dap-leader-url",
+        MOCK_BEARER_TOKEN,
+        MOCK_HPKE_CONFIG,
+        MOCK_HPKE_PRIVATE_KEY,
+        http_client=mock_dap_http_client(leader),
     )
 
 
+def mock_dap_http_client(leader: FakeDapLeader) -> httpx.AsyncClient:
+    return httpx.AsyncClient(transport=httpx.MockTransport(leader))
+
+
 def mock_create_dataset(data_set: str, exists_ok: bool):
     pass
 
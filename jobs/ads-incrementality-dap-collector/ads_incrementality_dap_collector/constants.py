@@ -3,8 +3,9 @@ from datetime import datetime
 from google.cloud import bigquery
 
 DAP_LEADER = "https://dap-09-3.api.divviup.org"
+DAP_DRAFT = "dap-09"
 VDAF = "histogram"
-PROCESS_TIMEOUT = 1200  # 20 mins
+COLLECTION_TIMEOUT = 1200  # 20 mins
 
 CONFIG_FILE_NAME = "config.json"  # See example_config.json for the contents and structure of the job config file.
 LOG_FILE_NAME = f"{datetime.now()}-ads-incrementality-dap-collector.log"
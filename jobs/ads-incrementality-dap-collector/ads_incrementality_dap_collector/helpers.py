@@ -1,9 +1,9 @@
-import ast
+import asyncio
 from datetime import datetime, date
+import httpx
 import json
 import logging
 import requests
-import subprocess
 import time
 
 from google.cloud import bigquery
@@ -12,14 +12,16 @@ from types import SimpleNamespace
 from typing import Optional
 
 from constants import (
+    COLLECTION_TIMEOUT,
     COLLECTOR_RESULTS_SCHEMA,
     CONFIG_FILE_NAME,
+    DAP_DRAFT,
     DAP_LEADER,
     DEFAULT_BATCH_DURATION,
     LOG_FILE_NAME,
-    PROCESS_TIMEOUT,
     VDAF,
 )
+from dap_client import DapCollector, DapError, DapTimeoutError, Vdaf
 from models import (
     IncrementalityBranchResultsRow,
     NimbusExperiment,
@@ -92,74 +94,45 @@ def prepare_results_rows(
 
 
 # DAP helper functions
-def collect_dap_result(
+async def collect_dap_result(
+    collector: DapCollector,
     task_id: str,
     vdaf_length: int,
     batch_start: int,
     duration: int,
-    bearer_token: str,
-    hpke_config: str,
-    hpke_private_key: str,
 ) -> dict:
-    # Beware! This command string reveals secrets. Uncomment logging below only for debugging in local dev.
-    #
-    # command_str = (f"./collect --task-id {task_id} --leader {DAP_LEADER} --vdaf {VDAF} --length {vdaf_length} "
-    #                f"--authorization-bearer-token {bearer_token} --batch-interval-start {batch_start} "
-    #                f"--batch-interval-duration {duration} --hpke-config {hpke_config} "
-    #                f"--hpke-private-key {hpke_private_key}")
-    # logging.debug(f"command_str: {command_str}")
     logging.info(f"Processing batch_start: {batch_start} for duration: {duration}")
     try:
-        result = subprocess.run(
-            [
-                "./collect",
-                "--task-id",
-                task_id,
-                "--leader",
-                DAP_LEADER,
-                "--vdaf",
-                VDAF,
-                "--length",
-                f"{vdaf_length}",
-                "--authorization-bearer-token",
-                bearer_token,
-                "--batch-interval-start",
-                f"{batch_start}",
-                "--batch-interval-duration",
-                f"{duration}",
-                "--hpke-config",
-                hpke_config,
-                "--hpke-private-key",
-                hpke_private_key,
-            ],
-            capture_output=True,
-            text=True,
-            check=True,
-            timeout=PROCESS_TIMEOUT,
+        collection = await collector.collect(
+            task_id,
+            Vdaf(VDAF, length=vdaf_length),
+            batch_start,
+            duration,
+            timeout=COLLECTION_TIMEOUT,
         )
-        for line in result.stdout.splitlines():
-            if line.startswith("Aggregation result:"):
-                entries = parse_histogram(line[21:-1])
-                return entries
-    # Beware! Exceptions thrown by the subprocess reveal secrets.
-    # Log them and include traceback only for debugging in local dev.
-    except subprocess.CalledProcessError as e:
-        raise Exception(
-            f"Collection failed for {task_id}, {e.returncode}, stderr: {e.stderr}"
-        ) from None
-    except subprocess.TimeoutExpired as e:
+    except DapTimeoutError:
         raise Exception(
-            f"Collection timed out for {task_id}, {e.timeout}, stderr: {e.stderr}"
+            f"Collection timed out for {task_id}, {COLLECTION_TIMEOUT}"
         ) from None
+    except (DapError, httpx.HTTPError) as e:
+        raise Exception(f"Collection failed for {task_id}, {e}") from None
+    logging.info(f"Collected {collection.report_count} reports for {task_id}")
+    return histogram_entries(collection.aggregate_result)
 
 
 def collect_dap_results(
     tasks_to_collect: dict[str, dict[int, IncrementalityBranchResultsRow]],
     config: SimpleNamespace,
+    http_client: Optional[httpx.AsyncClient] = None,
 ) -> dict[str, dict[int, IncrementalityBranchResultsRow]]:
+    """Collect all the tasks concurrently, sharing one connection to the leader.
+
+    :param http_client: Client to send DAP requests with, by default an HTTP/2 client.
+    """
     tasks = list(dict.fromkeys(tasks_to_collect))
     logging.info(f"Starting DAP collection for tasks: {tasks}.")
-    for task_id in tasks:
+
+    async def collect_task(collector: DapCollector, task_id: str):
         logging.info(f"Collecting DAP task: {task_id}")
         results = tasks_to_collect[task_id]
         # The task vector length and batch duration are specified per-experiment and
@@ -171,14 +144,12 @@ def collect_dap_results(
             datetime.combine(firstBranch.batch_start, datetime.min.time()).timestamp()
         )
         batch_duration = firstBranch.batch_duration
-        collected = collect_dap_result(
+        collected = await collect_dap_result(
+            collector,
             task_id,
             task_length,
             batch_start_epoch,
             batch_duration,
-            config.bearer_token,
-            config.hpke_config,
-            config.hpke_private_key,
         )
         try:
             for bucket in results.keys():
@@ -189,6 +160,21 @@ def collect_dap_results(
             ) from e
         logging.info(f"Prepared final result rows: {tasks_to_collect[task_id]}")
         logging.info(f"Finished collecting DAP task: {task_id}")
+
+    async def collect_tasks():
+        async with DapCollector(
+            DAP_LEADER,
+            config.bearer_token,
+            config.hpke_config,
+            config.hpke_private_key,
+            draft=DAP_DRAFT,
+            http_client=http_client,
+        ) as collector:
+            await asyncio.gather(
+                *(collect_task(collector, task_id) for task_id in tasks)
+            )
+
+    asyncio.run(collect_tasks())
     logging.info("Finished DAP collection for all tasks.")
     return tasks_to_collect
 
@@ -202,9 +188,8 @@ def correct_wraparound(num: int) -> int:
     return num
 
 
-def parse_histogram(histogram_str: str) -> dict:
-    parsed_list = ast.literal_eval(histogram_str)
-    return {i: correct_wraparound(val) for i, val in enumerate(parsed_list)}
+def histogram_entries(histogram: list[int]) -> dict:
+    return {i: correct_wraparound(val) for i, val in enumerate(histogram)}
 
 
 # BigQuery helper functions
@@ -34,9 +34,10 @@ from tests.test_mocks import (  # noqa: E402
     mock_dap_config,
     mock_experiment_config,
     mock_experiment_config_with_default_duration,
-    mock_dap_subprocess_success,
-    mock_dap_subprocess_fail,
-    mock_dap_subprocess_raise,
+    mock_dap_leader_success,
+    mock_dap_leader_fail,
+    mock_dap_leader_raise,
+    mock_dap_http_client,
     mock_collected_tasks,
     mock_bq_config,
     mock_bq_table,
@@ -139,35 +140,45 @@ class TestHelpers(TestCase):
         self.assertEqual({}, results_rows)
         self.assertEqual([], list(results_rows.keys()))
 
-    @patch("subprocess.run", side_effect=mock_dap_subprocess_success)
-    def test_collect_dap_results_success(self, mock_dap_subprocess_success):
+    def test_collect_dap_results_success(self):
         tasks_to_collect = mock_tasks_to_collect()
         task_id = list(tasks_to_collect.keys())[0]
-        collected_tasks = collect_dap_results(tasks_to_collect, mock_dap_config())
-        self.assertEqual(1, mock_dap_subprocess_success.call_count)
+        leader = mock_dap_leader_success()
+        collected_tasks = collect_dap_results(
+            tasks_to_collect, mock_dap_config(), mock_dap_http_client(leader)
+        )
+        # Create the collection job, then poll it twice
+        self.assertEqual(["PUT", "POST", "POST"], [r.method for r in leader.requests])
         self.assertEqual(len(collected_tasks[task_id].keys()), 3)
         self.assertEqual(collected_tasks[task_id][1].value_count, 51649)
         self.assertEqual(collected_tasks[task_id][2].value_count, 1016)
         self.assertEqual(collected_tasks[task_id][3].value_count, 250361)
 
-    @patch("subprocess.run", side_effect=mock_dap_subprocess_fail)
-    def test_collect_dap_results_fail(self, mock_dap_subprocess_fail):
+    def test_collect_dap_results_fail(self):
         tasks_to_collect = mock_tasks_to_collect()
+        task_id = list(tasks_to_collect.keys())[0]
         with pytest.raises(
-            Exception, match="Failed to parse collected DAP results: None"
+            Exception,
+            match=f"Collection failed for {task_id}, Aggregate share has 16 bytes",
         ):
-            collect_dap_results(tasks_to_collect, mock_dap_config())
-            self.assertEqual(1, mock_dap_subprocess_success.call_count)
+            collect_dap_results(
+                tasks_to_collect,
+                mock_dap_config(),
+                mock_dap_http_client(mock_dap_leader_fail()),
+            )
 
-    @patch("subprocess.run", side_effect=mock_dap_subprocess_raise)
-    def test_collect_dap_results_raise(self, mock_dap_subprocess_raise):
+    def test_collect_dap_results_raise(self):
         tasks_to_collect = mock_tasks_to_collect()
         task_id = list(tasks_to_collect.keys())[0]
         with pytest.raises(
-            Exception, match=f"Collection failed for {task_id}, 1, stderr: Uh-oh"
+            Exception,
+            match=f"Collection failed for {task_id}, HTTP response status 400 Bad Request",
         ):
-            collect_dap_results(tasks_to_collect, mock_dap_config())
-            self.assertEqual(1, mock_dap_subprocess_success.call_count)
+            collect_dap_results(
+                tasks_to_collect,
+                mock_dap_config(),
+                mock_dap_http_client(mock_dap_leader_raise()),
+            )
 
     @patch("google.cloud.bigquery.Table")
     @patch("google.cloud.bigquery.Client")
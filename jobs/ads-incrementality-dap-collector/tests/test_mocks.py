@@ -1,8 +1,22 @@
 from google.cloud import bigquery
 from collections.abc import Mapping, Sequence
-from subprocess import CompletedProcess
+import httpx
+import random
+import struct
 from types import SimpleNamespace
-
+from typing import Optional
+
+from ads_incrementality_dap_collector.dap_client import (
+    ROLE_HELPER,
+    ROLE_LEADER,
+    HpkeConfig,
+    Vdaf,
+    aggregate_share_aad,
+    aggregate_share_info,
+    b64decode,
+    encode_collection,
+    hpke_seal,
+)
 from ads_incrementality_dap_collector.models import (
     IncrementalityBranchResultsRow,
     NimbusExperiment,
@@ -263,9 +277,9 @@ def mock_collected_tasks(
 
 def mock_dap_config() -> SimpleNamespace:
     return SimpleNamespace(
-        hpke_config="AQAgAAEAAQAgpdceoGiuWvIiogA8SPCdprkhWMNtLq_y0GSePI7EhXE",
+        hpke_config="AQAgAAEAAQAgj0DFrbaPJWJK5bIU6nZ6bslNgp09e14a0bpvPiE4KF8",
         bearer_token="shh-secret-token",
-        hpke_private_key="ssh-private-key",
+        hpke_private_key="AAECAwQFBgcICQoLDA0ODxAREhMUFRYXGBkaGxwdHh8",
         batch_start="1755291600",
     )
 
@@ -284,74 +298,92 @@ def mock_bq_config() -> SimpleNamespace:
     )
 
 
-def mock_dap_subprocess_success(
-    args: list[str], capture_output: bool, text: bool, check: bool, timeout: int
-) -> CompletedProcess:
-    return CompletedProcess(
-        args=[
-            "./collect",
-            "--task-id",
-            mock_referrer_task_id(),
-            "--leader",
-            "https://dap-leader-url",
-            "--vdaf",
-            "histogram",
-            "--length",
-            "3",
-            "--authorization-bearer-token",
-            "ssh_secret_token",
-            "--batch-interval-start",
-            "1756335600",
-            "--batch-interval-duration",
-            "3600",
-            "--hpke-config",
-            "AQAgAAEAAQAgpdceoGiuWvIiogA8SPCdprkhWMNtLq_y0GSePI7EhXE",
-            "--hpke-private-key",
-            "ssh-secret-private-key",
-        ],
-        returncode=0,
-        stdout="Number of reports: 150\nInterval start: 2025-08-27 23:32:00 UTC\nInterval end: 2025-08-27 23:34:00 UTC\nInterval length: 120s\nAggregation result: [763205, 51649, 1016, 250361]\n",  # noqa: E501
-        stderr="",
-    )
+class FakeDapLeader:
+    """Fake DAP leader, for use with httpx.MockTransport.
 
+    Collection jobs are pending for the first poll, then return the aggregate
+    result split into encrypted leader and helper shares. If status_code is set,
+    creating collection jobs fails with that status instead."""
 
-def mock_dap_subprocess_fail(
-    args: list[str], capture_output: bool, text: bool, check: bool, timeout: int
-) -> CompletedProcess:
-    return CompletedProcess(
-        args=[
-            "./collect",
-            "--task-id",
-            mock_referrer_task_id(),
-            "--leader",
-            "https://dap-09-3.api.divviup.org",
-            "--vdaf",
-            "histogram",
-            "--length",
-            "3",
-            "--authorization-bearer-token",
-            "ssh_secret_token",
-            "--batch-interval-start",
-            "1756335600",
-            "--batch-interval-duration",
-            "3600",
-            "--hpke-config",
-            "AQAgAAEAAQAgpdceoGiuWvIiogA8SPCdprkhWMNtLq_y0GSePI7EhXE",
-            "--hpke-private-key",
-            "ssh-secret-private-key",
-        ],
-        returncode=0,
-        stdout="Derp",
-        stderr="Uh-oh stuff went wrong actually",
-    )
-
-
-def mock_dap_subprocess_raise(
-    args: list[str], capture_output: bool, text: bool, check: bool, timeout: int
-) -> CompletedProcess:
-    raise Exception(
-        f"Collection failed for {mock_referrer_task_id()}, 1, stderr: Uh-oh"
-    ) from None
+    def __init__(
+        self,
+        aggregate_result: list[int],
+        report_count: int = 150,
+        status_code: Optional[int] = None,
+    ):
+        self.aggregate_result = aggregate_result
+        self.report_count = report_count
+        self.status_code = status_code
+        self.jobs = {}
+        self.requests = []
+
+    def __call__(self, request: httpx.Request) -> httpx.Response:
+        self.requests.append(request)
+        assert request.headers["Authorization"] == (
+            f"Bearer {mock_dap_config().bearer_token}"
+        )
+        task_id = request.url.path.split("/")[2]
+        if request.method == "PUT":
+            if self.status_code is not None:
+                return httpx.Response(
+                    self.status_code,
+                    headers={"Content-Type": "application/problem+json"},
+                    json={"type": "urn:ietf:params:ppm:dap:error:invalidBatchSize"},
+                )
+            # Query type, followed by the batch interval
+            _, batch_start, duration = struct.unpack(">BQQ", request.content[:17])
+            self.jobs[request.url.path] = [batch_start, duration, 0]
+            return httpx.Response(201)
+
+        job = self.jobs[request.url.path]
+        job[2] += 1
+        if job[2] == 1:
+            return httpx.Response(202, headers={"Retry-After": "0"})
+        batch_start, duration, _ = job
+        return httpx.Response(
+            200, content=self.collection(task_id, batch_start, duration)
+        )
+
+    def collection(self, task_id: str, batch_start: int, duration: int) -> bytes:
+        vdaf = Vdaf("histogram", length=len(self.aggregate_result))
+        helper_share = [
+            random.randrange(vdaf.field_prime) for _ in self.aggregate_result
+        ]
+        leader_share = [
+            (value - share) % vdaf.field_prime
+            for value, share in zip(self.aggregate_result, helper_share)
+        ]
+        hpke_config = HpkeConfig.from_base64(mock_dap_config().hpke_config)
+        aad = aggregate_share_aad("dap-09", b64decode(task_id), batch_start, duration)
+        encrypted_shares = []
+        for role, share in [(ROLE_LEADER, leader_share), (ROLE_HELPER, helper_share)]:
+            enc, payload = hpke_seal(
+                hpke_config,
+                vdaf.encode_agg_share(share),
+                aggregate_share_info("dap-09", role),
+                aad,
+            )
+            encrypted_shares.append((hpke_config.id, enc, payload))
+        return encode_collection(
+            self.report_count, batch_start, duration, encrypted_shares
+        )
+
+
+def mock_dap_leader_success() -> FakeDapLeader:
+    return FakeDapLeader([763205, 51649, 1016, 250361])
+
+
+def mock_dap_leader_fail() -> FakeDapLeader:
+    # The histogram doesn't have the length of the task
+    return FakeDapLeader([763205])
+
+
+def mock_dap_leader_raise() -> FakeDapLeader:
+    return FakeDapLeader([], status_code=400)
+
+
+def mock_dap_http_client(leader: FakeDapLeader) -> httpx.AsyncClient:
+    return httpx.AsyncClient(transport=httpx.MockTransport(leader))
 
 
 def mock_create_dataset(data_set: str, exists_ok: bool):
@@ -1,5 +1,6 @@
 import asyncio
 import click
+import collections
 import datetime
 import math
 import time
@@ -7,6 +8,8 @@ import time
 from google.cloud import bigquery
 import requests
 
+from checkpoint import CheckpointJournal, is_retry_error
+
 LEADER = "https://dap-09-3.api.divviup.org"
 CMD = f"./collect --task-id {{task_id}} --leader {LEADER} --vdaf {{vdaf}} {{vdaf_args}} --authorization-bearer-token {{auth_token}} --batch-interval-start {{timestamp}} --batch-interval-duration {{duration}} --hpke-config {{hpke_config}} --hpke-private-key {{hpke_private_key}}"
 MINUTES_IN_DAY = 1440
@@ -129,25 +132,7 @@ async def collect_once(task, timestamp, duration, hpke_private_key, auth_token):
                 entries = parse_vector(line[21:-1])
 
                 rpt["value"] = entries
-
-                for i, entry in enumerate(entries):
-                    ad = get_ad(task["task_id"], i)
-                    print(task["task_id"], i, ad)
-                    if ad is not None:
-                        cnt = {}
-                        cnt["collection_time"] = timestamp
-                        cnt["placement_id"] = ad["advertiserInfo"]["placementId"]
-                        cnt["advertiser_id"] = ad["advertiserInfo"]["advertiserId"]
-                        cnt["advertiser_name"] = ad["advertiserInfo"]["advertiserName"]
-                        cnt["ad_id"] = ad["advertiserInfo"]["adId"]
-                        cnt["conversion_key"] = ad["advertiserInfo"]["conversionKey"]
-                        cnt["task_id"] = task["task_id"]
-                        cnt["task_index"] = i
-                        cnt["task_size"] = task["task_size"]
-                        cnt["campaign_id"] = ad["advertiserInfo"]["campaignId"]
-                        cnt["conversion_count"] = entry
-
-                        res["counts"].append(cnt)
+                res["counts"] = build_counts(task, timestamp, entries)
             elif line.startswith("Number of reports:"):
                 rpt["report_count"] = int(line.split()[-1].strip())
             elif (
@@ -165,6 +150,29 @@ async def collect_once(task, timestamp, duration, hpke_private_key, auth_token):
     return res
 
 
+def build_counts(task, timestamp, entries):
+    """Builds the ad table rows for the histogram entries of a single slot."""
+    counts = []
+    for i, entry in enumerate(entries):
+        ad = get_ad(task["task_id"], i)
+        if ad is not None:
+            cnt = {}
+            cnt["collection_time"] = timestamp
+            cnt["placement_id"] = ad["advertiserInfo"]["placementId"]
+            cnt["advertiser_id"] = ad["advertiserInfo"]["advertiserId"]
+            cnt["advertiser_name"] = ad["advertiserInfo"]["advertiserName"]
+            cnt["ad_id"] = ad["advertiserInfo"]["adId"]
+            cnt["conversion_key"] = ad["advertiserInfo"]["conversionKey"]
+            cnt["task_id"] = task["task_id"]
+            cnt["task_index"] = i
+            cnt["task_size"] = task["task_size"]
+            cnt["campaign_id"] = ad["advertiserInfo"]["campaignId"]
+            cnt["conversion_count"] = entry
+
+            counts.append(cnt)
+    return counts
+
+
 def parse_vector(histogram_str):
     count_strs = histogram_str.split(",")
     return [
@@ -208,30 +216,62 @@ def build_error_result(task_id, timestamp, metric_type, error):
     return results
 
 
+def needs_retry(result):
+    """Whether a collection result is a failure that is worth collecting again."""
+    return is_retry_error(result["reports"][0].get("error"))
+
+
+def index_ads(ad_config):
+    """Index the ad config by (task id, task index).
+
+    If several ads map to the same bucket, the first one is used."""
+    index = {}
+    for ad in ad_config:
+        index.setdefault((ad["taskId"], ad["taskIndex"]), ad)
+    return index
+
+
 def get_ad(task_id, index):
-    global ads
-    for ad in ads:
-        if ad["taskId"] == task_id and ad["taskIndex"] == index:
-            return ad
+    return ads.get((task_id, index))
 
 
-async def process_queue(q: asyncio.Queue, results: dict):
+async def process_queue(q: asyncio.Queue, results: dict, journal, summary):
     """Worker for parallelism. Processes items from the queue until it is empty."""
     while not q.empty():
         job = q.get_nowait()
+        task, timestamp, duration = job[:3]
         res = await collect_once(*job)
-        results["reports"] += res["reports"]
-        results["counts"] += res["counts"]
+        failed = needs_retry(res)
+        retry = failed and journal.can_retry(task["task_id"], timestamp, duration)
+        journal.record(task["task_id"], timestamp, duration, res, retry=retry)
+        summary["failed" if failed else "collected"] += 1
+        # With a journal, failures are stored once a rerun collects them again or
+        # they run out of attempts
+        if not retry:
+            results["reports"] += res["reports"]
+            results["counts"] += res["counts"]
 
 
 async def collect_many(
-    task, time_from, time_until, interval_length, hpke_private_key, auth_token
+    task,
+    time_from,
+    time_until,
+    interval_length,
+    hpke_private_key,
+    auth_token,
+    journal=None,
+    summary=None,
 ):
     """Collects data for a given time interval.
 
     Creates a configurable amount of workers which process jobs from a queue
-    for parallelism.
+    for parallelism. Slots that the journal has a stored result for are skipped,
+    and slots that were collected but not stored reuse the journaled result.
     """
+    if journal is None:
+        journal = CheckpointJournal()
+    if summary is None:
+        summary = collections.Counter()
     time_from = int(time_from.timestamp())
     time_until = int(time_until.timestamp())
     start = math.ceil(time_from // interval_length) * interval_length
@@ -240,11 +280,21 @@ async def collect_many(
     results["reports"] = []
     results["counts"] = []
     while start + interval_length <= time_until:
-        await jobs.put((task, start, interval_length, hpke_private_key, auth_token))
+        entry = journal.get(task["task_id"], start, interval_length)
+        if entry is not None and not entry["retry"]:
+            if entry["stored"]:
+                summary["skipped"] += 1
+            else:
+                summary["recovered"] += 1
+                res = journal.reuse(entry)
+                results["reports"] += res["reports"]
+                results["counts"] += res["counts"]
+        else:
+            await jobs.put((task, start, interval_length, hpke_private_key, auth_token))
         start += interval_length
     workers = []
     for _ in range(10):
-        workers.append(process_queue(jobs, results))
+        workers.append(process_queue(jobs, results, journal, summary))
     await asyncio.gather(*workers)
 
     return results
@@ -280,7 +330,7 @@ def check_time_precision(time_precision_minutes, end_collection_date):
     return None
 
 
-async def collect_task(task, auth_token, hpke_private_key, date):
+async def collect_task(task, auth_token, hpke_private_key, date, journal=None, summary=None):
     """Collects data for the given task through to the given day.
         For tasks with time precision smaller than a day, will collect data for aggregations from the day prior to date.
         For tasks with time precision a day or multiple of day, will collect data for the aggregation that ends on date.
@@ -310,7 +360,8 @@ async def collect_task(task, auth_token, hpke_private_key, date):
         start_collection_date = end_collection_date - datetime.timedelta(days=aggregation_days)
 
     return await collect_many(
-        task, start_collection_date, end_collection_date, time_precision_minutes * 60, hpke_private_key, auth_token
+        task, start_collection_date, end_collection_date, time_precision_minutes * 60, hpke_private_key, auth_token,
+        journal, summary
     )
 
 
@@ -323,13 +374,66 @@ def ensure_table(bqclient, table_id, schema):
     table = bqclient.create_table(table, exists_ok=True)
 
 
-def store_data(results, bqclient, table_id):
-    """Inserts the results into BQ. Assumes that they are already in the right format"""
+def to_load_rows(results, schema):
+    """Formats timestamps, which are collected as epoch seconds, for a JSON load job."""
+    timestamp_fields = [field.name for field in schema if field.field_type == "TIMESTAMP"]
+    rows = []
+    for result in results:
+        row = dict(result)
+        for name in timestamp_fields:
+            if row.get(name) is not None:
+                row[name] = toh(float(row[name])).isoformat()
+        rows.append(row)
+    return rows
+
+
+def store_data(results, bqclient, table_id, schema):
+    """Appends the results to the table in BQ with a single load job.
+    Assumes that they are already in the right format"""
     if results:
-        insert_res = bqclient.insert_rows_json(table=table_id, json_rows=results)
-        if len(insert_res) != 0:
-            print(insert_res)
-            assert len(insert_res) == 0
+        job_config = bigquery.LoadJobConfig(
+            schema=schema,
+            source_format=bigquery.SourceFormat.NEWLINE_DELIMITED_JSON,
+            write_disposition=bigquery.WriteDisposition.WRITE_APPEND,
+        )
+        job = bqclient.load_table_from_json(
+            to_load_rows(results, schema), table_id, job_config=job_config
+        )
+        job.result()
+        print(f"Loaded {job.output_rows} rows into {table_id}")
+
+
+def collect_and_store(
+    tasks, auth_token, hpke_private_key, date, bqclient, ad_table_id, report_table_id, journal, summary
+):
+    """Collects the tasks and stores their rows, with one load job per table.
+
+    With a journal, the rows of all tasks are stored at the end, and a run that fails
+    before that is recovered by rerunning it with the same journal. Without one, each
+    task's rows are stored when it's collected, so a later failure doesn't lose them.
+    """
+    reports = []
+    counts = []
+    task_ids = []
+
+    def store():
+        store_data(reports, bqclient, report_table_id, REPORT_SCHEMA)
+        store_data(counts, bqclient, ad_table_id, ADS_SCHEMA)
+        for task_id in task_ids:
+            journal.mark_stored(task_id)
+        reports.clear()
+        counts.clear()
+        task_ids.clear()
+
+    for task in tasks:
+        print(f"Now processing task: {task['task_id']}")
+        results = asyncio.run(collect_task(task, auth_token, hpke_private_key, date, journal, summary))
+        reports.extend(results["reports"])
+        counts.extend(results["counts"])
+        task_ids.append(task["task_id"])
+        if not journal.enabled:
+            store()
+    store()
 
 
 @click.command()
@@ -371,19 +475,34 @@ def store_data(results, bqclient, table_id):
     help="URL where a JSON definition of the ads to task map can be found.",
     required=True,
 )
-def main(project, ad_table_id, report_table_id, auth_token, hpke_private_key, date, task_config_url, ad_config_url):
+@click.option(
+    "--checkpoint-file",
+    help="Journal of collected slots. Slots already in the journal are skipped, "
+    "apart from ones that failed or timed out.",
+    default=None,
+)
+def main(project, ad_table_id, report_table_id, auth_token, hpke_private_key, date, task_config_url, ad_config_url,
+         checkpoint_file):
     global ads
     ad_table_id = project + "." + ad_table_id
     report_table_id = project + "." + report_table_id
     bqclient = bigquery.Client(project=project)
-    ads = read_json(ad_config_url)
+    ads = index_ads(read_json(ad_config_url))
     ensure_table(bqclient, ad_table_id, ADS_SCHEMA)
     ensure_table(bqclient, report_table_id, REPORT_SCHEMA)
-    for task in read_json(task_config_url):
-        print(f"Now processing task: {task['task_id']}")
-        results = asyncio.run(collect_task(task, auth_token, hpke_private_key, date))
-        store_data(results["reports"], bqclient, report_table_id)
-        store_data(results["counts"], bqclient, ad_table_id)
+    journal = CheckpointJournal(checkpoint_file)
+    summary = collections.Counter()
+    try:
+        collect_and_store(
+            read_json(task_config_url), auth_token, hpke_private_key, date, bqclient, ad_table_id, report_table_id,
+            journal, summary
+        )
+    finally:
+        journal.close()
+    print(
+        f"Slots collected: {summary['collected']}, failed: {summary['failed']}, "
+        f"recovered from checkpoint: {summary['recovered']}, skipped: {summary['skipped']}"
+    )
 
 if __name__ == "__main__":
     main()
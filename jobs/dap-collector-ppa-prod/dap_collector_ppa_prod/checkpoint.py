@@ -0,0 +1,109 @@
+"""Local journal of collected DAP slots, so that reruns can skip them.
+
+The dap-collector-ppa-dev and dap-collector-ppa-prod jobs keep copies of this
+file, so that each image builds on its own. Change the copy in the
+dap-collector job, where it's tested, and copy it over; the repository's
+tests/test_vendored_files.py checks that the copies match.
+"""
+
+import collections
+import json
+import os
+
+# How many times a slot is collected before a failure is stored as final
+MAX_ATTEMPTS = 3
+
+
+def is_retry_error(error):
+    """Whether a collection error is a failure that is worth collecting again."""
+    return error is not None and (
+        error == "TIMEOUT" or error.startswith("UNHANDLED ERROR")
+    )
+
+
+class CheckpointJournal:
+    """Local journal of collected slots, so that reruns can skip them.
+
+    Each line of the file is a JSON object with the result of collecting one
+    slot, keyed by (task_id, slot_start, duration), how many times the slot was
+    collected, and whether the result was stored in BigQuery. Later lines
+    replace earlier ones with the same key. Without a path, nothing is recorded
+    and no slots are skipped.
+
+    Failures that will be collected again are recorded with `retry=True`. They
+    are never marked as stored, and callers shouldn't store them, so a slot
+    doesn't end up with both an error row and a value row once it's collected
+    successfully. Once a slot has been collected `max_attempts` times, its
+    failure is final and is stored like any other result.
+    """
+
+    def __init__(self, path=None, max_attempts=MAX_ATTEMPTS):
+        self.max_attempts = max_attempts
+        self.entries = {}
+        # Keys of results used in this run that aren't stored yet, by task id
+        self.pending = collections.defaultdict(set)
+        self.file = None
+        if path is None:
+            return
+        if os.path.exists(path):
+            with open(path) as f:
+                for line in f:
+                    if line.strip():
+                        entry = json.loads(line)
+                        key = (entry["task_id"], entry["slot_start"], entry["duration"])
+                        self.entries[key] = entry
+            print(f"Loaded {len(self.entries)} checkpoints from {path}")
+        self.file = open(path, "a")
+
+    @property
+    def enabled(self):
+        """Whether results are written to a file that later runs will read."""
+        return self.file is not None
+
+    def get(self, task_id, slot_start, duration):
+        return self.entries.get((task_id, slot_start, duration))
+
+    def can_retry(self, task_id, slot_start, duration):
+        """Whether a slot that just failed can be left for a later run to collect.
+
+        Without a file there's no later run, so failures are always final.
+        """
+        entry = self.get(task_id, slot_start, duration)
+        attempts = entry["attempts"] if entry is not None else 0
+        return self.enabled and attempts + 1 < self.max_attempts
+
+    def reuse(self, entry):
+        """Use the result of a journaled slot that hasn't been stored yet."""
+        key = (entry["task_id"], entry["slot_start"], entry["duration"])
+        self.pending[entry["task_id"]].add(key)
+        return entry["result"]
+
+    def record(self, task_id, slot_start, duration, result, stored=False, retry=False):
+        """Record a result that was just collected, or that was just stored."""
+        key = (task_id, slot_start, duration)
+        previous = self.entries.get(key)
+        attempts = previous["attempts"] if previous is not None else 0
+        entry = {
+            "task_id": task_id,
+            "slot_start": slot_start,
+            "duration": duration,
+            "result": result,
+            "attempts": attempts if stored else attempts + 1,
+            "retry": retry,
+            "stored": stored,
+        }
+        self.entries[key] = entry
+        if not stored and not retry:
+            self.pending[task_id].add(key)
+        if self.file is not None:
+            self.file.write(json.dumps(entry) + "\n")
+            self.file.flush()
+
+    def mark_stored(self, task_id):
+        """Record that all the results of the task used in this run are stored."""
+        for key in sorted(self.pending.pop(task_id, set())):
+            self.record(*key, self.entries[key]["result"], stored=True)
+
+    def close(self):
+        if self.file is not None:
+            self.file.close()
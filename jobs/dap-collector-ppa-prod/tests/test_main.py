@@ -1,6 +1,258 @@
-from dap_collector_ppa_prod.main import parse_vector
+import asyncio
+import collections
+import datetime
+import os
+import sys
+
+# main imports checkpoint.py as a sibling module, as when it's run as a script
+sys.path.append(
+    os.path.abspath(
+        os.path.join(os.path.dirname(__file__), "../dap_collector_ppa_prod")
+    )
+)
+
+from dap_collector_ppa_prod import main  # noqa: E402
+from dap_collector_ppa_prod.main import (  # noqa: E402
+    ADS_SCHEMA,
+    REPORT_SCHEMA,
+    build_base_report,
+    build_counts,
+    index_ads,
+    parse_vector,
+    store_data,
+)
 
 
 def test_parse_vector():
-    ret = parse_vector("54, 49, 340282366920938462946865773367900766208, 340282366920938462946865773367900766206, 1")
+    ret = parse_vector(
+        "54, 49, 340282366920938462946865773367900766208, 340282366920938462946865773367900766206, 1"
+    )
     assert ret == [54, 49, -1, -3, 1]
+
+
+def fake_collect_once(timeout_slots):
+    async def collect_once(task, timestamp, duration, hpke_private_key, auth_token):
+        rpt = build_base_report(task["task_id"], timestamp, task["metric_type"], "0")
+        if timestamp in timeout_slots:
+            rpt["error"] = "TIMEOUT"
+        return {"reports": [rpt], "counts": []}
+
+    return collect_once
+
+
+def test_checkpoint_journal(tmp_path, monkeypatch):
+    path = str(tmp_path / "checkpoints.jsonl")
+    task = {"task_id": "task", "metric_type": "sumvec"}
+    start = datetime.datetime(2024, 1, 1, tzinfo=datetime.timezone.utc)
+    end = start + datetime.timedelta(hours=1)
+    timeout_slot = int(start.timestamp())
+
+    def collect(timeout_slots, journal, summary):
+        monkeypatch.setattr(main, "collect_once", fake_collect_once(timeout_slots))
+        return asyncio.run(
+            main.collect_many(task, start, end, 600, "key", "token", journal, summary)
+        )
+
+    journal = main.CheckpointJournal(path)
+    summary = collections.Counter()
+    results = collect({timeout_slot}, journal, summary)
+    journal.close()
+    # The timed out slot isn't stored until it's collected again
+    assert len(results["reports"]) == 5
+    assert timeout_slot not in [rpt["slot_start"] for rpt in results["reports"]]
+    assert summary == {"collected": 5, "failed": 1}
+
+    # Collected but not stored, so the results are reused
+    journal = main.CheckpointJournal(path)
+    summary = collections.Counter()
+    results = collect(set(), journal, summary)
+    assert len(results["reports"]) == 6
+    assert summary == {"recovered": 5, "collected": 1}
+    journal.mark_stored("task")
+    journal.close()
+
+    journal = main.CheckpointJournal(path)
+    summary = collections.Counter()
+    results = collect(set(), journal, summary)
+    journal.close()
+    assert results["reports"] == []
+    assert summary == {"skipped": 6}
+
+
+def test_checkpoint_journal_retries_run_out(tmp_path, monkeypatch):
+    path = str(tmp_path / "checkpoints.jsonl")
+    task = {"task_id": "task", "metric_type": "sumvec"}
+    start = datetime.datetime(2024, 1, 1, tzinfo=datetime.timezone.utc)
+    end = start + datetime.timedelta(hours=1)
+    timeout_slot = int(start.timestamp())
+    monkeypatch.setattr(main, "collect_once", fake_collect_once({timeout_slot}))
+
+    def rerun():
+        journal = main.CheckpointJournal(path)
+        summary = collections.Counter()
+        results = asyncio.run(
+            main.collect_many(task, start, end, 600, "key", "token", journal, summary)
+        )
+        journal.mark_stored("task")
+        journal.close()
+        return results, summary
+
+    results, summary = rerun()
+    assert summary == {"collected": 5, "failed": 1}
+    results, summary = rerun()
+    assert results["reports"] == []
+    # The slot failed on every attempt, so its error row is stored
+    results, summary = rerun()
+    assert [(rpt["slot_start"], rpt["error"]) for rpt in results["reports"]] == [
+        (timeout_slot, "TIMEOUT")
+    ]
+    results, summary = rerun()
+    assert summary == {"skipped": 6}
+
+
+def make_ad(task_id, index, ad_id=None):
+    return {
+        "taskId": task_id,
+        "taskIndex": index,
+        "advertiserInfo": {
+            "placementId": "placement",
+            "advertiserId": "advertiser",
+            "advertiserName": "Advertiser",
+            "adId": ad_id or f"{task_id}-{index}",
+            "conversionKey": "key",
+            "campaignId": "campaign",
+        },
+    }
+
+
+def test_build_counts(monkeypatch):
+    monkeypatch.setattr(
+        main,
+        "ads",
+        index_ads(
+            [
+                make_ad("task", 0, "first"),
+                make_ad("task", 0, "second"),
+                make_ad("task", 2),
+            ]
+        ),
+    )
+    task = {"task_id": "task", "task_size": 3}
+    counts = build_counts(task, 1704067200, [5, 6, -1])
+    # The first ad for a bucket wins, and buckets without an ad are skipped
+    assert [
+        (cnt["ad_id"], cnt["task_index"], cnt["conversion_count"]) for cnt in counts
+    ] == [
+        ("first", 0, 5),
+        ("task-2", 2, -1),
+    ]
+
+
+class FakeLoadJob:
+    def __init__(self, rows):
+        self.output_rows = len(rows)
+
+    def result(self):
+        return self
+
+
+class FakeBigQueryClient:
+    def __init__(self):
+        self.loads = []
+
+    def load_table_from_json(self, rows, table_id, job_config):
+        self.loads.append((table_id, rows, job_config))
+        return FakeLoadJob(rows)
+
+
+def test_store_data():
+    bqclient = FakeBigQueryClient()
+    report = build_base_report("task", 1704067200, "sumvec", "1704153600.5")
+    report["collection_duration"] = 1.5
+
+    store_data([report, report], bqclient, "project.dataset.reports", REPORT_SCHEMA)
+    store_data([], bqclient, "project.dataset.ads", ADS_SCHEMA)
+
+    assert len(bqclient.loads) == 1
+    table_id, rows, job_config = bqclient.loads[0]
+    assert table_id == "project.dataset.reports"
+    assert len(rows) == 2
+    assert rows[0]["slot_start"] == "2024-01-01T00:00:00+00:00"
+    assert rows[0]["collection_time"] == "2024-01-02T00:00:00.500000+00:00"
+    assert job_config.write_disposition == "WRITE_APPEND"
+    # The results themselves are left unchanged for the journal
+    assert report["slot_start"] == 1704067200
+
+
+def test_build_counts_one_day(monkeypatch):
+    """One day of 5 minute slots for tasks with an ad for every other bucket."""
+    task_ids = [f"task{i}" for i in range(2)]
+    ad_config = [make_ad(task_id, i) for task_id in task_ids for i in range(0, 10, 2)]
+    monkeypatch.setattr(main, "ads", index_ads(ad_config))
+    start_time = datetime.datetime(2024, 1, 1, tzinfo=datetime.timezone.utc)
+    slots = [int(start_time.timestamp()) + i * 300 for i in range(288)]
+
+    counts = []
+    for task_id in task_ids:
+        task = {"task_id": task_id, "task_size": 10}
+        for slot in slots:
+            counts += build_counts(task, slot, list(range(10)))
+
+    assert len(counts) == len(task_ids) * len(slots) * 5
+    assert {cnt["task_index"] for cnt in counts} == {0, 2, 4, 6, 8}
+
+
+def fake_collect_task(failing_task_id):
+    async def collect_task(task, auth_token, hpke_private_key, date, journal, summary):
+        if task["task_id"] == failing_task_id:
+            raise RuntimeError("Collection failed")
+        rpt = build_base_report(task["task_id"], 1704067200, "sumvec", "1704153600")
+        cnt = {"task_id": task["task_id"], "collection_time": 1704067200}
+        return {"reports": [rpt], "counts": [cnt]}
+
+    return collect_task
+
+
+def collect_and_store(monkeypatch, journal, failing_task_id=None):
+    monkeypatch.setattr(main, "collect_task", fake_collect_task(failing_task_id))
+    bqclient = FakeBigQueryClient()
+    tasks = [{"task_id": task_id} for task_id in ("a", "b", "c")]
+    try:
+        main.collect_and_store(
+            tasks,
+            "token",
+            "key",
+            "2024-01-02",
+            bqclient,
+            "ads",
+            "reports",
+            journal,
+            collections.Counter(),
+        )
+    except RuntimeError:
+        pass
+    return [
+        (table_id, [row["task_id"] for row in rows])
+        for table_id, rows, _ in bqclient.loads
+    ]
+
+
+def test_collect_and_store(tmp_path, monkeypatch):
+    # Without a journal, the rows of each task are stored as soon as it's collected
+    assert collect_and_store(
+        monkeypatch, main.CheckpointJournal(), failing_task_id="c"
+    ) == [
+        ("reports", ["a"]),
+        ("ads", ["a"]),
+        ("reports", ["b"]),
+        ("ads", ["b"]),
+    ]
+
+    # With one, all the rows are stored at the end, and a failed run stores nothing
+    journal = main.CheckpointJournal(str(tmp_path / "checkpoints.jsonl"))
+    assert collect_and_store(monkeypatch, journal, failing_task_id="c") == []
+    assert collect_and_store(monkeypatch, journal) == [
+        ("reports", ["a", "b", "c"]),
+        ("ads", ["a", "b", "c"]),
+    ]
+    journal.close()
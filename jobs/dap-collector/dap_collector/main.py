@@ -1,20 +1,23 @@
 import asyncio
 import click
+import collections
 import datetime
-import json
+import itertools
 import math
-import os
-import re
-import subprocess
 import time
-import typing
 
 from google.cloud import bigquery
+import httpx
 import requests
 
+from checkpoint import CheckpointJournal, is_retry_error
+from dap_client import DapCollector, DapError, DapHttpError, DapTimeoutError, Vdaf
+
 LEADER = "https://dap-07-1.api.divviup.org"
-CMD = f"./collect --task-id {{task_id}} --leader {LEADER} --vdaf {{vdaf}} {{vdaf_args}} --authorization-bearer-token {{auth_token}} --batch-interval-start {{timestamp}} --batch-interval-duration {{duration}} --hpke-config {{hpke_config}} --hpke-private-key {{hpke_private_key}}"
+DAP_DRAFT = "dap-07"
 INTERVAL_LENGTH = 300
+# How long an individual collection can take before it is given up on.
+COLLECTION_TIMEOUT = 100
 
 
 def read_tasks(task_config_url):
@@ -30,10 +33,10 @@ def toh(timestamp):
     return datetime.datetime.fromtimestamp(timestamp, datetime.timezone.utc)
 
 
-async def collect_once(task, timestamp, duration, hpke_private_key, auth_token):
+async def collect_once(collector, task, timestamp, duration):
     """Runs collection for a single time interval.
 
-    This uses the Janus collect binary. The result is formatted to fit the BQ table.
+    The result is formatted to fit the BQ table.
     """
     collection_time = str(datetime.datetime.now(datetime.timezone.utc).timestamp())
     print(f"{collection_time} Collecting {toh(timestamp)} - {toh(timestamp+duration)}")
@@ -46,121 +49,190 @@ async def collect_once(task, timestamp, duration, hpke_private_key, auth_token):
     res["collection_time"] = collection_time
     res["slot_start"] = timestamp
 
-    # Convert VDAF description to string for command line use
-    vdaf_args = ""
-    for k, v in task["vdaf_args_structured"].items():
-        vdaf_args += f" --{k} {v}"
-
-    cmd = CMD.format(
-        timestamp=timestamp,
-        duration=duration,
-        hpke_private_key=hpke_private_key,
-        auth_token=auth_token,
-        task_id=task["task_id"],
-        vdaf=task["vdaf"],
-        vdaf_args=vdaf_args,
-        hpke_config=task["hpke_config"],
-    )
+    vdaf = Vdaf.from_args(task["vdaf"], task["vdaf_args_structured"])
 
-    # How long an individual collection can take before it is killed.
-    timeout = 100
     start_counter = time.perf_counter()
     try:
-        proc = await asyncio.wait_for(
-            asyncio.create_subprocess_shell(
-                cmd, stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.PIPE
-            ),
-            timeout,
+        collection = await collector.collect(
+            task["task_id"], vdaf, timestamp, duration, timeout=COLLECTION_TIMEOUT
         )
-        stdout, stderr = await asyncio.wait_for(proc.communicate(), timeout)
-        stdout = stdout.decode()
-        stderr = stderr.decode()
-    except asyncio.exceptions.TimeoutError:
+    except DapTimeoutError:
         res["collection_duration"] = time.perf_counter() - start_counter
-        res["error"] = f"TIMEOUT"
+        res["error"] = "TIMEOUT"
         return res
-    res["collection_duration"] = time.perf_counter() - start_counter
-
-    # Parse the output of the collect binary
-    if proc.returncode == 1:
-        if (
-            stderr
-            == "Error: HTTP response status 400 Bad Request - The number of reports included in the batch is invalid.\n"
-        ):
+    except DapHttpError as e:
+        res["collection_duration"] = time.perf_counter() - start_counter
+        if e.is_invalid_batch_size:
             res["error"] = "BATCH TOO SMALL"
         else:
-            res["error"] = f"UNHANDLED ERROR: {stderr }"
+            res["error"] = f"UNHANDLED ERROR: {e}"
+        return res
+    except (DapError, httpx.HTTPError) as e:
+        res["collection_duration"] = time.perf_counter() - start_counter
+        res["error"] = f"UNHANDLED ERROR: {e!r}"
+        return res
+    res["collection_duration"] = time.perf_counter() - start_counter
+
+    if task["vdaf"] in ["countvec", "sumvec"]:
+        res["value"] = collection.aggregate_result
+    elif task["vdaf"] == "sum":
+        res["value"] = [collection.aggregate_result]
     else:
-        for line in stdout.splitlines():
-            if line.startswith("Aggregation result:"):
-                if task["vdaf"] in ["countvec", "sumvec"]:
-                    entries = line[21:-1]
-                    entries = list(map(int, entries.split(",")))
-                    res["value"] = entries
-                elif task["vdaf"] == "sum":
-                    s = int(line[20:])
-                    res["value"] = [s]
-                else:
-                    raise RuntimeError(f"Unknown VDAF: {task['vdaf']}")
-            elif line.startswith("Number of reports:"):
-                res["report_count"] = int(line.split()[-1].strip())
-            elif (
-                line.startswith("Interval start:")
-                or line.startswith("Interval end:")
-                or line.startswith("Interval length:")
-            ):
-                # irrelevant since we are using time interval queries
-                continue
-            else:
-                print(f"UNHANDLED OUTPUT LINE: {line}")
-                raise NotImplementedError
+        raise RuntimeError(f"Unknown VDAF: {task['vdaf']}")
+    res["report_count"] = collection.report_count
 
     return res
 
 
-async def process_queue(q: asyncio.Queue, results: list):
-    """Worker for parallelism. Processes items from the qeueu until it is empty."""
-    while not q.empty():
-        job = q.get_nowait()
-        res = await collect_once(*job)
-        results.append(res)
+def needs_retry(result):
+    """Whether a collection result is a failure that is worth collecting again."""
+    return is_retry_error(result.get("error"))
 
 
-async def collect_many(
-    task, time_from, time_until, interval_length, hpke_private_key, auth_token
-):
-    """Collects data for a given time interval.
-
-    Creates a configurable amount of workers which process jobs from a queue
-    for parallelism.
-    """
+def task_slots(date, interval_length=INTERVAL_LENGTH):
+    """Returns the start timestamps of all the slots to collect for the given day."""
+    time_from = datetime.datetime.fromisoformat(date)
+    time_from = time_from.replace(tzinfo=datetime.timezone.utc)
+    time_until = int((time_from + datetime.timedelta(days=1)).timestamp())
     time_from = int(time_from.timestamp())
-    time_until = int(time_until.timestamp())
     start = math.ceil(time_from // interval_length) * interval_length
-    jobs = asyncio.Queue(288)
-    results = []
+    slots = []
     while start + interval_length <= time_until:
-        await jobs.put((task, start, interval_length, hpke_private_key, auth_token))
+        slots.append(start)
         start += interval_length
-    workers = []
-    for _ in range(10):
-        workers.append(process_queue(jobs, results))
-    await asyncio.gather(*workers)
+    return slots
 
-    return results
 
+def schedule_jobs(task_jobs, active_tasks, per_task_concurrency):
+    """Orders the jobs of all tasks for the shared queue.
 
-async def collect_task(task, auth_token, hpke_private_key, date):
-    """Collects data for the given task and the given day."""
-    start = datetime.datetime.fromisoformat(date)
-    start = start.replace(tzinfo=datetime.timezone.utc)
-    end = start + datetime.timedelta(days=1)
+    Only `active_tasks` tasks are worked on at the same time, taking turns to
+    schedule up to `per_task_concurrency` jobs each. This keeps the workers busy
+    while no task goes over its limit, and lets each task finish (and be stored)
+    without waiting for all the other tasks.
+    """
+    pending = collections.deque(iter(jobs) for jobs in task_jobs)
+    active = collections.deque()
+    while pending or active:
+        while pending and len(active) < active_tasks:
+            active.append(pending.popleft())
+        jobs = active.popleft()
+        batch = list(itertools.islice(jobs, per_task_concurrency))
+        yield from batch
+        if len(batch) == per_task_concurrency:
+            active.append(jobs)
+
+
+async def collect_all(
+    tasks,
+    auth_token,
+    hpke_private_key,
+    date,
+    on_task_complete,
+    concurrency,
+    per_task_concurrency,
+    journal=None,
+):
+    """Collects data for all the given tasks on the given day.
 
-    results = await collect_many(
-        task, start, end, INTERVAL_LENGTH, hpke_private_key, auth_token
-    )
+    All (task, slot) pairs go through one bounded queue, processed by
+    `concurrency` workers. At most `per_task_concurrency` slots of a single task
+    are collected at once. `on_task_complete` is called with the task and its
+    results as soon as all the slots of the task are collected.
 
-    return results
+    Slots that the journal has a stored result for are skipped. Slots that were
+    collected but not stored reuse the journaled result. Slots that failed or
+    timed out are collected again, so while the journal is enabled their
+    results aren't stored until they succeed or run out of attempts.
+
+    All collections share one HTTP/2 connection pool to the leader.
+
+    Returns a counter summarizing what happened to the slots.
+    """
+    if journal is None:
+        journal = CheckpointJournal()
+    loop = asyncio.get_running_loop()
+    summary = collections.Counter()
+    task_jobs = []
+    remaining = {}
+    results = {}
+    limits = {}
+    stores = []
+    http_client = httpx.AsyncClient(http2=True, timeout=60)
+    # One collector per HPKE config, all sharing the same connections
+    collectors = {}
+
+    async def store(task, task_results):
+        if task_results:
+            await loop.run_in_executor(None, on_task_complete, task, task_results)
+        journal.mark_stored(task["task_id"])
+
+    for task in tasks:
+        task_id = task["task_id"]
+        jobs = []
+        results[task_id] = []
+        for slot in task_slots(date):
+            entry = journal.get(task_id, slot, INTERVAL_LENGTH)
+            if entry is not None and not entry["retry"]:
+                if entry["stored"]:
+                    summary["skipped"] += 1
+                else:
+                    summary["recovered"] += 1
+                    results[task_id].append(journal.reuse(entry))
+                continue
+            jobs.append((task, slot, INTERVAL_LENGTH))
+        task_jobs.append(jobs)
+        if jobs and task["hpke_config"] not in collectors:
+            collectors[task["hpke_config"]] = DapCollector(
+                LEADER,
+                auth_token,
+                task["hpke_config"],
+                hpke_private_key,
+                draft=DAP_DRAFT,
+                http_client=http_client,
+            )
+        remaining[task_id] = len(jobs)
+        limits[task_id] = asyncio.Semaphore(per_task_concurrency)
+        if not jobs and results[task_id]:
+            stores.append(asyncio.ensure_future(store(task, results.pop(task_id))))
+
+    queue = asyncio.Queue(concurrency * 2)
+
+    async def produce():
+        active_tasks = math.ceil(concurrency / per_task_concurrency)
+        for job in schedule_jobs(task_jobs, active_tasks, per_task_concurrency):
+            await queue.put(job)
+        for _ in range(concurrency):
+            await queue.put(None)
+
+    async def work():
+        while True:
+            job = await queue.get()
+            if job is None:
+                return
+            task = job[0]
+            task_id = task["task_id"]
+            async with limits[task_id]:
+                res = await collect_once(collectors[task["hpke_config"]], *job)
+            failed = needs_retry(res)
+            retry = failed and journal.can_retry(
+                task_id, res["slot_start"], INTERVAL_LENGTH
+            )
+            journal.record(
+                task_id, res["slot_start"], INTERVAL_LENGTH, res, retry=retry
+            )
+            summary["failed" if failed else "collected"] += 1
+            if not retry:
+                results[task_id].append(res)
+            remaining[task_id] -= 1
+            if remaining[task_id] == 0:
+                print(f"Finished collecting task: {task_id}")
+                stores.append(asyncio.ensure_future(store(task, results.pop(task_id))))
+
+    async with http_client:
+        await asyncio.gather(produce(), *(work() for _ in range(concurrency)))
+    await asyncio.gather(*stores)
+    return summary
 
 
 def ensure_table(bqclient, table_id):
@@ -218,15 +290,66 @@ def store_data(results, bqclient, table_id):
     help="URL where a JSON definition of the tasks to be collected can be found.",
     required=True,
 )
-def main(project, table_id, auth_token, hpke_private_key, date, task_config_url):
+@click.option(
+    "--concurrency",
+    help="Maximum number of collections to run at once, across all tasks.",
+    default=20,
+    show_default=True,
+)
+@click.option(
+    "--per-task-concurrency",
+    help="Maximum number of collections to run at once for a single task.",
+    default=10,
+    show_default=True,
+)
+@click.option(
+    "--checkpoint-file",
+    help="Journal of collected slots. Slots already in the journal are skipped, "
+    "apart from ones that failed or timed out.",
+    default=None,
+)
+def main(
+    project,
+    table_id,
+    auth_token,
+    hpke_private_key,
+    date,
+    task_config_url,
+    concurrency,
+    per_task_concurrency,
+    checkpoint_file,
+):
     table_id = project + "." + table_id
     bqclient = bigquery.Client(project=project)
     ensure_table(bqclient, table_id)
-    for task in read_tasks(task_config_url):
-        print(f"Now processing task: {task['task_id']}")
-        results = asyncio.run(collect_task(task, auth_token, hpke_private_key, date))
+    tasks = read_tasks(task_config_url)
+    print(f"Now processing {len(tasks)} tasks")
+
+    def on_task_complete(task, results):
         store_data(results, bqclient, table_id)
 
+    journal = CheckpointJournal(checkpoint_file)
+    try:
+        summary = asyncio.run(
+            collect_all(
+                tasks,
+                auth_token,
+                hpke_private_key,
+                date,
+                on_task_complete,
+                concurrency,
+                per_task_concurrency,
+                journal,
+            )
+        )
+    finally:
+        journal.close()
+    print(
+        f"Slots collected: {summary['collected']}, failed: {summary['failed']}, "
+        f"recovered from checkpoint: {summary['recovered']}, "
+        f"skipped: {summary['skipped']}"
+    )
+
 
 if __name__ == "__main__":
     main()
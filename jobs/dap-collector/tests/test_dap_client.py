@@ -0,0 +1,227 @@
+import asyncio
+import json
+import os
+import struct
+import sys
+
+import httpx
+import pytest
+from cryptography.hazmat.primitives.asymmetric.x25519 import (
+    X25519PrivateKey,
+    X25519PublicKey,
+)
+
+# Append the source code directory to the path
+sys.path.append(
+    os.path.abspath(os.path.join(os.path.dirname(__file__), "../dap_collector"))
+)
+
+from dap_client import (  # noqa: E402
+    AEAD_AES_128_GCM,
+    KDF_HKDF_SHA256,
+    KEM_X25519_HKDF_SHA256,
+    ROLE_HELPER,
+    ROLE_LEADER,
+    DapCollector,
+    DapError,
+    HpkeConfig,
+    Vdaf,
+    _hpke_context,
+    _public_bytes,
+    aggregate_share_aad,
+    aggregate_share_info,
+    b64decode,
+    b64encode,
+    decode_collection,
+    encode_collection,
+    hpke_open,
+    hpke_seal,
+)
+
+# Base mode, X25519/HKDF-SHA256 vectors from RFC 9180 (the CFRG test-vectors.json)
+HPKE_TEST_VECTORS = os.path.join(
+    os.path.dirname(__file__), "data", "hpke_test_vectors.json"
+)
+
+TASK_ID = b64encode(bytes(range(32)))
+BEARER_TOKEN = "token"
+BATCH_START = 1700000000
+BATCH_DURATION = 300
+
+
+def load_hpke_test_vectors():
+    with open(HPKE_TEST_VECTORS) as f:
+        return json.load(f)
+
+
+@pytest.mark.parametrize(
+    "vector", load_hpke_test_vectors(), ids=lambda vector: f"aead{vector['aead_id']}"
+)
+def test_hpke_known_answer(vector):
+    config = HpkeConfig(
+        1,
+        vector["kem_id"],
+        vector["kdf_id"],
+        vector["aead_id"],
+        bytes.fromhex(vector["pkRm"]),
+    )
+    private_key = bytes.fromhex(vector["skRm"])
+    enc = bytes.fromhex(vector["enc"])
+    info = bytes.fromhex(vector["info"])
+
+    recipient_key = X25519PrivateKey.from_private_bytes(private_key)
+    assert _public_bytes(recipient_key) == config.public_key
+    dh = recipient_key.exchange(X25519PublicKey.from_public_bytes(enc))
+    key, nonce = _hpke_context(config, dh, enc + config.public_key, info)
+    assert key.hex() == vector["key"]
+    assert nonce.hex() == vector["base_nonce"]
+
+    encryption = vector["encryptions"][0]
+    plaintext = hpke_open(
+        config,
+        private_key,
+        enc,
+        bytes.fromhex(encryption["ct"]),
+        info,
+        bytes.fromhex(encryption["aad"]),
+    )
+    assert plaintext.hex() == encryption["pt"]
+
+
+@pytest.mark.parametrize("draft", ["dap-07", "dap-09"])
+def test_aggregate_share_aad(draft):
+    task_id = bytes(range(32))
+    expected = (
+        task_id
+        # Empty aggregation parameter
+        + b"\x00\x00\x00\x00"
+        # Time interval batch selector
+        + b"\x01"
+        + BATCH_START.to_bytes(8, "big")
+        + BATCH_DURATION.to_bytes(8, "big")
+    )
+    assert aggregate_share_aad(draft, task_id, BATCH_START, BATCH_DURATION) == expected
+
+
+def test_aggregate_share_aad_unsupported_draft():
+    with pytest.raises(DapError):
+        aggregate_share_aad("dap-04", bytes(32), BATCH_START, BATCH_DURATION)
+
+
+def test_aggregate_share_info():
+    assert aggregate_share_info("dap-07", ROLE_LEADER) == (
+        b"dap-07 aggregate share\x02\x00"
+    )
+    assert aggregate_share_info("dap-09", ROLE_HELPER) == (
+        b"dap-09 aggregate share\x03\x00"
+    )
+
+
+def test_decode_collection():
+    data = (
+        # Partial batch selector for a time interval query
+        b"\x01"
+        + struct.pack(">QQQ", 12, BATCH_START, BATCH_DURATION)
+        + b"\x07\x00\x02ab\x00\x00\x00\x03cde"
+        + b"\x07\x00\x01f\x00\x00\x00\x01g"
+    )
+    assert decode_collection(data) == (
+        12,
+        BATCH_START,
+        BATCH_DURATION,
+        [(7, b"ab", b"cde"), (7, b"f", b"g")],
+    )
+    assert (
+        encode_collection(
+            12, BATCH_START, BATCH_DURATION, [(7, b"ab", b"cde"), (7, b"f", b"g")]
+        )
+        == data
+    )
+
+
+def test_decode_collection_truncated():
+    with pytest.raises(DapError):
+        decode_collection(b"\x01" + struct.pack(">QQ", 12, BATCH_START))
+
+
+class FakeDapLeader:
+    """Serves collection jobs, encrypting shares with the given AAD task id."""
+
+    def __init__(self, hpke_config, aggregate_result, draft, aad_task_id=None):
+        self.hpke_config = hpke_config
+        self.aggregate_result = aggregate_result
+        self.draft = draft
+        self.aad_task_id = aad_task_id
+
+    def __call__(self, request: httpx.Request) -> httpx.Response:
+        if request.method == "PUT":
+            return httpx.Response(201)
+        task_id = b64decode(request.url.path.split("/")[2])
+        aad = aggregate_share_aad(
+            self.draft, self.aad_task_id or task_id, BATCH_START, BATCH_DURATION
+        )
+        vdaf = Vdaf("sumvec", length=len(self.aggregate_result))
+        shares = [self.aggregate_result, [0] * len(self.aggregate_result)]
+        encrypted = []
+        for role, share in zip((ROLE_LEADER, ROLE_HELPER), shares):
+            enc, payload = hpke_seal(
+                self.hpke_config,
+                vdaf.encode_agg_share(share),
+                aggregate_share_info(self.draft, role),
+                aad,
+            )
+            encrypted.append((self.hpke_config.id, enc, payload))
+        return httpx.Response(
+            200, content=encode_collection(7, BATCH_START, BATCH_DURATION, encrypted)
+        )
+
+
+def make_collector(draft="dap-09", aad_task_id=None):
+    """A collector for a fake leader that aggregates to [4, 5, 6]."""
+    private_key = X25519PrivateKey.generate()
+    hpke_config = HpkeConfig(
+        3,
+        KEM_X25519_HKDF_SHA256,
+        KDF_HKDF_SHA256,
+        AEAD_AES_128_GCM,
+        _public_bytes(private_key),
+    )
+    leader = FakeDapLeader(hpke_config, [4, 5, 6], draft, aad_task_id)
+    return DapCollector(
+        "https://leader.example",
+        BEARER_TOKEN,
+        b64encode(hpke_config.to_bytes()),
+        b64encode(private_key.private_bytes_raw()),
+        draft=draft,
+        http_client=httpx.AsyncClient(transport=httpx.MockTransport(leader)),
+    )
+
+
+def collect(collector):
+    async def run():
+        async with collector:
+            return await collector.collect(
+                TASK_ID, Vdaf("sumvec", length=3), BATCH_START, BATCH_DURATION
+            )
+
+    return asyncio.run(run())
+
+
+@pytest.mark.parametrize("draft", ["dap-07", "dap-09"])
+def test_collect(draft):
+    collection = collect(make_collector(draft))
+    assert collection.report_count == 7
+    assert collection.aggregate_result == [4, 5, 6]
+
+
+def test_collect_undecryptable():
+    with pytest.raises(DapError, match="decrypt") as excinfo:
+        collect(make_collector(aad_task_id=bytes(32)))
+    report_count, interval_start, _, _ = decode_collection(excinfo.value.collection)
+    assert report_count == 7
+    assert interval_start == BATCH_START
+
+
+def test_unsupported_draft():
+    with pytest.raises(DapError):
+        make_collector("dap-04")
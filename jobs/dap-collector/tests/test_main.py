@@ -0,0 +1,333 @@
+import asyncio
+import collections
+import datetime
+import os
+import sys
+
+import pytest
+from cryptography.hazmat.primitives.asymmetric.x25519 import X25519PrivateKey
+
+# Append the source code directory to the path
+sys.path.append(
+    os.path.abspath(os.path.join(os.path.dirname(__file__), "../dap_collector"))
+)
+
+import main  # noqa: E402
+from checkpoint import CheckpointJournal, is_retry_error  # noqa: E402
+from dap_client import (  # noqa: E402
+    AEAD_AES_128_GCM,
+    KDF_HKDF_SHA256,
+    KEM_X25519_HKDF_SHA256,
+    HpkeConfig,
+    _public_bytes,
+    b64encode,
+)
+
+DATE = "2024-01-01"
+SLOTS_PER_DAY = 288
+
+PRIVATE_KEY = X25519PrivateKey.generate()
+HPKE_CONFIG = b64encode(
+    HpkeConfig(
+        1,
+        KEM_X25519_HKDF_SHA256,
+        KDF_HKDF_SHA256,
+        AEAD_AES_128_GCM,
+        _public_bytes(PRIVATE_KEY),
+    ).to_bytes()
+)
+HPKE_PRIVATE_KEY = b64encode(PRIVATE_KEY.private_bytes_raw())
+
+
+def make_task(task_id):
+    return {
+        "task_id": task_id,
+        "metric_type": "sum",
+        "vdaf": "sum",
+        "vdaf_args_structured": {},
+        "hpke_config": HPKE_CONFIG,
+    }
+
+
+def fake_collect_once(timeout_slots, collected):
+    async def collect_once(collector, task, timestamp, duration):
+        collected.append((task["task_id"], timestamp))
+        res = {
+            "metric_type": task["metric_type"],
+            "task_id": task["task_id"],
+            "collection_time": "0",
+            "slot_start": timestamp,
+            "collection_duration": 0,
+        }
+        if (task["task_id"], timestamp) in timeout_slots:
+            res["error"] = "TIMEOUT"
+        else:
+            res["value"] = [1]
+            res["report_count"] = 1
+        return res
+
+    return collect_once
+
+
+def run_collect_all(monkeypatch, tasks, timeout_slots, journal):
+    collected = []
+    stored = []
+    monkeypatch.setattr(
+        main, "collect_once", fake_collect_once(timeout_slots, collected)
+    )
+
+    def on_task_complete(task, results):
+        stored.extend(results)
+
+    summary = asyncio.run(
+        main.collect_all(
+            tasks,
+            "token",
+            HPKE_PRIVATE_KEY,
+            DATE,
+            on_task_complete,
+            concurrency=4,
+            per_task_concurrency=2,
+            journal=journal,
+        )
+    )
+    return summary, collected, stored
+
+
+def test_is_retry_error():
+    assert is_retry_error("TIMEOUT")
+    assert is_retry_error("UNHANDLED ERROR: HTTP response status 500")
+    assert not is_retry_error("BATCH TOO SMALL")
+    assert not is_retry_error(None)
+
+
+def test_checkpoint_journal(tmp_path):
+    path = str(tmp_path / "checkpoints.jsonl")
+    journal = CheckpointJournal(path)
+    assert journal.enabled
+    journal.record("a", 0, 300, {"value": [1]})
+    journal.record("a", 300, 300, {"error": "TIMEOUT"}, retry=True)
+    journal.record("b", 0, 300, {"value": [2]})
+    journal.mark_stored("a")
+    journal.close()
+
+    journal = CheckpointJournal(path)
+    assert journal.get("a", 0, 300)["stored"]
+    assert journal.get("a", 0, 300)["attempts"] == 1
+    # Results that will be retried are never marked as stored
+    assert not journal.get("a", 300, 300)["stored"]
+    assert not journal.get("b", 0, 300)["stored"]
+    assert journal.get("b", 300, 300) is None
+    journal.close()
+
+    assert not CheckpointJournal().enabled
+    assert not CheckpointJournal().can_retry("a", 0, 300)
+
+
+def test_checkpoint_journal_attempts(tmp_path):
+    journal = CheckpointJournal(str(tmp_path / "checkpoints.jsonl"), max_attempts=3)
+    for attempt in range(1, 3):
+        assert journal.can_retry("a", 0, 300)
+        journal.record("a", 0, 300, {"error": "TIMEOUT"}, retry=True)
+        assert journal.get("a", 0, 300)["attempts"] == attempt
+    # The third failure is final
+    assert not journal.can_retry("a", 0, 300)
+    journal.record("a", 0, 300, {"error": "TIMEOUT"})
+    journal.mark_stored("a")
+    assert journal.get("a", 0, 300)["stored"]
+    assert journal.get("a", 0, 300)["attempts"] == 3
+    journal.close()
+
+
+def test_collect_all_rerun(tmp_path, monkeypatch):
+    path = str(tmp_path / "checkpoints.jsonl")
+    tasks = [make_task("a"), make_task("b")]
+    first_slot = int(
+        datetime.datetime.fromisoformat(DATE + "T00:00:00+00:00").timestamp()
+    )
+    timeout_slots = {("a", first_slot)}
+
+    journal = CheckpointJournal(path)
+    summary, collected, stored = run_collect_all(
+        monkeypatch, tasks, timeout_slots, journal
+    )
+    journal.close()
+    assert len(collected) == 2 * SLOTS_PER_DAY
+    assert summary == {"collected": 2 * SLOTS_PER_DAY - 1, "failed": 1}
+    # The timed out slot is left for the rerun to store
+    assert len(stored) == 2 * SLOTS_PER_DAY - 1
+    assert all("error" not in row for row in stored)
+
+    journal = CheckpointJournal(path)
+    summary, collected, rerun_stored = run_collect_all(
+        monkeypatch, tasks, set(), journal
+    )
+    journal.close()
+    assert collected == [("a", first_slot)]
+    assert summary == {"skipped": 2 * SLOTS_PER_DAY - 1, "collected": 1}
+    assert [(row["task_id"], row["slot_start"]) for row in rerun_stored] == [
+        ("a", first_slot)
+    ]
+
+    # Every slot is stored exactly once across both runs
+    rows = collections.Counter(
+        (row["task_id"], row["slot_start"]) for row in stored + rerun_stored
+    )
+    assert len(rows) == 2 * SLOTS_PER_DAY
+    assert set(rows.values()) == {1}
+
+
+def test_collect_all_without_journal(monkeypatch):
+    first_slot = int(
+        datetime.datetime.fromisoformat(DATE + "T00:00:00+00:00").timestamp()
+    )
+    summary, collected, stored = run_collect_all(
+        monkeypatch, [make_task("a")], {("a", first_slot)}, None
+    )
+    # Without a journal there's no rerun, so the failure is stored
+    assert len(stored) == SLOTS_PER_DAY
+    assert [row["error"] for row in stored if "error" in row] == ["TIMEOUT"]
+
+
+def test_task_slots():
+    first_slot = int(
+        datetime.datetime.fromisoformat(DATE + "T00:00:00+00:00").timestamp()
+    )
+    slots = main.task_slots(DATE)
+    assert len(slots) == SLOTS_PER_DAY
+    assert slots[0] == first_slot
+    assert slots[-1] == first_slot + 86400 - main.INTERVAL_LENGTH
+    assert main.task_slots(DATE, interval_length=3600)[1] == first_slot + 3600
+
+
+def test_schedule_jobs_order():
+    task_jobs = [["a1", "a2", "a3", "a4", "a5"], ["b1", "b2", "b3"], ["c1", "c2"]]
+    # Tasks a and b take turns in batches of two, and c starts once b is done
+    assert list(
+        main.schedule_jobs(task_jobs, active_tasks=2, per_task_concurrency=2)
+    ) == ["a1", "a2", "b1", "b2", "a3", "a4", "b3", "a5", "c1", "c2"]
+    assert list(
+        main.schedule_jobs(
+            [["a1", "a2", "a3"], [], ["c1", "c2"]],
+            active_tasks=3,
+            per_task_concurrency=1,
+        )
+    ) == ["a1", "c1", "a2", "c2", "a3"]
+
+
+@pytest.mark.parametrize(
+    "active_tasks,per_task_concurrency", [(1, 1), (1, 4), (2, 3), (3, 2), (10, 4)]
+)
+def test_schedule_jobs_limits(active_tasks, per_task_concurrency):
+    sizes = [7, 1, 0, 4, 9, 3]
+    task_jobs = [[(task, i) for i in range(size)] for task, size in enumerate(sizes)]
+    order = list(main.schedule_jobs(task_jobs, active_tasks, per_task_concurrency))
+
+    # Every job is scheduled once, and the jobs of a task keep their order
+    assert len(order) == sum(sizes)
+    for task, jobs in enumerate(task_jobs):
+        assert [job for job in order if job[0] == task] == jobs
+
+    # Tasks are started in order, and at most active_tasks are in progress at once
+    first = {}
+    last = {}
+    for position, (task, _) in enumerate(order):
+        first.setdefault(task, position)
+        last[task] = position
+    assert sorted(first, key=first.get) == [task for task in range(6) if sizes[task]]
+    for position in range(len(order)):
+        in_progress = [task for task in first if first[task] <= position <= last[task]]
+        assert len(in_progress) <= active_tasks
+
+    # While other tasks are in progress, a task gets at most per_task_concurrency
+    # jobs in a row
+    for position in range(len(order) - per_task_concurrency):
+        window = order[position : position + per_task_concurrency + 1]
+        window_tasks = [
+            task
+            for task in first
+            if first[task] <= position + per_task_concurrency and last[task] > position
+        ]
+        if len(window_tasks) > 1:
+            assert len({task for task, _ in window}) > 1
+
+
+def test_collect_all_limits(monkeypatch):
+    tasks = [make_task("a"), make_task("b"), make_task("c")]
+    in_flight = collections.Counter()
+    max_in_flight = collections.Counter()
+    stored_tasks = []
+    stored_before_last_c = []
+
+    async def collect_once(collector, task, timestamp, duration):
+        task_id = task["task_id"]
+        in_flight[task_id] += 1
+        in_flight["total"] += 1
+        for key in (task_id, "total"):
+            max_in_flight[key] = max(max_in_flight[key], in_flight[key])
+        # Task c is slow, so the other tasks finish long before it does
+        await asyncio.sleep(0.001 if task_id == "c" else 0)
+        if task_id == "c" and timestamp == main.task_slots(DATE)[-1]:
+            stored_before_last_c.extend(stored_tasks)
+        in_flight[task_id] -= 1
+        in_flight["total"] -= 1
+        return {"task_id": task_id, "slot_start": timestamp}
+
+    monkeypatch.setattr(main, "collect_once", collect_once)
+
+    def on_task_complete(task, results):
+        stored_tasks.append(task["task_id"])
+        assert len(results) == SLOTS_PER_DAY
+
+    summary = asyncio.run(
+        main.collect_all(
+            tasks,
+            "token",
+            HPKE_PRIVATE_KEY,
+            DATE,
+            on_task_complete,
+            concurrency=3,
+            per_task_concurrency=2,
+        )
+    )
+    assert summary == {"collected": 3 * SLOTS_PER_DAY}
+    assert max_in_flight["total"] == 3
+    assert max(max_in_flight[task["task_id"]] for task in tasks) == 2
+    # Each task is stored when it's done, without waiting for the others
+    assert sorted(stored_tasks) == ["a", "b", "c"]
+    assert stored_tasks[-1] == "c"
+    assert set(stored_before_last_c) == {"a", "b"}
+
+
+def test_collect_all_retries_run_out(tmp_path, monkeypatch):
+    path = str(tmp_path / "checkpoints.jsonl")
+    first_slot = int(
+        datetime.datetime.fromisoformat(DATE + "T00:00:00+00:00").timestamp()
+    )
+    # The slot times out on every run
+    timeout_slots = {("a", first_slot)}
+
+    def rerun():
+        journal = CheckpointJournal(path)
+        try:
+            return run_collect_all(
+                monkeypatch, [make_task("a")], timeout_slots, journal
+            )
+        finally:
+            journal.close()
+
+    summary, collected, stored = rerun()
+    assert len(stored) == SLOTS_PER_DAY - 1
+    summary, collected, stored = rerun()
+    assert collected == [("a", first_slot)]
+    assert stored == []
+
+    # Once the slot runs out of attempts, its error row is stored
+    summary, collected, stored = rerun()
+    assert collected == [("a", first_slot)]
+    assert [row["error"] for row in stored] == ["TIMEOUT"]
+    assert summary == {"skipped": SLOTS_PER_DAY - 1, "failed": 1}
+
+    summary, collected, stored = rerun()
+    assert collected == []
+    assert summary == {"skipped": SLOTS_PER_DAY}
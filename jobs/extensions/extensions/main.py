@@ -2,12 +2,18 @@
 import pandas as pd
 from datetime import datetime
 import requests
+from requests.adapters import HTTPAdapter
 from bs4 import BeautifulSoup
 import re
 from argparse import ArgumentParser
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from contextlib import contextmanager
+import multiprocessing
 from google.cloud import bigquery
-from urllib.parse import urljoin
+from urllib.parse import urljoin, urlparse
+import threading
 import time
+from selenium.common.exceptions import TimeoutException
 from selenium.webdriver.common.by import By
 from selenium.webdriver.chrome.service import Service
 from selenium.webdriver.support.ui import WebDriverWait
@@ -16,6 +22,8 @@ from selenium.webdriver.chrome.options import Options
 from selenium.webdriver.chrome.webdriver import WebDriver as ChromiumDriver
 from selenium import webdriver
 
+from driver_pool import BrowserTimings, DriverPool
+
 # Main website for Chrome Webstore
 CHROME_WEBSTORE_URL = "https://chromewebstore.google.com"
 
@@ -47,9 +55,37 @@ GCS_BUCKET = "gs://moz-fx-data-prod-external-data/"
 RESULTS_FPATH = "CHROME_EXTENSIONS/chrome_extensions_%s.csv"
 TIMEOUT_IN_SECONDS = 10
 MAX_CLICKS = 40  # Max load more button clicks
+CLICK_TIMEOUT = 10  # Max seconds to wait for more results after a click
+SCROLL_TIMEOUT = 4  # Max seconds to wait for the page to grow after a scroll
+BROWSER_POOL_SIZE = 2  # Browsers kept open to crawl non detail pages
 DRIVER_TYP = "Chrome"  # "Chromium"
 BINARY_LOC = "/usr/bin/google-chrome-stable"  # "/usr/bin/chromium"
 DRIVER_PATH = "/usr/local/bin/chromedriver" # "/usr/bin/chromedriver"
+MAX_FETCH_WORKERS = 16  # Detail pages fetched at once
+MAX_REQUESTS_PER_HOST = 8  # Concurrent requests to a single host
+MIN_REQUEST_INTERVAL = 0.1  # Seconds between starting requests to a single host
+
+RESULT_COLUMNS = [
+    "submission_date",
+    "url",
+    "chrome_extension_name",
+    "star_rating",
+    "number_of_ratings",
+    "number_of_users",
+    "extension_version",
+    "extension_size",
+    "extension_languages",
+    "developer_desc",
+    "developer_email",
+    "developer_website",
+    "developer_phone",
+    "extension_updated_date",
+    "category",
+    "trader_status",
+    "featured",
+    "verified_domain",
+    "manifest_json",
+]
 
 # --------------DEFINE REUSABLE FUNCTIONS------------------------
 
@@ -88,10 +124,12 @@ def get_unique_links_from_webpage(
     """Output: List of links found on webpage"""
     driver.get(url)
 
-    time.sleep(3)  # Wait for JS to load content
+    # Wait for JS to load content
+    WebDriverWait(driver, TIMEOUT_IN_SECONDS).until(
+        EC.presence_of_element_located((By.TAG_NAME, "a"))
+    )
 
     soup = BeautifulSoup(driver.page_source, "html.parser")
-    driver.quit()
 
     links = [urljoin(base_url, a["href"]) for a in soup.find_all("a", href=True)]
     unique_links = []
@@ -225,31 +263,10 @@ def get_verified_domain(soup):
     return None
 
 
-def initialize_results_df():
-    """Returns a dataframe with 0 rows with the desired format"""
-    results_df = pd.DataFrame(
-        columns=[
-            "submission_date",
-            "url",
-            "chrome_extension_name",
-            "star_rating",
-            "number_of_ratings",
-            "number_of_users",
-            "extension_version",
-            "extension_size",
-            "extension_languages",
-            "developer_desc",
-            "developer_email",
-            "developer_website",
-            "developer_phone",
-            "extension_updated_date",
-            "category",
-            "trader_status",
-            "featured",
-            "verified_domain",
-            "manifest_json",
-        ]
-    )
+def initialize_results_df(records=()):
+    """Input: Records (dicts) of scraped detail pages
+    Output: A dataframe of the records with the desired format"""
+    results_df = pd.DataFrame.from_records(list(records), columns=RESULT_COLUMNS)
     return results_df
 
 
@@ -272,15 +289,46 @@ def check_if_load_more_button_present(webpage_soup):
     return False
 
 
+def wait_for_growth(driver, measure, previous, timeout):
+    """Waits until measure(driver) returns a value larger than previous
+    Output: The new value, or None if it didn't grow within the timeout"""
+
+    def grown(driver):
+        value = measure(driver)
+        return value if value > previous else False
+
+    try:
+        return WebDriverWait(driver, timeout, poll_frequency=0.2).until(grown)
+    except TimeoutException:
+        return None
+
+
+def count_links(driver):
+    return len(driver.find_elements(By.TAG_NAME, "a"))
+
+
+def page_height(driver):
+    return driver.execute_script("return document.body.scrollHeight")
+
+
 def get_links_from_non_detail_page(
-    url, list_of_links_already_processed, max_clicks, links_to_ignore_list, driver
+    url,
+    list_of_links_already_processed,
+    max_clicks,
+    links_to_ignore_list,
+    driver,
+    timings=None,
 ):
+    if timings is None:
+        timings = BrowserTimings()
+
     # Wait for the driver to load the page
     wait = WebDriverWait(driver, 10)
 
-    # Get the URL and wait 2 seconds
-    driver.get(url)
-    time.sleep(2)
+    # Get the URL and wait for the first links to render
+    with timings.measure("page_load"):
+        driver.get(url)
+        wait.until(EC.presence_of_element_located((By.TAG_NAME, "a")))
 
     # Initialize click count to 0 clicks
     click_count = 0
@@ -293,21 +341,28 @@ def get_links_from_non_detail_page(
                     (By.XPATH, '//button//span[contains(text(), "Load more")]')
                 )
             )
-            driver.execute_script("arguments[0].click();", load_more_button)
-            print(f"[{click_count+1}] Clicked 'Load more'")
-            time.sleep(2)
-            click_count += 1
         except Exception:
             print("No more 'Load more' button or timeout.")
             break
+        with timings.measure("click"):
+            link_count = count_links(driver)
+            driver.execute_script("arguments[0].click();", load_more_button)
+            grown = wait_for_growth(driver, count_links, link_count, CLICK_TIMEOUT)
+        print(f"[{click_count+1}] Clicked 'Load more'")
+        click_count += 1
+        if grown is None:
+            print("No new results after clicking 'Load more'.")
+            break
 
     # Scroll to bottom to trigger lazy loading
-    last_height = driver.execute_script("return document.body.scrollHeight")
+    last_height = page_height(driver)
     while True:
-        driver.execute_script("window.scrollTo(0, document.body.scrollHeight);")
-        time.sleep(4)
-        new_height = driver.execute_script("return document.body.scrollHeight")
-        if new_height == last_height:
+        with timings.measure("scroll"):
+            driver.execute_script("window.scrollTo(0, document.body.scrollHeight);")
+            new_height = wait_for_growth(
+                driver, page_height, last_height, SCROLL_TIMEOUT
+            )
+        if new_height is None:
             break
         last_height = new_height
 
@@ -336,13 +391,19 @@ def get_links_from_non_detail_page(
         - set(links_to_ignore_list)
     )
 
-    driver.quit()
-
     return unique_extension_links, unique_non_extension_links
 
 
 def pull_data_from_detail_page(url, timeout_limit, current_date):
-    """Input: URL, timeout limit (integer), and current date"""
+    """Input: URL, timeout limit (integer), and current date
+    Output: Record (dict) of the data on the page"""
+    response = requests.get(url, timeout=timeout_limit)
+    return parse_detail_page(response.text, url, current_date)
+
+
+def parse_detail_page(html, url, current_date):
+    """Input: Raw HTML of a detail page, its URL, and current date
+    Output: Record (dict) of the data on the page"""
 
     # Initialize as empty strings
     number_of_ratings = None
@@ -362,9 +423,7 @@ def pull_data_from_detail_page(url, timeout_limit, current_date):
     manifest_json = None
 
     # Get the soup from the current link
-    current_link_soup = get_soup_from_webpage(
-        webpage_url=url, timeout_seconds=timeout_limit
-    )
+    current_link_soup = BeautifulSoup(html, "html.parser")
 
     # Get paragraphs & headers from the current link
     paragraphs_from_current_link_soup = get_paragraphs_from_soup(current_link_soup)
@@ -473,37 +532,189 @@ def pull_data_from_detail_page(url, timeout_limit, current_date):
 
     # NOTE - Still need to add logic for manifest json
 
-    # Put the results into a dataframe
-    curr_link_results_df = pd.DataFrame(
-        {
-            "submission_date": [current_date],
-            "url": [url],
-            "chrome_extension_name": [chrome_extension_name],
-            "star_rating": [star_rating],
-            "number_of_ratings": [number_of_ratings],
-            "number_of_users": [number_of_users],
-            "extension_version": [extension_version],
-            "extension_size": [extension_size],
-            "extension_languages": [extension_languages],
-            "developer_desc": [developer_desc],
-            "developer_email": [developer_email],
-            "developer_website": [developer_website],
-            "developer_phone": [developer_phone],
-            "extension_updated_date": [extension_updated_date],
-            "category": [category],
-            "trader_status": [trader_status],
-            "featured": [featured],
-            "verified_domain": [verified_domain],
-            "manifest_json": [manifest_json],
-        }
-    )
+    # Put the results into a record
+    return {
+        "submission_date": current_date,
+        "url": url,
+        "chrome_extension_name": chrome_extension_name,
+        "star_rating": star_rating,
+        "number_of_ratings": number_of_ratings,
+        "number_of_users": number_of_users,
+        "extension_version": extension_version,
+        "extension_size": extension_size,
+        "extension_languages": extension_languages,
+        "developer_desc": developer_desc,
+        "developer_email": developer_email,
+        "developer_website": developer_website,
+        "developer_phone": developer_phone,
+        "extension_updated_date": extension_updated_date,
+        "category": category,
+        "trader_status": trader_status,
+        "featured": featured,
+        "verified_domain": verified_domain,
+        "manifest_json": manifest_json,
+    }
+
+
+class HostRateLimiter:
+    """Limits the number of concurrent requests to each host, and spaces out
+    the start of requests to the same host by at least min_interval seconds"""
+
+    def __init__(self, max_requests_per_host, min_interval):
+        self.max_requests_per_host = max_requests_per_host
+        self.min_interval = min_interval
+        self.lock = threading.Lock()
+        self.semaphores = {}
+        self.next_request_at = {}
+
+    @contextmanager
+    def limit(self, url):
+        host = urlparse(url).netloc
+        with self.lock:
+            if host not in self.semaphores:
+                self.semaphores[host] = threading.BoundedSemaphore(
+                    self.max_requests_per_host
+                )
+            semaphore = self.semaphores[host]
+        with semaphore:
+            with self.lock:
+                now = time.monotonic()
+                start = max(now, self.next_request_at.get(host, now))
+                self.next_request_at[host] = start + self.min_interval
+            if start > now:
+                time.sleep(start - now)
+            yield
+
+
+class DetailPageScraper:
+    """Scrapes detail pages in the background while the crawl continues.
+
+    Pages are fetched by a bounded pool of threads sharing one HTTP session,
+    subject to the per host limits, and parsed in a pool of processes. Each URL
+    is only scraped once."""
+
+    def __init__(
+        self,
+        current_date,
+        timeout_seconds=TIMEOUT_IN_SECONDS,
+        max_workers=MAX_FETCH_WORKERS,
+        max_requests_per_host=MAX_REQUESTS_PER_HOST,
+        min_request_interval=MIN_REQUEST_INTERVAL,
+        parse_workers=None,
+    ):
+        self.current_date = current_date
+        self.timeout_seconds = timeout_seconds
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=max_workers)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        self.rate_limiter = HostRateLimiter(max_requests_per_host, min_request_interval)
+        self.fetch_executor = ThreadPoolExecutor(max_workers=max_workers)
+        # Parse workers are started from the fetch threads, so don't fork them
+        self.parse_executor = ProcessPoolExecutor(
+            max_workers=parse_workers, mp_context=multiprocessing.get_context("spawn")
+        )
+        self.futures = {}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        self.fetch_executor.shutdown(cancel_futures=True)
+        self.parse_executor.shutdown(cancel_futures=True)
+        self.session.close()
+
+    def fetch(self, url):
+        with self.rate_limiter.limit(url):
+            response = self.session.get(url, timeout=self.timeout_seconds)
+        return response.text
+
+    def scrape(self, url):
+        html = self.fetch(url)
+        return self.parse_executor.submit(
+            parse_detail_page, html, url, self.current_date
+        ).result()
+
+    def submit(self, url):
+        """Start scraping the URL, unless it was already submitted"""
+        if url not in self.futures:
+            self.futures[url] = self.fetch_executor.submit(self.scrape, url)
+
+    def records(self):
+        """Waits for all the submitted pages and returns their records,
+        in the order they were submitted. Pages that failed are skipped"""
+        records = []
+        for idx, (url, future) in enumerate(self.futures.items()):
+            try:
+                records.append(future.result())
+            except Exception as e:
+                print(f"Failed to process detail page: {url} ({e})")
+            if (idx + 1) % 100 == 0:
+                print(f"Scraped {idx + 1} of {len(self.futures)} detail pages")
+        return records
+
+
+def get_links_with_pool(driver_pool, url, links_already_processed):
+    """Gets the links from a non detail page with a browser from the pool
+    Output: Tuple of (detail links, non detail links), which are empty if the
+    page timed out, so one slow page doesn't stop the crawl"""
+    with driver_pool.driver() as driver:
+        try:
+            return get_links_from_non_detail_page(
+                url,
+                links_already_processed,
+                MAX_CLICKS,
+                LIST_OF_LINKS_TO_IGNORE,
+                driver,
+                timings=driver_pool.timings,
+            )
+        except TimeoutException:
+            print(f"Timed out loading non detail page: {url}")
+            return [], []
+
 
-    return curr_link_results_df
+def crawl_non_detail_pages(driver_pool, urls, links_already_processed):
+    """Gets the links from each non detail page, using every browser in the pool
+    Output: Iterator of (detail links, non detail links), in the order of urls"""
+    # The crawl threads only see the links processed before they started
+    links_already_processed = frozenset(links_already_processed)
+    with ThreadPoolExecutor(max_workers=driver_pool.size) as executor:
+        yield from executor.map(
+            lambda url: get_links_with_pool(driver_pool, url, links_already_processed),
+            urls,
+        )
 
 
 def main():
     parser = ArgumentParser(description=__doc__)
     parser.add_argument("--date", required=True)
+    parser.add_argument(
+        "--max-workers",
+        type=int,
+        default=MAX_FETCH_WORKERS,
+        help="Number of detail pages to fetch at once",
+    )
+    parser.add_argument(
+        "--max-requests-per-host",
+        type=int,
+        default=MAX_REQUESTS_PER_HOST,
+        help="Maximum number of concurrent requests to a single host",
+    )
+    parser.add_argument(
+        "--min-request-interval",
+        type=float,
+        default=MIN_REQUEST_INTERVAL,
+        help="Minimum seconds between starting requests to a single host",
+    )
+    parser.add_argument(
+        "--browsers",
+        type=int,
+        default=BROWSER_POOL_SIZE,
+        help="Number of browsers to crawl non detail pages with at once",
+    )
     args = parser.parse_args()
 
     # Get DAG logical date
@@ -513,17 +724,21 @@ def main():
     # Initialize an empty set to hold links that have already been processed
     links_already_processed = set()
 
-    # Get all unique links found on the CHROME_WEBSTORE_URL (excluding links to ignore)
-    driver = initialize_driver(DRIVER_TYP, BINARY_LOC, DRIVER_PATH)
-
-    unique_links_on_chrome_webstore_page = get_unique_links_from_webpage(
-        url=CHROME_WEBSTORE_URL,
-        base_url=CHROME_WEBSTORE_URL,
-        links_to_ignore=LIST_OF_LINKS_TO_IGNORE,
-        links_to_not_process=links_already_processed,
-        driver=driver,
+    # Browsers are started on first use and reused for every page
+    driver_pool = DriverPool(
+        args.browsers, lambda: initialize_driver(DRIVER_TYP, BINARY_LOC, DRIVER_PATH)
     )
 
+    # Get all unique links found on the CHROME_WEBSTORE_URL (excluding links to ignore)
+    with driver_pool.driver() as driver:
+        unique_links_on_chrome_webstore_page = get_unique_links_from_webpage(
+            url=CHROME_WEBSTORE_URL,
+            base_url=CHROME_WEBSTORE_URL,
+            links_to_ignore=LIST_OF_LINKS_TO_IGNORE,
+            links_to_not_process=links_already_processed,
+            driver=driver,
+        )
+
     # Add on the additional link to grab
     unique_links_on_chrome_webstore_page.append(ADDITIONAL_LINK_TO_GRAB)
 
@@ -546,119 +761,87 @@ def main():
 
     del unique_links_on_chrome_webstore_page
 
-    # Initialize a dataframe to store extension level results
-    results_df = initialize_results_df()
-
-    # Loop through the links found on the main page of the Chrome Webstore
-    for idx, current_link in enumerate(main_page_links_to_process):
-        print("Currently processing link: ", current_link)
+    # Detail pages are scraped in the background while the crawl continues
+    with driver_pool, DetailPageScraper(
+        current_date=logical_dag_date_string,
+        max_workers=args.max_workers,
+        max_requests_per_host=args.max_requests_per_host,
+        min_request_interval=args.min_request_interval,
+    ) as scraper:
+        # Loop through the links found on the main page of the Chrome Webstore
+        for idx, current_link in enumerate(main_page_links_to_process):
+            print("Currently processing link: ", current_link)
+
+            percent_done = (idx + 1) / len(main_page_links_to_process) * 100
+            if idx % 5 == 0 or idx == len(main_page_links_to_process) - 1:
+                print(
+                    f"""Progress: {percent_done:.1f}% ({idx + 1} of
+                    {len(main_page_links_to_process)})"""
+                )
 
-        percent_done = (idx + 1) / len(main_page_links_to_process) * 100
-        if idx % 5 == 0 or idx == len(main_page_links_to_process) - 1:
-            print(
-                f"""Progress: {percent_done:.1f}% ({idx + 1} of
-                {len(main_page_links_to_process)})"""
-            )
+            # Check if the link is a "detail page" or a "non detail page"
+            is_detail_page = check_if_detail_or_non_detail_page(current_link)
 
-        # Check if the link is a "detail page" or a "non detail page"
-        is_detail_page = check_if_detail_or_non_detail_page(current_link)
-
-        # If the link is a detail page and not already processed
-        if is_detail_page:
-            print("link is a detail page")
-            if current_link not in links_already_processed:
-                print("link is not yet processed, pulling data...")
-                # Get the data from that page
-                detail_page_results_df = pull_data_from_detail_page(
-                    url=current_link,
-                    timeout_limit=TIMEOUT_IN_SECONDS,
-                    current_date=logical_dag_date_string,
-                )
+            # If the link is a detail page and not already processed
+            if is_detail_page:
+                print("link is a detail page")
+                if current_link not in links_already_processed:
+                    print("link is not yet processed, pulling data...")
+                    # Get the data from that page
+                    scraper.submit(current_link)
 
-                # Append the data scraped to results_df
-                results_df = pd.concat([results_df, detail_page_results_df])
+                    # Add the detail page link to links already processed
+                    links_already_processed.add(current_link)
+                else:
+                    print("link is already processed")
 
-                # Add the detail page link to links already processed
-                links_already_processed.add(current_link)
+            # If this link is not a detail page
             else:
-                print("link is already processed")
-
-        # If this link is not a detail page
-        else:
-            print("Link is not a detail page.")
-            # Get the HTML from the non detail page after clicking
-            # Load more button, plus update links already processed
-            # Initialize a driver
-            driver = initialize_driver(DRIVER_TYP, BINARY_LOC, DRIVER_PATH)
-
-            print("Getting links from the non detail page...")
-            detail_links_found, non_detail_links_found = get_links_from_non_detail_page(
-                current_link,
-                links_already_processed,
-                MAX_CLICKS,
-                LIST_OF_LINKS_TO_IGNORE,
-                driver,
-            )
+                print("Link is not a detail page.")
+                # Get the HTML from the non detail page after clicking
+                # Load more button, plus update links already processed
+                print("Getting links from the non detail page...")
+                (
+                    detail_links_found,
+                    non_detail_links_found,
+                ) = get_links_with_pool(
+                    driver_pool, current_link, links_already_processed
+                )
 
-            # Print # of detail and non detail links found
-            print("# detail links found on page: ", str(len(detail_links_found)))
-            print("# non detail links found: ", str(len(non_detail_links_found)))
+                # Print # of detail and non detail links found
+                print("# detail links found on page: ", str(len(detail_links_found)))
+                print("# non detail links found: ", str(len(non_detail_links_found)))
 
-            # Loop through each link on this page
-            print("Looping through detail links found...")
-            for detail_link in detail_links_found:
-                print("Processing detail link: ", detail_link)
+                # Loop through each link on this page
+                print("Looping through detail links found...")
+                for detail_link in detail_links_found:
+                    print("Processing detail link: ", detail_link)
 
-                try:
                     # Get the data from that page
-                    detail_page_results_df = pull_data_from_detail_page(
-                        url=detail_link,
-                        timeout_limit=TIMEOUT_IN_SECONDS,
-                        current_date=logical_dag_date_string,
-                    )
-                    # Append the data scraped to results_df
-                    results_df = pd.concat([results_df, detail_page_results_df])
-
-                except Exception:
-                    print(f"Failed to process detail page: {detail_link}")
-                links_already_processed.add(detail_link)
-            print("Done looping through detail links found.")
-
-            # Loop through all the non detail links found
-            print("Looping through non detail links found...")
-            for non_detail_link in non_detail_links_found:
-                print("Current non detail link: ", non_detail_link)
-                if non_detail_link in links_already_processed:
-                    print("Already processed, not processing again")
-                else:
-                    print("Processing non_detail_link: ", non_detail_link)
-                    # Initialize driver below
-                    driver = initialize_driver(DRIVER_TYP, BINARY_LOC, DRIVER_PATH)
-                    # Try again to get the detail links
-                    (
-                        next_level_detail_links_found,
-                        next_level_non_detail_links_found,
-                    ) = get_links_from_non_detail_page(
-                        non_detail_link,
-                        links_already_processed,
-                        MAX_CLICKS,
-                        LIST_OF_LINKS_TO_IGNORE,
-                        driver,
-                    )
-
+                    scraper.submit(detail_link)
+                    links_already_processed.add(detail_link)
+                print("Done looping through detail links found.")
+
+                # Crawl the non detail links found with all the browsers at once
+                print("Looping through non detail links found...")
+                non_detail_links_to_process = []
+                for non_detail_link in non_detail_links_found:
+                    print("Current non detail link: ", non_detail_link)
+                    if non_detail_link in links_already_processed:
+                        print("Already processed, not processing again")
+                    else:
+                        print("Processing non_detail_link: ", non_detail_link)
+                        non_detail_links_to_process.append(non_detail_link)
+
+                for (
+                    next_level_detail_links_found,
+                    next_level_non_detail_links_found,
+                ) in crawl_non_detail_pages(
+                    driver_pool, non_detail_links_to_process, links_already_processed
+                ):
                     for next_level_detail_link_found in next_level_detail_links_found:
-                        try:
-                            # Get the data from that page
-                            detail_page_results_df = pull_data_from_detail_page(
-                                url=next_level_detail_link_found,
-                                timeout_limit=TIMEOUT_IN_SECONDS,
-                                current_date=logical_dag_date_string,
-                            )
-                            # Append the data scraped to results_df
-                            results_df = pd.concat([results_df, detail_page_results_df])
-                        except Exception:
-                            print(f"Failed to process: {next_level_detail_link_found}")
-
+                        # Get the data from that page
+                        scraper.submit(next_level_detail_link_found)
                         links_already_processed.add(next_level_detail_link_found)
 
                     for (
@@ -667,6 +850,11 @@ def main():
                         print("Not processing: ", next_level_non_detail_link_found)
                         print("Currently only scrape 2 levels deep")
 
+        # Build the results from the records of all the scraped pages at once
+        results_df = initialize_results_df(scraper.records())
+
+    print(f"Browser timings: {driver_pool.timings.summary()}")
+
     # Remove duplicates
     results_df = results_df.drop_duplicates()
 
@@ -1,8 +1,32 @@
+import os
+import sys
+import threading
+import time
+
+import pytest
+import requests
 from bs4 import BeautifulSoup
-from extensions.main import (
+from selenium.common.exceptions import TimeoutException
+
+# main imports driver_pool.py as a sibling module, as when it's run as a script
+sys.path.append(
+    os.path.abspath(os.path.join(os.path.dirname(__file__), "../extensions"))
+)
+
+import extensions.main  # noqa: E402
+from extensions.main import (  # noqa: E402
+    RESULT_COLUMNS,
+    DetailPageScraper,
+    DriverPool,
+    HostRateLimiter,
     get_category_from_soup,
     get_website_url_from_soup,
     check_if_detail_or_non_detail_page,
+    crawl_non_detail_pages,
+    initialize_results_df,
+    parse_detail_page,
+    page_height,
+    wait_for_growth,
 )
 
 
@@ -54,3 +78,162 @@ def test_check_if_detail_page_true():
 def test_check_if_detail_page_false():
     url = "https://chromewebstore.google.com/category/extensions/productivity"
     assert check_if_detail_or_non_detail_page(url) is False
+
+
+DETAIL_PAGE_HTML = """
+<html>
+    <body>
+        <h1>Example Extension</h1>
+        <h2>4.5 out of 5 stars</h2>
+        <p>1,234 ratings</p>
+        <div>100,000 users</div>
+        <div>Version</div>
+        <div>1.2.3</div>
+        <span>Featured</span>
+        <a href="https://example.com">Website</a>
+    </body>
+</html>
+"""
+
+
+def test_parse_detail_page():
+    record = parse_detail_page(
+        DETAIL_PAGE_HTML, "https://chromewebstore.google.com/detail/a", "2025-01-01"
+    )
+    assert list(record.keys()) == RESULT_COLUMNS
+    assert record["chrome_extension_name"] == "Example Extension"
+    assert record["star_rating"] == "4.5"
+    assert record["number_of_ratings"] == "1,234"
+    assert record["number_of_users"] == "100000"
+    assert record["extension_version"] == "1.2.3"
+    assert record["featured"] is True
+    assert record["developer_website"] == "https://example.com"
+
+
+def test_host_rate_limiter():
+    limiter = HostRateLimiter(max_requests_per_host=1, min_interval=0.05)
+    starts = []
+    start = time.monotonic()
+    for url in ["https://a.test/1", "https://a.test/2", "https://b.test/1"]:
+        with limiter.limit(url):
+            starts.append(time.monotonic() - start)
+    # The second request to a.test waits, the first one to b.test doesn't
+    assert starts[1] >= 0.05
+    assert starts[2] - starts[1] < 0.05
+
+
+def test_detail_page_scraper(monkeypatch):
+    fetched = []
+
+    def fetch(self, url):
+        fetched.append(url)
+        if url.endswith("broken"):
+            raise requests.ConnectionError("Connection refused")
+        return DETAIL_PAGE_HTML
+
+    monkeypatch.setattr(DetailPageScraper, "fetch", fetch)
+    urls = [f"https://chromewebstore.google.com/detail/{i}" for i in range(5)]
+    with DetailPageScraper("2025-01-01", max_workers=4, parse_workers=2) as scraper:
+        for url in urls + urls[:2] + ["https://chromewebstore.google.com/broken"]:
+            scraper.submit(url)
+        results_df = initialize_results_df(scraper.records())
+
+    assert sorted(fetched) == sorted(
+        urls + ["https://chromewebstore.google.com/broken"]
+    )
+    assert list(results_df.columns) == RESULT_COLUMNS
+    assert list(results_df["url"]) == urls
+
+
+class FakeDriver:
+    def __init__(self, heights=()):
+        self.heights = list(heights)
+        self.quit_called = False
+
+    def execute_script(self, script):
+        if len(self.heights) > 1:
+            return self.heights.pop(0)
+        return self.heights[0]
+
+    def quit(self):
+        self.quit_called = True
+
+
+def test_driver_pool_reuses_drivers():
+    created = []
+
+    def create_driver():
+        created.append(FakeDriver())
+        return created[-1]
+
+    in_use = 0
+    max_in_use = 0
+    lock = threading.Lock()
+
+    def use_driver(_):
+        nonlocal in_use, max_in_use
+        with pool.driver():
+            with lock:
+                in_use += 1
+                max_in_use = max(max_in_use, in_use)
+            time.sleep(0.01)
+            with lock:
+                in_use -= 1
+
+    with DriverPool(2, create_driver) as pool:
+        threads = [threading.Thread(target=use_driver, args=(i,)) for i in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        # A driver that raised is replaced, not returned to the pool
+        with pytest.raises(ValueError):
+            with pool.driver() as driver:
+                raise ValueError("Browser crashed")
+        assert driver.quit_called
+        with pool.driver() as first, pool.driver() as second:
+            assert not first.quit_called and not second.quit_called
+
+    assert max_in_use == 2
+    assert len(created) == 3
+    assert all(driver.quit_called for driver in created)
+    assert len(pool.timings.durations["browser_start"]) == 3
+
+
+def test_wait_for_growth():
+    driver = FakeDriver(heights=[100, 100, 250])
+    assert wait_for_growth(driver, page_height, 100, timeout=2) == 250
+
+    start = time.monotonic()
+    assert wait_for_growth(driver, page_height, 250, timeout=0.3) is None
+    assert time.monotonic() - start < 1
+
+
+def test_crawl_non_detail_pages_timeout(monkeypatch):
+    def get_links_from_non_detail_page(url, *args, **kwargs):
+        if url == "slow":
+            raise TimeoutException("No links rendered")
+        return [f"{url}/detail/1"], [f"{url}/other"]
+
+    monkeypatch.setattr(
+        extensions.main,
+        "get_links_from_non_detail_page",
+        get_links_from_non_detail_page,
+    )
+    created = []
+
+    def create_driver():
+        created.append(FakeDriver())
+        return created[-1]
+
+    with DriverPool(1, create_driver) as pool:
+        # A page that timed out has no links, and the crawl carries on
+        assert list(crawl_non_detail_pages(pool, ["a", "slow", "b"], set())) == [
+            (["a/detail/1"], ["a/other"]),
+            ([], []),
+            (["b/detail/1"], ["b/other"]),
+        ]
+        # The browser is still usable, so it's kept
+        assert len(created) == 1
+        assert not created[0].quit_called
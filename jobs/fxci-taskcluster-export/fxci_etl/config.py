@@ -20,6 +20,8 @@ class PulseConfig:
     host: str = "pulse.mozilla.org"
     port: int = 5671
     durable: bool = True
+    flush_events: int = 1000
+    flush_interval: int = 60
     queues: ClassVar[dict[str, PulseExchangeConfig]] = {
         "task-completed": PulseExchangeConfig(
             exchange="exchange/taskcluster-queue/v1/task-completed",
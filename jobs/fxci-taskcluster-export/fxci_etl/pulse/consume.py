@@ -1,8 +1,10 @@
+import time
+
 from kombu import Connection, Exchange, Queue
 from loguru import logger
 
 from fxci_etl.config import Config
-from fxci_etl.pulse.handler import BigQueryHandler, PulseHandler
+from fxci_etl.pulse.handler import BigQueryHandler, MessageAcker, PulseHandler
 
 
 def get_connection(config: Config):
@@ -37,24 +39,52 @@ def get_consumer(
         auto_delete=not pulse.durable,
     )
 
+    # Every message goes to all the handlers, so it's only acknowledged once
+    # all of them have flushed it.
+    acker = MessageAcker(len(callbacks))
+    for callback in callbacks:
+        callback.acker = acker
+
     consumer = connection.Consumer(queue, auto_declare=False, callbacks=callbacks)
+    # Messages aren't acknowledged until the handlers flush them, so limit the
+    # number of unacknowledged messages to what the handlers buffer. Each
+    # handler must be able to fill its buffer, or it would only flush on its
+    # interval.
+    consumer.qos(prefetch_count=max(callback.flush_events for callback in callbacks))
     qinfo = consumer.queues[0].queue_declare()
     logger.debug(f"{qinfo.message_count} pending messages")
     consumer.queues[0].queue_bind()
     return consumer
 
 
+def update_queue_depth(consumer, callbacks: list[PulseHandler]) -> int:
+    count = consumer.queues[0].queue_declare(passive=True).message_count
+    for callback in callbacks:
+        callback.metrics.queue_depth = count
+    return count
+
+
 def drain(config: Config, name: str, callbacks: list[PulseHandler]):
     logger.info(f"Draining pulse queue {name}")
+    depth_interval = min(callback.flush_interval for callback in callbacks)
     with get_connection(config) as connection:
         with get_consumer(config, connection, name, callbacks) as consumer:
+            last_depth_check = time.monotonic()
             while True:
                 try:
                     connection.drain_events(timeout=1)
                 except TimeoutError:
-                    count = consumer.queues[0].queue_declare(passive=True).message_count
+                    count = update_queue_depth(consumer, callbacks)
+                    for callback in callbacks:
+                        callback.flush_if_due()
                     if count < 100:
                         break
+                    continue
 
-    for callback in callbacks:
-        callback.process_buffer()
+                if time.monotonic() - last_depth_check >= depth_interval:
+                    update_queue_depth(consumer, callbacks)
+                    last_depth_check = time.monotonic()
+
+            # Flush while the connection is open, so the messages can be acknowledged.
+            for callback in callbacks:
+                callback.process_buffer()
@@ -1,9 +1,10 @@
 import base64
 import json
 import re
+import time
 import traceback
 from abc import ABC, abstractmethod
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from pprint import pprint
 from typing import Any, Optional
 
@@ -14,7 +15,7 @@ from kombu import Message
 from loguru import logger
 import taskcluster
 
-from fxci_etl.config import Config
+from fxci_etl.config import Config, PulseConfig
 from fxci_etl.loaders.bigquery import BigQueryLoader
 from fxci_etl.schemas import Record, Runs, Tasks, Tags, TaskDefinitions
 
@@ -32,11 +33,73 @@ class Event:
         return {"data": self.data}
 
 
+@dataclass
+class FlushMetrics:
+    events: int = 0
+    flushes: int = 0
+    flush_seconds: float = 0
+    max_flush_seconds: float = 0
+    queue_depth: Optional[int] = None
+    started: float = field(default_factory=time.monotonic)
+
+    @property
+    def events_per_second(self) -> float:
+        elapsed = time.monotonic() - self.started
+        return self.events / elapsed if elapsed > 0 else 0
+
+    def __str__(self) -> str:
+        mean_flush = self.flush_seconds / self.flushes if self.flushes else 0
+        return (
+            f"{self.events} events in {self.flushes} flushes, "
+            f"{self.events_per_second:.1f} events/s, "
+            f"flush latency mean {mean_flush:.2f}s max {self.max_flush_seconds:.2f}s, "
+            f"queue depth {self.queue_depth}"
+        )
+
+
+class MessageAcker:
+    """Acknowledge each message once every handler it was passed to has flushed it.
+
+    A consumer passes every message to all of its handlers, which flush at
+    different times. Acknowledging a message when the first handler flushes it
+    would lose the events the other handlers haven't stored yet if the process
+    dies, so the message is only acknowledged after the last one.
+    """
+
+    def __init__(self, num_handlers: int = 1):
+        self.num_handlers = num_handlers
+        # Number of handlers that flushed each message so far, by delivery tag
+        self._flushed: dict[Any, int] = {}
+
+    def flushed(self, message: Message) -> None:
+        count = self._flushed.pop(message.delivery_tag, 0) + 1
+        if count < self.num_handlers:
+            self._flushed[message.delivery_tag] = count
+        elif not message.acknowledged:
+            message.ack()
+
+
 class PulseHandler(ABC):
+    """Buffer pulse events and process them in batches.
+
+    The buffer is flushed every `pulse.flush_events` events or
+    `pulse.flush_interval` seconds, whichever comes first. Messages are only
+    acknowledged once the batch containing them has been flushed, by every
+    handler that shares the handler's `acker`, so if flushing fails they are
+    redelivered rather than lost.
+    """
+
     name = ""
 
     def __init__(self, config: Config):
         self.config = config
+        pulse = config.pulse
+        self.flush_events = pulse.flush_events if pulse else PulseConfig.flush_events
+        self.flush_interval = (
+            pulse.flush_interval if pulse else PulseConfig.flush_interval
+        )
+        self.metrics = FlushMetrics()
+        self.acker = MessageAcker()
 
         if config.storage.credentials:
             storage_client = storage.Client.from_service_account_info(
@@ -48,25 +111,41 @@ class PulseHandler(ABC):
         bucket = self._bucket = storage_client.bucket(config.storage.bucket)
         self._event_backup = bucket.blob(f"failed-pulse-events-{self.name}.json")
         self._buffer: list[Event] = []
+        self._failed: Optional[list[dict[str, Any]]] = None
         self._count = 0
+        self._last_flush = time.monotonic()
         self._queue = taskcluster.Queue({"rootUrl": config.taskcluster.rootUrl})
 
     def __call__(self, data: dict[str, Any], message: Message) -> None:
         self._count += 1
-        message.ack()
         event = Event(data, message)
         self._buffer.append(event)
+        if len(self._buffer) >= self.flush_events:
+            self.process_buffer()
+        else:
+            self.flush_if_due()
+
+    def flush_if_due(self) -> None:
+        """Process the buffer if it's been `flush_interval` seconds since the last flush."""
+        if self._buffer and time.monotonic() - self._last_flush >= self.flush_interval:
+            self.process_buffer()
 
     def process_buffer(self):
-        try:
-            # Load previously failed events from storage, maybe the issue is fixed.
-            for obj in json.loads(self._event_backup.download_as_string()):
-                self._buffer.append(Event.from_dict(obj))
-        except NotFound:
-            pass
+        start = time.monotonic()
+        buffer = self._buffer
+        self._buffer = []
+
+        if self._failed is None:
+            self._failed = []
+            try:
+                # Load previously failed events from storage, maybe the issue is fixed.
+                for obj in json.loads(self._event_backup.download_as_string()):
+                    buffer.append(Event.from_dict(obj))
+            except NotFound:
+                pass
 
         failed = []
-        for event in self._buffer:
+        for event in buffer:
             try:
                 self.process_event(event)
             except Exception:
@@ -75,11 +154,29 @@ class PulseHandler(ABC):
                 traceback.print_exc()
                 failed.append(event.to_dict())
 
-        # Save any failed events back to storage.
-        self._event_backup.upload_from_string(json.dumps(failed))
-        self._buffer = []
         self.on_processing_complete()
 
+        # Save any failed events back to storage.
+        self._failed.extend(failed)
+        self._event_backup.upload_from_string(json.dumps(self._failed))
+
+        # Only acknowledge the messages once their events are stored, so a
+        # failure above leaves them in the queue to be redelivered.
+        for event in buffer:
+            if event.message is not None:
+                self.acker.flushed(event.message)
+
+        elapsed = time.monotonic() - start
+        self._last_flush = time.monotonic()
+        self.metrics.events += len(buffer)
+        self.metrics.flushes += 1
+        self.metrics.flush_seconds += elapsed
+        self.metrics.max_flush_seconds = max(self.metrics.max_flush_seconds, elapsed)
+        logger.info(
+            f"Flushed {len(buffer)} events from {self.name} handler in "
+            f"{elapsed:.2f}s ({self.metrics})"
+        )
+
     @abstractmethod
     def process_event(self, event: Event) -> None: ...
 
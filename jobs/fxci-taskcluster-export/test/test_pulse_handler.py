@@ -3,7 +3,14 @@ from typing import Any
 from google.cloud.exceptions import NotFound
 import pytest
 
-from fxci_etl.pulse.handler import BigQueryHandler, Event, storage
+from fxci_etl.pulse.consume import get_consumer
+from fxci_etl.pulse.handler import (
+    BigQueryHandler,
+    Event,
+    MessageAcker,
+    PulseHandler,
+    storage,
+)
 
 
 @pytest.fixture(autouse=True)
@@ -120,3 +127,116 @@ def test_big_query_handler_task_defined(run_bigquery, task_defined_event):
     assert len(bq.task_records) == 0
     assert len(bq.run_records) == 0
     assert bq.task_ids == {"abc"}
+
+
+class RecordingHandler(PulseHandler):
+    name = "recording"
+
+    def __init__(self, config, fail=False):
+        super().__init__(config)
+        self.fail = fail
+        self.processed = []
+        self.flushed = []
+
+    def process_event(self, event):
+        self.processed.append(event.data)
+
+    def on_processing_complete(self):
+        if self.fail:
+            raise Exception("load failed")
+        self.flushed.append(list(self.processed))
+        self.processed = []
+
+
+@pytest.fixture
+def make_message(mocker):
+    messages = []
+
+    def inner():
+        message = mocker.MagicMock()
+        message.acknowledged = False
+        message.delivery_tag = len(messages)
+        messages.append(message)
+        return message
+
+    return inner
+
+
+def test_pulse_handler_flush_events(make_config, make_message):
+    config = make_config(pulse={"user": "user", "password": "password", "flush_events": 2})
+    handler = RecordingHandler(config)
+
+    messages = [make_message() for _ in range(3)]
+    for i, message in enumerate(messages):
+        handler({"id": i}, message)
+
+    assert handler.flushed == [[{"id": 0}, {"id": 1}]]
+    assert [message.ack.call_count for message in messages] == [1, 1, 0]
+    assert handler.metrics.events == 2
+    assert handler.metrics.flushes == 1
+
+    handler.process_buffer()
+    assert handler.flushed[-1] == [{"id": 2}]
+    assert messages[2].ack.call_count == 1
+
+
+def test_pulse_handler_flush_interval(make_config, make_message):
+    config = make_config(pulse={"user": "user", "password": "password", "flush_interval": 60})
+    handler = RecordingHandler(config)
+
+    handler({"id": 0}, make_message())
+    handler.flush_if_due()
+    assert handler.flushed == []
+
+    handler._last_flush -= 60
+    handler.flush_if_due()
+    assert handler.flushed == [[{"id": 0}]]
+
+
+def test_pulse_handler_flush_failure(make_config, make_message):
+    config = make_config(pulse={"user": "user", "password": "password", "flush_events": 2})
+    handler = RecordingHandler(config, fail=True)
+
+    messages = [make_message() for _ in range(2)]
+    handler({"id": 0}, messages[0])
+    with pytest.raises(Exception, match="load failed"):
+        handler({"id": 1}, messages[1])
+
+    # The messages stay unacknowledged so they get redelivered
+    assert [message.ack.call_count for message in messages] == [0, 0]
+    handler._event_backup.upload_from_string.assert_not_called()
+
+
+def test_pulse_handler_shared_acker(make_config, make_message):
+    config = make_config(pulse={"user": "user", "password": "password", "flush_events": 2})
+    first = RecordingHandler(config)
+    second = RecordingHandler(config)
+    first.acker = second.acker = MessageAcker(2)
+
+    messages = [make_message() for _ in range(2)]
+    first({"id": 0}, messages[0])
+    second({"id": 0}, messages[0])
+    first({"id": 1}, messages[1])
+
+    # The first handler flushed, but the second still only buffers the events
+    assert first.flushed == [[{"id": 0}, {"id": 1}]]
+    assert second.flushed == []
+    assert [message.ack.call_count for message in messages] == [0, 0]
+
+    second({"id": 1}, messages[1])
+    assert second.flushed == [[{"id": 0}, {"id": 1}]]
+    assert [message.ack.call_count for message in messages] == [1, 1]
+
+
+def test_get_consumer_shares_acker(mocker, make_config):
+    config = make_config(pulse={"user": "user", "password": "password"})
+    first = RecordingHandler(config)
+    second = RecordingHandler(config)
+    second.flush_events = first.flush_events * 2
+    connection = mocker.MagicMock()
+
+    consumer = get_consumer(config, connection, "task-completed", [first, second])
+
+    assert first.acker is second.acker
+    assert first.acker.num_handlers == 2
+    consumer.qos.assert_called_once_with(prefetch_count=second.flush_events)
@@ -8,11 +8,14 @@ expose.
 """
 
 import datetime
+import functools
 import json
 import pathlib
+from concurrent.futures import ThreadPoolExecutor
 
 import click
-from google.cloud import bigquery, storage
+from google.api_core.exceptions import NotFound
+from google.cloud import bigquery, bigquery_storage, storage
 
 # GCS location the dashboard frontend reads from.
 DEFAULT_OUTPUT_BUCKET = "moz-fx-data-static-websit-8565-analysis-output"
@@ -29,6 +32,10 @@ DEFAULT_BILLING_PROJECT = "mozdata"
 SAMPLE_ID_SPACE = 100
 DEFAULT_SAMPLE_ID_COUNT = 1
 
+# Concurrent GCS uploads/downloads. Each file is a separate small request, so
+# this is bounded by round trips rather than bandwidth.
+GCS_MAX_WORKERS = 8
+
 _SQL_DIR = pathlib.Path(__file__).resolve().parent / "sql"
 
 
@@ -50,7 +57,10 @@ def default_end_date():
 def run_query(billing_project, sql, **params):
     """Run `sql` in `billing_project` with named scalar params, return rows.
 
-    Param types are inferred: datetime.date -> DATE, int -> INT64.
+    Param types are inferred: datetime.date -> DATE, int -> INT64. The result is
+    read through the BigQuery Storage API as Arrow and returned as a list of
+    dicts; the REST row iterator pages through it a few thousand rows at a time,
+    which dominates the runtime once --sample-id-count widens the result.
     """
     query_params = []
     for name, value in params.items():
@@ -69,27 +79,55 @@ def run_query(billing_project, sql, **params):
     client = bigquery.Client(project=billing_project)
     job = client.query(sql, job_config=job_config)
     print(f"Running query: {job.project}.{job.location}.{job.job_id}")
-    return list(job.result())
+    bqstorage_client = bigquery_storage.BigQueryReadClient()
+    return job.result().to_arrow(bqstorage_client=bqstorage_client).to_pylist()
+
+
+@functools.cache
+def storage_client(billing_project):
+    """One GCS client per project, shared by every upload and download."""
+    return storage.Client(project=billing_project)
 
 
 def upload_json(billing_project, bucket_name, prefix, name, payload):
     """Upload `payload` as JSON to gs://<bucket>/<prefix><name>."""
-    bucket = storage.Client(project=billing_project).bucket(bucket_name)
+    bucket = storage_client(billing_project).bucket(bucket_name)
     blob = bucket.blob(f"{prefix}{name}")
     blob.upload_from_string(json.dumps(payload), content_type="application/json")
     print(f"Wrote gs://{bucket_name}/{prefix}{name}")
 
 
+def upload_json_files(billing_project, bucket_name, prefix, payloads):
+    """Upload each {name: payload} concurrently, as upload_json does."""
+    with ThreadPoolExecutor(max_workers=GCS_MAX_WORKERS) as executor:
+        futures = [
+            executor.submit(
+                upload_json, billing_project, bucket_name, prefix, name, payload
+            )
+            for name, payload in payloads.items()
+        ]
+        # Re-raise the first failure once the other uploads have finished.
+        for future in futures:
+            future.result()
+
+
 def read_json(billing_project, bucket_name, prefix, name):
     """Read gs://<bucket>/<prefix><name> as JSON, or None if it doesn't exist."""
-    blob = (
-        storage.Client(project=billing_project)
-        .bucket(bucket_name)
-        .blob(f"{prefix}{name}")
-    )
-    if not blob.exists():
+    blob = storage_client(billing_project).bucket(bucket_name).blob(f"{prefix}{name}")
+    try:
+        return json.loads(blob.download_as_text())
+    except NotFound:
         return None
-    return json.loads(blob.download_as_text())
+
+
+def read_json_files(billing_project, bucket_name, prefix, names):
+    """read_json for each name concurrently. Returns {name: payload or None}."""
+    names = list(names)
+    with ThreadPoolExecutor(max_workers=GCS_MAX_WORKERS) as executor:
+        results = executor.map(
+            lambda name: read_json(billing_project, bucket_name, prefix, name), names
+        )
+        return dict(zip(names, results))
 
 
 def write_local_json(output_dir, name, payload):
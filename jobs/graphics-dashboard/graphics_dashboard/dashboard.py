@@ -418,15 +418,15 @@ def main(
     for payload in payloads.values():
         payload["phaseTime"] = phase_time
 
-    for filename, payload in payloads.items():
-        if dry_run:
+    if dry_run:
+        for filename, payload in payloads.items():
             print(
                 f"Wrote {common.write_local_json(test_output_dir, filename, payload)}"
             )
-        else:
-            common.upload_json(
-                billing_project, output_bucket, output_prefix, filename, payload
-            )
+    else:
+        common.upload_json_files(
+            billing_project, output_bucket, output_prefix, payloads
+        )
 
 
 if __name__ == "__main__":
@@ -191,31 +191,38 @@ def main(
     if any(o in DEVICE_GEN_VENDORS for o in outputs):
         device_map = fetch_device_map()
 
+    # Read the existing history in both modes so the merged file is the real
+    # result; --dry-run only changes where the result is written.
+    caches = common.read_json_files(
+        billing_project,
+        output_bucket,
+        output_prefix,
+        [_filename(TREND_FILES[output]) for output in outputs],
+    )
+
+    rows_by_output = {}
+    for r in rows:
+        rows_by_output.setdefault(r["output"], []).append(r)
+
     results = {}
     for output in outputs:
-        stem = TREND_FILES[output]
+        name = _filename(TREND_FILES[output])
         vendor_block = (
             device_map.get(DEVICE_GEN_VENDORS[output], {})
             if (device_map and output in DEVICE_GEN_VENDORS)
             else None
         )
-        new_points = build_points(rows, output, device_map=vendor_block)
-        # Read the existing history in both modes so the merged file is the real
-        # result; --dry-run only changes where the result is written.
-        cache = common.read_json(
-            billing_project, output_bucket, output_prefix, _filename(stem)
+        new_points = build_points(
+            rows_by_output.get(output, []), output, device_map=vendor_block
         )
-        results[stem] = merge_trend(cache, new_points)
+        results[name] = merge_trend(caches[name], new_points)
 
-    for stem, cache in results.items():
-        name = _filename(stem)
-        if dry_run:
+    if dry_run:
+        for name, cache in results.items():
             path = common.write_local_json(test_output_dir, name, cache)
             print(f"Wrote {path} ({len(cache['trend'])} points)")
-        else:
-            common.upload_json(
-                billing_project, output_bucket, output_prefix, name, cache
-            )
+    else:
+        common.upload_json_files(billing_project, output_bucket, output_prefix, results)
 
 
 if __name__ == "__main__":
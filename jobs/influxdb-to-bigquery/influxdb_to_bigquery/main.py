@@ -1,9 +1,53 @@
+from google.api_core.exceptions import NotFound
 from google.cloud import bigquery
 from influxdb import InfluxDBClient
+from influxdb.exceptions import InfluxDBClientError
+import numpy as np
 import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
 import click
-from datetime import datetime
+from datetime import datetime, timedelta
+import json
 import logging
+import os
+import tempfile
+
+DEFAULT_WINDOW_MINUTES = 60
+DEFAULT_CHUNK_SIZE = 10000
+
+# Arrow types of the InfluxDB field types reported by SHOW FIELD KEYS
+FIELD_TYPES = {
+    "float": pa.float64(),
+    "integer": pa.int64(),
+    # Unsigned values go up to 2^64 - 1, which overflows INT64, so they're NUMERIC
+    "unsigned": pa.decimal128(20, 0),
+    "string": pa.string(),
+    "boolean": pa.bool_(),
+}
+
+# Arrow types of the BigQuery column types that integer fields can be loaded into
+INTEGER_FIELD_COLUMN_TYPES = {
+    "INTEGER": pa.int64(),
+    "INT64": pa.int64(),
+    "FLOAT": pa.float64(),
+    "FLOAT64": pa.float64(),
+}
+
+MICROSECONDS_PER_DAY = 24 * 60 * 60 * 1000 * 1000
+
+
+def create_influxdb_client(
+    influxdb_host, influxdb_port, influxdb_username, influxdb_password
+):
+    return InfluxDBClient(
+        host=influxdb_host,
+        port=influxdb_port,
+        username=influxdb_username,
+        password=influxdb_password,
+        ssl=True,
+        verify_ssl=True,
+    )
 
 
 def collect_influxdb_data(
@@ -18,13 +62,8 @@ def collect_influxdb_data(
     bq_table_id,
 ):
     # Create InfluxDB client and extract data
-    client = InfluxDBClient(
-        host=influxdb_host,
-        port=influxdb_port,
-        username=influxdb_username,
-        password=influxdb_password,
-        ssl=True,
-        verify_ssl=True,
+    client = create_influxdb_client(
+        influxdb_host, influxdb_port, influxdb_username, influxdb_password
     )
     query_template = "SELECT  * FROM {influxdb_measurement} WHERE time >= '{date}T00:00:00Z' AND time < '{date}T23:59:59Z' AND \"environment\"='prod' "  # noqa: E501,E261
     query = query_template.format(date=date, influxdb_measurement=influxdb_measurement)
@@ -59,6 +98,230 @@ def load_bigquery_table(df, bq_project_id, bq_dataset_id, bq_table_id, date):
     job.result()
 
 
+def bq_column_name(name):
+    # rename the columns to be compatible with BQ
+    return name.replace(".", "_")
+
+
+def field_arrow_type(field_types, column_type=None):
+    """Arrow type of a field with the given InfluxDB types.
+
+    column_type is the BigQuery type of the field's column, if the table has
+    one. A load job can't change a column's type, and the DataFrame loads of
+    collect_influxdb_data made integer fields with nulls FLOAT64 and unsigned
+    fields INT64, so integer fields keep the type of an existing column.
+    """
+    # A field can have a different type in each shard
+    if len(field_types) == 1:
+        arrow_type = FIELD_TYPES[next(iter(field_types))]
+    elif field_types <= {"float", "integer", "unsigned"}:
+        arrow_type = pa.float64()
+    else:
+        arrow_type = pa.string()
+    if field_types <= {"integer", "unsigned"}:
+        arrow_type = INTEGER_FIELD_COLUMN_TYPES.get(column_type, arrow_type)
+    return arrow_type
+
+
+def measurement_schema(client, influxdb_measurement, column_types=None):
+    """Build the Arrow schema of a measurement's rows from its tag and field keys.
+
+    InfluxDB's JSON renders a float field with a whole number value as an integer,
+    so the types can't be inferred from the values of each chunk; they come from
+    SHOW FIELD KEYS instead. Every chunk is then written with the same schema.
+    column_types maps the columns of an existing table to their BigQuery types.
+
+    SELECT * returns a tag that has the same name as a field as name_1, so the
+    schema has that column instead. Columns are ordered as a SELECT * returns
+    them: time, then the keys by name.
+    """
+    column_types = column_types or {}
+    tags = {
+        point["tagKey"]
+        for point in client.query(
+            f"SHOW TAG KEYS FROM {influxdb_measurement}"
+        ).get_points()
+    }
+    field_types = {}
+    for point in client.query(
+        f"SHOW FIELD KEYS FROM {influxdb_measurement}"
+    ).get_points():
+        field_types.setdefault(point["fieldKey"], set()).add(point["fieldType"])
+
+    types = {}
+    for name in tags:
+        column = f"{name}_1" if name in field_types else name
+        types[bq_column_name(column)] = pa.string()
+    for name in field_types:
+        column = bq_column_name(name)
+        types[column] = field_arrow_type(field_types[name], column_types.get(column))
+
+    fields = [pa.field("time", pa.timestamp("us", tz="UTC"))]
+    for name in sorted(types):
+        fields.append(pa.field(name, types[name]))
+    fields.append(pa.field("submission_date", pa.date32()))
+    return pa.schema(fields)
+
+
+def table_column_types(bq_project_id, bq_dataset_id, bq_table_id):
+    """Map the columns of the destination table to their types, if it exists."""
+    bq_client = bigquery.Client(project=bq_project_id)
+    bq_table_ref = bq_client.dataset(bq_dataset_id).table(bq_table_id)
+    try:
+        table = bq_client.get_table(bq_table_ref)
+    except NotFound:
+        return {}
+    return {field.name: field.field_type for field in table.schema}
+
+
+def time_windows(date, window_minutes):
+    """Split the day into [start, end) windows of window_minutes.
+
+    The last window ends at 23:59:59, like the single query of
+    collect_influxdb_data, so both modes load the same rows.
+    """
+    start = datetime(date.year, date.month, date.day)
+    day_end = start + timedelta(days=1) - timedelta(seconds=1)
+    while start < day_end:
+        end = min(start + timedelta(minutes=window_minutes), day_end)
+        yield start.strftime("%Y-%m-%dT%H:%M:%SZ"), end.strftime("%Y-%m-%dT%H:%M:%SZ")
+        start = end
+
+
+def iter_chunks(client, query, chunk_size):
+    """Yield (columns, values) for each chunk of a chunked InfluxDB response.
+
+    InfluxDBClient.query(chunked=True) merges all the chunks into one ResultSet,
+    so the response is streamed and parsed a line (one chunk) at a time here.
+    Times are returned as integer nanoseconds since the epoch.
+    """
+    response = client.request(
+        "query",
+        params={
+            "q": query,
+            "epoch": "ns",
+            "chunked": "true",
+            "chunk_size": chunk_size,
+        },
+        stream=True,
+    )
+    try:
+        for line in response.iter_lines():
+            if not line:
+                continue
+            data = json.loads(line)
+            if "error" in data:
+                raise InfluxDBClientError(data["error"])
+            for result in data.get("results", []):
+                if "error" in result:
+                    raise InfluxDBClientError(result["error"])
+                for series in result.get("series", []):
+                    if series.get("values"):
+                        yield series["columns"], series["values"]
+    finally:
+        response.close()
+
+
+def chunk_to_table(columns, values, schema):
+    """Convert one chunk of rows to an Arrow table with the given schema."""
+    names = [bq_column_name(name) for name in columns]
+    unknown = set(names) - set(schema.names)
+    if unknown:
+        raise ValueError(
+            f"Columns {sorted(unknown)} are not tag or field keys of the measurement"
+        )
+    by_name = dict(zip(names, zip(*values)))
+
+    micros = np.asarray(by_name.pop("time"), dtype=np.int64) // 1000
+    arrays = {
+        "time": pa.array(micros, type=pa.timestamp("us", tz="UTC")),
+        "submission_date": pa.array(
+            (micros // MICROSECONDS_PER_DAY).astype(np.int32), type=pa.date32()
+        ),
+    }
+    for field in schema:
+        if field.name in arrays:
+            continue
+        column = by_name.get(field.name)
+        if column is None:
+            arrays[field.name] = pa.nulls(len(values), type=field.type)
+        elif pa.types.is_string(field.type):
+            arrays[field.name] = pa.array(
+                [None if value is None else str(value) for value in column],
+                type=field.type,
+            )
+        else:
+            arrays[field.name] = pa.array(column, type=field.type)
+    return pa.Table.from_arrays([arrays[name] for name in schema.names], schema=schema)
+
+
+def stream_influxdb_data(
+    influxdb_host,
+    influxdb_port,
+    influxdb_username,
+    influxdb_password,
+    influxdb_measurement,
+    date,
+    bq_project_id,
+    bq_dataset_id,
+    bq_table_id,
+    window_minutes=DEFAULT_WINDOW_MINUTES,
+    chunk_size=DEFAULT_CHUNK_SIZE,
+):
+    """Export a day of a measurement without holding it in memory.
+
+    The day is queried in windows of window_minutes, each read as a chunked
+    response of at most chunk_size rows per chunk. Chunks are appended to a
+    Parquet staging file as they arrive, and the file is loaded into the
+    partition with one load job, so peak memory is a single chunk.
+    """
+    client = create_influxdb_client(
+        influxdb_host, influxdb_port, influxdb_username, influxdb_password
+    )
+    schema = measurement_schema(
+        client,
+        influxdb_measurement,
+        table_column_types(bq_project_id, bq_dataset_id, bq_table_id),
+    )
+    query_template = "SELECT * FROM {influxdb_measurement} WHERE time >= '{start}' AND time < '{end}' AND \"environment\"='prod' "  # noqa: E501
+
+    with tempfile.TemporaryDirectory() as staging_dir:
+        path = os.path.join(staging_dir, f"{bq_table_id}.parquet")
+        num_rows = 0
+        with pq.ParquetWriter(path, schema) as writer:
+            for start, end in time_windows(date, window_minutes):
+                query = query_template.format(
+                    influxdb_measurement=influxdb_measurement, start=start, end=end
+                )
+                for columns, values in iter_chunks(client, query, chunk_size):
+                    writer.write_table(chunk_to_table(columns, values, schema))
+                    num_rows += len(values)
+                logging.info(f"{influxdb_measurement} {start}: {num_rows} rows staged")
+
+        if num_rows > 0:
+            load_bigquery_parquet(path, bq_project_id, bq_dataset_id, bq_table_id, date)
+        else:
+            logging.info(f"{influxdb_measurement} is empty")
+
+
+def load_bigquery_parquet(path, bq_project_id, bq_dataset_id, bq_table_id, date):
+    # Same destination and job configuration as load_bigquery_table
+    bq_client = bigquery.Client(project=bq_project_id)
+    bq_dataset_ref = bq_client.dataset(bq_dataset_id)
+    bq_table_ref = bq_dataset_ref.table(bq_table_id)
+
+    job_config = bigquery.LoadJobConfig(
+        source_format=bigquery.SourceFormat.PARQUET,
+        schema_update_options=bigquery.SchemaUpdateOption.ALLOW_FIELD_ADDITION,
+        write_disposition=bigquery.job.WriteDisposition.WRITE_TRUNCATE,
+        time_partitioning=bigquery.table.TimePartitioning(field="submission_date"),
+    )
+    partition = f"{bq_table_ref}${str(date).replace('-', '')}"
+    with open(path, "rb") as f:
+        job = bq_client.load_table_from_file(f, partition, job_config=job_config)
+    job.result()
+
+
 @click.command()
 @click.option("--bq_project_id", help="GCP BigQuery project id", required=True)
 @click.option("--bq_dataset_id", help="GCP BigQuery dataset id", required=True)
@@ -87,6 +350,22 @@ def load_bigquery_table(df, bq_project_id, bq_dataset_id, bq_table_id, date):
 @click.option(
     "--date", type=lambda x: datetime.strptime(x, "%Y-%m-%d").date(), required=True
 )
+@click.option(
+    "--streaming",
+    is_flag=True,
+    help="Export the day in time windows of chunked responses via a Parquet "
+    "staging file, instead of loading it into one DataFrame",
+)
+@click.option(
+    "--window_minutes",
+    default=DEFAULT_WINDOW_MINUTES,
+    help="Length of each query's time window in --streaming mode",
+)
+@click.option(
+    "--chunk_size",
+    default=DEFAULT_CHUNK_SIZE,
+    help="Rows per chunk of the InfluxDB response in --streaming mode",
+)
 def main(
     bq_project_id,
     bq_dataset_id,
@@ -97,7 +376,26 @@ def main(
     influxdb_host,
     influxdb_port,
     date,
+    streaming,
+    window_minutes,
+    chunk_size,
 ):
+    if streaming:
+        stream_influxdb_data(
+            influxdb_host,
+            influxdb_port,
+            influxdb_username,
+            influxdb_password,
+            influxdb_measurement,
+            date,
+            bq_project_id,
+            bq_dataset_id,
+            bq_table_id,
+            window_minutes=window_minutes,
+            chunk_size=chunk_size,
+        )
+        return
+
     collect_influxdb_data(
         influxdb_host,
         influxdb_port,
@@ -0,0 +1,193 @@
+import datetime
+from decimal import Decimal
+
+import pyarrow as pa
+import pytest
+
+from influxdb_to_bigquery.main import (
+    chunk_to_table,
+    measurement_schema,
+    time_windows,
+)
+
+NANOSECONDS_PER_SECOND = 1000 * 1000 * 1000
+
+# 2024-01-02T03:04:05Z
+TIMESTAMP = 1704164645
+
+
+class FakeResultSet:
+    def __init__(self, points):
+        self.points = points
+
+    def get_points(self):
+        return iter(self.points)
+
+
+class FakeInfluxDBClient:
+    """Answers SHOW TAG KEYS and SHOW FIELD KEYS with the given keys."""
+
+    def __init__(self, tags, fields):
+        self.tags = tags
+        self.fields = fields
+
+    def query(self, query):
+        if query.startswith("SHOW TAG KEYS"):
+            return FakeResultSet([{"tagKey": name} for name in self.tags])
+        if query.startswith("SHOW FIELD KEYS"):
+            return FakeResultSet(
+                [
+                    {"fieldKey": name, "fieldType": field_type}
+                    for name, field_type in self.fields
+                ]
+            )
+        raise AssertionError(f"Unexpected query {query}")
+
+
+def schema_types(schema):
+    return {field.name: field.type for field in schema}
+
+
+def test_time_windows():
+    windows = list(time_windows(datetime.date(2024, 1, 2), 60))
+    assert len(windows) == 24
+    assert windows[0] == ("2024-01-02T00:00:00Z", "2024-01-02T01:00:00Z")
+    assert windows[-1] == ("2024-01-02T23:00:00Z", "2024-01-02T23:59:59Z")
+
+
+def test_time_windows_uneven():
+    windows = list(time_windows(datetime.date(2024, 1, 2), 7 * 60))
+    assert windows == [
+        ("2024-01-02T00:00:00Z", "2024-01-02T07:00:00Z"),
+        ("2024-01-02T07:00:00Z", "2024-01-02T14:00:00Z"),
+        ("2024-01-02T14:00:00Z", "2024-01-02T21:00:00Z"),
+        ("2024-01-02T21:00:00Z", "2024-01-02T23:59:59Z"),
+    ]
+
+
+def test_measurement_schema():
+    client = FakeInfluxDBClient(
+        tags=["host", "environment"],
+        fields=[
+            ("load.avg", "float"),
+            ("requests", "integer"),
+            ("bytes", "unsigned"),
+            ("ok", "boolean"),
+            ("message", "string"),
+            # Fields with a different type in each shard
+            ("mixed_number", "integer"),
+            ("mixed_number", "float"),
+            ("mixed", "integer"),
+            ("mixed", "string"),
+        ],
+    )
+    schema = measurement_schema(client, "measurement")
+    assert schema.names == [
+        "time",
+        "bytes",
+        "environment",
+        "host",
+        "load_avg",
+        "message",
+        "mixed",
+        "mixed_number",
+        "ok",
+        "requests",
+        "submission_date",
+    ]
+    assert schema_types(schema) == {
+        "time": pa.timestamp("us", tz="UTC"),
+        "bytes": pa.decimal128(20, 0),
+        "environment": pa.string(),
+        "host": pa.string(),
+        "load_avg": pa.float64(),
+        "message": pa.string(),
+        "mixed": pa.string(),
+        "mixed_number": pa.float64(),
+        "ok": pa.bool_(),
+        "requests": pa.int64(),
+        "submission_date": pa.date32(),
+    }
+
+
+def test_measurement_schema_tag_and_field_with_same_name():
+    client = FakeInfluxDBClient(tags=["status"], fields=[("status", "integer")])
+    types = schema_types(measurement_schema(client, "measurement"))
+    assert types["status"] == pa.int64()
+    assert types["status_1"] == pa.string()
+
+
+def test_measurement_schema_existing_columns():
+    client = FakeInfluxDBClient(
+        tags=["host"],
+        fields=[
+            ("requests", "integer"),
+            ("errors", "integer"),
+            ("bytes", "unsigned"),
+            ("load", "float"),
+        ],
+    )
+    column_types = {
+        "host": "STRING",
+        # Loaded from a DataFrame with nulls
+        "requests": "FLOAT",
+        "errors": "INTEGER",
+        "bytes": "INTEGER",
+        # A float field can't be loaded into an integer column
+        "load": "INTEGER",
+    }
+    types = schema_types(measurement_schema(client, "measurement", column_types))
+    assert types["requests"] == pa.float64()
+    assert types["errors"] == pa.int64()
+    assert types["bytes"] == pa.int64()
+    assert types["load"] == pa.float64()
+
+
+def test_chunk_to_table():
+    client = FakeInfluxDBClient(
+        tags=["host", "status"],
+        fields=[
+            ("load.avg", "float"),
+            ("bytes", "unsigned"),
+            ("status", "integer"),
+            ("mixed", "integer"),
+            ("mixed", "string"),
+            ("ok", "boolean"),
+        ],
+    )
+    schema = measurement_schema(client, "measurement")
+    columns = ["time", "bytes", "host", "load.avg", "mixed", "status", "status_1"]
+    values = [
+        [TIMESTAMP * NANOSECONDS_PER_SECOND + 1500, 2**64 - 1, "a", 1, 5, 200, "x"],
+        [(TIMESTAMP + 86400) * NANOSECONDS_PER_SECOND, None, "b", 1.5, "c", None, "y"],
+    ]
+    table = chunk_to_table(columns, values, schema)
+
+    assert table.schema == schema
+    rows = table.to_pylist()
+    assert rows[0]["time"] == datetime.datetime(
+        2024, 1, 2, 3, 4, 5, 1, tzinfo=datetime.timezone.utc
+    )
+    assert [row["submission_date"] for row in rows] == [
+        datetime.date(2024, 1, 2),
+        datetime.date(2024, 1, 3),
+    ]
+    assert [row["bytes"] for row in rows] == [Decimal(2**64 - 1), None]
+    assert [row["load_avg"] for row in rows] == [1.0, 1.5]
+    assert [row["mixed"] for row in rows] == ["5", "c"]
+    assert [row["status"] for row in rows] == [200, None]
+    assert [row["status_1"] for row in rows] == ["x", "y"]
+    # Fields without values in the chunk are null
+    assert [row["ok"] for row in rows] == [None, None]
+
+
+def test_chunk_to_table_unknown_column():
+    schema = measurement_schema(
+        FakeInfluxDBClient(tags=["host"], fields=[("load", "float")]), "measurement"
+    )
+    with pytest.raises(ValueError, match="not_a_key"):
+        chunk_to_table(
+            ["time", "load", "not_a_key"],
+            [[TIMESTAMP * NANOSECONDS_PER_SECOND, 1.0, 2]],
+            schema,
+        )
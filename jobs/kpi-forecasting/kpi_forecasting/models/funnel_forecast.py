@@ -1,8 +1,9 @@
+from concurrent.futures import ProcessPoolExecutor
 from dataclasses import dataclass, field
 from datetime import datetime
 import itertools
 import json
-from typing import Dict, List, Union
+from typing import Callable, Dict, List, Tuple, Union
 
 from google.cloud import bigquery
 from google.cloud.bigquery.enums import SqlTypeNames as bq_types
@@ -21,6 +22,41 @@ from kpi_forecasting.configs.model_inputs import (
 from kpi_forecasting.models.prophet_forecast import ProphetForecast
 
 
+def _call_seeded(func: Callable, seed: Tuple[int, ...], *args):
+    """
+    Call `func` with numpy's global random state seeded from `seed`, and restore the
+    previous state afterwards. Prophet draws from the global state, so it can't be
+    given a local Generator instead.
+
+    Returns:
+        The return value of `func`.
+    """
+    state = np.random.get_state()
+    np.random.seed([42, *seed])
+    try:
+        return func(*args)
+    finally:
+        np.random.set_state(state)
+
+
+def _fit_model(model: prophet.Prophet, train_df: pd.DataFrame) -> prophet.Prophet:
+    """Fit a single model. Runs in a worker process when fitting in parallel."""
+    model.fit(train_df)
+    return model
+
+
+def _crossvalidation_metric(
+    model: prophet.Prophet,
+    train_df: pd.DataFrame,
+    get_metric: Callable,
+    cv_settings: dict,
+) -> float:
+    """Fit a single model and cross validate it. Runs in a worker process when
+    fitting in parallel."""
+    model.fit(train_df)
+    return get_metric(model, cv_settings)
+
+
 @dataclass
 class SegmentModelSettings:
     """
@@ -52,8 +88,16 @@ class FunnelForecast(ProphetForecast):
     Inherits from BaseForecast and provides methods for initializing forecast
     parameters, building models, generating forecasts, summarizing results,
     and writing results to BigQuery.
+
+    Additional attributes:
+    max_workers (int): The number of processes used to fit models. When greater than 1,
+            the grid search for every segment and the final fit of each segment are
+            spread across a process pool. Each fit seeds numpy from its position in the
+            grid, so the results are the same as when fitting serially. Defaults to 1.
     """
 
+    max_workers: int = 1
+
     def __post_init__(self) -> None:
         """
         Post-initialization method to set up necessary attributes and configurations.
@@ -316,9 +360,12 @@ class FunnelForecast(ProphetForecast):
                 submission_date column with unique dates corresponding to each observation and
                 y column containing values of observations
         """
-        for segment_settings in self.segment_models:
-            parameters = self._auto_tuning(observed_df, segment_settings)
+        segment_parameters = self._tune_segments(observed_df, self.segment_models)
 
+        tasks = []
+        for segment_index, (segment_settings, parameters) in enumerate(
+            zip(self.segment_models, segment_parameters)
+        ):
             # Initialize model; build model dataframe
             add_log_growth_cols = (
                 "growth" in parameters.keys() and parameters["growth"] == "logistic"
@@ -327,8 +374,8 @@ class FunnelForecast(ProphetForecast):
                 observed_df, segment_settings, add_log_growth_cols
             )
             model = self._build_model(segment_settings, parameters)
+            tasks.append(((segment_index,), model, test_dat))
 
-            model.fit(test_dat)
             if add_log_growth_cols:
                 # all values in these colunns are the same
                 parameters["floor"] = test_dat["floor"].values[0]
@@ -339,11 +386,33 @@ class FunnelForecast(ProphetForecast):
                     parameters["holidays"]["holiday"].unique().tolist()
                 )
             segment_settings.trained_parameters = parameters
+
+        models = self._map(_fit_model, tasks)
+        for segment_settings, model in zip(self.segment_models, models):
             segment_settings.segment_model = model
 
-    def _get_crossvalidation_metric(
-        self, m: prophet.Prophet, cv_settings: dict
-    ) -> float:
+    def _map(self, func: Callable, tasks: List[Tuple]) -> List:
+        """
+        Call `func` with the arguments in each element of `tasks`, in a process pool
+        if `max_workers` is greater than 1. The first element of each task is its
+        position, which seeds numpy for the call, so the result doesn't depend on
+        which process runs the task or what ran before it.
+
+        `func` and the tasks are pickled to send them to the pool, so `func` should
+        be a module-level function and the tasks should hold only what it needs.
+
+        Returns:
+            List: The results, in the same order as `tasks`.
+        """
+        if self.max_workers > 1 and len(tasks) > 1:
+            with ProcessPoolExecutor(max_workers=self.max_workers) as executor:
+                return list(
+                    executor.map(_call_seeded, itertools.repeat(func), *zip(*tasks))
+                )
+        return [_call_seeded(func, *task) for task in tasks]
+
+    @staticmethod
+    def _get_crossvalidation_metric(m: prophet.Prophet, cv_settings: dict) -> float:
         """function for calculated the metric used for crossvalidation
 
         Args:
@@ -379,37 +448,64 @@ class FunnelForecast(ProphetForecast):
         Returns:
             Dict[str, float]: The tuned parameters.
         """
-        add_log_growth_cols = (
-            "growth" in segment_settings.grid_parameters.keys()
-            and segment_settings.grid_parameters["growth"] == "logistic"
-        )
+        return self._tune_segments(observed_df, [segment_settings])[0]
 
-        for k, v in segment_settings.grid_parameters.items():
-            if not isinstance(v, list):
-                segment_settings.grid_parameters[k] = [v]
+    def _tune_segments(
+        self, observed_df, segment_models: List[SegmentModelSettings]
+    ) -> List[Dict[str, float]]:
+        """
+        Perform automatic tuning of model parameters for several segments. Every point
+        of every segment's parameter grid is evaluated as a separate task.
 
-        param_grid = [
-            dict(zip(segment_settings.grid_parameters.keys(), v))
-            for v in itertools.product(*segment_settings.grid_parameters.values())
-        ]
+        Args:
+            observed_df (pd.DataFrame): dataframe of observed data
+            segment_models (List[SegmentModelSettings]): The settings for each segment.
 
-        test_dat = self._build_train_dataframe(
-            observed_df, segment_settings, add_log_growth_cols
-        )
-        bias = []
+        Returns:
+            List[Dict[str, float]]: The tuned parameters for each segment.
+        """
+        param_grids = []
+        tasks = []
+        for segment_index, segment_settings in enumerate(segment_models):
+            add_log_growth_cols = (
+                "growth" in segment_settings.grid_parameters.keys()
+                and segment_settings.grid_parameters["growth"] == "logistic"
+            )
 
-        for params in param_grid:
-            m = self._build_model(segment_settings, params)
-            m.fit(test_dat)
+            for k, v in segment_settings.grid_parameters.items():
+                if not isinstance(v, list):
+                    segment_settings.grid_parameters[k] = [v]
+
+            param_grid = [
+                dict(zip(segment_settings.grid_parameters.keys(), v))
+                for v in itertools.product(*segment_settings.grid_parameters.values())
+            ]
+            param_grids.append(param_grid)
 
-            crossval_metric = self._get_crossvalidation_metric(
-                m, segment_settings.cv_settings
+            test_dat = self._build_train_dataframe(
+                observed_df, segment_settings, add_log_growth_cols
+            )
+            tasks.extend(
+                (
+                    (segment_index, grid_index),
+                    self._build_model(segment_settings, dict(params)),
+                    test_dat,
+                    self._get_crossvalidation_metric,
+                    segment_settings.cv_settings,
+                )
+                for grid_index, params in enumerate(param_grid)
             )
-            bias.append(crossval_metric)
 
-        min_abs_bias_index = np.argmin(np.abs(bias))
+        bias = self._map(_crossvalidation_metric, tasks)
 
-        return param_grid[min_abs_bias_index]
+        tuned_parameters = []
+        offset = 0
+        for param_grid in param_grids:
+            segment_bias = bias[offset : offset + len(param_grid)]
+            offset += len(param_grid)
+            min_abs_bias_index = np.argmin(np.abs(segment_bias))
+            tuned_parameters.append(param_grid[min_abs_bias_index])
+        return tuned_parameters
 
     def _add_regressors(self, df: pd.DataFrame, regressors: List[ProphetRegressor]):
         """
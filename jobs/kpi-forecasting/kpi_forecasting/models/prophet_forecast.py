@@ -2,7 +2,6 @@ import json
 import pandas as pd
 from pandas.api import types as pd_types
 import prophet
-import numpy as np
 from typing import Dict, List
 
 
@@ -173,10 +172,6 @@ class ProphetForecast(BaseForecast):
         numpy_aggregations: List[str],
         percentiles: List[int],
     ):
-        # build a list of all functions that we'll summarize the data by
-        aggregations = [getattr(np, i) for i in numpy_aggregations]
-        aggregations.extend([pdx.percentile(i) for i in percentiles])
-
         # aggregate metric to the correct date period (day, month, year)
         observed_summarized = pdx.aggregate_to_period(observed_df, period)
         forecast_agg = pdx.aggregate_to_period(forecast_df, period).sort_values(
@@ -198,10 +193,11 @@ class ProphetForecast(BaseForecast):
             # previously observed data within the period. For example, when a monthly
             # forecast is generated in the middle of the month.
             .add(overlap[["value"]].values)
-            # calculate summary values, aggregating by submission_date,
-            .agg(aggregations, axis=1)
-            .reset_index()
         )
+        # calculate summary values, aggregating by submission_date,
+        forecast_summarized = pdx.summarize_samples(
+            forecast_summarized, numpy_aggregations, percentiles
+        ).reset_index()
 
         return forecast_summarized, observed_summarized
 
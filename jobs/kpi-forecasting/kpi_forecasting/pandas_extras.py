@@ -1,3 +1,5 @@
+from typing import List
+
 import numpy as np
 import pandas as pd
 
@@ -12,6 +14,54 @@ def percentile(p: int = 50, name_format: str = "p{:02.0f}"):
     return f
 
 
+# numpy aggregations that `pandas.agg` dispatches to the pandas method of the same
+# name, which reduces every row at once when called with `axis=1`
+VECTORIZED_AGGREGATIONS = {
+    "sum": "sum",
+    "mean": "mean",
+    "median": "median",
+    "std": "std",
+    "var": "var",
+    "prod": "prod",
+    "min": "min",
+    "max": "max",
+    "amin": "min",
+    "amax": "max",
+}
+
+
+def summarize_samples(
+    df: pd.DataFrame,
+    numpy_aggregations: List[str],
+    percentiles: List[int],
+    name_format: str = "p{:02.0f}",
+) -> pd.DataFrame:
+    """Summarize each row of a dataframe of samples.
+
+    Gives the same result as
+    `df.agg([np.<aggregation>, ..., percentile(p), ...], axis=1)`, but computes every
+    percentile in a single `np.nanquantile` call over the sample matrix, instead of
+    calling `pandas.Series.quantile` once per row and percentile.
+    """
+    columns = {}
+    for aggregation in numpy_aggregations:
+        func = getattr(np, aggregation)
+        method = VECTORIZED_AGGREGATIONS.get(aggregation)
+        if method is not None:
+            columns[func.__name__] = getattr(df, method)(axis=1)
+        else:
+            columns[func.__name__] = df.agg([func], axis=1).iloc[:, 0]
+
+    if percentiles:
+        quantiles = np.nanquantile(
+            df.to_numpy(dtype=float), [p / 100 for p in percentiles], axis=1
+        )
+        for p, values in zip(percentiles, quantiles):
+            columns[name_format.format(p)] = pd.Series(values, index=df.index)
+
+    return pd.DataFrame(columns, index=df.index)
+
+
 def aggregate_to_period(
     df: pd.DataFrame,
     period: str,
@@ -119,6 +119,8 @@ class MockModel:
 
     def fit(self, df, *args, **kwargs):
         self.history = df
+        # records the state of the random number generator when fitting
+        self.random_draw = np.random.random()
         return None
 
     def predict(self, dates_to_predict):
@@ -842,6 +844,78 @@ def test_fit(funnel_forecast_for_fit_tests, segment_info_fit_tests):
         pd.testing.assert_frame_equal(segment_model.history, expected_training)
 
 
+def test_fit_parallel(funnel_forecast_for_fit_tests, segment_info_fit_tests):
+    """test that fitting in a process pool gives the same results as fitting serially"""
+    observed_data = pd.DataFrame(
+        {
+            "a": ["A1", "A1", "A2", "A2"],
+            "b": ["B1", "B2", "B1", "B2"],
+            "submission_date": [
+                TEST_DATE,
+                TEST_DATE_NEXT_DAY,
+                TEST_DATE,
+                TEST_DATE_NEXT_DAY,
+            ],
+        }
+    )
+
+    segment_list = ["a"]
+
+    funnel_forecast_for_fit_tests._set_segment_models(
+        observed_df=observed_data, segment_column_list=segment_list
+    )
+    funnel_forecast_for_fit_tests._fit(observed_data)
+    serial_models = [
+        segment.segment_model
+        for segment in funnel_forecast_for_fit_tests.segment_models
+    ]
+
+    funnel_forecast_for_fit_tests.max_workers = 2
+    funnel_forecast_for_fit_tests._fit(observed_data)
+
+    for segment, serial_model in zip(
+        funnel_forecast_for_fit_tests.segment_models, serial_models
+    ):
+        key = segment.segment["a"]
+        segment_model = segment.segment_model
+
+        # the model is fit in a separate process, so it's a copy
+        assert segment_model is not serial_model
+        assert segment_model.value == segment_info_fit_tests[key]["min_param_value"]
+        assert segment_model.value == serial_model.value
+        assert segment_model.random_draw == serial_model.random_draw
+        pd.testing.assert_frame_equal(segment_model.history, serial_model.history)
+
+    # each segment is seeded separately
+    assert serial_models[0].random_draw != serial_models[1].random_draw
+
+
+def test_fit_keeps_random_state(funnel_forecast_for_fit_tests):
+    """test that seeding each fit doesn't change the caller's random state"""
+    observed_data = pd.DataFrame(
+        {
+            "a": ["A1", "A1", "A2", "A2"],
+            "b": ["B1", "B2", "B1", "B2"],
+            "submission_date": [
+                TEST_DATE,
+                TEST_DATE_NEXT_DAY,
+                TEST_DATE,
+                TEST_DATE_NEXT_DAY,
+            ],
+        }
+    )
+
+    funnel_forecast_for_fit_tests._set_segment_models(
+        observed_df=observed_data, segment_column_list=["a"]
+    )
+
+    np.random.seed(1)
+    expected = np.random.random()
+    np.random.seed(1)
+    funnel_forecast_for_fit_tests._fit(observed_data)
+    assert np.random.random() == expected
+
+
 def test_set_segment_models():
     """test the set_segment_models method"""
     A1_start_date = "2018-01-01"
@@ -1,7 +1,12 @@
+import numpy as np
 import pandas as pd
 import pytest
 
-from kpi_forecasting.pandas_extras import aggregate_to_period
+from kpi_forecasting.pandas_extras import (
+    aggregate_to_period,
+    percentile,
+    summarize_samples,
+)
 
 
 def test_only_numeric():
@@ -217,3 +222,57 @@ def test_agg_exception():
         match="Don't know how to floor dates by hamburger. Please use 'day', 'month', or 'year'.",
     ):
         _ = aggregate_to_period(df, "hamburger")
+
+
+def sample_matrix(num_rows, num_samples):
+    rng = np.random.default_rng(42)
+    df = pd.DataFrame(
+        rng.normal(1e6, 1e4, (num_rows, num_samples)),
+        index=pd.Index(
+            pd.date_range("2024-01-01", periods=num_rows), name="submission_date"
+        ),
+    )
+    df.iloc[1, 3] = np.nan
+    return df
+
+
+def summarize_samples_agg(df, numpy_aggregations, percentiles):
+    """Summarize samples with a row-by-row `pandas.agg`"""
+    aggregations = [getattr(np, i) for i in numpy_aggregations]
+    aggregations.extend([percentile(i) for i in percentiles])
+    return df.agg(aggregations, axis=1)
+
+
+def test_summarize_samples():
+    df = sample_matrix(20, 50)
+    numpy_aggregations = ["mean", "median", "std", "max", "nanmean"]
+    percentiles = [5, 10, 50, 90, 95]
+
+    output = summarize_samples(df, numpy_aggregations, percentiles)
+    expected = summarize_samples_agg(df, numpy_aggregations, percentiles)
+
+    assert list(output.columns) == list(expected.columns)
+    pd.testing.assert_frame_equal(output, expected, check_exact=True, check_freq=False)
+
+
+def test_summarize_samples_missing_samples():
+    df = sample_matrix(10, 30)
+    df.iloc[::3, ::4] = np.nan
+    df.iloc[1, :] = np.nan
+    numpy_aggregations = ["mean", "sum"]
+    percentiles = [10, 50, 90]
+
+    output = summarize_samples(df, numpy_aggregations, percentiles)
+    expected = summarize_samples_agg(df, numpy_aggregations, percentiles)
+
+    pd.testing.assert_frame_equal(output, expected, check_exact=True, check_freq=False)
+
+
+def test_summarize_samples_percentiles_only():
+    df = sample_matrix(5, 20)
+
+    output = summarize_samples(df, [], [25, 75], name_format="q{:.0f}")
+
+    assert list(output.columns) == ["q25", "q75"]
+    pd.testing.assert_index_equal(output.index, df.index)
+    assert (output["q25"] <= output["q75"]).all()
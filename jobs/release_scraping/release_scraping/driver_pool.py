@@ -0,0 +1,114 @@
+"""A pool of Selenium browsers that are kept open and reused across pages.
+
+The release_scraping job keeps a copy of this file, so that each image builds
+on its own. Change the copy in the extensions job, where it's tested, and copy
+it over; the repository's tests/test_vendored_files.py checks that the copies
+match.
+"""
+
+import queue
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+
+
+def quit_driver(driver):
+    try:
+        driver.quit()
+    except Exception as e:
+        print(f"Failed to quit browser: {e}")
+
+
+class BrowserTimings:
+    """Collects how long each kind of browser action (page load, click,
+    scroll) takes, across all the browsers in a pool"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.durations = defaultdict(list)
+
+    @contextmanager
+    def measure(self, kind):
+        start = time.monotonic()
+        try:
+            yield
+        finally:
+            elapsed = time.monotonic() - start
+            with self.lock:
+                self.durations[kind].append(elapsed)
+
+    def summary(self):
+        with self.lock:
+            return "; ".join(
+                f"{kind}: {len(durations)} in {sum(durations):.1f}s "
+                f"(mean {sum(durations) / len(durations):.2f}s, "
+                f"max {max(durations):.2f}s)"
+                for kind, durations in self.durations.items()
+            )
+
+
+class DriverPool:
+    """Keeps up to size browsers open and lends them out one page at a time.
+
+    Browsers are started on first use and reused for later pages, rather than
+    starting a new browser for each page. A browser that raised an error is
+    quit instead of being returned to the pool, and replaced when next needed."""
+
+    def __init__(self, size, create_driver):
+        self.size = size
+        self.create_driver = create_driver
+        self.timings = BrowserTimings()
+        self.lock = threading.Lock()
+        self.slots = threading.BoundedSemaphore(size)
+        self.idle = queue.LifoQueue()
+        self.drivers = set()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def acquire(self):
+        self.slots.acquire()
+        try:
+            return self.idle.get_nowait()
+        except queue.Empty:
+            pass
+        try:
+            with self.timings.measure("browser_start"):
+                driver = self.create_driver()
+        except BaseException:
+            self.slots.release()
+            raise
+        with self.lock:
+            self.drivers.add(driver)
+        return driver
+
+    def release(self, driver, broken=False):
+        if broken:
+            with self.lock:
+                self.drivers.discard(driver)
+            quit_driver(driver)
+        else:
+            self.idle.put(driver)
+        self.slots.release()
+
+    @contextmanager
+    def driver(self):
+        """Borrows a browser from the pool for the duration of the block"""
+        driver = self.acquire()
+        try:
+            yield driver
+        except BaseException:
+            self.release(driver, broken=True)
+            raise
+        self.release(driver)
+
+    def close(self):
+        with self.lock:
+            drivers = list(self.drivers)
+            self.drivers.clear()
+        for driver in drivers:
+            quit_driver(driver)
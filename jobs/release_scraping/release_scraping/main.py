@@ -1,6 +1,7 @@
 import html
 import json
 import re
+import threading
 import time
 import xml.etree.ElementTree as ET
 
@@ -8,6 +9,9 @@ import feedparser
 import requests
 from argparse import ArgumentParser
 from bs4 import BeautifulSoup
+from collections import defaultdict, deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass
 from datetime import datetime
 from google.cloud import storage
 from urllib.parse import urlparse
@@ -17,6 +21,8 @@ from selenium.webdriver.chrome.webdriver import WebDriver as ChromiumDriver
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 
+from driver_pool import BrowserTimings, DriverPool
+
 BROWSERS_FYI_FEED = "https://www.browsers.fyi/feed/"
 FEED_TITLE_RE = re.compile(r"^(.+) release (.+) is out!$")
 
@@ -54,7 +60,10 @@ GREENHOUSE_API_URL = (
 OPERA_SITEMAP_URL = "https://jobs.opera.com/sitemap.xml"
 
 TIMEOUT_IN_SECONDS = 20
-REQUEST_DELAY_SECONDS = 2
+REQUEST_DELAY_SECONDS = 2  # Delay between requests to the same host
+MAX_HOSTS = 8  # Hosts scraped at once
+MAX_UPLOAD_WORKERS = 4  # Upload batches in flight at once
+UPLOAD_BATCH_SIZE = 20  # Records per upload batch
 REQUEST_HEADERS = {
     "User-Agent": (
         "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) "
@@ -64,6 +73,8 @@ REQUEST_HEADERS = {
 DRIVER_TYP = "Chromium"
 BINARY_LOC = "/usr/bin/chromium"
 
+BROWSER_POOL_SIZE = 1  # Browsers kept open for JS-rendered pages
+
 # Browsers whose release notes pages require JavaScript rendering
 JS_RENDERED_BROWSERS = {
     "Safari",
@@ -95,6 +106,203 @@ def initialize_driver(driver_type, binary_location):
     return driver
 
 
+@dataclass
+class SourceStats:
+    name: str
+    scraped: int = 0
+    uploaded: int = 0
+    failed: int = 0
+    elapsed: float = 0
+
+    def __str__(self):
+        return (
+            f"{self.name}: {self.scraped} scraped, {self.uploaded} uploaded, "
+            f"{self.failed} failed in {self.elapsed:.1f}s"
+        )
+
+
+class HostScheduler:
+    """Run calls that fetch a URL with at most one worker per host.
+
+    Calls for the same host run one at a time in the order they were submitted,
+    waiting min_interval after each call before starting the next. Calls for
+    different hosts run concurrently, up to max_hosts hosts at once.
+    """
+
+    def __init__(self, min_interval, max_hosts):
+        self.min_interval = min_interval
+        self.executor = ThreadPoolExecutor(max_workers=max_hosts)
+        self.lock = threading.Lock()
+        self.queues = {}
+        self.next_request_at = {}
+
+    def submit(self, url, fn, *args):
+        host = urlparse(url).netloc
+        future = Future()
+        with self.lock:
+            start_worker = host not in self.queues
+            if start_worker:
+                self.queues[host] = deque()
+            self.queues[host].append((future, fn, args))
+        if start_worker:
+            self.executor.submit(self._run_host, host)
+        return future
+
+    def _run_host(self, host):
+        while True:
+            with self.lock:
+                calls = self.queues[host]
+                if not calls:
+                    del self.queues[host]
+                    return
+                future, fn, args = calls.popleft()
+            if not future.set_running_or_notify_cancel():
+                continue
+            delay = self.next_request_at.get(host, 0) - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+            try:
+                future.set_result(fn(*args))
+            except BaseException as e:
+                future.set_exception(e)
+            self.next_request_at[host] = time.monotonic() + self.min_interval
+
+    def shutdown(self):
+        self.executor.shutdown(wait=True)
+
+
+class ScrapeExecutor:
+    """Run scraping sources concurrently and upload their records to GCS.
+
+    Each source runs in its own thread and submits its fetches through a
+    HostScheduler, so the per-host request delay only holds up pages from the
+    same host. Records are uploaded in batches of upload_batch_size, with up to
+    max_upload_workers batches in flight.
+    """
+
+    def __init__(
+        self,
+        bucket,
+        request_delay=REQUEST_DELAY_SECONDS,
+        max_hosts=MAX_HOSTS,
+        max_upload_workers=MAX_UPLOAD_WORKERS,
+        upload_batch_size=UPLOAD_BATCH_SIZE,
+    ):
+        self.bucket = bucket
+        self.hosts = HostScheduler(request_delay, max_hosts)
+        self.upload_executor = ThreadPoolExecutor(max_workers=max_upload_workers)
+        self.upload_batch_size = upload_batch_size
+        self.lock = threading.Lock()
+        self.stats = {}
+        self.pending_uploads = defaultdict(list)
+        self.upload_futures = defaultdict(list)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        self.hosts.shutdown()
+        self.upload_executor.shutdown(wait=True)
+
+    def fetch(self, url, fn, *args):
+        """Schedule fn(*args), which requests url, and return its Future."""
+        return self.hosts.submit(url, fn, *args)
+
+    def failed(self, source, message):
+        print(message)
+        with self.lock:
+            self.stats[source].failed += 1
+
+    def upload(self, source, gcs_path, data, description):
+        """Queue a JSON string for upload, starting a batch once enough are queued."""
+        with self.lock:
+            self.stats[source].scraped += 1
+            batch = self.pending_uploads[source]
+            batch.append((gcs_path, data, description))
+            if len(batch) < self.upload_batch_size:
+                return
+            del self.pending_uploads[source]
+        self._submit_batch(source, batch)
+
+    def _submit_batch(self, source, batch):
+        future = self.upload_executor.submit(self._upload_batch, source, batch)
+        with self.lock:
+            self.upload_futures[source].append(future)
+
+    def _upload_batch(self, source, batch):
+        for gcs_path, data, description in batch:
+            try:
+                blob = self.bucket.blob(gcs_path)
+                blob.upload_from_string(data, content_type="application/json")
+            except Exception as e:
+                self.failed(source, f"Failed to upload {description}: {e}")
+                continue
+            print(f"{description} -> gs://{GCS_BUCKET_NAME}/{gcs_path}")
+            with self.lock:
+                self.stats[source].uploaded += 1
+
+    def _run_source(self, name, scrape_source):
+        start = time.monotonic()
+        try:
+            scrape_source()
+        finally:
+            with self.lock:
+                batch = self.pending_uploads.pop(name, None)
+            if batch:
+                self._submit_batch(name, batch)
+            with self.lock:
+                futures = self.upload_futures.pop(name, [])
+            for future in futures:
+                future.result()
+            self.stats[name].elapsed = time.monotonic() - start
+
+    def run(self, sources):
+        """Run each source function concurrently and wait for their uploads.
+
+        Returns the SourceStats for each source. If a source raised, the other
+        sources still run to completion and the first error is re-raised.
+        """
+        for name in sources:
+            self.stats[name] = SourceStats(name)
+        start = time.monotonic()
+        with ThreadPoolExecutor(max_workers=len(sources)) as executor:
+            futures = {
+                name: executor.submit(self._run_source, name, scrape_source)
+                for name, scrape_source in sources.items()
+            }
+        error = None
+        for name, future in futures.items():
+            try:
+                future.result()
+            except Exception as e:
+                print(f"Source {name} failed: {e}")
+                error = error or e
+        for stats in self.stats.values():
+            print(stats)
+        print(f"All sources completed in {time.monotonic() - start:.1f}s")
+        if error is not None:
+            raise error
+        return self.stats
+
+
+def page_source_settled():
+    """Expected condition that is met once the page source is the same size on
+    two consecutive polls, i.e. scripts have stopped adding content."""
+    last_size = None
+
+    def settled(driver):
+        nonlocal last_size
+        size = len(driver.page_source)
+        is_settled = size == last_size
+        last_size = size
+        return is_settled
+
+    return settled
+
+
 def parse_feed():
     """Parse the browsers.fyi Atom feed and return all browser release entries.
 
@@ -214,16 +422,29 @@ def parse_blog_feed(feed_url):
     return posts
 
 
-def scrape_page_text(url, driver=None, use_js=False):
-    """Scrape plain text from a URL, using Selenium for JS-rendered pages."""
-    if use_js and driver is not None:
+def render_page_source(url, driver, timings=None):
+    """Load a URL in a browser and return the page source once it stops changing."""
+    if timings is None:
+        timings = BrowserTimings()
+    with timings.measure("page_load"):
         driver.get(url)
-        WebDriverWait(driver, TIMEOUT_IN_SECONDS).until(
-            EC.presence_of_element_located(("tag name", "body"))
-        )
-        # Allow additional time for JS to populate the body content
-        time.sleep(2)
-        soup = BeautifulSoup(driver.page_source, "html.parser")
+        wait = WebDriverWait(driver, TIMEOUT_IN_SECONDS, poll_frequency=0.25)
+        wait.until(EC.presence_of_element_located(("tag name", "body")))
+        # Wait for JS to finish populating the body content
+        wait.until(page_source_settled())
+    return driver.page_source
+
+
+def scrape_page_text(url, driver=None, use_js=False):
+    """Scrape plain text from a URL, using Selenium for JS-rendered pages.
+
+    driver may be a WebDriver, or a DriverPool to borrow a browser from."""
+    if use_js and isinstance(driver, DriverPool):
+        with driver.driver() as pooled_driver:
+            page_source = render_page_source(url, pooled_driver, driver.timings)
+        soup = BeautifulSoup(page_source, "html.parser")
+    elif use_js and driver is not None:
+        soup = BeautifulSoup(render_page_source(url, driver), "html.parser")
     else:
         response = requests.get(
             url, headers=REQUEST_HEADERS, timeout=TIMEOUT_IN_SECONDS
@@ -268,72 +489,101 @@ def main():
     }
     print(f"Found {len(existing_paths)} existing objects in GCS")
 
-    driver = None
-    try:
-        for release in releases:
-            name = release["name"]
-            version = release["version"]
-            release_date = release["release_date"]
-            release_notes_url = release["release_notes"]
-
-            gcs_path = gcs_path_for(name, version, release_date)
+    # The browser is only started if a JS-rendered page needs scraping
+    driver_pool = DriverPool(
+        BROWSER_POOL_SIZE, lambda: initialize_driver(DRIVER_TYP, BINARY_LOC)
+    )
+    with driver_pool, ScrapeExecutor(bucket) as executor:
+        executor.run(
+            {
+                "release_notes": lambda: scrape_and_upload_releases(
+                    releases, scraped_date, executor, existing_paths, driver_pool
+                ),
+                "user_release_notes": lambda: scrape_and_upload_user_releases(
+                    scraped_date, executor, existing_paths
+                ),
+                "blog_posts": lambda: scrape_and_upload_blog_posts(
+                    scraped_date, executor, existing_paths
+                ),
+                "jobs": lambda: scrape_and_upload_jobs(scraped_date, executor),
+            }
+        )
 
-            if gcs_path in existing_paths:
-                print(f"Skipping {name} {version} — already in GCS")
-                continue
+    if driver_pool.timings.durations:
+        print(f"Browser timings: {driver_pool.timings.summary()}")
 
-            print(f"Scraping {name} {version} ({release_date}): {release_notes_url}")
-            use_js = name in JS_RENDERED_BROWSERS
 
-            if use_js and driver is None:
-                driver = initialize_driver(DRIVER_TYP, BINARY_LOC)
+def scrape_and_upload_releases(
+    releases, scraped_date, executor, existing_paths, driver_pool
+):
+    """Scrape developer release notes from the feed and upload new ones to GCS."""
+    scrapes = []
+    for release in releases:
+        name = release["name"]
+        version = release["version"]
+        release_date = release["release_date"]
+        release_notes_url = release["release_notes"]
 
-            try:
-                raw_text = scrape_page_text(
-                    release_notes_url, driver=driver, use_js=use_js
-                )
-            except Exception as e:
-                print(f"Failed to scrape {name} {version}: {e}")
-                continue
+        gcs_path = gcs_path_for(name, version, release_date)
 
-            record = {
-                "browser": name,
-                "version": version,
-                "release_date": release_date,
-                "scraped_date": scraped_date,
-                "source_url": release_notes_url,
-                "features": [],
-                "raw_text": raw_text,
-            }
+        if gcs_path in existing_paths:
+            print(f"Skipping {name} {version} — already in GCS")
+            continue
 
-            blob = bucket.blob(gcs_path)
-            blob.upload_from_string(
-                json.dumps(record, indent=2), content_type="application/json"
-            )
-            print(f"Uploaded to gs://{GCS_BUCKET_NAME}/{gcs_path}")
-            time.sleep(REQUEST_DELAY_SECONDS)
+        print(f"Scraping {name} {version} ({release_date}): {release_notes_url}")
+        use_js = name in JS_RENDERED_BROWSERS
+        future = executor.fetch(
+            release_notes_url,
+            scrape_page_text,
+            release_notes_url,
+            driver_pool,
+            use_js,
+        )
+        scrapes.append((release, gcs_path, future))
 
-    finally:
-        if driver is not None:
-            driver.quit()
+    for release, gcs_path, future in scrapes:
+        name = release["name"]
+        version = release["version"]
+        try:
+            raw_text = future.result()
+        except Exception as e:
+            executor.failed("release_notes", f"Failed to scrape {name} {version}: {e}")
+            continue
 
-    scrape_and_upload_user_releases(scraped_date, bucket, existing_paths)
-    scrape_and_upload_blog_posts(scraped_date, bucket, existing_paths)
-    scrape_and_upload_jobs(scraped_date, bucket)
+        record = {
+            "browser": name,
+            "version": version,
+            "release_date": release["release_date"],
+            "scraped_date": scraped_date,
+            "source_url": release["release_notes"],
+            "features": [],
+            "raw_text": raw_text,
+        }
+        executor.upload(
+            "release_notes",
+            gcs_path,
+            json.dumps(record, indent=2),
+            f"{name} {version}",
+        )
 
 
-def scrape_and_upload_user_releases(scraped_date, bucket, existing_paths):
+def scrape_and_upload_user_releases(scraped_date, executor, existing_paths):
     """Scrape Firefox user-facing release notes and upload new ones to GCS."""
     print("--- Scraping Firefox user-facing release notes ---")
     try:
-        ff_releases = fetch_firefox_user_releases()
+        ff_releases = executor.fetch(
+            FIREFOX_PRODUCT_DETAILS_URL, fetch_firefox_user_releases
+        ).result()
     except Exception as e:
-        print(f"Failed to fetch Firefox product details: {e}")
+        executor.failed(
+            "user_release_notes", f"Failed to fetch Firefox product details: {e}"
+        )
         return
 
     ff_releases = [r for r in ff_releases if r["release_date"] >= MIN_RELEASE_DATE]
     print(f"Found {len(ff_releases)} Firefox user releases since {MIN_RELEASE_DATE}")
 
+    scrapes = []
     for release in ff_releases:
         version = release["version"]
         release_date = release["release_date"]
@@ -345,46 +595,61 @@ def scrape_and_upload_user_releases(scraped_date, bucket, existing_paths):
             continue
 
         print(f"Scraping Firefox {version} user release ({release_date}): {url}")
+        scrapes.append(
+            (release, url, gcs_path, executor.fetch(url, scrape_page_text, url))
+        )
+
+    for release, url, gcs_path, future in scrapes:
+        version = release["version"]
         try:
-            raw_text = scrape_page_text(url)
+            raw_text = future.result()
         except Exception as e:
-            print(f"Failed to scrape Firefox {version} user release: {e}")
+            executor.failed(
+                "user_release_notes",
+                f"Failed to scrape Firefox {version} user release: {e}",
+            )
             continue
 
         record = {
             "browser": "Firefox",
             "version": version,
-            "release_date": release_date,
+            "release_date": release["release_date"],
             "scraped_date": scraped_date,
             "source_url": url,
             "source_type": "user_release_notes",
             "features": [],
             "raw_text": raw_text,
         }
-
-        blob = bucket.blob(gcs_path)
-        blob.upload_from_string(
-            json.dumps(record, indent=2), content_type="application/json"
+        executor.upload(
+            "user_release_notes",
+            gcs_path,
+            json.dumps(record, indent=2),
+            f"Firefox {version} user release",
         )
-        print(f"Uploaded to gs://{GCS_BUCKET_NAME}/{gcs_path}")
-        time.sleep(REQUEST_DELAY_SECONDS)
 
 
-def scrape_and_upload_blog_posts(scraped_date, bucket, existing_paths):
+def scrape_and_upload_blog_posts(scraped_date, executor, existing_paths):
     """Scrape browser blog RSS feeds and upload new posts to GCS."""
     print("--- Scraping browser blog posts ---")
-    for browser_name, feed_url in BLOG_FEEDS.items():
+    feeds = [
+        (browser_name, executor.fetch(feed_url, parse_blog_feed, feed_url))
+        for browser_name, feed_url in BLOG_FEEDS.items()
+    ]
+
+    scrapes = []
+    for browser_name, feed_future in feeds:
         print(f"Fetching {browser_name} blog feed")
         try:
-            posts = parse_blog_feed(feed_url)
+            posts = feed_future.result()
         except Exception as e:
-            print(f"Failed to fetch {browser_name} blog feed: {e}")
+            executor.failed(
+                "blog_posts", f"Failed to fetch {browser_name} blog feed: {e}"
+            )
             continue
 
         for post in posts:
             publish_date = post["release_date"]
             url = post["url"]
-            title = post["title"]
 
             if publish_date < MIN_RELEASE_DATE:
                 continue
@@ -395,31 +660,42 @@ def scrape_and_upload_blog_posts(scraped_date, bucket, existing_paths):
                 print(f"Skipping {browser_name} post ({publish_date}) — already in GCS")
                 continue
 
-            print(f"Scraping {browser_name} blog post: {title}")
-            try:
-                raw_text = scrape_page_text(url)
-            except Exception as e:
-                print(f"Failed to scrape {browser_name} post {url}: {e}")
-                continue
-
-            record = {
-                "browser": browser_name,
-                "version": None,
-                "release_date": publish_date,
-                "scraped_date": scraped_date,
-                "source_url": url,
-                "source_type": "blog_post",
-                "title": title,
-                "features": [],
-                "raw_text": raw_text,
-            }
+            print(f"Scraping {browser_name} blog post: {post['title']}")
+            scrapes.append(
+                (
+                    browser_name,
+                    post,
+                    gcs_path,
+                    executor.fetch(url, scrape_page_text, url),
+                )
+            )
 
-            blob = bucket.blob(gcs_path)
-            blob.upload_from_string(
-                json.dumps(record, indent=2), content_type="application/json"
+    for browser_name, post, gcs_path, future in scrapes:
+        try:
+            raw_text = future.result()
+        except Exception as e:
+            executor.failed(
+                "blog_posts", f"Failed to scrape {browser_name} post {post['url']}: {e}"
             )
-            print(f"Uploaded to gs://{GCS_BUCKET_NAME}/{gcs_path}")
-            time.sleep(REQUEST_DELAY_SECONDS)
+            continue
+
+        record = {
+            "browser": browser_name,
+            "version": None,
+            "release_date": post["release_date"],
+            "scraped_date": scraped_date,
+            "source_url": post["url"],
+            "source_type": "blog_post",
+            "title": post["title"],
+            "features": [],
+            "raw_text": raw_text,
+        }
+        executor.upload(
+            "blog_posts",
+            gcs_path,
+            json.dumps(record, indent=2),
+            f"{browser_name} post {post['title']}",
+        )
 
 
 def gcs_job_path_for(company, scraped_date, job_id):
@@ -589,7 +865,7 @@ def scrape_opera_job(url):
     }
 
 
-def scrape_and_upload_jobs(scraped_date, bucket):
+def scrape_and_upload_jobs(scraped_date, executor):
     """Scrape job postings from all configured sources and upload to GCS.
 
     Each run writes a complete snapshot under a date directory. A job that
@@ -598,12 +874,24 @@ def scrape_and_upload_jobs(scraped_date, bucket):
     """
     print("--- Scraping job postings ---")
 
-    for company, board in GREENHOUSE_BOARDS.items():
+    boards = [
+        (
+            company,
+            board,
+            executor.fetch(
+                GREENHOUSE_API_URL.format(board=board), fetch_greenhouse_jobs, board
+            ),
+        )
+        for company, board in GREENHOUSE_BOARDS.items()
+    ]
+    opera_sitemap = executor.fetch(OPERA_SITEMAP_URL, fetch_opera_job_urls)
+
+    for company, board, future in boards:
         print(f"{company} (Greenhouse: {board})")
         try:
-            jobs = fetch_greenhouse_jobs(board)
+            jobs = future.result()
         except Exception as e:
-            print(f"Failed to fetch {company} jobs: {e}")
+            executor.failed("jobs", f"Failed to fetch {company} jobs: {e}")
             continue
 
         print(f"  Found {len(jobs)} jobs")
@@ -611,36 +899,34 @@ def scrape_and_upload_jobs(scraped_date, bucket):
             try:
                 record = greenhouse_job_to_record(company, job, scraped_date)
             except Exception as e:
-                print(f"  Failed to parse job {job.get('id', '?')}: {e}")
+                executor.failed(
+                    "jobs", f"  Failed to parse job {job.get('id', '?')}: {e}"
+                )
                 continue
 
             gcs_path = gcs_job_path_for(company, scraped_date, record["job_id"])
-            try:
-                blob = bucket.blob(gcs_path)
-                blob.upload_from_string(
-                    json.dumps(record, indent=2, ensure_ascii=False),
-                    content_type="application/json",
-                )
-                print(f"  {record['title']} -> gs://{GCS_BUCKET_NAME}/{gcs_path}")
-            except Exception as e:
-                print(f"  Failed to upload {record['title']}: {e}")
-
-        time.sleep(REQUEST_DELAY_SECONDS)
+            executor.upload(
+                "jobs",
+                gcs_path,
+                json.dumps(record, indent=2, ensure_ascii=False),
+                f"  {record['title']}",
+            )
 
     print("Opera (Teamtailor)")
     try:
-        job_urls = fetch_opera_job_urls()
+        job_urls = opera_sitemap.result()
     except Exception as e:
-        print(f"Failed to fetch Opera sitemap: {e}")
+        executor.failed("jobs", f"Failed to fetch Opera sitemap: {e}")
         job_urls = []
 
     print(f"  Found {len(job_urls)} jobs")
-    for url in job_urls:
+    scrapes = [(url, executor.fetch(url, scrape_opera_job, url)) for url in job_urls]
+    for url, future in scrapes:
         job_id = opera_job_id_from_url(url)
         try:
-            job_data = scrape_opera_job(url)
+            job_data = future.result()
         except Exception as e:
-            print(f"  Failed to scrape {url}: {e}")
+            executor.failed("jobs", f"  Failed to scrape {url}: {e}")
             continue
 
         record = {
@@ -655,17 +941,12 @@ def scrape_and_upload_jobs(scraped_date, bucket):
         }
 
         gcs_path = gcs_job_path_for("Opera", scraped_date, job_id)
-        try:
-            blob = bucket.blob(gcs_path)
-            blob.upload_from_string(
-                json.dumps(record, indent=2, ensure_ascii=False),
-                content_type="application/json",
-            )
-            print(f"  {job_data['title']} -> gs://{GCS_BUCKET_NAME}/{gcs_path}")
-        except Exception as e:
-            print(f"  Failed to upload {job_data.get('title', url)}: {e}")
-
-        time.sleep(REQUEST_DELAY_SECONDS)
+        executor.upload(
+            "jobs",
+            gcs_path,
+            json.dumps(record, indent=2, ensure_ascii=False),
+            f"  {job_data['title'] or url}",
+        )
 
 
 if __name__ == "__main__":
@@ -1,13 +1,23 @@
 import importlib
 import json
 import os
+import sys
+import time
 from datetime import datetime, timedelta, timezone
 from unittest.mock import MagicMock, patch
 
 import pytest
 
-from release_scraping.main import (
+# main imports driver_pool.py as a sibling module, as when it's run as a script
+sys.path.append(
+    os.path.abspath(os.path.join(os.path.dirname(__file__), "../release_scraping"))
+)
+
+from release_scraping.main import (  # noqa: E402
     BLOG_FEEDS,
+    DriverPool,
+    HostScheduler,
+    ScrapeExecutor,
     gcs_blog_path_for,
     gcs_path_for,
     gcs_user_release_path_for,
@@ -123,6 +133,65 @@ def test_scrape_page_text_selenium():
     assert "JS content" in text
 
 
+def test_scrape_page_text_driver_pool():
+    """Reuses a pooled browser across JS-rendered pages and times page loads."""
+    mock_driver = MagicMock()
+    mock_driver.page_source = "<html><body><p>JS content</p></body></html>"
+    create_driver = MagicMock(return_value=mock_driver)
+
+    with DriverPool(1, create_driver) as pool:
+        for url in ["https://example.com/1", "https://example.com/2"]:
+            assert "JS content" in scrape_page_text(url, driver=pool, use_js=True)
+
+    create_driver.assert_called_once_with()
+    assert mock_driver.get.call_count == 2
+    mock_driver.quit.assert_called_once_with()
+    assert len(pool.timings.durations["page_load"]) == 2
+
+
+def test_host_scheduler_spaces_requests_per_host():
+    """Requests to one host are spaced out, other hosts aren't held up."""
+    scheduler = HostScheduler(min_interval=0.2, max_hosts=4)
+    start = time.monotonic()
+    try:
+        futures = [
+            scheduler.submit(url, lambda: time.monotonic() - start)
+            for url in ["https://a.test/1", "https://a.test/2", "https://b.test/1"]
+        ]
+        a_first, a_second, b_first = [future.result() for future in futures]
+    finally:
+        scheduler.shutdown()
+
+    assert a_second - a_first >= 0.2
+    assert b_first < 0.2
+
+
+def test_scrape_executor_uploads_in_batches():
+    """Sources run concurrently and their records are uploaded in batches."""
+    mock_bucket = MagicMock()
+
+    def scrape_source(name, count):
+        def run():
+            futures = [
+                executor.fetch(f"https://{name}.test/{i}", lambda i=i: i)
+                for i in range(count)
+            ]
+            for future in futures:
+                i = future.result()
+                executor.upload(name, f"{name}/{i}.json", "{}", f"{name} {i}")
+            executor.failed(name, f"{name} failed")
+
+        return run
+
+    with ScrapeExecutor(mock_bucket, request_delay=0, upload_batch_size=2) as executor:
+        stats = executor.run({"a": scrape_source("a", 3), "b": scrape_source("b", 1)})
+
+    uploaded_paths = sorted(call.args[0] for call in mock_bucket.blob.call_args_list)
+    assert uploaded_paths == ["a/0.json", "a/1.json", "a/2.json", "b/0.json"]
+    assert (stats["a"].scraped, stats["a"].uploaded, stats["a"].failed) == (3, 3, 1)
+    assert (stats["b"].scraped, stats["b"].uploaded, stats["b"].failed) == (1, 1, 1)
+
+
 def test_main_skips_existing_and_continues_on_failure():
     """main() skips GCS-existing entries and continues after a scrape failure."""
     from release_scraping.main import main
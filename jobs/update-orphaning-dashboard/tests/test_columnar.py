@@ -0,0 +1,232 @@
+"""Parity tests for the columnar categorization engine.
+
+columnar.categorize_batches has to produce exactly what processing.categorize
+does, down to the order of the keys in each Counter (which decides the order of
+the report JSON). These tests generate randomized clients that reach every stage
+of the funnel, including the rows the columnar engine hands back to the mappers,
+and compare the two.
+"""
+
+import datetime as dt
+import json
+import random
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+import pytest
+
+from update_orphaning_dashboard import benchmark, columnar, processing
+
+from .test_processing import (
+    EARLIEST_UP_TO_DATE,
+    MIN_SUBSESSION_DATE,
+    MIN_SUBSESSION_SECONDS,
+    MIN_UPDATE_PING_COUNT,
+    _sparse,
+    make_row,
+)
+
+PARAMS = {
+    "min_subsession_date": MIN_SUBSESSION_DATE,
+    "min_subsession_seconds": MIN_SUBSESSION_SECONDS,
+    "min_update_ping_count": MIN_UPDATE_PING_COUNT,
+    "earliest_up_to_date_version": EARLIEST_UP_TO_DATE,
+}
+
+VERSIONS = ["120.0", "120.0.1", "119.0", "118.0b3", "138.0", "50.1.0", "99.0\n"]
+# Mostly recent dates, and a few that are too old or don't parse
+DATES = ["2026-05-26T00:00:00.0+00:00"] * 6 + [
+    "2026-03-01",
+    "2026-02-28T12:00:00",
+    "not a date",
+    None,
+]
+EX_ERROR_KEYS = [
+    "UPDATE_CHECK_EXT_2152398878",
+    "UPDATE_CHECK_EXT_0022",
+    "UPDATE_CHECK_EXT_15",
+]
+
+
+def random_histogram(rng, buckets):
+    if rng.random() < 0.15:
+        return None
+    return _sparse(
+        {k: rng.randint(1, 3) for k in rng.sample(buckets, rng.randint(0, 2))}
+    )
+
+
+def random_row(rng, irregular=False):
+    """A client with random pings, biased towards reaching the later stages."""
+    n_pings = rng.randint(1, 14)
+    current = rng.choice(VERSIONS[:4])
+    versions = []
+    for _ in range(n_pings):
+        if versions and rng.random() < 0.1:
+            current = rng.choice(VERSIONS)
+        versions.append(current)
+
+    def pings(make):
+        return [make() for _ in range(n_pings)]
+
+    def enum(buckets, null_rate=0.3):
+        if rng.random() < null_rate:
+            return json.dumps([{"h": None}] * n_pings)
+        return json.dumps(pings(lambda: {"h": random_histogram(rng, buckets)}))
+
+    def count(values):
+        if rng.random() < 0.1:
+            return json.dumps([None] * n_pings)
+        return json.dumps(pings(lambda: rng.choice(values)))
+
+    def keyed():
+        return json.dumps(
+            pings(
+                lambda: {
+                    "ext": [
+                        {"key": key, "value": rng.choice([0, 1, 2])}
+                        for key in rng.sample(EX_ERROR_KEYS, rng.randint(0, 2))
+                    ]
+                }
+            )
+        )
+
+    row = make_row(
+        n_pings=n_pings,
+        client_id=f"c{rng.random()}",
+        enabled=(
+            None
+            if rng.random() < 0.1
+            else pings(lambda: rng.choice([True, True, True, False, None]))
+        ),
+        subsession_start_date=pings(lambda: rng.choice(DATES)),
+        subsession_length=pings(lambda: rng.choice([3600, 7200, 0, None])),
+        update_check_code_notify=enum([0, 22, 22, 23, 28, 37], null_rate=0.05),
+        update_check_extended_error_notify=keyed(),
+        update_check_no_update_notify=count([0, 1, 1, None]),
+        update_ping_count_notify=json.dumps(pings(lambda: rng.choice([0, 1, 1, 2]))),
+        update_unable_to_apply_notify=count([0, 0, 0, 1]),
+    )
+    row["version"] = versions
+    for name in processing._ENUMERATED[1:]:
+        row[name] = enum([0, 4, 12, 31])
+
+    if irregular:
+        kind = rng.randrange(5)
+        if kind == 0:
+            # Duplicate keys in the keyed histogram; the last value wins
+            row["update_check_extended_error_notify"] = json.dumps(
+                pings(
+                    lambda: {
+                        "ext": [{"key": EX_ERROR_KEYS[0], "value": v} for v in (0, 1)]
+                    }
+                )
+            )
+        elif kind == 1:
+            # Buckets out of order
+            row["update_check_code_notify"] = json.dumps(
+                pings(lambda: {"h": [{"k": 23, "v": 1}, {"k": 22, "v": 1}]})
+            )
+        elif kind == 2:
+            # Fewer dates than pings
+            row["subsession_start_date"] = row["subsession_start_date"][:-1]
+        elif kind == 3:
+            # A zero bucket, which the query never emits
+            row["update_download_code_partial"] = json.dumps(
+                pings(lambda: {"h": [{"k": 7, "v": 0}]})
+            )
+        else:
+            # More enabled values than pings
+            row["enabled"] = row["enabled"] + [False] if row["enabled"] else [False]
+    return row
+
+
+def random_rows(seed, n_rows, irregular_rate=0.0):
+    rng = random.Random(seed)
+    return [random_row(rng, rng.random() < irregular_rate) for _ in range(n_rows)]
+
+
+def to_batches(rows, batch_size):
+    table = pa.Table.from_pylist(rows, schema=columnar.DETAILS_SCHEMA)
+    return table.to_batches(max_chunksize=batch_size)
+
+
+def assert_same_counts(expected, actual):
+    assert list(actual) == list(expected)
+    for name in expected:
+        # Same counts, with keys in the same order
+        assert list(actual[name].items()) == list(expected[name].items()), name
+
+
+@pytest.mark.parametrize("seed", range(4))
+def test_matches_processing(seed):
+    rows = random_rows(seed, 400)
+    expected = processing.categorize(rows, **PARAMS)
+    actual = columnar.categorize_batches(to_batches(rows, 64), **PARAMS, max_workers=1)
+    assert_same_counts(expected, actual)
+    # The random clients get through the funnel and into each categorization
+    assert expected["hasUpdateEnabled"][True] > 0
+    assert expected["checkExErrorNotifyOfConcern"]
+    assert expected["hasUpdateApplyFailure"]
+
+
+@pytest.mark.parametrize(
+    "params",
+    [
+        {"min_subsession_seconds": 0, "min_update_ping_count": 1},
+        {"min_subsession_seconds": 10000, "min_update_ping_count": 2},
+        {"min_subsession_date": dt.date(2026, 2, 1)},
+    ],
+)
+def test_matches_processing_params(params):
+    rows = random_rows(10, 300)
+    params = {**PARAMS, **params}
+    expected = processing.categorize(rows, **params)
+    actual = columnar.categorize_batches(to_batches(rows, 50), **params, max_workers=1)
+    assert_same_counts(expected, actual)
+
+
+def test_irregular_rows_match_processing():
+    rows = random_rows(20, 300, irregular_rate=0.3)
+    expected = processing.categorize(rows, **PARAMS)
+    actual = columnar.categorize_batches(to_batches(rows, 100), **PARAMS, max_workers=1)
+    assert_same_counts(expected, actual)
+
+
+def test_unparseable_batch_matches_processing():
+    rows = random_rows(30, 50)
+    # Valid JSON, but spread over several lines
+    rows[3]["update_ping_count_notify"] = json.dumps(
+        json.loads(rows[3]["update_ping_count_notify"]), indent=1
+    )
+    expected = processing.categorize(rows, **PARAMS)
+    actual = columnar.categorize_batches(to_batches(rows, 20), **PARAMS, max_workers=1)
+    assert_same_counts(expected, actual)
+
+
+def test_missing_update_ping_raises():
+    # With no minimum update ping count, a client without an update ping gets as
+    # far as isAbleToApply, which has no value to look at.
+    row = make_row(update_ping_count_notify=json.dumps([0] * 8))
+    params = {**PARAMS, "min_update_ping_count": 0}
+    with pytest.raises(ValueError, match="Missing update unable to apply value!"):
+        processing.categorize([row], **params)
+    with pytest.raises(ValueError, match="Missing update unable to apply value!"):
+        columnar.categorize_batches(to_batches([row], 10), **params, max_workers=1)
+
+
+def test_process_pool_matches_processing():
+    rows = random_rows(40, 300)
+    expected = processing.categorize(rows, **PARAMS)
+    actual = columnar.categorize_batches(to_batches(rows, 32), **PARAMS, max_workers=2)
+    assert_same_counts(expected, actual)
+
+
+def test_benchmark_replays_saved_details(tmp_path):
+    path = tmp_path / "details.parquet"
+    rows = random_rows(50, 200)
+    pq.write_table(pa.Table.from_pylist(rows, schema=columnar.DETAILS_SCHEMA), path)
+
+    timings = benchmark.replay(path, **PARAMS, batch_size=64, max_workers=1)
+
+    assert set(timings) == {"processing", "columnar"}
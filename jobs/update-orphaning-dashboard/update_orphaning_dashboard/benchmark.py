@@ -0,0 +1,107 @@
+"""Replay a saved out_of_date_details result through both categorization engines.
+
+`main --save-details` writes the details query result to Parquet; this reads it
+back and runs `processing.categorize` and `columnar.categorize_batches` over the
+same rows, so the two can be compared on real data without BigQuery access. The
+counts must match exactly, key order included, since that order is the order of
+the report JSON.
+"""
+
+import time
+
+import click
+import pyarrow.parquet as pq
+
+from update_orphaning_dashboard import columnar, main, processing
+
+DEFAULT_BATCH_SIZE = 4096
+
+
+def _iter_batches(path, batch_size):
+    yield from pq.ParquetFile(path).iter_batches(batch_size=batch_size)
+
+
+def _iter_rows(path, batch_size):
+    for batch in _iter_batches(path, batch_size):
+        yield from batch.to_pylist()
+
+
+def replay(
+    path,
+    *,
+    min_subsession_date,
+    min_subsession_seconds,
+    min_update_ping_count,
+    earliest_up_to_date_version,
+    batch_size=DEFAULT_BATCH_SIZE,
+    max_workers=None,
+):
+    """Return the seconds each engine took; raise ValueError on a count mismatch."""
+    params = {
+        "min_subsession_date": min_subsession_date,
+        "min_subsession_seconds": min_subsession_seconds,
+        "min_update_ping_count": min_update_ping_count,
+        "earliest_up_to_date_version": earliest_up_to_date_version,
+    }
+    timings = {}
+
+    start = time.monotonic()
+    expected = processing.categorize(_iter_rows(path, batch_size), **params)
+    timings["processing"] = time.monotonic() - start
+
+    start = time.monotonic()
+    actual = columnar.categorize_batches(
+        _iter_batches(path, batch_size), **params, max_workers=max_workers
+    )
+    timings["columnar"] = time.monotonic() - start
+
+    for name in processing.REPORT_COUNTS:
+        if list(actual[name].items()) != list(expected[name].items()):
+            raise ValueError(
+                f"{name} differs: expected {dict(expected[name])}, "
+                f"got {dict(actual[name])}"
+            )
+    return timings
+
+
+@click.command()
+@click.argument("path", type=click.Path(exists=True, dir_okay=False))
+@click.option(
+    "--run-date",
+    "-d",
+    required=True,
+    type=click.DateTime(formats=["%Y-%m-%d", "%Y%m%d"]),
+    help="Run date the details were saved for.",
+)
+@click.option(
+    "--latest-version",
+    required=True,
+    type=int,
+    help="Latest Firefox major version the run used (printed by the job).",
+)
+@click.option("--batch-size", default=DEFAULT_BATCH_SIZE, show_default=True)
+@click.option(
+    "--workers",
+    type=int,
+    default=None,
+    help="Processes for the columnar engine. Defaults to one per CPU.",
+)
+def benchmark(path, run_date, latest_version, batch_size, workers):
+    dates = main.ReportDates(run_date.date())
+    timings = replay(
+        path,
+        min_subsession_date=dates.min_subsession_date,
+        min_subsession_seconds=main.MIN_SUBSESSION_SECONDS,
+        min_update_ping_count=main.MIN_UPDATE_PING_COUNT,
+        earliest_up_to_date_version=str(latest_version - main.UP_TO_DATE_RELEASES),
+        batch_size=batch_size,
+        max_workers=workers,
+    )
+    print(f"min_subsession_date : {dates.min_subsession_date:%Y%m%d}")
+    print(f"processing engine   : {timings['processing']:.2f}s")
+    print(f"columnar engine     : {timings['columnar']:.2f}s")
+    print("Counts match")
+
+
+if __name__ == "__main__":
+    benchmark()
@@ -0,0 +1,831 @@
+"""Columnar categorization over Arrow record batches.
+
+:func:`processing.categorize` builds a :class:`processing.Ping` per client
+(~24 ``json.loads``) and walks it through the ported mappers one client at a
+time. This module computes the same counts for a whole record batch at once:
+
+- The histogram JSON columns of the batch are parsed in one pass by Arrow's JSON
+  reader, straight into list arrays, instead of into python objects.
+- Every column is flattened to one NumPy array per batch, indexed by ping, with
+  per-client offsets. Each mapper becomes a handful of array operations, mostly
+  "the first ping of each client where <condition>" (:func:`_segment_first`).
+- ``_has_min_update_ping_count`` moves its index by a data dependent amount, so
+  it can't be written as a reduction. It is stepped for all the clients of a
+  batch in lockstep instead, one loop iteration per step rather than per client.
+- Batches are categorized in a process pool (:func:`categorize_batches`).
+
+The mappers have edge cases that only matter for rows the query never produces:
+per-ping arrays of different lengths, null histogram entries, duplicate buckets,
+and so on. Rather than reproduce each of those, any client whose row doesn't
+have the regular shape is categorized by ``processing.classify`` on a ``Ping``.
+The counts are identical to :func:`processing.categorize`, including the
+Counter key order that decides the order of the report JSON.
+"""
+
+import datetime as dt
+import functools
+import os
+from collections import Counter, deque
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.json as pa_json
+
+from update_orphaning_dashboard import processing
+
+# processing.VERSION_RE for RE2. Python's `$` also matches before a trailing
+# newline, RE2's only at the end of the string.
+VERSION_PATTERN = r"^[0-9]{2,3}\.0[\.0-9]*\n?$"
+
+_ENUMERATED_TYPE = pa.list_(
+    pa.struct([("h", pa.list_(pa.struct([("k", pa.int64()), ("v", pa.int64())])))])
+)
+_COUNT_TYPE = pa.list_(pa.int64())
+_KEYED_TYPE = pa.list_(
+    pa.struct(
+        [
+            (
+                "ext",
+                pa.list_(pa.struct([("key", pa.string()), ("value", pa.int64())])),
+            )
+        ]
+    )
+)
+
+# The out_of_date_details result schema, as read through the Storage API.
+DETAILS_SCHEMA = pa.schema(
+    [
+        ("client_id", pa.string()),
+        ("version", pa.list_(pa.string())),
+        ("session_length", pa.list_(pa.int64())),
+        ("enabled", pa.list_(pa.bool_())),
+        ("subsession_start_date", pa.list_(pa.string())),
+        ("subsession_length", pa.list_(pa.int64())),
+    ]
+    + [
+        (name, pa.string())
+        for name in processing._ENUMERATED + processing._COUNT + (processing._KEYED,)
+    ]
+)
+
+# Smallest block handed to Arrow's JSON reader; each block holds whole rows.
+_MIN_JSON_BLOCK_SIZE = 16 << 20
+
+
+# ----------------------------------------------------------------------------
+# Segment helpers. A segment is one client's pings (or one ping's histogram
+# entries) in a flat array, delimited by offsets[i]:offsets[i + 1].
+# ----------------------------------------------------------------------------
+def _offsets(lengths):
+    offsets = np.zeros(len(lengths) + 1, dtype=np.int64)
+    np.cumsum(lengths, out=offsets[1:])
+    return offsets
+
+
+def _segment_any(mask, offsets):
+    counts = np.zeros(len(mask) + 1, dtype=np.int64)
+    np.cumsum(mask, out=counts[1:])
+    return counts[offsets[1:]] > counts[offsets[:-1]]
+
+
+def _segment_sum(values, offsets):
+    sums = np.zeros(len(values) + 1, dtype=np.int64)
+    np.cumsum(values, out=sums[1:])
+    return sums[offsets[1:]] - sums[offsets[:-1]]
+
+
+def _segment_first(mask, offsets):
+    """Index within each segment of its first True, or the segment's length."""
+    hits = np.flatnonzero(mask)
+    starts = offsets[:-1]
+    pos = np.searchsorted(hits, starts)
+    found = pos < len(hits)
+    found[found] &= hits[pos[found]] < offsets[1:][found]
+    first = offsets[1:] - starts
+    first[found] = hits[pos[found]] - starts[found]
+    return first
+
+
+def _local_index(offsets):
+    lengths = np.diff(offsets)
+    return np.arange(offsets[-1]) - np.repeat(offsets[:-1], lengths)
+
+
+def _to_numpy(array, fill):
+    return array.fill_null(fill).to_numpy(zero_copy_only=False)
+
+
+def _exclusive_segment_cumsum(values, offsets):
+    """Per element, the sum of the values before it in its segment."""
+    sums = np.zeros(len(values) + 1, dtype=np.int64)
+    np.cumsum(values, out=sums[1:])
+    return sums[:-1] - np.repeat(sums[offsets[:-1]], np.diff(offsets))
+
+
+class _ListColumn:
+    """A list array split into per-row offsets and its flattened values."""
+
+    def __init__(self, array):
+        if isinstance(array, pa.ChunkedArray):
+            array = array.combine_chunks()
+        self.null = _to_numpy(array.is_null(), False)
+        self.lengths = _to_numpy(pc.list_value_length(array), 0).astype(np.int64)
+        self.offsets = _offsets(self.lengths)
+        self.values = array.flatten()
+
+    def any_row(self, mask):
+        """Per row: is mask True for any of the row's values."""
+        return _segment_any(mask, self.offsets)
+
+
+class _Histogram:
+    """Per-ping summary of an enumerated histogram column.
+
+    For each ping: the number of buckets present (processing keeps only the
+    non-zero ones), the smallest bucket present, and the entries to look up the
+    count of a given bucket.
+    """
+
+    def __init__(self, array, ping_offsets):
+        pings = _ListColumn(array).values
+        h = _ListColumn(pings.field("h"))
+        entries = h.values
+        self.ping_null = h.null
+        self.count = h.lengths
+        self.keys = _to_numpy(entries.field("k"), 0)
+        self.values = _to_numpy(entries.field("v"), 0)
+        self.entry_ping = np.repeat(np.arange(len(self.count)), self.count)
+        self.min_key = np.zeros(len(self.count), dtype=np.int64)
+        present = self.count > 0
+        self.min_key[present] = self.keys[h.offsets[:-1][present]]
+        # Whole column None: every ping null (processing.merge_enumerated_histogram)
+        self.none = ~_segment_any(~self.ping_null, ping_offsets)
+
+    def value_at(self, bucket):
+        values = np.zeros(len(self.count), dtype=np.int64)
+        at_bucket = self.keys == bucket
+        values[self.entry_ping[at_bucket]] = self.values[at_bucket]
+        return values
+
+
+class _Counts:
+    """Per-ping values of a count histogram column, nulls read as 0."""
+
+    def __init__(self, array, ping_offsets):
+        values = _ListColumn(array).values
+        null = _to_numpy(values.is_null(), False)
+        self.values = _to_numpy(values, 0)
+        # Whole column None: every ping null (processing.merge_count_histogram)
+        self.none = ~_segment_any(~null, ping_offsets)
+
+
+# ----------------------------------------------------------------------------
+# Decoding and shape checks
+# ----------------------------------------------------------------------------
+def _parse_histograms(batch):
+    """Parse every histogram JSON column of the batch with Arrow's JSON reader.
+
+    Each row becomes one NDJSON line of the form {"<column>": <column JSON>, ...}.
+    Returns a table of list columns, or None if the batch can't be read that way:
+    a value spanning lines or not matching the column type, which is never the
+    case for TO_JSON_STRING output of the query.
+    """
+    names = processing._ENUMERATED + processing._COUNT + (processing._KEYED,)
+    parts = []
+    for i, name in enumerate(names):
+        column = batch.column(name).cast(pa.large_string())
+        if pc.any(pc.match_substring_regex(column, "[\r\n]")).as_py():
+            return None
+        prefix = ("{" if i == 0 else ",") + f'"{name}":'
+        parts.append(pa.scalar(prefix, pa.large_string()))
+        parts.append(column.fill_null("null"))
+    parts.append(pa.scalar("}\n", pa.large_string()))
+    lines = pc.binary_join_element_wise(*parts, pa.scalar("", pa.large_string()))
+
+    line_offsets = np.frombuffer(lines.buffers()[1], dtype=np.int64)
+    first = lines.offset
+    line_offsets = line_offsets[first:][: len(lines) + 1]
+    start, end = int(line_offsets[0]), int(line_offsets[-1])
+    data = lines.buffers()[2].slice(start, end - start)
+    longest = int(np.diff(line_offsets).max())
+
+    schema = pa.schema(
+        [(name, _ENUMERATED_TYPE) for name in processing._ENUMERATED]
+        + [(name, _COUNT_TYPE) for name in processing._COUNT]
+        + [(processing._KEYED, _KEYED_TYPE)]
+    )
+    try:
+        table = pa_json.read_json(
+            pa.BufferReader(data),
+            read_options=pa_json.ReadOptions(
+                block_size=max(_MIN_JSON_BLOCK_SIZE, 2 * longest)
+            ),
+            parse_options=pa_json.ParseOptions(
+                explicit_schema=schema, unexpected_field_behavior="ignore"
+            ),
+        )
+    except pa.ArrowInvalid:
+        # Values of another type than the query's (e.g. floats), which json.loads
+        # accepts; leave them to the mappers.
+        return None
+    assert table.num_rows == batch.num_rows
+    return table.combine_chunks()
+
+
+def _irregular_rows(batch, histograms):
+    """Rows whose shape the vectorized mappers don't handle.
+
+    The query always returns every per-ping array aligned with ``version``,
+    histogram entries without nulls, and sorted unique bucket keys. Anything else
+    is left to processing.classify, which reproduces whatever the mappers do with
+    it (including raising).
+    """
+    version = _ListColumn(batch.column("version"))
+    n_pings = version.lengths
+    bad = version.null | (n_pings == 0)
+    bad |= version.any_row(_to_numpy(version.values.is_null(), True))
+
+    for name in ("subsession_start_date", "subsession_length"):
+        column = _ListColumn(batch.column(name))
+        bad |= column.null | (column.lengths != n_pings)
+    enabled = _ListColumn(batch.column("enabled"))
+    bad |= ~enabled.null & (enabled.lengths != n_pings)
+
+    for name in processing._COUNT:
+        column = _ListColumn(histograms.column(name))
+        bad |= column.null | (column.lengths != n_pings)
+
+    for name in processing._ENUMERATED:
+        column = _ListColumn(histograms.column(name))
+        bad |= column.null | (column.lengths != n_pings)
+        ping_null = _to_numpy(column.values.is_null(), True)
+        h = _ListColumn(column.values.field("h"))
+        entries = h.values
+        entry_null = _to_numpy(entries.is_null(), True)
+        for field in ("k", "v"):
+            entry_null |= _to_numpy(entries.field(field).is_null(), True)
+        keys = _to_numpy(entries.field("k"), 0)
+        entry_ping = np.repeat(np.arange(len(h.lengths)), h.lengths)
+        # Buckets not strictly increasing within a ping (duplicates included)
+        unsorted = np.zeros(len(keys), dtype=bool)
+        unsorted[1:] = (entry_ping[1:] == entry_ping[:-1]) & (keys[1:] <= keys[:-1])
+        bad_ping = ping_null | h.any_row(entry_null | unsorted)
+        bad |= column.any_row(bad_ping)
+
+    column = _ListColumn(histograms.column(processing._KEYED))
+    bad |= column.null | (column.lengths != n_pings)
+    ext = _ListColumn(column.values.field("ext"))
+    entries = ext.values
+    entry_null = _to_numpy(entries.is_null(), True)
+    for field in ("key", "value"):
+        entry_null |= _to_numpy(entries.field(field).is_null(), True)
+    # Duplicate keys within a ping
+    entry_ping = np.repeat(np.arange(len(ext.lengths)), ext.lengths)
+    key_ids = _to_numpy(pc.dictionary_encode(entries.field("key")).indices, -1)
+    pairs = entry_ping * (int(key_ids.max(initial=0)) + 2) + key_ids + 1
+    _, first, counts = np.unique(pairs, return_index=True, return_counts=True)
+    duplicate = np.zeros(len(pairs), dtype=bool)
+    duplicate[first[counts > 1]] = True
+    bad_ping = _to_numpy(column.values.is_null(), True) | ext.null
+    bad_ping |= ext.any_row(entry_null | duplicate)
+    bad |= column.any_row(bad_ping)
+
+    return bad
+
+
+def _date_ordinals(values):
+    """Parse subsession_start_date values exactly as the mappers do.
+
+    Returns (ordinal, valid) per value. Only the distinct strings are parsed.
+    """
+    encoded = pc.dictionary_encode(values)
+    ordinals = []
+    for value in encoded.dictionary.to_pylist():
+        try:
+            ordinals.append(dt.datetime.strptime(value[:10], "%Y-%m-%d").toordinal())
+        except Exception:  # catch *all* exceptions, as the mappers do
+            ordinals.append(-1)
+    ordinals = np.array(ordinals + [-1], dtype=np.int64)
+    indices = _to_numpy(encoded.indices, -1)
+    ordinal = ordinals[indices]
+    return ordinal, ordinal >= 0
+
+
+# ----------------------------------------------------------------------------
+# Vectorized mappers
+# ----------------------------------------------------------------------------
+class _Stages:
+    """The counter keys of the clients in a batch.
+
+    ``reached[name]`` marks the clients that reach a counter and ``keys[name]``
+    holds their keys, as python values.
+    """
+
+    def __init__(self, n_clients):
+        self.reached = {
+            name: np.zeros(n_clients, dtype=bool) for name in processing.COUNTERS
+        }
+        self.keys = {
+            name: np.empty(n_clients, dtype=object) for name in processing.COUNTERS
+        }
+
+    def set(self, name, clients, keys):
+        self.reached[name][clients] = True
+        self.keys[name][clients] = keys
+
+    def tally(self):
+        """Per counter, [(key, count)] in order of each key's first client."""
+        rv = {}
+        for name in processing.COUNTERS:
+            keys = self.keys[name][self.reached[name]]
+            if not len(keys):
+                rv[name] = []
+                continue
+            unique, first, counts = np.unique(
+                keys, return_index=True, return_counts=True
+            )
+            order = np.argsort(first)
+            rv[name] = list(zip(unique[order].tolist(), counts[order].tolist()))
+        return rv
+
+
+def _first_nonzero_state(histograms, eq_current, ping_offsets):
+    """processing._first_nonzero_state over a set of enumerated columns."""
+    hits = []
+    for histogram in histograms:
+        hits.append(
+            np.repeat(~histogram.none, np.diff(ping_offsets)) & (histogram.count > 0)
+        )
+    first = _segment_first(np.logical_or.reduce(hits), ping_offsets)
+    found = first < np.diff(ping_offsets)
+    codes = np.full(len(first), -2, dtype=np.int64)
+    ping = ping_offsets[:-1][found] + first[found]
+    code = np.full(len(ping), -1, dtype=np.int64)
+    # Earlier columns take precedence when several have a bucket in the ping
+    for histogram, hit in reversed(list(zip(histograms, hits))):
+        code = np.where(hit[ping], histogram.min_key[ping], code)
+    codes[found] = np.where(eq_current[ping], code, -1)
+    return codes
+
+
+def _min_update_ping_count(
+    clients,
+    ping_offsets,
+    n_pings,
+    eq_current,
+    ping_count,
+    date_ordinal,
+    date_valid,
+    check_code,
+    no_update,
+    min_ordinal,
+    min_update_ping_count,
+):
+    """processing._has_min_update_ping_count, stepped for all clients at once.
+
+    Each iteration advances every still running client by one pass of the
+    mapper's while loop, with the same index arithmetic (including advancing the
+    index once per non-zero check code bucket).
+    """
+    result = np.zeros(len(n_pings), dtype=bool)
+    index = np.zeros(len(n_pings), dtype=np.int64)
+    total = np.zeros(len(n_pings), dtype=np.int64)
+    active = clients
+    while len(active):
+        i = index[active]
+        running = (total[active] < min_update_ping_count) & (i < n_pings[active])
+        ping = ping_offsets[active] + np.minimum(i, n_pings[active] - 1)
+        running &= eq_current[ping]
+        done = active[~running]
+        result[done] = total[done] >= min_update_ping_count
+        active, i, ping = active[running], i[running], ping[running]
+
+        count = ping_count[ping]
+        # No update ping, or an unparseable date: on to the next ping
+        checked = (count > 0) & date_valid[ping]
+        too_old = checked & (date_ordinal[ping] < min_ordinal)
+        result[active[too_old]] = False
+        checked &= ~too_old
+        index[active[~checked & ~too_old]] = i[~checked & ~too_old] + 1
+
+        updating = active[checked]
+        i, ping, count = i[checked], ping[checked], count[checked]
+        # One index step per check code bucket, as in the mapper's inner loop
+        buckets = np.where(check_code.none[updating], 0, check_code.count[ping])
+        total[updating] += count * buckets
+        i = i + buckets
+        in_range = ~no_update.none[updating] & (n_pings[updating] > i)
+        at = ping_offsets[updating] + np.minimum(i, n_pings[updating] - 1)
+        total[updating] += np.where(in_range & (no_update.values[at] > 0), count, 0)
+        index[updating] = i + 1
+
+        active = active[~too_old]
+    return result
+
+
+def _ex_error_code(key_name):
+    # As in processing._check_ex_error_notify
+    key_name = key_name[17:]
+    if len(key_name) == 4:
+        key_name = key_name[1:]
+    return int(key_name)
+
+
+def _classify_regular(
+    batch,
+    histograms,
+    stages,
+    rows,
+    *,
+    min_subsession_date,
+    min_subsession_seconds,
+    min_update_ping_count,
+    earliest_up_to_date_version,
+):
+    """Set the stage keys of the given rows, which all have the regular shape."""
+    version = _ListColumn(batch.column("version"))
+    offsets = version.offsets
+    n_pings = version.lengths
+    starts = offsets[:-1]
+    ping_client = np.repeat(np.arange(len(n_pings)), n_pings)
+    local = _local_index(offsets)
+
+    current = pc.take(version.values, pa.array(starts[ping_client]))
+    eq_current = _to_numpy(pc.equal(version.values, current), False)
+    run_length = _segment_first(~eq_current, offsets)
+    in_run = local < run_length[ping_client]
+
+    counts = {
+        name: _Counts(histograms.column(name), offsets) for name in processing._COUNT
+    }
+    enumerated = {
+        name: _Histogram(histograms.column(name), offsets)
+        for name in processing._ENUMERATED
+    }
+    ping_count = counts["update_ping_count_notify"]
+    no_update = counts["update_check_no_update_notify"]
+    unable = counts["update_unable_to_apply_notify"]
+    check_code = enumerated["update_check_code_notify"]
+
+    def per_ping(client_values):
+        return client_values[ping_client]
+
+    # hasOutOfDateMaxVersion
+    release = pc.or_(
+        pc.match_substring_regex(version.values, VERSION_PATTERN),
+        pc.equal(version.values, "50.1.0"),
+    )
+    newer = pc.and_(release, pc.greater(version.values, earliest_up_to_date_version))
+    out_of_date = ~version.any_row(_to_numpy(newer, False))
+    reached = np.arange(len(n_pings))
+    stages.set("hasOutOfDateMaxVersion", rows[reached], out_of_date.tolist())
+    reached = reached[out_of_date]
+
+    # hasUpdatePing
+    has_update_ping = ~ping_count.none & ~(check_code.none & no_update.none)
+    stages.set("hasUpdatePing", rows[reached], has_update_ping[reached].tolist())
+    reached = reached[has_update_ping[reached]]
+
+    # hasMinSubsessionLength: add up subsession lengths over the current version's
+    # pings until there are enough, failing on a ping from before the window.
+    date_ordinal, date_valid = _date_ordinals(
+        _ListColumn(batch.column("subsession_start_date")).values
+    )
+    min_ordinal = min_subsession_date.toordinal()
+    lengths = _ListColumn(batch.column("subsession_length")).values
+    length_valid = _to_numpy(lengths.is_valid(), False)
+    seconds = np.where(
+        in_run & date_valid & length_valid, _to_numpy(lengths, 0), 0
+    ).astype(np.int64)
+    before = _exclusive_segment_cumsum(seconds, offsets)
+    enough_at = _segment_first(in_run & (before >= min_subsession_seconds), offsets)
+    too_old = in_run & date_valid & (date_ordinal < min_ordinal)
+    too_old_first = _segment_first(too_old, offsets)
+    total_seconds = _segment_sum(seconds, offsets)
+    has_min_length = (too_old_first >= np.minimum(enough_at, run_length)) & (
+        (enough_at < run_length) | (total_seconds >= min_subsession_seconds)
+    )
+    stages.set(
+        "hasMinSubsessionLength", rows[reached], has_min_length[reached].tolist()
+    )
+    reached = reached[has_min_length[reached]]
+
+    # hasMinUpdatePingCount
+    has_min_count = _min_update_ping_count(
+        reached,
+        starts,
+        n_pings,
+        eq_current,
+        ping_count.values,
+        date_ordinal,
+        date_valid,
+        check_code,
+        no_update,
+        min_ordinal,
+        min_update_ping_count,
+    )
+    stages.set("hasMinUpdatePingCount", rows[reached], has_min_count[reached].tolist())
+    reached = reached[has_min_count[reached]]
+
+    # isSupported: no update ping with check code 28 in the current version
+    update_ping = ping_count.values > 0
+    unsupported = in_run & update_ping & ~per_ping(check_code.none)
+    unsupported &= check_code.value_at(28) > 0
+    is_supported = ~version.any_row(unsupported) | (min_update_ping_count <= 0)
+    stages.set("isSupported", rows[reached], is_supported[reached].tolist())
+    reached = reached[is_supported[reached]]
+
+    # isAbleToApply and hasUpdateEnabled look at the first update ping of the
+    # current version
+    first_update = _segment_first(in_run & update_ping, offsets)
+    missing = first_update >= run_length
+    if missing[reached].any():
+        raise ValueError("Missing update unable to apply value!")
+    first_update_ping = starts + np.minimum(first_update, n_pings - 1)
+
+    is_able_to_apply = unable.none | ~(unable.values[first_update_ping] > 0)
+    stages.set("isAbleToApply", rows[reached], is_able_to_apply[reached].tolist())
+    reached = reached[is_able_to_apply[reached]]
+
+    # A null enabled column has no values, otherwise it is aligned with version
+    enabled = _ListColumn(batch.column("enabled"))
+    disabled = np.zeros(len(eq_current), dtype=bool)
+    disabled[per_ping(~enabled.null)] = _to_numpy(pc.invert(enabled.values), False)
+    has_update_enabled = ~disabled[first_update_ping]
+    stages.set("hasUpdateEnabled", rows[reached], has_update_enabled[reached].tolist())
+    concern = reached[has_update_enabled[reached]]
+    if not len(concern):
+        return
+
+    # --- of concern ---
+    stages.set(
+        "ofConcernByVersion",
+        rows[concern],
+        pc.take(version.values, pa.array(starts[concern])).to_pylist(),
+    )
+
+    # checkCodeNotifyOfConcern: first update ping of the current version with a
+    # check code, or with a no update count (code 0)
+    has_code = check_code.count > 0
+    code_hit = in_run & update_ping & ~per_ping(check_code.none)
+    code_hit &= has_code | (~per_ping(no_update.none) & (no_update.values > 0))
+    code_first = _segment_first(code_hit, offsets)
+    code_ping = starts + np.minimum(code_first, n_pings - 1)
+    codes = np.where(has_code[code_ping], check_code.min_key[code_ping], 0)
+    codes = np.where(code_first < run_length, codes, -1)
+    stages.set("checkCodeNotifyOfConcern", rows[concern], codes[concern].tolist())
+
+    general = concern[np.isin(codes[concern], (22, 23))]
+    if len(general):
+        stages.set(
+            "checkExErrorNotifyOfConcern",
+            rows[general],
+            _check_ex_error_notify(
+                histograms.column(processing._KEYED),
+                general,
+                offsets,
+                eq_current,
+                update_ping,
+            ),
+        )
+
+    download = [
+        enumerated["update_download_code_partial"],
+        enumerated["update_download_code_complete"],
+    ]
+    download_codes = _first_nonzero_state(download, eq_current, offsets)
+    stages.set("downloadCodeOfConcern", rows[concern], download_codes[concern].tolist())
+
+    for stage_name, failure_name, suffix in (
+        ("stateCodeStageOfConcern", "stateFailureCodeStageOfConcern", "stage"),
+        ("stateCodeStartupOfConcern", "stateFailureCodeStartupOfConcern", "startup"),
+    ):
+        states = _first_nonzero_state(
+            [
+                enumerated[f"update_state_code_{kind}_{suffix}"]
+                for kind in ("partial", "complete", "unknown")
+            ],
+            eq_current,
+            offsets,
+        )
+        stages.set(stage_name, rows[concern], states[concern].tolist())
+        failed = concern[states[concern] == 12]
+        failures = _first_nonzero_state(
+            [
+                enumerated[f"update_status_error_code_{kind}_{suffix}"]
+                for kind in ("partial", "complete", "unknown")
+            ],
+            eq_current,
+            offsets,
+        )
+        stages.set(failure_name, rows[failed], failures[failed].tolist())
+
+    # hasOnlyNoUpdateFound -> hasNoDownloadCode -> hasUpdateApplyFailure: each
+    # looks for the first ping that is either from an older version, or decides
+    # the question within the current version.
+    def first_decisive(hit):
+        first = _segment_first(~eq_current | hit, offsets)
+        found = first < n_pings
+        ping = starts + np.minimum(first, n_pings - 1)
+        return found, eq_current[ping]
+
+    found, current_version = first_decisive(update_ping & (no_update.values == 0))
+    only_no_update = ~no_update.none & (~found | ~current_version)
+    stages.set("hasOnlyNoUpdateFound", rows[concern], only_no_update[concern].tolist())
+    concern = concern[~only_no_update[concern]]
+
+    has_download = np.zeros(len(eq_current), dtype=bool)
+    for histogram in download:
+        has_download |= ~per_ping(histogram.none) & (histogram.count > 0)
+    found, current_version = first_decisive(has_download)
+    no_download = ~found | ~current_version
+    stages.set("hasNoDownloadCode", rows[concern], no_download[concern].tolist())
+    concern = concern[~no_download[concern]]
+
+    apply_failed = np.zeros(len(eq_current), dtype=bool)
+    for kind in ("partial", "complete"):
+        histogram = enumerated[f"update_state_code_{kind}_startup"]
+        apply_failed |= ~per_ping(histogram.none) & (histogram.value_at(12) > 0)
+    found, current_version = first_decisive(apply_failed)
+    apply_failure = found & current_version
+    stages.set("hasUpdateApplyFailure", rows[concern], apply_failure[concern].tolist())
+
+
+def _check_ex_error_notify(keyed, clients, ping_offsets, eq_current, update_ping):
+    """processing._check_ex_error_notify for the given clients.
+
+    The mapper pivots the keyed histogram to {key: per-ping values}, with keys in
+    order of first appearance, then returns the first key with a non-zero value
+    in the client's first update ping that has one.
+    """
+    ext = _ListColumn(_ListColumn(keyed).values.field("ext"))
+    entries = ext.values
+    values = _to_numpy(entries.field("value"), 0)
+    key_ids = _to_numpy(pc.dictionary_encode(entries.field("key")).indices, 0)
+    entry_ping = np.repeat(np.arange(len(ext.lengths)), ext.lengths)
+    n_pings = np.diff(ping_offsets)
+    entry_client = np.repeat(np.arange(len(n_pings)), n_pings)[entry_ping]
+
+    # Rank of each entry's key in its client's pivot: the position of the key's
+    # first appearance.
+    pairs = entry_client * (int(key_ids.max(initial=0)) + 1) + key_ids
+    _, first, inverse = np.unique(pairs, return_index=True, return_inverse=True)
+    rank = first[inverse.reshape(-1)]
+
+    positive = np.flatnonzero(values > 0)
+    hit = np.zeros(len(eq_current), dtype=bool)
+    hit[entry_ping[positive]] = True
+    hit &= update_ping
+    first_ping = _segment_first(hit, ping_offsets)
+
+    # Per ping, the positive entry with the lowest rank
+    order = np.lexsort((rank[positive], entry_ping[positive]))
+    by_ping = positive[order]
+    ping_of = entry_ping[by_ping]
+    lead = np.ones(len(by_ping), dtype=bool)
+    lead[1:] = ping_of[1:] != ping_of[:-1]
+    best_entry = np.full(len(eq_current), -1, dtype=np.int64)
+    best_entry[ping_of[lead]] = by_ping[lead]
+
+    keys = entries.field("key")
+    codes = []
+    for client in clients:
+        if first_ping[client] >= n_pings[client]:
+            codes.append(-2)
+            continue
+        ping = ping_offsets[client] + first_ping[client]
+        if not eq_current[ping]:
+            codes.append(-1)
+            continue
+        codes.append(_ex_error_code(keys[int(best_entry[ping])].as_py()))
+    return codes
+
+
+# ----------------------------------------------------------------------------
+# Entry points
+# ----------------------------------------------------------------------------
+def _serialize(batch):
+    """Arrow IPC bytes of the batch, to send it to a worker process.
+
+    Pickling a batch that is a slice of a larger one (as record batch readers
+    hand out) copies the whole underlying buffers; IPC writes only the slice.
+    """
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, batch.schema) as writer:
+        writer.write_batch(batch)
+    return sink.getvalue()
+
+
+def _categorize_serialized(data, **params):
+    return categorize_batch(pa.ipc.open_stream(data).read_next_batch(), **params)
+
+
+def _init_worker():
+    # The pool already uses every CPU; don't multiply that by Arrow's threads.
+    pa.set_cpu_count(1)
+    pa.set_io_thread_count(1)
+
+
+def categorize_batch(
+    batch,
+    *,
+    min_subsession_date,
+    min_subsession_seconds,
+    min_update_ping_count,
+    earliest_up_to_date_version,
+):
+    """Categorize one record batch of out_of_date_details rows.
+
+    Returns ``{counter name: [(key, count), ...]}`` with each counter's keys in
+    the order the batch's clients first reach them, so adding up the batches in
+    order reproduces the Counters of :func:`processing.categorize`.
+    """
+    params = {
+        "min_subsession_date": min_subsession_date,
+        "min_subsession_seconds": min_subsession_seconds,
+        "min_update_ping_count": min_update_ping_count,
+        "earliest_up_to_date_version": earliest_up_to_date_version,
+    }
+    stages = _Stages(batch.num_rows)
+    histograms = _parse_histograms(batch) if batch.num_rows else None
+    if histograms is None:
+        irregular = np.ones(batch.num_rows, dtype=bool)
+    else:
+        irregular = _irregular_rows(batch, histograms)
+
+    regular = np.flatnonzero(~irregular)
+    if len(regular):
+        mask = pa.array(~irregular)
+        _classify_regular(
+            batch.filter(mask),
+            histograms.filter(mask),
+            stages,
+            regular,
+            **params,
+        )
+
+    irregular = np.flatnonzero(irregular)
+    if len(irregular):
+        for row, values in zip(irregular, batch.take(irregular).to_pylist()):
+            for name, key in processing.classify(
+                processing.Ping(values), **params
+            ).items():
+                stages.set(name, [row], [key])
+
+    return stages.tally()
+
+
+def categorize_batches(
+    batches,
+    *,
+    min_subsession_date,
+    min_subsession_seconds,
+    min_update_ping_count,
+    earliest_up_to_date_version,
+    max_workers=None,
+):
+    """Run the full pipeline over Arrow record batches of the query result.
+
+    Returns the same dict as :func:`processing.categorize` would for the rows of
+    the batches. With ``max_workers`` > 1 (or None, for one per CPU) batches are
+    categorized in a process pool, with at most two batches per worker in flight
+    so memory stays bounded.
+    """
+    params = {
+        "min_subsession_date": min_subsession_date,
+        "min_subsession_seconds": min_subsession_seconds,
+        "min_update_ping_count": min_update_ping_count,
+        "earliest_up_to_date_version": earliest_up_to_date_version,
+    }
+    counters = {name: Counter() for name in processing.COUNTERS}
+
+    def add(batch_counts):
+        for name, pairs in batch_counts.items():
+            counters[name].update(dict(pairs))
+        n_clients = sum(counters["hasOutOfDateMaxVersion"].values())
+        print(
+            f"    processed {n_clients} clients "
+            f"({counters['hasUpdateEnabled'][True]} of concern)"
+        )
+
+    print("  Categorizing record batches")
+    max_workers = max_workers or os.cpu_count() or 1
+    if max_workers == 1:
+        for batch in batches:
+            add(categorize_batch(batch, **params))
+    else:
+        categorize_one = functools.partial(_categorize_serialized, **params)
+        with ProcessPoolExecutor(
+            max_workers=max_workers, initializer=_init_worker
+        ) as executor:
+            pending = deque()
+            for batch in batches:
+                pending.append(executor.submit(categorize_one, _serialize(batch)))
+                if len(pending) >= 2 * max_workers:
+                    add(pending.popleft().result())
+            while pending:
+                add(pending.popleft().result())
+
+    return processing.report_counts(counters)
@@ -9,8 +9,8 @@ The legacy job ran on a 20-node Dataproc cluster: it aggregated the 1% sample of
 Spark to fix histogram shapes, then ran an RDD map/filter pipeline. None of that
 needs Spark — the working set after filtering is ~10k-15k clients. This job does
 the histogram densification and out-of-date filtering in BigQuery (see
-sql/out_of_date_details.sql) and the per-client categorization in plain python
-(see processing.py).
+sql/out_of_date_details.sql) and the per-client categorization over the Arrow
+result batches (see columnar.py, and processing.py for the reference port).
 
 Output is a single JSON file `<report_filename>.json` written to
 gs://<output-bucket>/<output-prefix>, identical in shape to the legacy output.
@@ -21,9 +21,10 @@ import json
 import pathlib
 
 import click
+import pyarrow.parquet as pq
 from google.cloud import bigquery, bigquery_storage, storage
 
-from update_orphaning_dashboard import processing
+from update_orphaning_dashboard import columnar, processing
 
 # Defaults match the legacy Airflow DAG's py_args.
 DEFAULT_OUTPUT_BUCKET = "moz-fx-data-static-websit-8565-analysis-output"
@@ -139,8 +140,8 @@ def run_query(billing_project, sql, **params):
     return job.result().to_arrow(bqstorage_client=bqstorage_client).to_pylist()
 
 
-def iter_query_rows(billing_project, sql, **params):
-    """Run `sql` and yield result rows as dicts, one Arrow batch at a time.
+def iter_query_batches(billing_project, sql, **params):
+    """Run `sql` and yield the result as Arrow record batches.
 
     Reads results via the BigQuery Storage API (Arrow). The details query returns
     ~100k rows whose histogram columns are large JSON strings; the default REST
@@ -150,16 +151,30 @@ def iter_query_rows(billing_project, sql, **params):
     usable here -- it rejects the nested-record schema the legacy job needed.
 
     Unlike :func:`run_query`, this never materializes the whole result set: it
-    pulls one record batch at a time and yields its rows as dicts, so peak memory
-    is bounded by a single batch plus whatever the caller keeps. This is what
-    keeps the ~100k-client details pass within the GKE memory budget.
+    pulls one record batch at a time, so peak memory is bounded by the batches
+    the caller holds on to. This is what keeps the ~100k-client details pass
+    within the GKE memory budget.
     """
     job = _start_query(billing_project, sql, **params)
     bqstorage_client = bigquery_storage.BigQueryReadClient()
-    for batch in job.result().to_arrow_iterable(bqstorage_client=bqstorage_client):
-        # to_pylist() on a single batch -> one short-lived list of row dicts.
-        for row in batch.to_pylist():
-            yield row
+    yield from job.result().to_arrow_iterable(bqstorage_client=bqstorage_client)
+
+
+def save_batches(batches, path):
+    """Pass record batches through, writing them to a Parquet file on the way.
+
+    The file can be replayed with update_orphaning_dashboard.benchmark.
+    """
+    writer = None
+    try:
+        for batch in batches:
+            if writer is None:
+                writer = pq.ParquetWriter(path, batch.schema)
+            writer.write_batch(batch)
+            yield batch
+    finally:
+        if writer is not None:
+            writer.close()
 
 
 def build_results(dates, latest_version, summary_row, counts):
@@ -240,8 +255,37 @@ def write_local_json(output_dir, name, payload):
     is_flag=True,
     help="Write the JSON to --test-output-dir instead of uploading to GCS.",
 )
+@click.option(
+    "--engine",
+    type=click.Choice(["columnar", "processing"]),
+    default="columnar",
+    show_default=True,
+    help="Categorize whole record batches (columnar) or one client at a time "
+    "with the reference port (processing). Both produce identical counts.",
+)
+@click.option(
+    "--workers",
+    type=int,
+    default=None,
+    help="Processes for the columnar engine. Defaults to one per CPU.",
+)
+@click.option(
+    "--save-details",
+    type=click.Path(dir_okay=False),
+    default=None,
+    help="Also write the details query result to this Parquet file, for "
+    "update_orphaning_dashboard.benchmark.",
+)
 def main(
-    run_date, billing_project, output_bucket, output_prefix, test_output_dir, dry_run
+    run_date,
+    billing_project,
+    output_bucket,
+    output_prefix,
+    test_output_dir,
+    dry_run,
+    engine,
+    workers,
+    save_details,
 ):
     start_time = dt.datetime.now()
     print("Start: " + start_time.strftime("%Y-%m-%d %H:%M:%S"))
@@ -277,9 +321,8 @@ def main(
 
     print("\n[3/5] Running out-of-date details query (candidate clients)")
     # Streamed one Arrow batch at a time (not materialized) so the ~100k-client
-    # details pass stays within the GKE memory budget; categorize() consumes the
-    # iterator client-by-client.
-    detail_rows = iter_query_rows(
+    # details pass stays within the GKE memory budget.
+    detail_batches = iter_query_batches(
         billing_project,
         load_sql("out_of_date_details.sql"),
         date_from=dates.aggregation_from,
@@ -291,14 +334,25 @@ def main(
         max_up_to_date_ver=max_up_to_date_ver,
     )
 
-    print("\n[4/5] Categorizing clients (streaming funnel)")
-    counts = processing.categorize(
-        detail_rows,
-        min_subsession_date=dates.min_subsession_date,
-        min_subsession_seconds=MIN_SUBSESSION_SECONDS,
-        min_update_ping_count=MIN_UPDATE_PING_COUNT,
-        earliest_up_to_date_version=earliest_up_to_date_version,
-    )
+    if save_details:
+        print(f"Saving details to {save_details}")
+        detail_batches = save_batches(detail_batches, save_details)
+
+    print(f"\n[4/5] Categorizing clients ({engine} engine)")
+    params = {
+        "min_subsession_date": dates.min_subsession_date,
+        "min_subsession_seconds": MIN_SUBSESSION_SECONDS,
+        "min_update_ping_count": MIN_UPDATE_PING_COUNT,
+        "earliest_up_to_date_version": earliest_up_to_date_version,
+    }
+    if engine == "columnar":
+        counts = columnar.categorize_batches(
+            detail_batches, **params, max_workers=workers
+        )
+    else:
+        # to_pylist() on a single batch -> one short-lived list of row dicts.
+        detail_rows = (row for batch in detail_batches for row in batch.to_pylist())
+        counts = processing.categorize(detail_rows, **params)
 
     results = build_results(dates, latest_version, summary_row, counts)
     payload = to_json(results)
@@ -151,6 +151,136 @@ class Ping:
         self.update_check_extended_error_notify = keyed or None
 
 
+# The report's count-by-key dictionaries, in the order the legacy results_dict
+# listed them. Two are aliases for another stage's counter.
+REPORT_COUNTS = (
+    "hasOutOfDateMaxVersion",
+    "hasUpdatePing",
+    "hasMinSubsessionLength",
+    "hasMinUpdatePingCount",
+    "isSupported",
+    "isAbleToApply",
+    "hasUpdateEnabled",
+    "ofConcern",
+    "hasOnlyNoUpdateFound",
+    "hasNoDownloadCode",
+    "hasUpdateApplyFailure",
+    "ofConcernCategorized",
+    "ofConcernByVersion",
+    "checkCodeNotifyOfConcern",
+    "checkExErrorNotifyOfConcern",
+    "downloadCodeOfConcern",
+    "stateCodeStageOfConcern",
+    "stateFailureCodeStageOfConcern",
+    "stateCodeStartupOfConcern",
+    "stateFailureCodeStartupOfConcern",
+)
+_ALIASES = {
+    "ofConcern": "hasUpdateEnabled",
+    "ofConcernCategorized": "hasUpdateApplyFailure",
+}
+# The distinct counters, one per funnel stage or categorization.
+COUNTERS = tuple(name for name in REPORT_COUNTS if name not in _ALIASES)
+
+
+def report_counts(counters):
+    """Arrange the per-stage Counters into the dict :func:`categorize` returns."""
+    return {name: counters[_ALIASES.get(name, name)] for name in REPORT_COUNTS}
+
+
+def classify(
+    ping,
+    *,
+    min_subsession_date,
+    min_subsession_seconds,
+    min_update_ping_count,
+    earliest_up_to_date_version,
+):
+    """Walk one client through the funnel and the of-concern categorization.
+
+    Returns ``{counter name: key}`` for each counter in :data:`COUNTERS` the
+    client reaches, in the order it reaches them.
+    """
+    keys = {}
+
+    # --- "out of date, potentially of concern" funnel, short-circuiting on
+    # the first False exactly as the staged filter did. ---
+    key, _ = _has_out_of_date_max_version(ping, earliest_up_to_date_version)
+    keys["hasOutOfDateMaxVersion"] = key
+    if key is not True:
+        return keys
+
+    key, _ = _has_update_ping(ping)
+    keys["hasUpdatePing"] = key
+    if key is not True:
+        return keys
+
+    key, _ = _has_min_subsession_length(
+        ping, min_subsession_date, min_subsession_seconds
+    )
+    keys["hasMinSubsessionLength"] = key
+    if key is not True:
+        return keys
+
+    key, _ = _has_min_update_ping_count(
+        ping, min_subsession_date, min_update_ping_count
+    )
+    keys["hasMinUpdatePingCount"] = key
+    if key is not True:
+        return keys
+
+    key, _ = _is_supported(ping, min_update_ping_count)
+    keys["isSupported"] = key
+    if key is not True:
+        return keys
+
+    key, _ = _is_able_to_apply(ping)
+    keys["isAbleToApply"] = key
+    if key is not True:
+        return keys
+
+    key, _ = _has_update_enabled(ping)
+    keys["hasUpdateEnabled"] = key
+    if key is not True:
+        return keys
+
+    # --- out of date, of concern: categorize this client. ---
+    keys["ofConcernByVersion"] = ping.version[0]
+
+    code, _ = _check_code_notify(ping)
+    keys["checkCodeNotifyOfConcern"] = code
+    if code in (22, 23):
+        ex_code, _ = _check_ex_error_notify(ping)
+        keys["checkExErrorNotifyOfConcern"] = ex_code
+
+    dl_code, _ = _download_code(ping)
+    keys["downloadCodeOfConcern"] = dl_code
+
+    stage_code, _ = _state_code_stage(ping)
+    keys["stateCodeStageOfConcern"] = stage_code
+    if stage_code == 12:
+        fail, _ = _state_failure_code_stage(ping)
+        keys["stateFailureCodeStageOfConcern"] = fail
+
+    startup_code, _ = _state_code_startup(ping)
+    keys["stateCodeStartupOfConcern"] = startup_code
+    if startup_code == 12:
+        fail, _ = _state_failure_code_startup(ping)
+        keys["stateFailureCodeStartupOfConcern"] = fail
+
+    # --- of-concern sub-categorizations (sequential False-survivor chain) ---
+    only_no_update, _ = _has_only_no_update_found(ping)
+    keys["hasOnlyNoUpdateFound"] = only_no_update
+    if only_no_update is False:
+        no_download, _ = _has_no_download_code(ping)
+        keys["hasNoDownloadCode"] = no_download
+        if no_download is False:
+            apply_failure, _ = _has_update_apply_failure(ping)
+            keys["hasUpdateApplyFailure"] = apply_failure
+
+    return keys
+
+
 def categorize(
     rows,
     *,
@@ -161,10 +291,10 @@ def categorize(
 ):
     """Run the full pipeline over the query rows.
 
-    ``rows`` may be any iterable of result-row dicts (e.g. the streaming Arrow
-    iterator from ``main.iter_query_rows``); each client is parsed, classified,
-    and discarded one at a time, so peak memory is one ``Ping`` rather than the
-    whole ~100k-client result set.
+    ``rows`` may be any iterable of result-row dicts (e.g. the rows of the
+    streaming Arrow batches from ``main.iter_query_batches``); each client is
+    parsed, classified, and discarded one at a time, so peak memory is one
+    ``Ping`` rather than the whole ~100k-client result set.
 
     Returns a dict of the count-by-key dictionaries the report JSON needs, keyed
     by the same names the legacy ``results_dict`` used (minus ``reportDetails``
@@ -172,29 +302,14 @@ def categorize(
     to the list-based pipeline: the funnel is a per-client sequence of stages, so
     walking one client through it and tallying each stage it reaches produces the
     same per-stage Counters as filtering the whole population stage by stage.
+
+    This is the reference implementation; ``columnar.categorize_batches``
+    computes the same counts over whole Arrow record batches.
     """
     # Funnel stage counters (each tallies True/False over the clients that reach
-    # it). hasUpdateEnabled doubles as `ofConcern`, as in the legacy results_dict.
-    has_out_of_date_max_version = Counter()
-    has_update_ping = Counter()
-    has_min_subsession_length = Counter()
-    has_min_update_ping_count = Counter()
-    is_supported = Counter()
-    is_able_to_apply = Counter()
-    has_update_enabled = Counter()
-
-    # Of-concern categorization counters.
-    of_concern_by_version = Counter()
-    check_code_notify_of_concern = Counter()
-    check_ex_error_notify_of_concern = Counter()
-    download_code_of_concern = Counter()
-    state_code_stage_of_concern = Counter()
-    state_failure_code_stage_of_concern = Counter()
-    state_code_startup_of_concern = Counter()
-    state_failure_code_startup_of_concern = Counter()
-    has_only_no_update_found = Counter()
-    has_no_download_code = Counter()
-    has_update_apply_failure = Counter()
+    # it) and the of-concern categorization counters. hasUpdateEnabled doubles
+    # as `ofConcern`, as in the legacy results_dict.
+    counters = {name: Counter() for name in COUNTERS}
 
     print("  Streaming clients through the funnel")
     n_clients = 0
@@ -203,108 +318,21 @@ def categorize(
         n_clients += 1
         if n_clients % 25000 == 0:
             print(f"    processed {n_clients} clients ({n_of_concern} of concern)")
-        ping = Ping(row)
-
-        # --- "out of date, potentially of concern" funnel, short-circuiting on
-        # the first False exactly as the staged filter did. ---
-        key, _ = _has_out_of_date_max_version(ping, earliest_up_to_date_version)
-        has_out_of_date_max_version[key] += 1
-        if key is not True:
-            continue
-
-        key, _ = _has_update_ping(ping)
-        has_update_ping[key] += 1
-        if key is not True:
-            continue
-
-        key, _ = _has_min_subsession_length(
-            ping, min_subsession_date, min_subsession_seconds
-        )
-        has_min_subsession_length[key] += 1
-        if key is not True:
-            continue
-
-        key, _ = _has_min_update_ping_count(
-            ping, min_subsession_date, min_update_ping_count
+        keys = classify(
+            Ping(row),
+            min_subsession_date=min_subsession_date,
+            min_subsession_seconds=min_subsession_seconds,
+            min_update_ping_count=min_update_ping_count,
+            earliest_up_to_date_version=earliest_up_to_date_version,
         )
-        has_min_update_ping_count[key] += 1
-        if key is not True:
-            continue
-
-        key, _ = _is_supported(ping, min_update_ping_count)
-        is_supported[key] += 1
-        if key is not True:
-            continue
-
-        key, _ = _is_able_to_apply(ping)
-        is_able_to_apply[key] += 1
-        if key is not True:
-            continue
-
-        key, _ = _has_update_enabled(ping)
-        has_update_enabled[key] += 1
-        if key is not True:
-            continue
-
-        # --- out of date, of concern: categorize this client. ---
-        n_of_concern += 1
-        of_concern_by_version[ping.version[0]] += 1
-
-        code, _ = _check_code_notify(ping)
-        check_code_notify_of_concern[code] += 1
-        if code in (22, 23):
-            ex_code, _ = _check_ex_error_notify(ping)
-            check_ex_error_notify_of_concern[ex_code] += 1
-
-        dl_code, _ = _download_code(ping)
-        download_code_of_concern[dl_code] += 1
-
-        stage_code, _ = _state_code_stage(ping)
-        state_code_stage_of_concern[stage_code] += 1
-        if stage_code == 12:
-            fail, _ = _state_failure_code_stage(ping)
-            state_failure_code_stage_of_concern[fail] += 1
-
-        startup_code, _ = _state_code_startup(ping)
-        state_code_startup_of_concern[startup_code] += 1
-        if startup_code == 12:
-            fail, _ = _state_failure_code_startup(ping)
-            state_failure_code_startup_of_concern[fail] += 1
-
-        # --- of-concern sub-categorizations (sequential False-survivor chain) ---
-        only_no_update, _ = _has_only_no_update_found(ping)
-        has_only_no_update_found[only_no_update] += 1
-        if only_no_update is False:
-            no_download, _ = _has_no_download_code(ping)
-            has_no_download_code[no_download] += 1
-            if no_download is False:
-                apply_failure, _ = _has_update_apply_failure(ping)
-                has_update_apply_failure[apply_failure] += 1
+        for name, key in keys.items():
+            counters[name][key] += 1
+        if "ofConcernByVersion" in keys:
+            n_of_concern += 1
 
     print(f"  Done: {n_clients} clients, {n_of_concern} of concern")
 
-    return {
-        "hasOutOfDateMaxVersion": has_out_of_date_max_version,
-        "hasUpdatePing": has_update_ping,
-        "hasMinSubsessionLength": has_min_subsession_length,
-        "hasMinUpdatePingCount": has_min_update_ping_count,
-        "isSupported": is_supported,
-        "isAbleToApply": is_able_to_apply,
-        "hasUpdateEnabled": has_update_enabled,
-        "ofConcern": has_update_enabled,
-        "hasOnlyNoUpdateFound": has_only_no_update_found,
-        "hasNoDownloadCode": has_no_download_code,
-        "hasUpdateApplyFailure": has_update_apply_failure,
-        "ofConcernCategorized": has_update_apply_failure,
-        "ofConcernByVersion": of_concern_by_version,
-        "checkCodeNotifyOfConcern": check_code_notify_of_concern,
-        "checkExErrorNotifyOfConcern": check_ex_error_notify_of_concern,
-        "downloadCodeOfConcern": download_code_of_concern,
-        "stateCodeStageOfConcern": state_code_stage_of_concern,
-        "stateFailureCodeStageOfConcern": state_failure_code_stage_of_concern,
-        "stateCodeStartupOfConcern": state_code_startup_of_concern,
-        "stateFailureCodeStartupOfConcern": state_failure_code_startup_of_concern,
-    }
+    return report_counts(counters)
 
 
 # ----------------------------------------------------------------------------
@@ -7,6 +7,7 @@ from unittest.mock import Mock
 
 import pytest
 from google.cloud import bigquery
+from google.cloud.bigquery.client import _check_mode
 
 from webcompat_kb import projectdata, redashdata
 from webcompat_kb.base import DEFAULT_DATA_DIR
@@ -51,6 +52,8 @@ class MockClient:
     def __init__(self, project):
         self.project = project
         self.called = []
+        # Data read from files passed to load_table_from_file
+        self.loaded_data = []
         # Map between fn name and list of return values for that function
         self.return_values = defaultdict(deque)
 
@@ -92,6 +95,17 @@ class MockClient:
         assert isinstance(job_config, bigquery.LoadJobConfig)
         return rv
 
+    def load_table_from_file(self, file_obj, destination, rewind, job_config):
+        rv = self._record()
+        assert isinstance(destination, (str, bigquery.Table))
+        assert isinstance(job_config, bigquery.LoadJobConfig)
+        # The real client rejects files that aren't opened in binary read mode
+        _check_mode(file_obj)
+        if rewind:
+            file_obj.seek(0)
+        self.loaded_data.append(file_obj.read())
+        return rv
+
     def insert_rows(self, table, rows):
         rv = self._record()
         assert isinstance(table, (str, bigquery.Table))
@@ -118,7 +132,7 @@ class MockClient:
         assert isinstance(job_config, bigquery.QueryJobConfig)
         return rv
 
-    def delete_table(self, table, not_found_ok):
+    def delete_table(self, table, not_found_ok=False):
         self._record()
         assert isinstance(table, (str, bigquery.Table))
         assert isinstance(not_found_ok, bool)
@@ -1,5 +1,11 @@
+import json
+from datetime import datetime, timezone
+from types import SimpleNamespace
+from unittest.mock import Mock
+
 import pytest
 
+from webcompat_kb import bqhelpers
 from webcompat_kb.bqhelpers import (
     Dataset,
     DatasetId,
@@ -168,17 +174,47 @@ def test_write_table(bq_client, table):
         schema=schema,
         write_disposition="WRITE_APPEND",
     )
-    bq_client.write_table(table, schema, rows, False)
-    assert bq_client.client.called == [
-        Call(
-            function="load_table_from_json",
-            arguments={
-                "rows": rows,
-                "table": "project.dataset.table",
-                "job_config": job_config,
-            },
-        )
+    bq_client.write_table(table, schema, iter(rows), False)
+    assert len(bq_client.client.called) == 1
+    load_call = bq_client.client.called[0]
+    assert load_call.function == "load_table_from_file"
+    assert load_call.arguments["destination"] == "project.dataset.table"
+    assert load_call.arguments["rewind"] is True
+    assert load_call.arguments["job_config"].__dict__ == job_config.__dict__
+    assert bq_client.client.loaded_data == [b'{"id": 1}\n']
+    stats = bq_client.write_stats[SchemaId("project", "dataset", "table")]
+    assert stats.rows == 1
+    assert stats.bytes == len(b'{"id": 1}\n')
+    assert stats.load_jobs == 1
+
+
+def test_write_table_chunks(bq_client, monkeypatch):
+    monkeypatch.setattr(bqhelpers, "LOAD_CHUNK_ROWS", 3)
+    schema = [
+        bigquery.SchemaField("id", "INTEGER", "REQUIRED"),
+        bigquery.SchemaField("time", "TIMESTAMP"),
+    ]
+    time = datetime(2025, 1, 1, tzinfo=timezone.utc)
+    rows = ({"id": i, "time": time} for i in range(10))
+    bq_client.write_table("project.dataset.table", schema, rows, True)
+
+    assert [call.function for call in bq_client.client.called] == [
+        "load_table_from_file"
     ]
+    job_config = bq_client.client.called[0].arguments["job_config"]
+    assert job_config.write_disposition == "WRITE_TRUNCATE"
+    lines = bq_client.client.loaded_data[0].decode("utf8").splitlines()
+    assert [json.loads(line) for line in lines] == [
+        {"id": i, "time": "2025-01-01T00:00:00+00:00"} for i in range(10)
+    ]
+
+
+def test_write_table_no_write(bq_client):
+    bq_client.write = False
+    bq_client.write_table(
+        "project.dataset.table", [], ({"id": i} for i in range(10)), False
+    )
+    assert bq_client.client.called == []
 
 
 @pytest.mark.parametrize(
@@ -214,6 +250,49 @@ def test_insert_rows(bq_client, table):
     assert isinstance(insert_rows_call.arguments["table"], bigquery.Table)
 
 
+def test_insert_rows_batches(bq_client, monkeypatch):
+    monkeypatch.setattr(bqhelpers, "STREAMING_BATCH_ROWS", 4)
+    bq_client.client.return_values["get_table"].append(
+        bigquery.Table("project.dataset.table")
+    )
+    rows = [{"id": i} for i in range(10)]
+    bq_client.insert_rows("project.dataset.table", iter(rows))
+
+    insert_calls = [
+        call for call in bq_client.client.called if call.function == "insert_rows"
+    ]
+    assert [call.arguments["rows"] for call in insert_calls] == [
+        rows[:4],
+        rows[4:8],
+        rows[8:],
+    ]
+    stats = bq_client.write_stats[SchemaId("project", "dataset", "table")]
+    assert stats.rows == 10
+    assert stats.streaming_requests == 3
+    assert stats.load_jobs == 0
+
+
+def test_insert_rows_load_job(bq_client, monkeypatch):
+    monkeypatch.setattr(bqhelpers, "STREAMING_MAX_ROWS", 5)
+    schema = [bigquery.SchemaField("id", "INTEGER", "REQUIRED")]
+    bq_client.client.return_values["get_table"].append(
+        bigquery.Table("project.dataset.table", schema=schema)
+    )
+    bq_client.insert_rows("project.dataset.table", ({"id": i} for i in range(10)))
+
+    assert [call.function for call in bq_client.client.called] == [
+        "get_table",
+        "load_table_from_file",
+    ]
+    job_config = bq_client.client.called[1].arguments["job_config"]
+    assert job_config.write_disposition == "WRITE_APPEND"
+    assert job_config.schema == schema
+    assert len(bq_client.client.loaded_data[0].splitlines()) == 10
+    stats = bq_client.write_stats[SchemaId("project", "dataset", "table")]
+    assert stats.rows == 10
+    assert stats.load_jobs == 1
+
+
 @pytest.mark.parametrize(
     "table",
     [
@@ -498,3 +577,188 @@ def test_check_write_targets(bq_client):
 )
 def test_schema_id_relative_string(schema_id, dataset_id, expected):
     assert schema_id.relative_string(dataset_id) == expected
+
+
+UPSERT_SCHEMA = [
+    bigquery.SchemaField("id", "INTEGER", "REQUIRED"),
+    bigquery.SchemaField("group", "STRING", "REQUIRED"),
+    bigquery.SchemaField("value", "STRING"),
+]
+
+
+def test_upsert(bq_client):
+    table = TableSchema(
+        SchemaId("project", "dataset", "table"),
+        SchemaId("project", "dataset", "table"),
+        [],
+        set(),
+    )
+    table_schema = bq_client.client.return_values["get_table"]
+    table_schema.append(bigquery.Table("project.dataset.table", UPSERT_SCHEMA))
+    merge_job = Mock()
+    merge_job.num_dml_affected_rows = 3
+    merge_job.dml_stats.inserted_row_count = 1
+    merge_job.dml_stats.updated_row_count = 2
+    merge_job.dml_stats.deleted_row_count = 0
+    bq_client.client.return_values["query"].append(merge_job)
+
+    rows = ({"id": i, "group": "a", "value": str(i)} for i in range(3))
+    result = bq_client.upsert(table.id, rows, key=["id", "group"])
+
+    assert (result.rows, result.inserted, result.updated, result.deleted) == (
+        3,
+        1,
+        2,
+        0,
+    )
+    assert result.affected == 3
+    assert [call.function for call in bq_client.client.called] == [
+        "get_table",
+        "create_table",
+        "load_table_from_file",
+        "query",
+        "delete_table",
+    ]
+    staging = bq_client.client.called[1].arguments["table"]
+    assert staging.dataset_id == "dataset"
+    assert [field.name for field in staging.schema] == ["id", "group", "value"]
+    assert len(bq_client.client.loaded_data[0].splitlines()) == 3
+
+    merge_query = bq_client.client.called[3].arguments["query"]
+    assert merge_query.startswith("MERGE `project.dataset.table` AS target")
+    # GROUP is a reserved word, so every identifier is quoted
+    assert "PARTITION BY `id`, `group` ORDER BY `id`, `group`" in merge_query
+    assert (
+        "ON target.`id` = source.`id` AND target.`group` = source.`group`"
+        in merge_query
+    )
+    assert "target.`value`=source.`value`" in merge_query
+    assert "target.`id`=source.`id`" not in merge_query
+    assert "INSERT (`id`, `group`, `value`)" in merge_query
+    assert "NOT MATCHED BY SOURCE" not in merge_query
+
+
+def test_upsert_loads_binary_file(bq_client):
+    # The mock client runs the same file mode check as the real one
+    bq_client.client.return_values["get_table"].append(
+        bigquery.Table("project.dataset.table", UPSERT_SCHEMA)
+    )
+    result = bq_client.upsert(
+        "project.dataset.table",
+        iter([{"id": 1, "group": "a", "value": "x"}]),
+        key=["id", "group"],
+    )
+    assert result.rows == 1
+    load_call = bq_client.client.called[2]
+    assert load_call.function == "load_table_from_file"
+    assert load_call.arguments["file_obj"].mode == "rb"
+    assert bq_client.client.loaded_data == [b'{"id": 1, "group": "a", "value": "x"}\n']
+
+
+def test_upsert_key_only(bq_client):
+    schema = [
+        bigquery.SchemaField("id", "INTEGER", "REQUIRED"),
+        bigquery.SchemaField("group", "STRING", "REQUIRED"),
+    ]
+    bq_client.client.return_values["get_table"].append(
+        bigquery.Table("project.dataset.table", schema)
+    )
+    bq_client.upsert(
+        "project.dataset.table",
+        [{"id": 1, "group": "a"}],
+        key=["id", "group"],
+        delete_condition="TRUE",
+    )
+    merge_query = bq_client.client.called[3].arguments["query"]
+    # Every column is in the key, so there's nothing to update on a match
+    assert "WHEN MATCHED" not in merge_query
+    assert "UPDATE SET" not in merge_query
+    assert (
+        "ON target.`id` = source.`id` AND target.`group` = source.`group`\n"
+        "WHEN NOT MATCHED THEN\n"
+        "  INSERT (`id`, `group`)"
+    ) in merge_query
+    assert merge_query.endswith("WHEN NOT MATCHED BY SOURCE AND TRUE THEN\n  DELETE")
+
+
+def test_upsert_delete_condition(bq_client):
+    bq_client.client.return_values["get_table"].append(
+        bigquery.Table("project.dataset.table", UPSERT_SCHEMA)
+    )
+    parameters = [bigquery.ScalarQueryParameter("group", "STRING", "a")]
+    bq_client.upsert(
+        "project.dataset.table",
+        [{"id": 1, "group": "a", "value": None}],
+        key=["id"],
+        order_by="value DESC",
+        delete_condition="target.group = @group",
+        parameters=parameters,
+    )
+    query_call = bq_client.client.called[3]
+    assert "PARTITION BY `id` ORDER BY value DESC" in query_call.arguments["query"]
+    assert query_call.arguments["query"].endswith(
+        "WHEN NOT MATCHED BY SOURCE AND target.group = @group THEN\n  DELETE"
+    )
+    assert query_call.arguments["job_config"].query_parameters == parameters
+
+
+def test_upsert_no_rows(bq_client):
+    result = bq_client.upsert(
+        TableSchema(
+            SchemaId("project", "dataset", "table"),
+            SchemaId("project", "dataset", "table"),
+            [],
+            set(),
+        ),
+        [],
+        key=["id"],
+    )
+    assert result.rows == 0
+    assert bq_client.client.called == []
+
+
+def test_upsert_no_rows_delete_condition(bq_client):
+    # An empty input must not delete everything matching delete_condition
+    result = bq_client.upsert(
+        "project.dataset.table",
+        iter([]),
+        key=["id"],
+        delete_condition="target.group = 'a'",
+    )
+    assert result.rows == 0
+    assert result.deleted == 0
+    assert bq_client.client.called == []
+
+
+def test_upsert_dry_run(bq_client):
+    bq_client.write = False
+    bq_client.client.return_values["get_table"].append(
+        bigquery.Table("project.dataset.table", UPSERT_SCHEMA)
+    )
+    count_result = Mock()
+    count_result.result.return_value = iter(
+        [SimpleNamespace(inserted=1, updated=0, deleted=4)]
+    )
+    bq_client.client.return_values["query"].append(count_result)
+
+    result = bq_client.upsert(
+        "project.dataset.table",
+        [{"id": 1, "group": "a", "value": None}],
+        key=["id"],
+        delete_condition="target.group = 'a'",
+    )
+
+    assert (result.inserted, result.updated, result.deleted) == (1, 0, 4)
+    assert result.affected == 5
+    # The input is loaded into the temporary table, but the target isn't changed
+    assert [call.function for call in bq_client.client.called] == [
+        "get_table",
+        "create_table",
+        "load_table_from_file",
+        "query",
+        "delete_table",
+    ]
+    count_query = bq_client.client.called[3].arguments["query"]
+    assert not count_query.startswith("MERGE")
+    assert "FULL OUTER JOIN" in count_query
+    assert "(target.group = 'a') AS _upsert_deletable" in count_query
@@ -1,3 +1,4 @@
+import os
 import tempfile
 from collections import defaultdict
 from datetime import datetime, timezone
@@ -9,6 +10,8 @@ import bugdantic.bugzilla
 
 from webcompat_kb.etl.bugzilla import (
     Bug,
+    BugCache,
+    BugGraph,
     BugHistoryChange,
     BugHistoryEntry,
     BugHistoryUpdater,
@@ -23,6 +26,8 @@ from webcompat_kb.etl.bugzilla import (
     group_bugs,
     load_bugs,
     parse_user_story,
+    read_bug_batches,
+    read_bug_metadata,
     write_bugs,
 )
 
@@ -1716,6 +1721,63 @@ def test_read_write_data(project):
         assert load_bugs(project, None, None, f.name, None) == SAMPLE_ALL_BUGS
 
 
+def test_read_write_data_arrow(project):
+    site_reports, etp_reports, kb_bugs, platform_bugs = group_bugs(SAMPLE_ALL_BUGS)
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = os.path.join(tmp_dir, "bugs.arrow")
+        write_bugs(
+            path,
+            SAMPLE_ALL_BUGS,
+            site_reports,
+            etp_reports,
+            kb_bugs,
+            platform_bugs,
+            [],
+            [],
+        )
+
+        assert load_bugs(project, None, None, path, None) == SAMPLE_ALL_BUGS
+
+        batches = list(read_bug_batches(path, columns=["id", "keywords"]))
+        assert all(batch.schema.names == ["id", "keywords"] for batch in batches)
+        assert {
+            bug_id for batch in batches for bug_id in batch.column("id").to_pylist()
+        } == set(SAMPLE_ALL_BUGS.keys())
+
+        metadata = read_bug_metadata(path)
+        assert set(metadata["site_report"]) == site_reports
+        assert set(metadata["etp_reports"]) == etp_reports
+        assert set(metadata["kb_bugs"]) == kb_bugs
+        assert set(metadata["platform_bugs"]) == platform_bugs
+
+
+def test_cache_snapshot(bq_client):
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = os.path.join(tmp_dir, "bugs.json")
+
+        bug_cache = BugCache(bq_client, None)
+        assert bug_cache.load_snapshot(path) is None
+
+        bug_cache.bugs.update(SAMPLE_ALL_BUGS)
+        bug_cache.write_snapshot(path)
+
+        loaded_cache = BugCache(bq_client, None)
+        high_water_mark = loaded_cache.load_snapshot(path)
+        assert high_water_mark == max(
+            bug.last_change_time for bug in SAMPLE_ALL_BUGS.values()
+        )
+        assert loaded_cache.into_mapping() == SAMPLE_ALL_BUGS
+
+
+def test_cache_snapshot_invalid(bq_client):
+    with tempfile.NamedTemporaryFile("w") as f:
+        f.write("{}")
+        f.flush()
+        bug_cache = BugCache(bq_client, None)
+        assert bug_cache.load_snapshot(f.name) is None
+        assert len(bug_cache) == 0
+
+
 @pytest.mark.parametrize(
     "input_query, expected_query",
     [
@@ -1904,3 +1966,42 @@ def test_get_recursive_dependencies_empty():
     result = get_recursive_dependencies({1000}, bugs)
 
     assert result == set()
+
+
+def test_bug_graph_missing_relations():
+    graph = BugGraph(
+        {
+            1000: Bug(id=1000, depends_on=[2000, 3000], blocks=[], **_bug_defaults()),
+        }
+    )
+    assert graph.missing_relations() == {2000, 3000}
+
+    graph[2000] = Bug(id=2000, depends_on=[4000], blocks=[], **_bug_defaults())
+    assert graph.missing_relations() == {3000, 4000}
+
+    # Bugs outside the web compatibility components don't require their dependencies
+    platform_defaults = {**_bug_defaults(), "product": "Core", "component": "DOM"}
+    graph[3000] = Bug(id=3000, depends_on=[5000], blocks=[], **platform_defaults)
+    assert graph.missing_relations() == {4000}
+
+    del graph[2000]
+    assert graph.missing_relations() == {2000}
+    assert graph.dependents[3000] == {1000}
+    assert 2000 not in graph.site_reports
+
+
+def test_bug_graph_update():
+    graph = BugGraph(
+        {
+            1000: Bug(id=1000, depends_on=[2000], blocks=[], **_bug_defaults()),
+            2000: Bug(id=2000, depends_on=[], blocks=[], **_bug_defaults()),
+        }
+    )
+    assert graph.site_reports == {1000, 2000}
+
+    kb_defaults = {**_bug_defaults(), "component": "Knowledge Base"}
+    graph[1000] = Bug(id=1000, depends_on=[3000], blocks=[], **kb_defaults)
+    assert graph.site_reports == {2000}
+    assert graph.kb_entries == {1000}
+    assert graph.dependents == {3000: {1000}}
+    assert graph.missing_relations() == {3000}
@@ -0,0 +1,102 @@
+import httpx
+
+import bugdantic
+
+from webcompat_kb.bzhelpers import BugzillaFetcher
+
+
+def make_client(handler):
+    bz_client = bugdantic.Bugzilla(
+        bugdantic.BugzillaConfig("https://bugzilla.example", None)
+    )
+    bz_client.client = httpx.Client(transport=httpx.MockTransport(handler))
+    return bz_client
+
+
+def bugs_response(request, skip=frozenset()):
+    ids = [int(item) for item in request.url.params.get_list("id")]
+    return httpx.Response(
+        200, json={"bugs": [{"id": bug_id} for bug_id in ids if bug_id not in skip]}
+    )
+
+
+def test_fetch_bugs_chunks():
+    requested = []
+
+    def handler(request):
+        requested.append(request.url.params.get_list("id"))
+        return bugs_response(request)
+
+    fetcher = BugzillaFetcher(make_client(handler), max_workers=2)
+    bugs, failed = fetcher.fetch_bugs(range(1, 6), include_fields=["id"], chunk_size=2)
+
+    assert set(bugs.keys()) == {1, 2, 3, 4, 5}
+    assert failed == set()
+    assert sorted(requested) == [["1", "2"], ["3", "4"], ["5"]]
+    assert fetcher.stats.requests == 3
+    assert fetcher.stats.bytes > 0
+
+
+def test_fetch_bugs_rate_limited():
+    responses = []
+
+    def handler(request):
+        if not responses:
+            responses.append(429)
+            return httpx.Response(429, headers={"Retry-After": "0"})
+        responses.append(200)
+        return bugs_response(request)
+
+    fetcher = BugzillaFetcher(make_client(handler), initial_backoff=0)
+    bugs, failed = fetcher.fetch_bugs([1, 2], include_fields=["id"])
+
+    assert set(bugs.keys()) == {1, 2}
+    assert failed == set()
+    assert responses == [429, 200]
+    assert fetcher.stats.rate_limited == 1
+
+
+def test_fetch_bugs_require_all():
+    def handler(request):
+        return bugs_response(request, skip={2})
+
+    fetcher = BugzillaFetcher(make_client(handler), max_attempts=2, initial_backoff=0)
+
+    bugs, failed = fetcher.fetch_bugs([1, 2, 3], include_fields=["id"])
+    assert set(bugs.keys()) == {1, 3}
+    assert failed == set()
+
+    bugs, failed = fetcher.fetch_bugs(
+        [1, 2, 3], include_fields=["id"], require_all=True
+    )
+    assert set(bugs.keys()) == {1, 3}
+    assert failed == {2}
+
+
+def test_fetch_bugs_error():
+    def handler(request):
+        return httpx.Response(500, json={"message": "Internal error"})
+
+    fetcher = BugzillaFetcher(make_client(handler), max_attempts=2, initial_backoff=0)
+    bugs, failed = fetcher.fetch_bugs([1, 2], include_fields=["id"])
+
+    assert bugs == {}
+    assert failed == {1, 2}
+    assert fetcher.stats.failures == 2
+
+
+def test_hooks_installed_once():
+    def handler(request):
+        return bugs_response(request)
+
+    bz_client = make_client(handler)
+    first = BugzillaFetcher(bz_client)
+    second = BugzillaFetcher(bz_client, max_workers=2)
+
+    assert len(bz_client.client.event_hooks["request"]) == 1
+    assert len(bz_client.client.event_hooks["response"]) == 1
+    assert BugzillaFetcher.for_client(bz_client) is second
+
+    second.fetch_bugs([1, 2], include_fields=["id"])
+    assert second.stats.requests == 1
+    assert first.stats.requests == 0
@@ -0,0 +1,160 @@
+import os
+import time
+from datetime import timedelta
+
+import httpx
+import pytest
+
+from webcompat_kb.httphelpers import HttpClient, ResponseCache
+
+
+def make_client(handler, tmp_path):
+    return HttpClient(ResponseCache(tmp_path), transport=httpx.MockTransport(handler))
+
+
+def test_revalidate_etag(tmp_path):
+    requests = []
+
+    def handler(request):
+        requests.append(request)
+        if request.headers.get("if-none-match") == '"v1"':
+            return httpx.Response(304, headers={"ETag": '"v1"'})
+        return httpx.Response(200, headers={"ETag": '"v1"'}, json={"value": 1})
+
+    client = make_client(handler, tmp_path)
+    assert client.get_json("https://example.test/data") == {"value": 1}
+    # A new client with the same cache directory, as in the next run
+    client = make_client(handler, tmp_path)
+    assert client.get_json("https://example.test/data") == {"value": 1}
+
+    assert "if-none-match" not in requests[0].headers
+    assert requests[1].headers["if-none-match"] == '"v1"'
+    assert client.stats.requests == 1
+    assert client.stats.revalidations == 1
+    assert client.stats.hits == 1
+    assert client.stats.cached_bytes > 0
+
+
+def test_changed_response_replaces_cache(tmp_path):
+    version = 1
+
+    def handler(request):
+        etag = f'"v{version}"'
+        if request.headers.get("if-none-match") == etag:
+            return httpx.Response(304, headers={"ETag": etag})
+        return httpx.Response(200, headers={"ETag": etag}, json={"value": version})
+
+    client = make_client(handler, tmp_path)
+    assert client.get_json("https://example.test/data") == {"value": 1}
+    version = 2
+    assert client.get_json("https://example.test/data") == {"value": 2}
+    assert client.get_json("https://example.test/data") == {"value": 2}
+
+    assert client.stats.requests == 3
+    assert client.stats.revalidations == 2
+    assert client.stats.hits == 1
+
+
+def test_no_validator_not_cached(tmp_path):
+    def handler(request):
+        assert "if-none-match" not in request.headers
+        return httpx.Response(200, text="rank,host")
+
+    client = make_client(handler, tmp_path)
+    assert client.get_text("https://example.test/list") == "rank,host"
+    assert client.get_text("https://example.test/list") == "rank,host"
+    assert client.stats.revalidations == 0
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_iter_lines_not_cached(tmp_path):
+    def handler(request):
+        assert "if-none-match" not in request.headers
+        return httpx.Response(
+            200, headers={"ETag": '"v1"'}, text="1,a.test\n2,b.test\n"
+        )
+
+    client = make_client(handler, tmp_path)
+    with client.iter_lines("https://example.test/list") as lines:
+        assert list(lines) == ["1,a.test", "2,b.test"]
+    with client.iter_lines("https://example.test/list") as lines:
+        assert list(lines) == ["1,a.test", "2,b.test"]
+
+    assert client.stats.requests == 2
+    assert client.stats.revalidations == 0
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_iter_lines_error(tmp_path):
+    client = make_client(lambda request: httpx.Response(404), tmp_path)
+    with pytest.raises(httpx.HTTPStatusError):
+        with client.iter_lines("https://example.test/list"):
+            pass
+
+
+def test_paginated_from_cache(tmp_path):
+    pages = {
+        "https://example.test/items?page=1": (
+            [1, 2],
+            '<https://example.test/items?page=2>; rel="next"',
+        ),
+        "https://example.test/items?page=2": ([3], None),
+    }
+
+    def handler(request):
+        data, link = pages[str(request.url)]
+        headers = {"ETag": f'"{request.url.params["page"]}"'}
+        if request.headers.get("if-none-match") == headers["ETag"]:
+            return httpx.Response(304, headers=headers)
+        if link is not None:
+            headers["Link"] = link
+        return httpx.Response(200, headers=headers, json=data)
+
+    client = make_client(handler, tmp_path)
+    url = "https://example.test/items?page=1"
+    assert client.get_paginated_json(url) == [1, 2, 3]
+    # The link header is stored with the body, so pagination works on 304s
+    assert [page.data for page in client.iter_paginated_json(url)] == [[1, 2], [3]]
+    assert client.stats.hits == 2
+
+
+def test_rate_limited_not_cached(tmp_path):
+    responses = [
+        httpx.Response(200, headers={"ETag": '"v1"'}, json=[1]),
+        httpx.Response(403, headers={"Retry-After": "0"}),
+        httpx.Response(304, headers={"ETag": '"v1"'}),
+    ]
+
+    def handler(request):
+        return responses.pop(0)
+
+    client = make_client(handler, tmp_path)
+    url = "https://example.test/items"
+    assert client.get_paginated_json(url) == [1]
+    pages = list(client.iter_paginated_json(url))
+    assert pages[0].data is None
+    assert pages[0].resume_at is not None
+    assert pages[1].data == [1]
+
+
+def test_prune_unused_entries(tmp_path):
+    def handler(request):
+        if request.headers.get("if-none-match") == '"v1"':
+            return httpx.Response(304, headers={"ETag": '"v1"'})
+        return httpx.Response(200, headers={"ETag": '"v1"'}, json=[])
+
+    client = make_client(handler, tmp_path)
+    client.get_json("https://example.test/items?since=2024-01-01")
+    client.get_json("https://example.test/items?since=2024-01-02")
+    # Mark every entry as last used a month ago
+    old = time.time() - timedelta(days=30).total_seconds()
+    for path in tmp_path.iterdir():
+        os.utime(path, (old, old))
+    # A hit marks the entry as used again
+    client.get_json("https://example.test/items?since=2024-01-02")
+    assert client.stats.hits == 1
+
+    cache = ResponseCache(tmp_path, max_age=timedelta(days=14))
+    assert cache.get("https://example.test/items?since=2024-01-01") is None
+    assert cache.get("https://example.test/items?since=2024-01-02") is not None
+    assert len(list(tmp_path.iterdir())) == 2
@@ -0,0 +1,209 @@
+import random
+from contextlib import contextmanager
+from datetime import datetime, timedelta, timezone
+from decimal import Decimal
+from types import SimpleNamespace
+
+import pytest
+
+from webcompat_kb.etl.metric_changes import (
+    BugChange,
+    BugData,
+    BugFieldChange,
+    KeywordTable,
+    bugs_historic_states,
+    compute_historic_scores,
+)
+
+START_TIME = datetime(2024, 1, 1, tzinfo=timezone.utc)
+
+KEYWORDS = [
+    "webcompat:site-report",
+    "webcompat:sitepatch-applied",
+    "webcompat:needs-diagnosis",
+    "webcompat:platform-bug",
+    "webcompat:needs-sitepatch",
+]
+
+
+def bug_data(number, keywords, status="NEW", user_story=""):
+    return BugData(
+        number=number,
+        status=status,
+        resolution="",
+        product="Web Compatibility",
+        component="Site Reports",
+        creator="nobody@mozilla.org",
+        creation_time=START_TIME,
+        resolved_time=None,
+        keywords=keywords,
+        url="https://example.org",
+        user_story=user_story,
+    )
+
+
+def change(offset, *changes):
+    return BugChange(
+        "nobody@mozilla.org",
+        START_TIME + timedelta(days=offset),
+        [BugFieldChange(*item) for item in changes],
+    )
+
+
+def make_history(num_bugs, num_changes, seed=0):
+    """Generate a deterministic set of bugs and histories.
+
+    Each bug starts out NEW with a single keyword, and each change toggles a
+    single keyword or the status."""
+    rng = random.Random(seed)
+    bugs = {}
+    changes_by_bug = {}
+    initial_keywords = {}
+    for bug_id in range(1, num_bugs + 1):
+        keywords = {KEYWORDS[0]}
+        initial_keywords[bug_id] = set(keywords)
+        status = "NEW"
+        changes = []
+        for i in range(num_changes):
+            if rng.random() < 0.2:
+                new_status = "RESOLVED" if status == "NEW" else "NEW"
+                changes.append(change(i, ("status", new_status, status)))
+                status = new_status
+                continue
+            keyword = rng.choice(KEYWORDS[1:])
+            if keyword in keywords:
+                keywords.remove(keyword)
+                changes.append(change(i, ("keywords", "", keyword)))
+            else:
+                keywords.add(keyword)
+                changes.append(change(i, ("keywords", keyword, "")))
+        bugs[bug_id] = bug_data(bug_id, sorted(keywords), status=status)
+        changes_by_bug[bug_id] = changes
+    return bugs, changes_by_bug, initial_keywords
+
+
+class FakeTemporaryTable:
+    def __init__(self, rows):
+        self.name = "project.dataset.tmp"
+        self.rows = rows
+
+    def query(self, query):
+        return FakeResult(
+            SimpleNamespace(score=len(row["keywords"]), **row) for row in self.rows
+        )
+
+
+class FakeResult(list):
+    @property
+    def num_results(self):
+        return len(self)
+
+
+class FakeClient:
+    def __init__(self):
+        self.rows = None
+
+    @contextmanager
+    def temporary_table(self, schema, rows):
+        self.rows = rows
+        yield FakeTemporaryTable(rows)
+
+
+def test_keyword_table():
+    table = KeywordTable()
+    bits = table.to_bits(["a", "b", "c"])
+    assert table.to_list(bits) == ["a", "b", "c"]
+    assert table.contains(bits, "b")
+    assert not table.contains(bits, "d")
+
+    bits = table.remove(bits, "b")
+    assert table.to_list(bits) == ["a", "c"]
+
+    bits = table.add(bits, "B")
+    assert table.to_list(table.remove(bits, "b")) == ["a", "c"]
+
+    with pytest.raises(ValueError):
+        table.remove(bits, "d")
+
+
+def test_bugs_historic_states():
+    bugs = {
+        1: bug_data(
+            1,
+            [KEYWORDS[0], KEYWORDS[1]],
+            status="RESOLVED",
+            user_story="platform:windows\nimpact:blocked\n",
+        )
+    }
+    changes_by_bug = {
+        1: [
+            change(0, ("keywords", KEYWORDS[1], "")),
+            change(
+                1,
+                ("status", "RESOLVED", "NEW"),
+                (
+                    "cf_user_story",
+                    "@@ -1,2 +1,2 @@\n platform:windows\n-impact:workflow\n+impact:blocked\n",
+                    "",
+                ),
+            ),
+            # Duplicate change which is skipped
+            change(
+                1,
+                ("status", "RESOLVED", "NEW"),
+                (
+                    "cf_user_story",
+                    "@@ -1,2 +1,2 @@\n platform:windows\n-impact:workflow\n+impact:blocked\n",
+                    "",
+                ),
+            ),
+        ]
+    }
+
+    states = bugs_historic_states(bugs, changes_by_bug)[1]
+    assert len(states) == 3
+    assert [state.change_idx for state in states] == [2, 0, None]
+    assert [state.status for state in states] == ["RESOLVED", "NEW", "NEW"]
+    assert [state.keywords for state in states] == [
+        [KEYWORDS[0], KEYWORDS[1]],
+        [KEYWORDS[0], KEYWORDS[1]],
+        [KEYWORDS[0]],
+    ]
+    assert [state.user_story for state in states] == [
+        "platform:windows\nimpact:blocked\n",
+        "platform:windows\nimpact:workflow\n",
+        "platform:windows\nimpact:workflow\n",
+    ]
+    # Unchanged fields are shared with the later state
+    assert states[2].user_story is states[1].user_story
+
+
+def test_compute_historic_scores_unchanged_states(project):
+    bugs = {1: bug_data(1, [KEYWORDS[0], KEYWORDS[1]])}
+    changes_by_bug = {
+        1: [
+            change(0, ("keywords", KEYWORDS[1], "")),
+            change(1, ("status", "RESOLVED", "NEW")),
+            change(2, ("status", "NEW", "RESOLVED")),
+        ]
+    }
+    historic_states = bugs_historic_states(bugs, changes_by_bug)
+    client = FakeClient()
+
+    scores = compute_historic_scores(project, client, historic_states, {1: 2})
+
+    # The current state and the state before the bug was resolved have the same
+    # scoring inputs, so only one is sent for scoring
+    assert [(row["number"], row["index"]) for row in client.rows] == [(1, 0), (1, 3)]
+    assert scores == {1: [Decimal(2), Decimal(0), Decimal(2), Decimal(1)]}
+
+
+def test_bugs_historic_states_initial_state():
+    bugs, changes_by_bug, initial_keywords = make_history(num_bugs=5, num_changes=10)
+
+    historic_states = bugs_historic_states(bugs, changes_by_bug)
+
+    for bug_id, states in historic_states.items():
+        assert len(states) == 11
+        assert set(states[-1].keywords) == initial_keywords[bug_id]
+        assert states[-1].status == "NEW"
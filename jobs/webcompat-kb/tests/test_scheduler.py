@@ -0,0 +1,112 @@
+import threading
+import time
+
+import pytest
+
+from webcompat_kb.base import ALL_JOBS
+from webcompat_kb.scheduler import JobScheduler, job_dependencies
+
+
+class FakeJob:
+    def __init__(self, name, writes, reads):
+        self.name = name
+        self.writes = writes
+        self.reads = reads
+
+    def write_targets(self, project):
+        return {project[dataset][name].id for dataset, name in self.writes}
+
+    def inputs(self, project):
+        if self.reads is None:
+            return None
+        return {project[dataset][name].id for dataset, name in self.reads}
+
+
+def test_job_dependencies(project):
+    jobs = [
+        FakeJob("bugs", [("webcompat_knowledge_base", "bugzilla_bugs")], []),
+        FakeJob("ranks", [("crux_imported", "host_min_ranks")], []),
+        # Reads bugzilla_bugs and host_min_ranks through the view
+        FakeJob("metric", [], [("webcompat_knowledge_base", "scored_site_reports")]),
+        FakeJob("features", [("web_features", "features")], []),
+        FakeJob("unknown", [], None),
+        FakeJob("interop", [("interop", "interop_proposals")], []),
+    ]
+    dependencies = job_dependencies(jobs, project)
+    assert dependencies == {
+        "bugs": set(),
+        "ranks": set(),
+        "metric": {"bugs", "ranks"},
+        "features": set(),
+        "unknown": {"bugs", "ranks", "metric", "features"},
+        "interop": {"unknown"},
+    }
+
+
+def test_job_dependencies_all_jobs(project):
+    jobs = [cls() for cls in ALL_JOBS.values()]
+    dependencies = job_dependencies(jobs, project)
+    names = list(dependencies.keys())
+    for name, job_dependencies_ in dependencies.items():
+        assert all(names.index(item) < names.index(name) for item in job_dependencies_)
+    assert dependencies["web-bugs"] == {"update-schema"}
+
+
+def test_scheduler_order():
+    dependencies = {"a": set(), "b": set(), "c": {"a", "b"}, "d": {"a"}}
+    running = set()
+    max_running = 0
+    order = []
+    lock = threading.Lock()
+
+    def run_job(name):
+        nonlocal max_running
+        with lock:
+            for dependency in dependencies[name]:
+                assert dependency in order
+            running.add(name)
+            max_running = max(max_running, len(running))
+        time.sleep(0.05)
+        with lock:
+            running.remove(name)
+            order.append(name)
+        return name != "d"
+
+    results = JobScheduler(dependencies, max_workers=2).run(run_job)
+
+    assert max_running == 2
+    assert set(order) == {"a", "b", "c", "d"}
+    assert {name: result.success for name, result in results.items()} == {
+        "a": True,
+        "b": True,
+        "c": True,
+        "d": False,
+    }
+    assert all(result.elapsed >= 0.05 for result in results.values())
+
+
+def test_scheduler_continue_on_error():
+    dependencies = {"a": set(), "b": {"a"}}
+
+    def run_job(name):
+        if name == "a":
+            raise ValueError("Failed")
+
+    results = JobScheduler(dependencies, max_workers=2).run(run_job)
+    assert not results["a"].success
+    assert isinstance(results["a"].error, ValueError)
+    assert results["b"].success
+
+
+def test_scheduler_fail_fast():
+    dependencies = {"a": set(), "b": {"a"}}
+    run = []
+
+    def run_job(name):
+        run.append(name)
+        if name == "a":
+            raise ValueError("Failed")
+
+    with pytest.raises(ValueError):
+        JobScheduler(dependencies, max_workers=2, fail_fast=True).run(run_job)
+    assert run == ["a"]
@@ -74,3 +74,69 @@ def test_tree(tmp_path: pathlib.Path):
     root_tree_hash = hashlib.sha1(root_tree_data).digest()
     assert tree.content.serialize() == root_tree_data
     assert tree.content.hash() == root_tree_hash
+
+
+def write_files(root: pathlib.Path, files: dict[str, bytes], mtime_ns: int) -> None:
+    for name, data in files.items():
+        path = root / name
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_bytes(data)
+        # Old enough that the entries aren't racy
+        os.utime(path, ns=(mtime_ns, mtime_ns))
+
+
+def test_hash_tree_cache(tmp_path: pathlib.Path):
+    mtime_ns = 1_700_000_000_000_000_000
+    write_files(
+        tmp_path,
+        {"file1.txt": b"file1", "sub/file2.txt": b"file2", "sub/file3.txt": b"file3"},
+        mtime_ns,
+    )
+    expected = treehash.hash_tree(tmp_path)
+
+    assert treehash.hash_tree(tmp_path, use_cache=True) == expected
+    cache_path = tmp_path / treehash.CACHE_FILENAME
+    assert cache_path.exists()
+    # The cache file doesn't contribute to the hash
+    assert treehash.hash_tree(tmp_path) == expected
+    # Nor does a temporary file left behind by an interrupted write
+    (tmp_path / f"{treehash.CACHE_FILENAME}.abc123").write_text("{}")
+    assert treehash.hash_tree(tmp_path) == expected
+
+    cache = treehash.HashCache(tmp_path)
+    assert set(cache.entries) == {"file1.txt", "sub/file2.txt", "sub/file3.txt"}
+    assert treehash.hash_tree(tmp_path, use_cache=True) == expected
+
+    # A file with the same mtime and size is assumed to be unchanged, which shows
+    # that it's not read again
+    write_files(tmp_path, {"sub/file2.txt": b"FILE2"}, mtime_ns)
+    assert treehash.hash_tree(tmp_path, use_cache=True) == expected
+
+    # A changed mtime is noticed
+    write_files(tmp_path, {"sub/file2.txt": b"FILE2"}, mtime_ns + 1)
+    changed = treehash.hash_tree(tmp_path, use_cache=True)
+    assert changed != expected
+    assert changed == treehash.hash_tree(tmp_path)
+
+    # Deleted files are dropped from the cache
+    (tmp_path / "sub" / "file3.txt").unlink()
+    treehash.hash_tree(tmp_path, use_cache=True)
+    assert set(treehash.HashCache(tmp_path).entries) == {"file1.txt", "sub/file2.txt"}
+
+
+def test_hash_tree_cache_racy(tmp_path: pathlib.Path):
+    (tmp_path / "file1.txt").write_bytes(b"file1")
+    expected = treehash.hash_tree(tmp_path)
+
+    assert treehash.hash_tree(tmp_path, use_cache=True) == expected
+    # The file was modified too recently for its hash to be cached
+    assert treehash.HashCache(tmp_path).entries == {}
+
+
+def test_hash_tree_cache_invalid(tmp_path: pathlib.Path):
+    write_files(tmp_path, {"file1.txt": b"file1"}, 1_700_000_000_000_000_000)
+    (tmp_path / treehash.CACHE_FILENAME).write_text("not json")
+    expected = treehash.hash_tree(tmp_path)
+
+    assert treehash.hash_tree(tmp_path, use_cache=True) == expected
+    assert set(treehash.HashCache(tmp_path).entries) == {"file1.txt"}
@@ -191,3 +191,64 @@ mode="NULLABLE"
             "CREATE OR REPLACE FUNCTION `test.dataset.test_routine`() RETURNS INT64 AS ( 1 )",
         ),
     }
+
+
+def test_topological_levels():
+    def dfn(name, *depends_on):
+        return update_schema.SchemaDefinition(
+            id=SchemaId("project", "dataset", name),
+            type=SchemaType.view,
+            sql="",
+            depends_on={SchemaId("project", "dataset", item) for item in depends_on},
+        )
+
+    nodes = {
+        node.id: node
+        for node in [
+            dfn("d", "b", "c"),
+            dfn("a"),
+            dfn("b", "a"),
+            dfn("c"),
+            dfn("e", "a", "d"),
+        ]
+    }
+
+    levels = update_schema.topological_levels(nodes)
+
+    assert [{node.id.name for node in level} for level in levels] == [
+        {"a", "c"},
+        {"b"},
+        {"d"},
+        {"e"},
+    ]
+
+
+def test_get_current_schemas(bq_client):
+    datasets = [DatasetId("project", name) for name in ["first", "missing", "second"]]
+
+    def list_tables(dataset):
+        if dataset == "project.missing":
+            raise ValueError("Not found")
+        return [
+            update_schema.bigquery.Table(f"{dataset}.table"),
+        ]
+
+    def list_routines(dataset):
+        return [update_schema.bigquery.Routine(f"{dataset}.routine")]
+
+    bq_client.client.list_tables = list_tables
+    bq_client.client.list_routines = list_routines
+    bq_client.client.get_table = lambda table: update_schema.bigquery.Table(table)
+
+    schemas = update_schema.get_current_schemas(
+        bq_client, datasets, need_datasets=set(), max_workers=3
+    )
+
+    assert set(schemas.tables) == {
+        SchemaId("project", "first", "table"),
+        SchemaId("project", "second", "table"),
+    }
+    assert set(schemas.routines) == {
+        SchemaId("project", "first", "routine"),
+        SchemaId("project", "second", "routine"),
+    }
@@ -1,4 +1,37 @@
-from webcompat_kb.etl.web_bugs import BodyData, ConfigurationValue, WebBugsRepo
+import json
+from datetime import UTC, datetime
+
+import pytest
+
+from webcompat_kb.etl.web_bugs import (
+    BigQueryService,
+    BodyData,
+    ConfigurationValue,
+    WebBugsRepo,
+    load_from_file,
+)
+
+
+def issue_data(number, updated_at, title="Example issue", milestone=None):
+    url = f"https://api.github.com/repos/webcompat/web-bugs/issues/{number}"
+    return {
+        "comments": 0,
+        "comments_url": f"{url}/comments",
+        "events_url": f"{url}/events",
+        "html_url": f"https://github.com/webcompat/web-bugs/issues/{number}",
+        "id": number,
+        "labels": ["browser-firefox"],
+        "labels_url": f"{url}/labels",
+        "milestone": milestone,
+        "number": number,
+        "repository_url": "https://api.github.com/repos/webcompat/web-bugs",
+        "state": "open",
+        "title": title,
+        "url": url,
+        "body": "<!-- @reported_with: desktop-reporter -->\n**URL**: https://example.org/",
+        "created_at": "2025-01-01T00:00:00Z",
+        "updated_at": updated_at.isoformat(),
+    }
 
 
 def test_parse_issue_body_webcompat():
@@ -119,3 +152,66 @@ Google informs me that only Chrome supports U2F and to change web browser
         screenshot="https://pbs.twimg.com/media/DJxw9baVYAAzdXi.jpg",
         configuration=[],
     )
+
+
+@pytest.mark.parametrize("max_workers", [1, 2])
+def test_load_from_file(tmp_path, monkeypatch, project, bq_client, max_workers):
+    monkeypatch.setattr("webcompat_kb.etl.web_bugs.BACKFILL_CHUNK_LINES", 3)
+    private_milestone = {
+        "id": 8,
+        "url": "https://api.github.com/repos/webcompat/web-bugs/milestones/8",
+        "html_url": "https://github.com/webcompat/web-bugs/milestone/8",
+        "labels_url": "https://api.github.com/repos/webcompat/web-bugs/milestones/8/labels",
+        "number": 8,
+        "state": "open",
+        "title": "invalid",
+        "description": None,
+        "creator": {"login": "webcompat-bot", "id": 1},
+        "open_issues": 0,
+        "closed_issues": 1,
+        "created_at": "2020-01-01T00:00:00Z",
+        "updated_at": "2020-01-01T00:00:00Z",
+        "closed_at": None,
+        "due_on": None,
+    }
+    issues = [issue_data(i, datetime(2025, 1, i, tzinfo=UTC)) for i in range(1, 10)]
+    # Private issues are skipped but still count towards the source time
+    issues.append(
+        issue_data(
+            10,
+            datetime(2025, 2, 1, tzinfo=UTC),
+            title="Issue closed.",
+            milestone=private_milestone,
+        )
+    )
+    path = tmp_path / "issues.jsonl"
+    path.write_text("".join(json.dumps(item) + "\n" for item in issues))
+
+    table = project["web_bugs"]["web_bugs"].table()
+    repo = WebBugsRepo(None, table)
+    source_time = load_from_file(
+        BigQueryService(project, bq_client), repo, path, max_workers=max_workers
+    )
+
+    assert source_time == datetime(2025, 2, 1, tzinfo=UTC)
+
+    client = bq_client.client
+    loaded = [
+        json.loads(line) for data in client.loaded_data for line in data.splitlines()
+    ]
+    assert [row["number"] for row in loaded] == list(range(1, 10))
+    assert loaded[0]["source"] == "desktop-reporter"
+    # All the rows are loaded into the staging table with one load job
+    assert len(client.loaded_data) == 1
+
+    queries = [
+        call.arguments["query"] for call in client.called if call.function == "query"
+    ]
+    assert len(queries) == 1
+    assert queries[0].startswith(f"MERGE `{table.id}` AS target")
+    assert "PARTITION BY `number` ORDER BY updated_at DESC" in queries[0]
+    assert [call.function for call in client.called if call.function != "query"] == [
+        "create_table",
+        "load_table_from_file",
+        "delete_table",
+    ]
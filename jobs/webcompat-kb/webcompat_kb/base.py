@@ -10,6 +10,7 @@ from typing import Any, MutableMapping, Optional
 
 from google.auth import exceptions as auth_exceptions
 
+from . import httphelpers
 from .bqhelpers import BigQuery, SchemaId
 from .config import Config
 from .projectdata import Project, TableSchema
@@ -88,6 +89,21 @@ class Command(ABC):
             help="GitHub token",
         )
 
+        parser.add_argument(
+            "--http-cache-dir",
+            type=pathlib.Path,
+            default=httphelpers.default_cache_dir(),
+            help="Directory for cached HTTP responses, which are revalidated with ETags",
+        )
+
+        parser.add_argument(
+            "--no-http-cache",
+            dest="http_cache",
+            action="store_false",
+            default=True,
+            help="Don't cache HTTP responses",
+        )
+
         parser.add_argument(
             "--pdb", action="store_true", help="Drop into debugger on execption"
         )
@@ -104,6 +120,11 @@ class Command(ABC):
         log_level = args.log_level.upper() if "log_level" in args else "INFO"
         logging.getLogger().setLevel(logging.getLevelNamesMapping()[log_level])
 
+        http_cache_dir = (
+            args.http_cache_dir if getattr(args, "http_cache", False) else None
+        )
+        http_client = httphelpers.configure(http_cache_dir)
+
         rv: Optional[int] = 1
         try:
             rv = self.main(args)
@@ -119,6 +140,9 @@ gcloud auth login --enable-gdrive-access --update-adc
                 pdb.post_mortem()
             else:
                 raise
+        finally:
+            if http_client.stats.requests:
+                logging.info(f"HTTP: {http_client.stats}")
         if rv:
             sys.exit(rv)
 
@@ -153,6 +177,14 @@ class EtlJob(ABC):
                     rv.add(schema.id)
         return rv
 
+    def inputs(self, project: Project) -> Optional[set[SchemaId]]:
+        """Tables, views and routines read by this job.
+
+        Anything referenced by the views and routines is included automatically.
+        None means that the inputs aren't known, so the job is never run concurrently
+        with other jobs."""
+        return None
+
     def required_args(self) -> set[str | tuple[str, str]]:
         return set()
 
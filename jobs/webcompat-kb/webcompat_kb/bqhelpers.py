@@ -1,11 +1,17 @@
 import enum
+import itertools
+import json
 import logging
+import tempfile
+import time
 import uuid
 from abc import ABC, abstractmethod
+from collections import defaultdict
 from dataclasses import dataclass
-from datetime import datetime
+from datetime import date, datetime
+from decimal import Decimal
 from types import TracebackType
-from typing import Any, Iterable, Iterator, Mapping, Optional, Self, Sequence, cast
+from typing import IO, Any, Iterable, Iterator, Mapping, Optional, Self, Sequence, cast
 
 import google.auth
 from google.cloud import bigquery
@@ -13,6 +19,15 @@ from google.cloud import bigquery
 from .httphelpers import Json
 
 
+# Number of rows serialized at a time when writing load job data
+LOAD_CHUNK_ROWS = 10000
+# insert_rows payloads with more rows than this are written with a load job
+STREAMING_MAX_ROWS = 10000
+# Limits for a single streaming insert request
+STREAMING_BATCH_ROWS = 500
+STREAMING_BATCH_BYTES = 5 * 1024 * 1024
+
+
 def get_client(bq_project_id: str) -> bigquery.Client:
     credentials, _ = google.auth.default(
         scopes=[
@@ -129,6 +144,96 @@ class SchemaId:
         return cls(project, dataset, name)
 
 
+@dataclass
+class WriteStats:
+    """Counters for the data written to a single table"""
+
+    rows: int = 0
+    bytes: int = 0
+    load_jobs: int = 0
+    streaming_requests: int = 0
+    latency: float = 0
+
+    def __str__(self) -> str:
+        return (
+            f"{self.rows} rows, {self.bytes} bytes, {self.load_jobs} load jobs, "
+            f"{self.streaming_requests} streaming requests, {self.latency:.2f}s"
+        )
+
+
+@dataclass
+class UpsertResult:
+    """Counts for a single upsert.
+
+    In dry-run mode these are the counts that the MERGE would have had."""
+
+    rows: int = 0
+    affected: int = 0
+    inserted: int = 0
+    updated: int = 0
+    deleted: int = 0
+
+    def __str__(self) -> str:
+        return (
+            f"{self.rows} input rows, {self.affected} affected "
+            f"({self.inserted} inserted, {self.updated} updated, "
+            f"{self.deleted} deleted)"
+        )
+
+
+def json_default(value: Any) -> Json:
+    """Serialize values that aren't natively supported by json.dumps"""
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return str(value)
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def encode_row(row: Mapping[str, Any]) -> bytes:
+    return json.dumps(row, ensure_ascii=False, default=json_default).encode("utf8")
+
+
+def write_ndjson(
+    rows: Iterable[Mapping[str, Any]], file_obj: IO[bytes], chunk_size: int
+) -> tuple[int, int]:
+    """Write rows to file_obj as newline-delimited JSON.
+
+    Rows are consumed in chunks of chunk_size, so only one chunk of encoded
+    data is held in memory at once.
+
+    :returns: A tuple of (number of rows, number of bytes) written."""
+    row_count = 0
+    byte_count = 0
+    rows_iter = iter(rows)
+    while chunk := list(itertools.islice(rows_iter, chunk_size)):
+        data = b"".join(encode_row(row) + b"\n" for row in chunk)
+        file_obj.write(data)
+        row_count += len(chunk)
+        byte_count += len(data)
+    return row_count, byte_count
+
+
+def streaming_batches(
+    rows: Iterable[Mapping[str, Any]], max_rows: int, max_bytes: int
+) -> Iterator[tuple[list[Mapping[str, Any]], int]]:
+    """Split rows into batches that fit within the streaming insert limits
+
+    :returns: An iterator of (rows, approximate size in bytes) for each batch."""
+    batch: list[Mapping[str, Any]] = []
+    batch_bytes = 0
+    for row in rows:
+        row_bytes = len(encode_row(row))
+        if batch and (len(batch) >= max_rows or batch_bytes + row_bytes > max_bytes):
+            yield batch, batch_bytes
+            batch = []
+            batch_bytes = 0
+        batch.append(row)
+        batch_bytes += row_bytes
+    if batch:
+        yield batch, batch_bytes
+
+
 class SchemaType(enum.StrEnum):
     table = "table"
     view = "view"
@@ -378,6 +483,7 @@ class BigQuery:
         self.default_dataset_id = default_dataset_id
         self.write = write
         self.write_targets = write_targets
+        self.write_stats: defaultdict[SchemaId, WriteStats] = defaultdict(WriteStats)
 
     def get_dataset_id(
         self, dataset_id: Optional[str | Dataset | DatasetId]
@@ -565,39 +671,79 @@ class BigQuery:
         self,
         table: bigquery.Table | str | SchemaId | TableSchema,
         schema: Sequence[bigquery.SchemaField],
-        rows: Sequence[Mapping[str, Json]],
+        rows: Iterable[Mapping[str, Json]],
         overwrite: bool,
         dataset_id: Optional[str] = None,
     ) -> None:
+        """Write rows to a table using a single load job.
+
+        The rows are serialized as newline-delimited JSON into a temporary file,
+        so rows can be passed as an iterator without all of them being held
+        in memory at once."""
         table_id = self.get_table_id(dataset_id, table)
 
         self.check_write_target(table_id)
 
+        if self.write:
+            row_count = self._load_rows(
+                table_id,
+                schema,
+                rows,
+                "WRITE_APPEND" if not overwrite else "WRITE_TRUNCATE",
+            )
+            logging.info(f"Wrote {row_count} records into {table}")
+        else:
+            row_count = self._log_skipped_rows(rows)
+            logging.info(f"Skipping writes, would have written {row_count} to {table}")
+
+    def _load_rows(
+        self,
+        table_id: SchemaId,
+        schema: Sequence[bigquery.SchemaField],
+        rows: Iterable[Mapping[str, Any]],
+        write_disposition: str,
+    ) -> int:
         job_config = bigquery.LoadJobConfig(
             source_format=bigquery.SourceFormat.NEWLINE_DELIMITED_JSON,
             schema=schema,
-            write_disposition="WRITE_APPEND" if not overwrite else "WRITE_TRUNCATE",
+            write_disposition=write_disposition,
         )
 
-        if self.write:
-            job = self.client.load_table_from_json(
-                cast(Iterable[dict[str, Any]], rows),
-                str(table_id),
-                job_config=job_config,
-            )
-            job.result()
-            logging.info(f"Wrote {len(rows)} records into {table}")
-        else:
-            logging.info(f"Skipping writes, would have written {len(rows)} to {table}")
-            for row in rows:
-                logging.debug(f"  {row}")
+        start = time.monotonic()
+        with tempfile.TemporaryFile() as f:
+            row_count, byte_count = write_ndjson(rows, f, LOAD_CHUNK_ROWS)
+            f.flush()
+            # load_table_from_file only accepts files opened in "rb" mode
+            with open(f.fileno(), "rb", closefd=False) as data:
+                job = self.client.load_table_from_file(
+                    data, str(table_id), rewind=True, job_config=job_config
+                )
+                job.result()
+
+        stats = self.write_stats[table_id]
+        stats.rows += row_count
+        stats.bytes += byte_count
+        stats.load_jobs += 1
+        stats.latency += time.monotonic() - start
+        return row_count
+
+    def _log_skipped_rows(self, rows: Iterable[Mapping[str, Any]]) -> int:
+        row_count = 0
+        for row in rows:
+            logging.debug(f"  {row}")
+            row_count += 1
+        return row_count
 
     def insert_rows(
         self,
         table: str | bigquery.Table | SchemaId | TableSchema,
-        rows: Sequence[Mapping[str, Any]],
+        rows: Iterable[Mapping[str, Any]],
         dataset_id: Optional[str] = None,
     ) -> None:
+        """Append rows to a table.
+
+        Small inputs are sent using batched streaming inserts. If there are more than
+        STREAMING_MAX_ROWS rows they are instead written using a single load job."""
         table_id = self.get_table_id(dataset_id, table)
 
         self.check_write_target(table_id)
@@ -607,18 +753,44 @@ class BigQuery:
         if isinstance(table, TableSchema):
             table = table.bq()
 
-        if not rows:
+        rows_iter = iter(rows)
+        initial_rows = list(itertools.islice(rows_iter, STREAMING_MAX_ROWS + 1))
+
+        if not initial_rows:
             logging.warning(f"No data to insert into {table}")
             return
 
-        if self.write:
-            errors = self.client.insert_rows(table, rows)
+        if not self.write:
+            row_count = self._log_skipped_rows(itertools.chain(initial_rows, rows_iter))
+            logging.info(f"Skipping writes, would have written {row_count} to {table}")
+            return
+
+        if len(initial_rows) > STREAMING_MAX_ROWS:
+            row_count = self._load_rows(
+                table_id,
+                table.schema,
+                itertools.chain(initial_rows, rows_iter),
+                "WRITE_APPEND",
+            )
+            logging.info(f"Wrote {row_count} records into {table}")
+            return
+
+        stats = self.write_stats[table_id]
+        for batch, batch_bytes in streaming_batches(
+            initial_rows, STREAMING_BATCH_ROWS, STREAMING_BATCH_BYTES
+        ):
+            start = time.monotonic()
+            errors = self.client.insert_rows(table, batch)
+            stats.latency += time.monotonic() - start
+            stats.streaming_requests += 1
+            stats.rows += len(batch)
+            stats.bytes += batch_bytes
             if errors:
                 logging.error(errors)
-        else:
-            logging.info(f"Skipping writes, would have written {len(rows)} to {table}")
-            for row in rows:
-                logging.debug(f"  {row}")
+
+    def log_write_stats(self) -> None:
+        for table_id, stats in self.write_stats.items():
+            logging.info(f"Write stats for {table_id}: {stats}")
 
     def insert_query(
         self,
@@ -717,6 +889,132 @@ WHERE {condition}
             if count:
                 logging.info(f"Would delete {count} rows from {table_id}")
 
+    def upsert(
+        self,
+        table: str | bigquery.Table | SchemaId | TableSchema,
+        rows: Iterable[Mapping[str, Any]],
+        key: Sequence[str],
+        dataset_id: Optional[str] = None,
+        order_by: Optional[str] = None,
+        delete_condition: Optional[str] = None,
+        parameters: Optional[Sequence[bigquery.query._AbstractQueryParameter]] = None,
+    ) -> UpsertResult:
+        """Insert rows into a table, replacing any existing rows with the same key.
+
+        The rows are loaded into a temporary table next to the target, and then
+        applied with a single MERGE statement, so there's no point at which
+        replaced rows are missing from the table. In dry-run mode the rows are
+        still loaded into the temporary table, but only used to count the rows
+        that would change.
+
+        :param key: Columns that identify a row.
+        :param order_by: ORDER BY expression used to pick the input row to keep
+                         when several have the same key e.g. "updated_at DESC".
+                         Otherwise an arbitrary one is kept.
+        :param delete_condition: If set, rows in the target table that aren't in
+                                 the input and match this condition are deleted.
+                                 The target table is referred to as "target".
+                                 Nothing is deleted if there are no input rows,
+                                 so an empty fetch can't empty the table.
+        :param parameters: Parameters used in delete_condition.
+        :returns: Counts of the input rows and of the rows changed by the MERGE."""
+        table_id = self.get_table_id(dataset_id, table)
+
+        self.check_write_target(table_id)
+
+        result = UpsertResult()
+        rows_iter = iter(rows)
+        first_row = next(rows_iter, None)
+        if first_row is None:
+            logging.info(f"No rows to upsert into {table_id}")
+            return result
+
+        schema = (
+            table.schema
+            if isinstance(table, TableSchema)
+            else self.get_table(table_id).schema
+        )
+        columns = [field.name for field in schema]
+        value_columns = [column for column in columns if column not in key]
+        key_columns = ", ".join(f"`{column}`" for column in key)
+
+        with self.temporary_table(schema, dataset_id=table_id.dataset_id) as staging:
+            result.rows = staging.write_rows(itertools.chain([first_row], rows_iter))
+
+            source_query = f"""SELECT * FROM `{staging.id}`
+WHERE TRUE
+QUALIFY ROW_NUMBER() OVER (
+  PARTITION BY {key_columns} ORDER BY {order_by or key_columns}
+) = 1"""
+
+            if self.write:
+                on_clause = " AND ".join(
+                    f"target.`{column}` = source.`{column}`" for column in key
+                )
+                merge_query = f"""MERGE `{table_id}` AS target
+USING ({source_query}) AS source
+ON {on_clause}"""
+                # If every column is part of the key, matched rows are already
+                # identical, and there's nothing to update
+                if value_columns:
+                    set_clause = ",\n    ".join(
+                        f"target.`{column}`=source.`{column}`"
+                        for column in value_columns
+                    )
+                    merge_query += f"""
+WHEN MATCHED THEN
+  UPDATE SET
+    {set_clause}"""
+                merge_query += f"""
+WHEN NOT MATCHED THEN
+  INSERT ({", ".join(f"`{column}`" for column in columns)})
+  VALUES ({", ".join(f"source.`{column}`" for column in columns)})"""
+                if delete_condition is not None:
+                    merge_query += f"""
+WHEN NOT MATCHED BY SOURCE AND {delete_condition} THEN
+  DELETE"""
+
+                job_config = bigquery.QueryJobConfig(
+                    default_dataset=str(self.get_dataset_id(dataset_id)),
+                )
+                if parameters is not None:
+                    job_config.query_parameters = parameters
+                logging.debug(merge_query)
+                job = self.client.query(merge_query, job_config=job_config)
+                job.result()
+                result.affected = job.num_dml_affected_rows or 0
+                if job.dml_stats is not None:
+                    result.inserted = job.dml_stats.inserted_row_count
+                    result.updated = job.dml_stats.updated_row_count
+                    result.deleted = job.dml_stats.deleted_row_count
+                logging.info(f"Upserted into {table_id}: {result}")
+            else:
+                deletable = (
+                    f"({delete_condition})" if delete_condition is not None else "FALSE"
+                )
+                join = "FULL OUTER" if delete_condition is not None else "LEFT"
+                updatable = "target._upsert_present" if value_columns else "FALSE"
+                count_query = f"""SELECT
+  COUNTIF(target._upsert_present IS NULL) AS inserted,
+  COUNTIF(source._upsert_present AND {updatable}) AS updated,
+  COUNTIF(source._upsert_present IS NULL AND target._upsert_deletable) AS deleted
+FROM (SELECT TRUE AS _upsert_present, {key_columns} FROM ({source_query})) AS source
+{join} JOIN (
+  SELECT TRUE AS _upsert_present, {deletable} AS _upsert_deletable, {key_columns}
+  FROM `{table_id}` AS target
+) AS target
+USING ({key_columns})"""
+                counts = next(self.query(count_query, parameters=parameters))
+                result.inserted = counts.inserted
+                result.updated = counts.updated
+                result.deleted = counts.deleted
+                result.affected = result.inserted + result.updated + result.deleted
+                logging.info(
+                    f"Skipping writes, would have upserted into {table_id}: {result}"
+                )
+
+        return result
+
     def get_routine(
         self, routine_id: str | SchemaId | RoutineSchema
     ) -> bigquery.Routine:
@@ -894,6 +1192,22 @@ class TemporaryTable:
         self.client.client.delete_table(self.table)
         self.table = None
 
+    @property
+    def id(self) -> SchemaId:
+        return self.client.get_table_id(self.dataset_id, self.name)
+
+    def write_rows(self, rows: Iterable[Mapping[str, Any]]) -> int:
+        """Append rows to the temporary table using a load job.
+
+        Unlike the rows passed to the constructor these are streamed through a
+        temporary file, so they don't all need to be held in memory."""
+        assert self.table is not None
+        row_count = self.client._load_rows(
+            self.id, list(self.schema), rows, "WRITE_APPEND"
+        )
+        logging.info(f"Wrote {row_count} records into {self.name}")
+        return row_count
+
     def query(
         self,
         query: str,
@@ -0,0 +1,259 @@
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from dataclasses import dataclass
+from typing import Callable, Iterable, Mapping, Optional, TypeVar
+
+import bugdantic
+import httpx
+
+from .httphelpers import retry_time
+
+T = TypeVar("T")
+
+BugzillaBug = bugdantic.bugzilla.Bug
+
+# Attribute of the bugdantic client holding the fetcher its hooks report to
+FETCHER_ATTR = "_webcompat_kb_fetcher"
+
+
+class RateLimitedError(Exception):
+    def __init__(self, url: str, delay: float):
+        super().__init__(f"Rate limited fetching {url}, retry after {delay:.0f}s")
+        self.delay = delay
+
+
+@dataclass
+class FetchStats:
+    requests: int = 0
+    rate_limited: int = 0
+    failures: int = 0
+    bytes: int = 0
+    latency: float = 0
+    max_latency: float = 0
+
+    def __str__(self) -> str:
+        mean_latency = self.latency / self.requests if self.requests else 0
+        return (
+            f"{self.requests} requests, {self.bytes} bytes, "
+            f"{self.rate_limited} rate limited, {self.failures} failed, "
+            f"latency mean {mean_latency:.2f}s max {self.max_latency:.2f}s"
+        )
+
+
+class BugzillaFetcher:
+    """Fetch bugs from Bugzilla using a bounded pool of concurrent requests.
+
+    Every HTTP request made by the Bugzilla client goes through a shared rate
+    limiter. When Bugzilla responds with a 429 all workers pause until the
+    Retry-After time, and the spacing between requests is doubled. The spacing
+    decays again as requests succeed. Chunks are retried independently, so a
+    failing chunk doesn't hold up the others."""
+
+    def __init__(
+        self,
+        bz_client: Optional[bugdantic.Bugzilla],
+        max_workers: int = 4,
+        max_attempts: int = 5,
+        initial_backoff: float = 1,
+        max_backoff: float = 60,
+    ):
+        self.bz_client = bz_client
+        self.max_workers = max_workers
+        self.max_attempts = max_attempts
+        self.initial_backoff = initial_backoff
+        self.max_backoff = max_backoff
+        self.stats = FetchStats()
+
+        self._lock = threading.Lock()
+        # Minimum time between starting requests, adapted based on 429 responses
+        self._interval = 0.0
+        # Monotonic time at which the next request may be sent
+        self._next_request_at = 0.0
+
+        if bz_client is not None:
+            # The hooks are installed once per client, and call whichever
+            # fetcher was created for it most recently
+            if getattr(bz_client, FETCHER_ATTR, None) is None:
+                event_hooks = bz_client.client.event_hooks
+                event_hooks["request"] = [
+                    *event_hooks["request"],
+                    lambda request: getattr(bz_client, FETCHER_ATTR)._on_request(
+                        request
+                    ),
+                ]
+                event_hooks["response"] = [
+                    *event_hooks["response"],
+                    lambda response: getattr(bz_client, FETCHER_ATTR)._on_response(
+                        response
+                    ),
+                ]
+                bz_client.client.event_hooks = event_hooks
+            setattr(bz_client, FETCHER_ATTR, self)
+
+    @classmethod
+    def for_client(cls, bz_client: Optional[bugdantic.Bugzilla]) -> "BugzillaFetcher":
+        """Return the fetcher already created for bz_client, or a new one."""
+        fetcher = getattr(bz_client, FETCHER_ATTR, None)
+        if fetcher is not None:
+            return fetcher
+        return cls(bz_client)
+
+    def _on_request(self, request: httpx.Request) -> None:
+        with self._lock:
+            now = time.monotonic()
+            start = max(now, self._next_request_at)
+            self._next_request_at = start + self._interval
+        if start > now:
+            time.sleep(start - now)
+        request.extensions["fetch_start"] = time.monotonic()
+
+    def _on_response(self, response: httpx.Response) -> None:
+        response.read()
+        latency = time.monotonic() - response.request.extensions["fetch_start"]
+        with self._lock:
+            self.stats.requests += 1
+            self.stats.bytes += len(response.content)
+            self.stats.latency += latency
+            self.stats.max_latency = max(self.stats.max_latency, latency)
+
+            if response.status_code != 429:
+                self._interval = self._interval / 2 if self._interval > 0.05 else 0
+                return
+
+            self.stats.rate_limited += 1
+            resume_at = retry_time(response)
+            if resume_at is not None:
+                delay = max(resume_at.timestamp() - time.time(), 0)
+            else:
+                delay = self.initial_backoff
+            self._interval = min(
+                max(self._interval * 2, self.initial_backoff), self.max_backoff
+            )
+            self._next_request_at = max(self._next_request_at, time.monotonic() + delay)
+        raise RateLimitedError(str(response.url), delay)
+
+    def backoff_delay(self, attempt: int) -> float:
+        return min(self.initial_backoff * 2 ** (attempt - 1), self.max_backoff)
+
+    def call(self, fn: Callable[[], T], description: str) -> T:
+        """Call fn, retrying with exponential backoff if it fails."""
+        attempt = 0
+        while True:
+            attempt += 1
+            try:
+                return fn()
+            except RateLimitedError as e:
+                # The rate limiter already delays the next request
+                if attempt >= self.max_attempts:
+                    raise
+                logging.warning(f"{description}: {e}")
+            except Exception as e:
+                with self._lock:
+                    self.stats.failures += 1
+                if attempt >= self.max_attempts:
+                    raise
+                delay = self.backoff_delay(attempt)
+                logging.warning(f"{description} failed, retrying in {delay:.0f}s:\n{e}")
+                time.sleep(delay)
+
+    def search(
+        self,
+        query: Mapping[str, str | list[str]],
+        include_fields: list[str],
+        page_size: int = 200,
+    ) -> list[BugzillaBug]:
+        assert self.bz_client is not None
+        bz_client = self.bz_client
+        return self.call(
+            lambda: bz_client.search(
+                query=query, include_fields=include_fields, page_size=page_size
+            ),
+            "Bugzilla search",
+        )
+
+    def fetch_chunk(
+        self, bug_ids: list[int], include_fields: list[str], require_all: bool
+    ) -> tuple[Mapping[int, BugzillaBug], set[int]]:
+        """Fetch a single chunk of bugs.
+
+        :returns: A tuple of (bugs by id, ids that could not be fetched). Missing ids
+                  are only retried and reported if require_all is set, since
+                  otherwise they might be bugs we don't have access to."""
+        assert self.bz_client is not None
+        bz_client = self.bz_client
+        bugs: dict[int, BugzillaBug] = {}
+        remaining = bug_ids
+        for attempt in range(1, self.max_attempts + 1):
+            results = self.call(
+                lambda: bz_client.search(
+                    query={"id": [str(item) for item in remaining]},
+                    include_fields=include_fields,
+                    # A page size larger than the chunk ensures a single request
+                    page_size=len(remaining) + 1,
+                ),
+                f"Fetching bugs {remaining[0]}-{remaining[-1]}",
+            )
+            for bug in results:
+                assert bug.id is not None
+                bugs[bug.id] = bug
+
+            remaining = [item for item in remaining if item not in bugs]
+            if not remaining or not require_all:
+                break
+
+            if attempt < self.max_attempts:
+                delay = self.backoff_delay(attempt)
+                logging.info(
+                    f"Retrying {len(remaining)} bugs missing from response in {delay:.0f}s"
+                )
+                time.sleep(delay)
+
+        return bugs, set(remaining) if require_all else set()
+
+    def fetch_bugs(
+        self,
+        bug_ids: Iterable[int],
+        include_fields: list[str],
+        chunk_size: int = 200,
+        require_all: bool = False,
+    ) -> tuple[Mapping[int, BugzillaBug], set[int]]:
+        """Fetch bugs by id, running up to max_workers chunks concurrently.
+
+        :returns: A tuple of (bugs by id, ids that failed to fetch)."""
+        ids_list = list(dict.fromkeys(bug_ids))
+        chunks = [
+            ids_list[offset : offset + chunk_size]
+            for offset in range(0, len(ids_list), chunk_size)
+        ]
+
+        bugs: dict[int, BugzillaBug] = {}
+        failed: set[int] = set()
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            futures = {
+                executor.submit(self.fetch_chunk, chunk, include_fields, require_all): (
+                    chunk
+                )
+                for chunk in chunks
+            }
+            for i, future in enumerate(as_completed(futures)):
+                chunk = futures[future]
+                try:
+                    chunk_bugs, chunk_failed = future.result()
+                except Exception as e:
+                    logging.error(
+                        f"Failed to fetch bugs {','.join(str(item) for item in chunk)}: {e}"
+                    )
+                    failed |= set(chunk)
+                    continue
+                bugs.update(chunk_bugs)
+                failed |= chunk_failed
+                logging.info(
+                    f"Fetched {len(chunk_bugs)} bugs from bugzilla ({i + 1}/{len(chunks)})"
+                )
+
+        return bugs, failed
+
+    def log_stats(self) -> None:
+        logging.info(f"Bugzilla fetch stats: {self.stats}")
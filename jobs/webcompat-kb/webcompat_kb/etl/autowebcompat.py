@@ -25,7 +25,7 @@ from google.cloud import bigquery
 from pydantic import BaseModel, Field, RootModel
 
 from ..base import Context, EtlJob
-from ..bqhelpers import BigQuery
+from ..bqhelpers import BigQuery, SchemaId
 from ..projectdata import Project
 from ..hackbot import (
     ArtifactRef,
@@ -1220,6 +1220,11 @@ class AutowebcompatJob(EtlJob):
     def default_dataset(self, context: Context) -> str:
         return "autowebcompat"
 
+    def inputs(self, project: Project) -> set[SchemaId]:
+        return {schema.id for schema in project["autowebcompat"]} | {
+            project["webcompat_knowledge_base"]["site_reports"].id
+        }
+
     def main(self, context: Context) -> bool:
         bz_config = bugzilla.BugzillaConfig(
             "https://bugzilla.mozilla.org",
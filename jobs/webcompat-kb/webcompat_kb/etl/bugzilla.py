@@ -7,6 +7,7 @@ import re
 import time
 from typing import (
     Any,
+    Callable,
     Iterable,
     Iterator,
     MutableMapping,
@@ -19,10 +20,12 @@ from dataclasses import dataclass
 from datetime import datetime, timedelta
 
 import bugdantic
+import pyarrow as pa
 from google.cloud import bigquery
 
 from ..base import Context, EtlJob
-from ..bqhelpers import BigQuery, TableSchema
+from ..bqhelpers import BigQuery, SchemaId, TableSchema
+from ..bzhelpers import BugzillaFetcher
 from ..projectdata import Project
 
 
@@ -248,6 +251,40 @@ MutBugsById = MutableMapping[BugId, Bug]
 
 HistoryByBug = Mapping[BugId, Sequence[BugHistoryEntry]]
 
+# Bump this whenever the Bug fields change so that old snapshots are ignored
+BUG_CACHE_SNAPSHOT_VERSION = 1
+
+# Columnar representation of Bug used for writing bug data to Arrow IPC files
+BUG_ARROW_SCHEMA = pa.schema(
+    [
+        ("id", pa.int64()),
+        ("alias", pa.string()),
+        ("summary", pa.string()),
+        ("status", pa.string()),
+        ("resolution", pa.string()),
+        ("product", pa.string()),
+        ("component", pa.string()),
+        ("creator", pa.string()),
+        ("see_also", pa.list_(pa.string())),
+        ("depends_on", pa.list_(pa.int64())),
+        ("blocks", pa.list_(pa.int64())),
+        ("priority", pa.int64()),
+        ("severity", pa.int64()),
+        ("creation_time", pa.timestamp("us", tz="UTC")),
+        ("assigned_to", pa.string()),
+        ("keywords", pa.list_(pa.string())),
+        ("url", pa.string()),
+        ("user_story", pa.string()),
+        ("last_resolved", pa.timestamp("us", tz="UTC")),
+        ("last_change_time", pa.timestamp("us", tz="UTC")),
+        ("size_estimate", pa.string()),
+        ("whiteboard", pa.string()),
+        ("webcompat_priority", pa.string()),
+        ("webcompat_score", pa.int64()),
+    ]
+)
+ARROW_EXTENSIONS = {".arrow", ".feather"}
+
 BUG_QUERIES: Mapping[str, Mapping[str, str | list[str]]] = {
     "webcompat_product": {
         "component": [
@@ -436,39 +473,22 @@ def get_recursive_dependencies(
     all_bugs: Mapping[BugId, Bug],
 ) -> set[BugId]:
     """Recursively find all dependencies of the given bugs."""
-    dependency_ids = set()
-    to_process = starting_bugs.copy()
-    processed = set()
-
-    while to_process:
-        bug_id = to_process.pop()
-        if bug_id in processed:
-            continue
-        processed.add(bug_id)
-
-        if bug_id in all_bugs:
-            bug = all_bugs[bug_id]
-
-            if bug.depends_on:
-                for dep_id in bug.depends_on:
-                    dependency_ids.add(dep_id)
-                    if dep_id not in processed:
-                        to_process.add(dep_id)
-
-            if bug.blocks:
-                for block_id in bug.blocks:
-                    dependency_ids.add(block_id)
-                    if block_id not in processed:
-                        to_process.add(block_id)
-
-    return dependency_ids - starting_bugs
+    return as_graph(all_bugs).recursive_dependencies(starting_bugs)
 
 
 class BugCache(Mapping):
-    def __init__(self, bq_client: BigQuery, bz_client: bugdantic.Bugzilla):
+    def __init__(
+        self,
+        bq_client: BigQuery,
+        bz_client: Optional[bugdantic.Bugzilla],
+        fetcher: Optional[BugzillaFetcher] = None,
+    ):
         self.bq_client = bq_client
         self.bz_client = bz_client
-        self.bugs: MutBugsById = {}
+        self.fetcher = (
+            fetcher if fetcher is not None else BugzillaFetcher.for_client(bz_client)
+        )
+        self.bugs = BugGraph()
 
     def __getitem__(self, key: BugId) -> Bug:
         return self.bugs[key]
@@ -508,6 +528,70 @@ class BugCache(Mapping):
                 webcompat_score=bug.webcompat_score,
             )
 
+    def load_snapshot(self, path: str) -> Optional[datetime]:
+        """Populate the cache from a local snapshot written by write_snapshot.
+
+        :returns: The high-water mark of the snapshot i.e. the most recent
+                  last_change_time of any bug in the snapshot, or None if the
+                  snapshot couldn't be used."""
+        if not os.path.exists(path):
+            logging.info(f"No bug cache snapshot found at {path}")
+            return None
+
+        try:
+            with open(path) as f:
+                data = json.load(f)
+            if data["version"] != BUG_CACHE_SNAPSHOT_VERSION:
+                logging.warning(
+                    f"Ignoring bug cache snapshot with version {data['version']}"
+                )
+                return None
+            if data["high_water_mark"] is None:
+                return None
+            fields = data["fields"]
+            bugs = {}
+            for values in data["bugs"]:
+                bug = Bug.from_json(dict(zip(fields, values)))
+                bugs[bug.id] = bug
+            high_water_mark = datetime.fromisoformat(data["high_water_mark"])
+        except Exception as e:
+            logging.warning(f"Failed to read bug cache snapshot {path}: {e}")
+            return None
+
+        self.bugs.update(bugs)
+        logging.info(
+            f"Read {len(bugs)} bugs from snapshot {path} last changed at {high_water_mark.isoformat()}"
+        )
+        return high_water_mark
+
+    def write_snapshot(self, path: str) -> None:
+        """Write the current cache contents to a local snapshot file.
+
+        Each bug is stored as a list of values in the same order as the fields
+        list, which keeps the file compact and fast to parse."""
+        fields = list(Bug.__dataclass_fields__.keys())
+        high_water_mark = max(
+            (bug.last_change_time for bug in self.bugs.values()), default=None
+        )
+        data = {
+            "version": BUG_CACHE_SNAPSHOT_VERSION,
+            "high_water_mark": high_water_mark.isoformat()
+            if high_water_mark is not None
+            else None,
+            "fields": fields,
+            "bugs": [
+                [bug_data[field] for field in fields]
+                for bug_data in (bug.to_json() for bug in self.bugs.values())
+            ],
+        }
+        # Write to a temporary file first so an interrupted run can't leave
+        # a truncated snapshot behind
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(data, f)
+        os.replace(tmp_path, path)
+        logging.info(f"Wrote {len(self.bugs)} bugs to snapshot {path}")
+
     def bz_fetch_bugs(
         self,
         params: Optional[Mapping[str, str | list[str]]] = None,
@@ -549,14 +633,17 @@ class BugCache(Mapping):
 
         try:
             if params is not None:
-                bugs = self.bz_client.search(
-                    query=params, include_fields=fields, page_size=200
-                )
+                bugs = self.fetcher.search(params, include_fields=fields, page_size=200)
             else:
                 assert bug_ids is not None
-                bugs = self.bz_client.bugs(
-                    bug_ids, include_fields=fields, page_size=200
+                bugs_by_id, failed = self.fetcher.fetch_bugs(
+                    bug_ids, include_fields=fields, chunk_size=200
                 )
+                if failed:
+                    raise BugLoadError(
+                        f"Failed to fetch bugs {','.join(str(item) for item in failed)}"
+                    )
+                bugs = list(bugs_by_id.values())
             logging.info(f"Got {len(bugs)} bugs")
             for bug in bugs:
                 assert bug.id is not None
@@ -567,21 +654,16 @@ class BugCache(Mapping):
             raise
         return bugs_fetched
 
-    def missing_relations(self, bugs: BugsById, relation: str) -> set[BugId]:
-        related_ids = set()
-        for bug in bugs.values():
-            related_ids |= {
-                bug_id for bug_id in getattr(bug, relation) if bug_id not in self
-            }
-        return related_ids
+    def missing_relations(self) -> set[BugId]:
+        return self.bugs.missing_relations()
 
-    def into_mapping(self) -> BugsById:
-        """Convert the data into a plain dict.
+    def into_mapping(self) -> "BugGraph":
+        """Get the bug data as a BugGraph.
 
         Also reset this object, so we aren't sharing the state between multiple places
         """
         bugs = self.bugs
-        self.bugs = {}
+        self.bugs = BugGraph()
         return bugs
 
 
@@ -614,57 +696,202 @@ def is_webcompat_platform_bug(bug: Bug) -> bool:
     )
 
 
+def is_meta_bug(bug: Bug) -> bool:
+    return "meta" in bug.keywords
+
+
+class BugGraph(MutableMapping[BugId, Bug]):
+    """Bugs indexed by category and by the relations between them.
+
+    The indexes are updated as bugs are added or removed, so that queries
+    don't require a scan over all the bugs.
+
+    Relations are stored both forwards (depends_on, blocks) and in
+    reverse (dependents, blocked_by), and also include bugs that
+    aren't in the graph."""
+
+    categories: Mapping[str, Callable[[Bug], bool]] = {
+        "site_reports": is_site_report,
+        "etp_reports": is_etp_report,
+        "kb_entries": is_kb_entry,
+        "webcompat_platform_bugs": is_webcompat_platform_bug,
+        "platform_bugs": lambda bug: bug.product != "Web Compatibility",
+        "meta_bugs": is_meta_bug,
+    }
+
+    def __init__(self, bugs: Optional[BugsById] = None):
+        self.bugs: dict[BugId, Bug] = {}
+        self.site_reports: set[BugId] = set()
+        self.etp_reports: set[BugId] = set()
+        self.kb_entries: set[BugId] = set()
+        self.webcompat_platform_bugs: set[BugId] = set()
+        self.platform_bugs: set[BugId] = set()
+        self.meta_bugs: set[BugId] = set()
+
+        self.depends_on: dict[BugId, set[BugId]] = {}
+        self.blocks: dict[BugId, set[BugId]] = {}
+        self.dependents: defaultdict[BugId, set[BugId]] = defaultdict(set)
+        self.blocked_by: defaultdict[BugId, set[BugId]] = defaultdict(set)
+
+        # Related bugs that we need but aren't in the graph, mapped to the
+        # bugs that refer to them
+        self._missing: defaultdict[BugId, set[BugId]] = defaultdict(set)
+
+        if bugs is not None:
+            self.update(bugs)
+
+    def __getitem__(self, key: BugId) -> Bug:
+        return self.bugs[key]
+
+    def __setitem__(self, key: BugId, bug: Bug) -> None:
+        assert key == bug.id
+        if key in self.bugs:
+            self._unlink(self.bugs[key])
+        self.bugs[key] = bug
+        self._missing.pop(key, None)
+        self._link(bug)
+
+    def __delitem__(self, key: BugId) -> None:
+        bug = self.bugs.pop(key)
+        self._unlink(bug)
+        for referrer in self.dependents.get(key, set()) | self.blocked_by.get(
+            key, set()
+        ):
+            if key in self._required_relations(self.bugs[referrer]):
+                self._missing[key].add(referrer)
+
+    def __len__(self) -> int:
+        return len(self.bugs)
+
+    def __iter__(self) -> Iterator[BugId]:
+        yield from self.bugs
+
+    def _required_relations(self, bug: Bug) -> set[BugId]:
+        """Related bugs that have to be fetched to categorize this bug"""
+        rv = set()
+        if is_site_report(bug) or is_kb_entry(bug) or is_etp_report(bug):
+            rv |= set(bug.depends_on)
+        if is_etp_report(bug):
+            rv |= set(bug.blocks)
+        return rv
+
+    def _link(self, bug: Bug) -> None:
+        for category, predicate in self.categories.items():
+            if predicate(bug):
+                getattr(self, category).add(bug.id)
+
+        self.depends_on[bug.id] = set(bug.depends_on)
+        for dep_id in bug.depends_on:
+            self.dependents[dep_id].add(bug.id)
+        self.blocks[bug.id] = set(bug.blocks)
+        for block_id in bug.blocks:
+            self.blocked_by[block_id].add(bug.id)
+
+        for related_id in self._required_relations(bug):
+            if related_id not in self.bugs:
+                self._missing[related_id].add(bug.id)
+
+    def _unlink(self, bug: Bug) -> None:
+        for category in self.categories:
+            getattr(self, category).discard(bug.id)
+
+        for reverse, relations in [
+            (self.dependents, self.depends_on.pop(bug.id)),
+            (self.blocked_by, self.blocks.pop(bug.id)),
+        ]:
+            for related_id in relations:
+                reverse[related_id].discard(bug.id)
+                if not reverse[related_id]:
+                    del reverse[related_id]
+
+        for related_id in self._required_relations(bug):
+            if related_id in self._missing:
+                self._missing[related_id].discard(bug.id)
+                if not self._missing[related_id]:
+                    del self._missing[related_id]
+
+    def missing_relations(self) -> set[BugId]:
+        """Get bugs that are dependencies of site reports, kb entries or ETP reports,
+        or blocked by ETP reports, but aren't in the graph."""
+        return set(self._missing.keys())
+
+    def dependencies(self, bug_id: BugId) -> set[BugId]:
+        """Get the dependencies of a bug that are in the graph"""
+        return {
+            dep_id
+            for dep_id in self.depends_on.get(bug_id, set())
+            if dep_id in self.bugs
+        }
+
+    def recursive_dependencies(self, starting_bugs: set[BugId]) -> set[BugId]:
+        """Recursively find all bugs related to the given bugs via either
+        depends_on or blocks."""
+        dependency_ids = set()
+        to_process = starting_bugs.copy()
+        processed = set()
+
+        while to_process:
+            bug_id = to_process.pop()
+            processed.add(bug_id)
+            related = self.depends_on.get(bug_id, set()) | self.blocks.get(
+                bug_id, set()
+            )
+            dependency_ids |= related
+            to_process |= related - processed
+
+        return dependency_ids - starting_bugs
+
+
+def as_graph(all_bugs: BugsById) -> BugGraph:
+    return all_bugs if isinstance(all_bugs, BugGraph) else BugGraph(all_bugs)
+
+
 def get_kb_bug_core_bugs(
     all_bugs: BugsById, kb_bugs: set[BugId], platform_bugs: set[BugId]
 ) -> Mapping[BugId, set[BugId]]:
-    rv = defaultdict(set)
-    for kb_id in kb_bugs:
-        if kb_id not in platform_bugs:
-            for bug_id in all_bugs[kb_id].depends_on:
-                if bug_id in platform_bugs:
-                    rv[kb_id].add(bug_id)
+    graph = as_graph(all_bugs)
+    rv = {}
+    for kb_id in kb_bugs - platform_bugs:
+        core_bugs = graph.depends_on[kb_id] & platform_bugs
+        if core_bugs:
+            rv[kb_id] = core_bugs
     return rv
 
 
 def get_kb_bug_site_report(
     all_bugs: BugsById, kb_bugs: set[BugId], site_report_bugs: set[BugId]
 ) -> Mapping[BugId, set[BugId]]:
-    rv = defaultdict(set)
+    graph = as_graph(all_bugs)
+    rv = {}
     for kb_id in kb_bugs:
+        site_reports = graph.blocks[kb_id] & site_report_bugs
         if kb_id in site_report_bugs:
-            rv[kb_id].add(kb_id)
-        for bug_id in all_bugs[kb_id].blocks:
-            if bug_id in site_report_bugs:
-                rv[kb_id].add(bug_id)
+            site_reports.add(kb_id)
+        if site_reports:
+            rv[kb_id] = site_reports
     return rv
 
 
 def get_etp_breakage_reports(
     all_bugs: BugsById, etp_reports: set[BugId]
 ) -> Mapping[BugId, set[BugId]]:
+    graph = as_graph(all_bugs)
     rv = {}
     for bug_id in etp_reports:
-        report_bug = all_bugs[bug_id]
-        meta_bugs = {
-            meta_id
-            for meta_id in report_bug.depends_on + report_bug.blocks
-            if meta_id in all_bugs and "meta" in all_bugs[meta_id].keywords
-        }
+        meta_bugs = (graph.depends_on[bug_id] | graph.blocks[bug_id]) & graph.meta_bugs
         if meta_bugs:
             rv[bug_id] = meta_bugs
     return rv
 
 
-def get_relevant_bug_ids_from_bugzilla(bz_client: bugdantic.Bugzilla) -> set[BugId]:
+def get_relevant_bug_ids_from_bugzilla(fetcher: BugzillaFetcher) -> set[BugId]:
     logging.info("Querying Bugzilla for all bug ids that match current filter")
 
     valid_ids = set()
 
     for category, filter_config in BUG_QUERIES.items():
         try:
-            bugs = bz_client.search(
-                query=filter_config, include_fields=["id"], page_size=1000
-            )
+            bugs = fetcher.search(filter_config, include_fields=["id"], page_size=1000)
             ids = {bug.id for bug in bugs if bug.id is not None}
             valid_ids |= ids
             logging.info(f"Got {len(ids)} bug ids for {category}")
@@ -704,41 +931,46 @@ def fetch_all_bugs(
     bz_client: bugdantic.Bugzilla,
     bugs_table: TableSchema,
     last_import_time: Optional[datetime],
+    snapshot_path: Optional[str] = None,
+    fetcher: Optional[BugzillaFetcher] = None,
 ) -> BugsById:
     """Get all the bugs that should be imported into BigQuery.
 
+    If snapshot_path is set, incremental runs start from the local snapshot of
+    the bug cache rather than reading the full bugs table from BigQuery, and the
+    snapshot is updated with the result.
+
     :returns: A tuple of (all bugs, site report bugs, knowledge base bugs,
                           core bugs, ETP report bugs, ETP dependencies)."""
 
-    bug_cache = BugCache(bq_client, bz_client)
+    bug_cache = BugCache(bq_client, bz_client, fetcher)
 
+    changed_since = last_import_time
     if last_import_time is not None:
-        bug_cache.bq_fetch_bugs(bugs_table)
+        snapshot_time = (
+            bug_cache.load_snapshot(snapshot_path)
+            if snapshot_path is not None
+            else None
+        )
+        if snapshot_time is not None:
+            # The snapshot might be older than the last import, in which case
+            # we need all the changes since the snapshot was written.
+            changed_since = min(last_import_time, snapshot_time)
+        else:
+            bug_cache.bq_fetch_bugs(bugs_table)
 
-    update_changed_bugs(bug_cache, last_import_time)
-    relevant_ids = get_relevant_bug_ids_from_bugzilla(bz_client)
+    update_changed_bugs(bug_cache, changed_since)
+    relevant_ids = get_relevant_bug_ids_from_bugzilla(bug_cache.fetcher)
     fetch_new_bugs(relevant_ids, bug_cache)
 
     tried_to_fetch: set[BugId] = set()
-    missing_relations = None
     # Add a limit on how many fetches we will try
     recurse_limit = 10
     for _ in range(recurse_limit):
         # Get all blocking bugs for site reports or kb entries or etp site reports
         # This can take more than one iteration if dependencies themselves turn out
         # to be site reports that were excluded by a the date cutoff
-        missing_relations = bug_cache.missing_relations(
-            {
-                bug_id: bug
-                for bug_id, bug in bug_cache.items()
-                if is_site_report(bug) or is_kb_entry(bug) or is_etp_report(bug)
-            },
-            "depends_on",
-        )
-        missing_relations |= bug_cache.missing_relations(
-            {bug_id: bug for bug_id, bug in bug_cache.items() if is_etp_report(bug)},
-            "blocks",
-        )
+        missing_relations = bug_cache.missing_relations()
         # If we already tried to fetch a bug don't try to fetch it again
         missing_relations -= tried_to_fetch
         if not missing_relations:
@@ -755,9 +987,7 @@ def fetch_all_bugs(
             f"Failed to fetch all dependencies after {recurse_limit} attempts"
         )
 
-    dependency_ids = get_recursive_dependencies(
-        relevant_ids, {bug.id: bug for bug in bug_cache.values()}
-    )
+    dependency_ids = bug_cache.bugs.recursive_dependencies(relevant_ids)
     bugs_to_keep = relevant_ids | dependency_ids
     stale_bugs = set(bug_cache.keys()) - bugs_to_keep
 
@@ -769,6 +999,9 @@ def fetch_all_bugs(
         for bug_id in stale_bugs:
             del bug_cache.bugs[bug_id]
 
+    if snapshot_path is not None:
+        bug_cache.write_snapshot(snapshot_path)
+
     return bug_cache.into_mapping()
 
 
@@ -777,10 +1010,14 @@ class BugHistoryUpdater:
         self,
         project: Project,
         bq_client: BigQuery,
-        bz_client: bugdantic.Bugzilla,
+        bz_client: Optional[bugdantic.Bugzilla],
+        fetcher: Optional[BugzillaFetcher] = None,
     ):
         self.bq_client = bq_client
         self.bz_client = bz_client
+        self.fetcher = (
+            fetcher if fetcher is not None else BugzillaFetcher.for_client(bz_client)
+        )
         self.bugs_table = project["webcompat_knowledge_base"]["bugzilla_bugs"].table()
         self.history_table = project["webcompat_knowledge_base"]["bugs_history"].table()
 
@@ -886,56 +1123,22 @@ class BugHistoryUpdater:
         return imported_ids
 
     def bugzilla_fetch_history(self, ids: Iterable[int]) -> HistoryByBug:
-        history: dict[int, list[bugdantic.bugzilla.History]] = {}
-        chunk_size = 100
         ids_list = list(ids)
-        max_retries = 3
-
-        for retry in range(max_retries):
-            retry += 1
-            retry_ids: list[int] = []
-
-            chunks: list[list[int]] = []
-            for i in range((len(ids_list) // chunk_size) + 1):
-                offset = i * chunk_size
-                bug_ids = ids_list[offset : offset + chunk_size]
-                if bug_ids:
-                    chunks.append(bug_ids)
-
-            for i, bug_ids in enumerate(chunks):
-                logging.info(
-                    f"Fetching history from bugzilla for {','.join(str(item) for item in bug_ids)} ({i + 1}/{len(chunks)})"
-                )
-                try:
-                    results = self.bz_client.search(
-                        query={"id": bug_ids}, include_fields=["id", "history"]
-                    )
-                except Exception as e:
-                    logging.warning(f"Search request failed:\n{e}")
-                    results = []
-
-                for bug in results:
-                    assert bug.id is not None
-                    assert bug.history is not None
-                    history[bug.id] = bug.history
-
-                # Add anything missing from the response to the retry list
-                retry_ids.extend(item for item in bug_ids if item not in history)
-
-                time.sleep(1)
-
-            ids_list = retry_ids
-            if retry_ids:
-                time.sleep(10)
-                logging.info(f"Retrying {len(retry_ids)} bugs with missing history")
-            else:
-                break
+        logging.info(f"Fetching history from bugzilla for {len(ids_list)} bugs")
+        bugs, failed = self.fetcher.fetch_bugs(
+            ids_list, include_fields=["id", "history"], chunk_size=100, require_all=True
+        )
 
-        if len(ids_list) != 0:
+        if failed:
             raise BugLoadError(
-                f"Failed to fetch bug history for {','.join(str(item) for item in ids_list)}"
+                f"Failed to fetch bug history for {','.join(str(item) for item in failed)}"
             )
 
+        history: dict[int, list[bugdantic.bugzilla.History]] = {}
+        for bug_id, bug in bugs.items():
+            assert bug.history is not None
+            history[bug_id] = bug.history
+
         return self.bugzilla_to_history_entry(history)
 
     def bugzilla_to_history_entry(
@@ -1127,7 +1330,7 @@ class BigQueryImporter:
     def write_table(
         self,
         table: TableSchema,
-        rows: Sequence[Mapping[str, Any]],
+        rows: Iterable[Mapping[str, Any]],
         overwrite: bool,
     ) -> None:
         self.client.write_table(table, table.schema, rows, overwrite=overwrite)
@@ -1191,39 +1394,39 @@ WHERE is_history_fetch_completed = TRUE"""
 
     def insert_bugs(self, all_bugs: BugsById) -> None:
         table = self.project["webcompat_knowledge_base"]["bugzilla_bugs"].table()
-        rows = [self.convert_bug(bug) for bug in all_bugs.values()]
+        rows = (self.convert_bug(bug) for bug in all_bugs.values())
         self.write_table(table, rows, overwrite=True)
 
     def insert_history_changes(
         self, history_entries: HistoryByBug, recreate: bool
     ) -> None:
         table = self.project["webcompat_knowledge_base"]["bugs_history"].table()
-        rows = [
+        rows = (
             self.convert_history_entry(entry)
             for entries in history_entries.values()
             for entry in entries
-        ]
+        )
         self.write_table(table, rows, overwrite=recreate)
 
     def insert_bug_list(
         self, table_name: str, field_name: str, bugs: Iterable[BugId]
     ) -> None:
         table = self.project["webcompat_knowledge_base"][table_name].table()
-        rows = [{field_name: bug_id} for bug_id in bugs]
+        rows = ({field_name: bug_id} for bug_id in bugs)
         self.write_table(table, rows, overwrite=True)
 
     def insert_bug_links(
         self, link_config: BugLinkConfig, links_by_bug: Mapping[BugId, Iterable[BugId]]
     ) -> None:
         table = self.project["webcompat_knowledge_base"][link_config.table_name].table()
-        rows = [
+        rows = (
             {
                 link_config.from_field_name: from_bug_id,
                 link_config.to_field_name: to_bug_id,
             }
             for from_bug_id, to_bug_ids in links_by_bug.items()
             for to_bug_id in to_bug_ids
-        ]
+        )
         self.write_table(table, rows, overwrite=True)
 
     def insert_external_links(
@@ -1232,11 +1435,11 @@ WHERE is_history_fetch_completed = TRUE"""
         links_by_bug: Mapping[BugId, Iterable[str]],
     ) -> None:
         table = self.project["webcompat_knowledge_base"][link_config.table_name].table()
-        rows = [
+        rows = (
             {"knowledge_base_bug": bug_id, link_config.field_name: link_text}
             for bug_id, links in links_by_bug.items()
             for link_text in links
-        ]
+        )
         self.write_table(table, rows, overwrite=True)
 
     def record_import_run(
@@ -1265,27 +1468,21 @@ WHERE is_history_fetch_completed = TRUE"""
 
 
 def get_kb_entries(all_bugs: BugsById, site_report_blockers: set[BugId]) -> set[BugId]:
-    direct_kb_entries = {bug_id for bug_id, bug in all_bugs.items() if is_kb_entry(bug)}
+    graph = as_graph(all_bugs)
+    direct_kb_entries = set(graph.kb_entries)
     kb_blockers = {
         dependency
         for bug_id in direct_kb_entries
-        for dependency in all_bugs[bug_id].depends_on
-        if dependency in all_bugs
+        for dependency in graph.dependencies(bug_id)
     }
     # We include any bug that's blocking a site report but isn't in Web Compatibility
-    platform_site_report_blockers = {
-        bug_id
-        for bug_id in site_report_blockers
-        if bug_id not in kb_blockers and all_bugs[bug_id].product != "Web Compatibility"
-    }
+    platform_site_report_blockers = (
+        site_report_blockers - kb_blockers
+    ) & graph.platform_bugs
     # We also include all other bugs that are platform bugs but don't depend on a kb entry
     # TODO: This is probably too many bugs; platform bugs that don't block any site reports
     # should likely be excluded
-    platform_kb_entries = {
-        bug_id
-        for bug_id in all_bugs
-        if bug_id not in kb_blockers and is_webcompat_platform_bug(all_bugs[bug_id])
-    }
+    platform_kb_entries = graph.webcompat_platform_bugs - kb_blockers
     return direct_kb_entries | platform_site_report_blockers | platform_kb_entries
 
 
@@ -1293,22 +1490,84 @@ def group_bugs(
     all_bugs: BugsById,
 ) -> tuple[set[BugId], set[BugId], set[BugId], set[BugId]]:
     """Extract groups of bugs according to their types"""
-    site_reports = {bug_id for bug_id, bug in all_bugs.items() if is_site_report(bug)}
-    etp_reports = {bug_id for bug_id, bug in all_bugs.items() if is_etp_report(bug)}
+    graph = as_graph(all_bugs)
+    site_reports = set(graph.site_reports)
+    etp_reports = set(graph.etp_reports)
     site_report_blockers = {
         dependency
         for bug_id in site_reports
-        for dependency in all_bugs[bug_id].depends_on
-        # This might not be true if the dependency is a bug we can't access
-        if dependency in all_bugs
-    }
-    kb_bugs = get_kb_entries(all_bugs, site_report_blockers)
-    platform_bugs = {
-        bug_id for bug_id in all_bugs if all_bugs[bug_id].product != "Web Compatibility"
+        # This excludes dependencies that are bugs we can't access
+        for dependency in graph.dependencies(bug_id)
     }
+    kb_bugs = get_kb_entries(graph, site_report_blockers)
+    platform_bugs = set(graph.platform_bugs)
     return site_reports, etp_reports, kb_bugs, platform_bugs
 
 
+def is_arrow_path(path: str) -> bool:
+    return os.path.splitext(path)[1] in ARROW_EXTENSIONS
+
+
+def iter_bug_batches(
+    all_bugs: BugsById, batch_size: int = 10000
+) -> Iterator[pa.RecordBatch]:
+    bugs = list(all_bugs.values())
+    for offset in range(0, len(bugs), batch_size):
+        chunk = bugs[offset : offset + batch_size]
+        yield pa.RecordBatch.from_pydict(
+            {
+                field.name: [getattr(bug, field.name) for bug in chunk]
+                for field in BUG_ARROW_SCHEMA
+            },
+            schema=BUG_ARROW_SCHEMA,
+        )
+
+
+def write_bugs_arrow(
+    path: str, all_bugs: BugsById, metadata: Mapping[str, Any]
+) -> None:
+    """Write bugs to an Arrow IPC file, one record batch at a time.
+
+    Everything except the bugs themselves is small, and is stored as JSON in the
+    schema metadata."""
+    schema = BUG_ARROW_SCHEMA.with_metadata({"webcompat_kb": json.dumps(metadata)})
+    with pa.OSFile(path, "wb") as sink, pa.ipc.new_file(sink, schema) as writer:
+        for batch in iter_bug_batches(all_bugs):
+            writer.write_batch(batch)
+
+
+def read_bug_batches(
+    path: str, columns: Optional[Sequence[str]] = None
+) -> Iterator[pa.RecordBatch]:
+    """Read record batches of bug data from an Arrow IPC file.
+
+    The file is memory mapped and each batch references the mapped buffers, so
+    only the selected columns are actually read."""
+    with pa.memory_map(path) as source:
+        reader = pa.ipc.open_file(source)
+        for i in range(reader.num_record_batches):
+            batch = reader.get_batch(i)
+            if columns is not None:
+                batch = batch.select(columns)
+            yield batch
+
+
+def read_bug_metadata(path: str) -> dict[str, Any]:
+    """Read the bug groupings and links stored alongside the bugs by write_bugs_arrow."""
+    with pa.memory_map(path) as source:
+        metadata = pa.ipc.open_file(source).schema.metadata or {}
+    return json.loads(metadata.get(b"webcompat_kb", b"{}"))
+
+
+def bugs_from_arrow(batches: Iterable[pa.RecordBatch]) -> BugsById:
+    rv = {}
+    for batch in batches:
+        for row in batch.to_pylist():
+            bug = Bug(**row)
+            rv[bug.id] = bug
+    return rv
+
+
 def write_bugs(
     path: str,
     all_bugs: BugsById,
@@ -1320,7 +1579,6 @@ def write_bugs(
     external_links: Iterable[tuple[ExternalLinkConfig, Mapping[BugId, set[str]]]],
 ) -> None:
     data: dict[str, Any] = {}
-    data["all_bugs"] = {bug_id: bug.to_json() for bug_id, bug in all_bugs.items()}
     data["site_report"] = list(site_reports)
     data["etp_reports"] = list(etp_reports)
     data["kb_bugs"] = list(kb_bugs)
@@ -1334,6 +1592,11 @@ def write_bugs(
             bug_id: list(values) for bug_id, values in external_link_data.items()
         }
 
+    if is_arrow_path(path):
+        write_bugs_arrow(path, all_bugs, data)
+        return
+
+    data["all_bugs"] = {bug_id: bug.to_json() for bug_id, bug in all_bugs.items()}
     with open(path, "w") as f:
         json.dump(data, f)
 
@@ -1344,16 +1607,22 @@ def load_bugs(
     bz_client: bugdantic.Bugzilla,
     load_bug_data_path: Optional[str],
     last_import_time: Optional[datetime],
+    snapshot_path: Optional[str] = None,
+    fetcher: Optional[BugzillaFetcher] = None,
 ) -> BugsById:
     if load_bug_data_path is not None:
         try:
             logging.info(f"Reading bug data from {load_bug_data_path}")
+            if is_arrow_path(load_bug_data_path):
+                return BugGraph(bugs_from_arrow(read_bug_batches(load_bug_data_path)))
             with open(load_bug_data_path) as f:
                 data = json.load(f)
-            return {
-                int(bug_id): Bug.from_json(bug_data)
-                for bug_id, bug_data in data["all_bugs"].items()
-            }
+            return BugGraph(
+                {
+                    int(bug_id): Bug.from_json(bug_data)
+                    for bug_id, bug_data in data["all_bugs"].items()
+                }
+            )
         except Exception as e:
             raise BugLoadError(f"Reading bugs from {load_bug_data_path} failed") from e
     else:
@@ -1363,6 +1632,8 @@ def load_bugs(
                 bz_client,
                 project["webcompat_knowledge_base"]["bugzilla_bugs"].table(),
                 last_import_time,
+                snapshot_path,
+                fetcher,
             )
         except Exception as e:
             raise BugLoadError(
@@ -1379,9 +1650,13 @@ def run(
     recreate_history: bool,
     write_bug_data_path: Optional[str],
     load_bug_data_path: Optional[str],
+    snapshot_path: Optional[str] = None,
+    fetch_concurrency: int = 4,
 ) -> None:
     start_time = time.monotonic()
 
+    fetcher = BugzillaFetcher(bz_client, max_workers=fetch_concurrency)
+
     importer = BigQueryImporter(project, bq_client)
 
     last_import_time = (
@@ -1397,11 +1672,13 @@ def run(
         bz_client,
         load_bug_data_path,
         bugs_last_import_time,
+        snapshot_path,
+        fetcher,
     )
 
     history_changes = None
     if include_history:
-        history_updater = BugHistoryUpdater(project, bq_client, bz_client)
+        history_updater = BugHistoryUpdater(project, bq_client, bz_client, fetcher)
         history_last_import_time = last_import_time if not recreate_history else None
         try:
             history_changes = history_updater.run(all_bugs, history_last_import_time)
@@ -1411,6 +1688,8 @@ def run(
     else:
         logging.info("Not updating bug history")
 
+    fetcher.log_stats()
+
     site_reports, etp_reports, kb_bugs, platform_bugs = group_bugs(all_bugs)
 
     # Links between different kinds of bugs
@@ -1503,17 +1782,35 @@ class BugzillaJob(EtlJob):
         group.add_argument(
             "--bugzilla-write-bug-data",
             action="store",
-            help="Path to write bug data as a JSON file",
+            help="Path to write bug data to; paths ending .arrow are written as an Arrow IPC file, otherwise JSON",
         )
         group.add_argument(
             "--bugzilla-load-bug-data",
             action="store",
-            help="Path to JSON file to load bug data from",
+            help="Path to JSON or Arrow IPC (.arrow) file to load bug data from",
+        )
+        group.add_argument(
+            "--bugzilla-cache-snapshot",
+            action="store",
+            help="Path to a local snapshot of the bug cache used for incremental runs",
+        )
+        group.add_argument(
+            "--bugzilla-fetch-concurrency",
+            action="store",
+            type=int,
+            default=4,
+            help="Maximum number of concurrent requests to Bugzilla",
         )
 
     def default_dataset(self, context: Context) -> str:
         return "webcompat_knowledge_base"
 
+    def inputs(self, project: Project) -> set[SchemaId]:
+        kb = project["webcompat_knowledge_base"]
+        return {
+            kb[name].id for name in ["bugzilla_bugs", "bugs_history", "import_runs"]
+        }
+
     def main(self, context: Context) -> None:
         bz_config = bugdantic.BugzillaConfig(
             "https://bugzilla.mozilla.org",
@@ -1531,4 +1828,6 @@ class BugzillaJob(EtlJob):
             context.args.bugzilla_recreate_history,
             context.args.bugzilla_write_bug_data,
             context.args.bugzilla_load_bug_data,
+            context.args.bugzilla_cache_snapshot,
+            context.args.bugzilla_fetch_concurrency,
         )
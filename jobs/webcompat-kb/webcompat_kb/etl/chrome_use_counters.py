@@ -7,7 +7,7 @@ from dataclasses import asdict, dataclass
 import pydantic
 
 from ..base import Context, EtlJob, dataset_arg
-from ..bqhelpers import BigQuery, TableSchema
+from ..bqhelpers import BigQuery, SchemaId, TableSchema
 from ..httphelpers import get_json
 from ..projectdata import Project
 
@@ -155,6 +155,11 @@ class ChromeUseCountersJob(EtlJob):
     def default_dataset(self, context: Context) -> str:
         return "chrome_use_counters"
 
+    def inputs(self, project: Project) -> set[SchemaId]:
+        return {schema.id for schema in project["chrome_use_counters"]} | {
+            project["web_features"]["features_latest"].id
+        }
+
     def main(self, context: Context) -> None:
         update_chrome_use_counters(
             context.project,
@@ -9,7 +9,7 @@ from google.api_core.exceptions import NotFound
 from pydantic import BaseModel
 
 from ..base import Context, EtlJob, dataset_arg
-from ..bqhelpers import BigQuery, TableSchema
+from ..bqhelpers import BigQuery, SchemaId, TableSchema
 from ..github import GitHub, GitHubIssue
 from ..httphelpers import Json
 from ..projectdata import Project
@@ -227,6 +227,9 @@ class InteropJob(EtlJob):
     def default_dataset(self, context: Context) -> str:
         return "interop"
 
+    def inputs(self, project: Project) -> set[SchemaId]:
+        return {schema.id for schema in project["interop"]}
+
     def main(self, context: Context) -> None:
         gh_client = GitHub(context.args.github_token)
         update_interop_data(
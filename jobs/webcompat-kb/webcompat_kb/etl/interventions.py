@@ -9,7 +9,7 @@ from pydantic import BaseModel, Field, model_validator
 from google.cloud import bigquery
 
 from ..base import Context, EtlJob
-from ..bqhelpers import BigQuery, TableSchema
+from ..bqhelpers import BigQuery, SchemaId, TableSchema
 from ..github import GitHub
 from ..httphelpers import get_json
 from .interop import repo_arg
@@ -676,6 +676,9 @@ class InterventionsJob(EtlJob):
     def default_dataset(self, context: Context) -> str:
         return "interventions"
 
+    def inputs(self, project: Project) -> set[SchemaId]:
+        return {schema.id for schema in project["interventions"]}
+
     def main(self, context: Context) -> None:
         gh_client = GitHub(context.args.github_token)
         update_interventions(
@@ -2,7 +2,7 @@ import logging
 from datetime import date
 
 from ..base import Context, EtlJob
-from ..bqhelpers import BigQuery
+from ..bqhelpers import BigQuery, SchemaId
 from ..projectdata import Project
 
 
@@ -114,6 +114,9 @@ class MetricJob(EtlJob):
     def default_dataset(self, context: Context) -> str:
         return "webcompat_knowledge_base"
 
+    def inputs(self, project: Project) -> set[SchemaId]:
+        return {schema.id for schema in project["webcompat_knowledge_base"]}
+
     def main(self, context: Context) -> None:
         update_metric_history(
             context.project,
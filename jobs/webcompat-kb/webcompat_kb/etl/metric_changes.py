@@ -2,15 +2,15 @@ import argparse
 import logging
 import re
 from collections import defaultdict
-from dataclasses import dataclass
+from dataclasses import dataclass, field, replace
 from datetime import datetime, timezone
 from decimal import Decimal
-from typing import Iterator, Mapping, Optional, Sequence, cast
+from typing import Iterable, Iterator, Mapping, Optional, Sequence, cast
 
 from google.cloud import bigquery
 
 from ..base import Context, EtlJob
-from ..bqhelpers import BigQuery, Json, TableSchema
+from ..bqhelpers import BigQuery, Json, SchemaId, TableSchema
 from .bugzilla import parse_user_story
 from ..projectdata import Project
 
@@ -47,15 +47,97 @@ class BugData:
     user_story: str
 
 
+class KeywordTable:
+    """Table of interned keywords.
+
+    This allows a set of keywords to be represented as a bitset, stored as an int,
+    where bit n is set if the keyword with id n is present."""
+
+    def __init__(self) -> None:
+        self.ids: dict[str, int] = {}
+        self.keywords: list[str] = []
+        self.ids_by_lower: defaultdict[str, list[int]] = defaultdict(list)
+
+    def get_id(self, keyword: str) -> int:
+        keyword_id = self.ids.get(keyword)
+        if keyword_id is None:
+            keyword_id = len(self.keywords)
+            self.ids[keyword] = keyword_id
+            self.keywords.append(keyword)
+            self.ids_by_lower[keyword.lower()].append(keyword_id)
+        return keyword_id
+
+    def to_bits(self, keywords: Iterable[str]) -> int:
+        bits = 0
+        for keyword in keywords:
+            bits |= 1 << self.get_id(keyword)
+        return bits
+
+    def to_list(self, bits: int) -> list[str]:
+        rv = []
+        while bits:
+            lowest_bit = bits & -bits
+            rv.append(self.keywords[lowest_bit.bit_length() - 1])
+            bits ^= lowest_bit
+        return rv
+
+    def contains(self, bits: int, keyword: str) -> bool:
+        keyword_id = self.ids.get(keyword)
+        return keyword_id is not None and bool(bits & (1 << keyword_id))
+
+    def add(self, bits: int, keyword: str) -> int:
+        return bits | (1 << self.get_id(keyword))
+
+    def remove(self, bits: int, keyword: str) -> int:
+        keyword_bit = 1 << self.get_id(keyword)
+        if bits & keyword_bit:
+            return bits & ~keyword_bit
+
+        # Occasionally keywords change case
+        for keyword_id in self.ids_by_lower[keyword.lower()]:
+            keyword_bit = 1 << keyword_id
+            if bits & keyword_bit:
+                logging.warning(
+                    f"Didn't find keyword {keyword}, using {self.keywords[keyword_id]}"
+                )
+                return bits & ~keyword_bit
+
+        logging.error(
+            f"Keyword {keyword} not found, had {', '.join(self.to_list(bits))}"
+        )
+        raise ValueError(f"Keyword {keyword} not found")
+
+
 @dataclass
 class BugState:
     status: str
     product: str
     component: str
-    keywords: list[str]
+    keyword_bits: int
     url: str
     user_story: str
     change_idx: Optional[int]
+    keyword_table: KeywordTable = field(repr=False, compare=False)
+
+    @property
+    def keywords(self) -> list[str]:
+        return self.keyword_table.to_list(self.keyword_bits)
+
+    def has_keyword(self, keyword: str) -> bool:
+        return self.keyword_table.contains(self.keyword_bits, keyword)
+
+    @property
+    def scoring_key(self) -> tuple[int, str, str]:
+        """The fields that are used as inputs when computing the score"""
+        return (self.keyword_bits, self.url, self.user_story)
+
+    def __str__(self) -> str:
+        return (
+            f"BugState(status={self.status!r}, product={self.product!r}, "
+            f"component={self.component!r}, keywords={self.keywords!r}, "
+            f"url={self.url!r}, user_story={self.user_story!r}, "
+            f"change_idx={self.change_idx!r})"
+        )
 
 
 @dataclass
@@ -228,11 +310,18 @@ def reverse_apply_diff(input_str: str, diff: str) -> str:
 def bugs_historic_states(
     bug_data: Mapping[int, BugData],
     changes_by_bug: Mapping[int, list[BugChange]],
+    keyword_table: Optional[KeywordTable] = None,
 ) -> Mapping[int, list[BugState]]:
     """Create a per bug list of historic states of that bug
 
     The first item in the list is the current state, subsequent items
-    are prior states, in chronological order."""
+    are prior states, in chronological order.
+
+    States are immutable once created, so fields that a change doesn't
+    touch are shared between consecutive states rather than copied."""
+    if keyword_table is None:
+        keyword_table = KeywordTable()
+
     rv: dict[int, list[BugState]] = {}
     for bug_id, bug in bug_data.items():
         # Initial state corrsponding to what the bug looks like now
@@ -241,10 +330,11 @@ def bugs_historic_states(
                 bug.status,
                 bug.product,
                 bug.component,
-                list(bug.keywords),
+                keyword_table.to_bits(bug.keywords),
                 bug.url,
                 bug.user_story,
                 change_idx=None,
+                keyword_table=keyword_table,
             )
         ]
 
@@ -258,56 +348,51 @@ def bugs_historic_states(
 
             current = states[-1]
             current.change_idx = index
-            # Duplicate the current state
-            prev = BugState(
-                current.status,
-                current.product,
-                current.component,
-                current.keywords[:],
-                current.url,
-                current.user_story,
-                change_idx=None,
-            )
+            status = current.status
+            product = current.product
+            component = current.component
+            keyword_bits = current.keyword_bits
+            url = current.url
+            user_story = current.user_story
+
             # Apply the delta from current to previous state
             for field_change in change.changes:
-                if field_change.field_name == "keywords":
+                field_name = field_change.field_name
+                if field_name == "keywords":
                     for keyword in field_change.added.split(", "):
                         if keyword:
-                            try:
-                                prev.keywords.remove(keyword)
-                            except ValueError:
-                                # Occasionally keywords change case
-                                for prev_keyword in prev.keywords:
-                                    if prev_keyword.lower() == keyword.lower():
-                                        prev.keywords.remove(prev_keyword)
-                                        logging.warning(
-                                            f"Didn't find keyword {keyword}, using {prev_keyword}"
-                                        )
-                                        break
-                                else:
-                                    logging.error(
-                                        f"Keyword {keyword} not found, had {', '.join(prev.keywords)}"
-                                    )
-                                    raise
+                            keyword_bits = keyword_table.remove(keyword_bits, keyword)
                     for keyword in field_change.removed.split(", "):
                         if keyword:
-                            prev.keywords.append(keyword)
-                elif field_change.field_name in {
-                    "status",
-                    "product",
-                    "component",
-                    "url",
-                }:
-                    assert getattr(prev, field_change.field_name) == field_change.added
-                    setattr(prev, field_change.field_name, field_change.removed)
-                elif field_change.field_name == "cf_user_story":
-                    prev.user_story = reverse_apply_diff(
-                        prev.user_story, field_change.added
-                    )
-                else:
-                    continue
+                            keyword_bits = keyword_table.add(keyword_bits, keyword)
+                elif field_name == "status":
+                    assert status == field_change.added
+                    status = field_change.removed
+                elif field_name == "product":
+                    assert product == field_change.added
+                    product = field_change.removed
+                elif field_name == "component":
+                    assert component == field_change.added
+                    component = field_change.removed
+                elif field_name == "url":
+                    assert url == field_change.added
+                    url = field_change.removed
+                elif field_name == "cf_user_story":
+                    user_story = reverse_apply_diff(user_story, field_change.added)
+
             prev_changes = change.changes
-            states.append(prev)
+            states.append(
+                replace(
+                    current,
+                    status=status,
+                    product=product,
+                    component=component,
+                    keyword_bits=keyword_bits,
+                    url=url,
+                    user_story=user_story,
+                    change_idx=None,
+                )
+            )
 
         rv[bug_id] = states
 
@@ -343,8 +428,13 @@ def compute_historic_scores(
     ]
 
     rows: list[Mapping[str, Json]] = []
+    # Map of bug id to (index, scored index) for states that have the same
+    # scoring inputs as an earlier state of the same bug, and so don't need
+    # to be scored again.
+    duplicate_states: defaultdict[int, list[tuple[int, int]]] = defaultdict(list)
     for bug_id, states in historic_states.items():
         rv[bug_id] = [Decimal(0)] * len(states)
+        scored_states: dict[tuple[int, str, str], int] = {}
         for i, state in enumerate(states):
             is_open = state.status not in FIXED_STATES
             is_webcompat = (
@@ -352,9 +442,14 @@ def compute_historic_scores(
                 and state.component == "Site Reports"
             ) or (
                 state.product != "Web Compatibility"
-                and "webcompat:site-report" in state.keywords
+                and state.has_keyword("webcompat:site-report")
             )
             if is_open and is_webcompat:
+                scoring_key = state.scoring_key
+                if scoring_key in scored_states:
+                    duplicate_states[bug_id].append((i, scored_states[scoring_key]))
+                    continue
+                scored_states[scoring_key] = i
                 rows.append(
                     {
                         "number": bug_id,
@@ -404,6 +499,10 @@ FROM overrides
             )
             rv[row.number][row.index] = Decimal(row.score)
 
+    for bug_id, duplicates in duplicate_states.items():
+        for index, scored_index in duplicates:
+            rv[bug_id][index] = rv[bug_id][scored_index]
+
     for bug_id, computed_scores in rv.items():
         current_score = float(current_scores.get(bug_id, 0))
         if computed_scores[0] != current_score and states[0].status not in FIXED_STATES:
@@ -417,7 +516,8 @@ FROM overrides
 """)
 
     logging.info(
-        f"Got {scores.num_results} historic scores for {len(bugs_with_webcompat_states)} bugs"
+        f"Got {scores.num_results} historic scores for {len(bugs_with_webcompat_states)} bugs, "
+        f"reused scores for {sum(len(item) for item in duplicate_states.values())} unchanged states"
     )
     return rv
 
@@ -605,6 +705,9 @@ class MetricChangesJob(EtlJob):
     def default_dataset(self, context: Context) -> str:
         return "webcompat_knowledge_base"
 
+    def inputs(self, project: Project) -> set[SchemaId]:
+        return {schema.id for schema in project["webcompat_knowledge_base"]}
+
     @classmethod
     def add_arguments(cls, parser: argparse.ArgumentParser) -> None:
         group = parser.add_argument_group(
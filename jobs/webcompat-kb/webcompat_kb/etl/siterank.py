@@ -3,14 +3,13 @@ import csv
 import logging
 from collections.abc import Collection, Iterator
 from dataclasses import dataclass
-from datetime import datetime
+from datetime import UTC, datetime
 from typing import Any, Optional, cast
-import httpx
 from google.cloud import bigquery
 
 from ..base import Context, EtlJob
-from ..bqhelpers import BigQuery, Json, TableSchema
-from ..httphelpers import get_json
+from ..bqhelpers import BigQuery, SchemaId, TableSchema
+from ..httphelpers import get_json, iter_lines
 from ..projectdata import Project
 
 
@@ -141,22 +140,25 @@ def get_tranco_data() -> Iterator[tuple[int, str]]:
     id_resp = cast(dict[str, Any], id_resp)
     list_id = id_resp["list_id"]
 
-    data_resp = httpx.get(
-        f"https://tranco-list.eu/download/{list_id}/1000000", follow_redirects=True
-    )
-    data_resp.raise_for_status()
-    for row in csv.reader(data_resp.iter_lines()):
-        yield int(row[0]), row[1]
+    with iter_lines(f"https://tranco-list.eu/download/{list_id}/1000000") as lines:
+        for row in csv.reader(lines):
+            yield int(row[0]), row[1]
 
 
 def update_tranco_data(client: BigQuery, table: TableSchema, yyyymm: int) -> None:
     logging.info(f"Importing Tranco data for {yyyymm}")
-    rows: list[dict[str, Json]] = [
+    rows = (
         {"yyyymm": yyyymm, "rank": rank, "host": host}
         for rank, host in get_tranco_data()
-    ]
-    delete_existing_data(client, table, yyyymm)
-    client.write_table(table, table.schema, rows, overwrite=False)
+    )
+    # Replaces the data for yyyymm, deleting any hosts no longer in the list
+    client.upsert(
+        table,
+        rows,
+        key=["yyyymm", "host"],
+        delete_condition="target.yyyymm = @yyyymm",
+        parameters=[bigquery.ScalarQueryParameter("yyyymm", "INTEGER", yyyymm)],
+    )
 
 
 def update_sightline_data(project: Project, client: BigQuery, yyyymm: int) -> None:
@@ -265,20 +267,17 @@ def update_min_rank_data(project: Project, client: BigQuery, yyyymm: int) -> Non
 def record_update(
     client: BigQuery, table: TableSchema, update_result: CruxUpdateResult
 ) -> None:
-    delete_existing_data(client, table, update_result.yyyymm)
-    client.insert_query(
+    client.upsert(
         table,
-        columns=[item.name for item in table.fields],
-        query="SELECT @yyyymm, CURRENT_TIMESTAMP(), @crux_rows, @is_complete",
-        parameters=[
-            bigquery.ScalarQueryParameter("yyyymm", "INTEGER", update_result.yyyymm),
-            bigquery.ScalarQueryParameter(
-                "crux_rows", "INTEGER", update_result.crux_rows
-            ),
-            bigquery.ScalarQueryParameter(
-                "is_complete", "BOOL", update_result.is_complete
-            ),
+        [
+            {
+                "yyyymm": update_result.yyyymm,
+                "run_at": datetime.now(UTC),
+                "crux_rows": update_result.crux_rows,
+                "is_complete": update_result.is_complete,
+            }
         ],
+        key=["yyyymm"],
     )
 
 
@@ -393,6 +392,11 @@ class SiteRanksJob(EtlJob):
     def default_dataset(self, context: Context) -> str:
         return "crux_imported"
 
+    def inputs(self, project: Project) -> set[SchemaId]:
+        return {schema.id for schema in project["crux_imported"]} | {
+            schema.id for schema in project["tranco_imported"]
+        }
+
     def main(self, context: Context) -> None:
         project = context.project
         client = context.bq_client
@@ -7,7 +7,7 @@ from urllib.parse import urlparse
 import pydantic
 
 from ..base import Context, EtlJob, dataset_arg
-from ..bqhelpers import BigQuery, TableSchema
+from ..bqhelpers import BigQuery, SchemaId, TableSchema
 from ..httphelpers import get_json
 from ..projectdata import Project
 
@@ -206,5 +206,8 @@ class StandardsPositionsJob(EtlJob):
     def default_dataset(self, context: Context) -> str:
         return "standards_positions"
 
+    def inputs(self, project: Project) -> set[SchemaId]:
+        return {schema.id for schema in project["standards_positions"]}
+
     def main(self, context: Context) -> None:
         update_standards_positions(context.project, context.bq_client)
@@ -1,9 +1,12 @@
 import argparse
 import difflib
+import functools
 import json
 import logging
 import re
 import os
+import time
+from concurrent.futures import ThreadPoolExecutor
 from dataclasses import dataclass, field
 from datetime import datetime
 from typing import Any, Callable, Iterable, Mapping, Optional, Sequence
@@ -32,6 +35,9 @@ from ..treehash import hash_tree
 
 here = os.path.dirname(__file__)
 
+# Maximum number of concurrent BigQuery requests when deploying schemas
+DEFAULT_SCHEMA_CONCURRENCY = 8
+
 
 @dataclass
 class SchemaDefinition:
@@ -251,6 +257,25 @@ def topological_sort(
     return rv
 
 
+def topological_levels(
+    nodes: Mapping[SchemaId, SchemaDefinition],
+) -> Sequence[Sequence[SchemaDefinition]]:
+    """Group nodes into levels so that each node's dependencies are all in
+    earlier levels.
+
+    Nodes in the same level don't depend on each other, so they can be created
+    concurrently. Within a level nodes are in topological_sort order."""
+    node_levels: dict[SchemaId, int] = {}
+    levels: list[list[SchemaDefinition]] = []
+    for node in topological_sort(nodes):
+        level = max((node_levels[item] + 1 for item in node.depends_on), default=0)
+        node_levels[node.id] = level
+        if level == len(levels):
+            levels.append([])
+        levels[level].append(node)
+    return levels
+
+
 def validate_routine_sql(schema_id: SchemaId, sql: str) -> bool:
     """Some basic validation of the generated SQL for routines
 
@@ -293,25 +318,43 @@ class Schemas:
 
 
 def get_current_schemas(
-    client: BigQuery, datasets: Iterable[DatasetId], need_datasets: set[DatasetId]
+    client: BigQuery,
+    datasets: Iterable[DatasetId],
+    need_datasets: set[DatasetId],
+    max_workers: int = DEFAULT_SCHEMA_CONCURRENCY,
 ) -> Schemas:
-    schemas = Schemas()
+    """Get the tables, views and routines currently in datasets.
 
-    for dataset in datasets:
+    The datasets are listed concurrently."""
+
+    def list_dataset(
+        dataset: DatasetId,
+    ) -> Optional[tuple[list[bigquery.Table], list[bigquery.Routine]]]:
         try:
             tables = list(client.get_tables(dataset.dataset))
         except Exception:
             # If the dataset doesn't exist we don't want to fail here
             if not client.write or dataset not in need_datasets:
-                continue
+                return None
             raise
+        return tables, list(client.get_routines(dataset.dataset))
+
+    datasets = list(datasets)
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        listings = list(executor.map(list_dataset, datasets))
+
+    schemas = Schemas()
+    for dataset, listing in zip(datasets, listings):
+        if listing is None:
+            continue
+        tables, routines = listing
         for table in tables:
             schema_id = SchemaId(dataset.project, dataset.dataset, table.table_id)
             if table.table_type == "VIEW":
                 schemas.views[schema_id] = table
             elif table.view_query is None:
                 schemas.tables[schema_id] = table
-        for routine in client.get_routines(dataset.dataset):
+        for routine in routines:
             schema_id = SchemaId(dataset.project, dataset.dataset, routine.routine_id)
             schemas.routines[schema_id] = routine
 
@@ -471,17 +514,33 @@ def render_schemas(
     return outputs
 
 
+def run_updates(
+    updates: Sequence[Callable[[], None]],
+    executor: ThreadPoolExecutor,
+) -> None:
+    """Run independent updates concurrently, waiting for all of them to finish."""
+    futures = [executor.submit(update) for update in updates]
+    for future in futures:
+        future.result()
+
+
 def update_schemas(
     client: BigQuery,
     project: Project,
     etl_jobs: set[str],
     delete_missing: bool,
     update_all_tables: bool,
+    max_workers: int = DEFAULT_SCHEMA_CONCURRENCY,
 ) -> None:
+    """Deploy the project's tables, views and routines.
+
+    Tables are updated concurrently. Views and routines are grouped into
+    dependency levels; the schemas in each level are created concurrently once
+    the previous level is complete."""
     creator = SchemaCreator(project)
     sql_schemas = creator.create()
 
-    sql_schemas_list = topological_sort(sql_schemas)
+    sql_schema_levels = topological_levels(sql_schemas)
     datasets = [
         (project.map_dataset_id(item.id), item.description)
         for item in project.data.templates_by_dataset.values()
@@ -509,28 +568,48 @@ def update_schemas(
         if dataset_id in need_datasets:
             client.ensure_dataset(dataset_id, description)
 
+    start = time.monotonic()
     current_schemas = get_current_schemas(
-        client, [item[0] for item in datasets], need_datasets
+        client, [item[0] for item in datasets], need_datasets, max_workers
     )
+    logging.info(f"Listed {len(datasets)} datasets in {time.monotonic() - start:.1f}s")
 
     table_updater = TableUpdater(current_schemas.tables)
     # Only create tables when they're needed for a job that we'll run
     logging.debug(
         f"Will update table schemas: {', '.join(str(item) for item in update_table_schemas)}"
     )
-    for table_schema in update_table_schemas:
-        if table_updater.needs_update(table_schema):
-            table_updater.update(client, table_schema)
 
     updaters: Mapping[SchemaType, RoutineUpdater | ViewUpdater] = {
         SchemaType.routine: RoutineUpdater(current_schemas.routines),
         SchemaType.view: ViewUpdater(current_schemas.views),
     }
 
-    for schema_dfn in sql_schemas_list:
-        updater = updaters[schema_dfn.type]
-        if updater.needs_update(schema_dfn):
-            updater.update(client, schema_dfn)
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        start = time.monotonic()
+        table_updates = [
+            functools.partial(table_updater.update, client, table_schema)
+            for table_schema in update_table_schemas
+            if table_updater.needs_update(table_schema)
+        ]
+        run_updates(table_updates, executor)
+        logging.info(
+            f"Updated {len(table_updates)} tables in {time.monotonic() - start:.1f}s"
+        )
+
+        for level, level_schemas in enumerate(sql_schema_levels):
+            start = time.monotonic()
+            updates = [
+                functools.partial(updaters[schema_dfn.type].update, client, schema_dfn)
+                for schema_dfn in level_schemas
+                if updaters[schema_dfn.type].needs_update(schema_dfn)
+            ]
+            run_updates(updates, executor)
+            logging.info(
+                f"Schema level {level}: updated {len(updates)} of "
+                f"{len(level_schemas)} views and routines in "
+                f"{time.monotonic() - start:.1f}s"
+            )
 
     output_view_ids = {schema.id for dataset in project for schema in dataset.views()}
     output_routine_ids = {
@@ -597,8 +676,9 @@ def update_schema_if_needed(
     delete_extra: bool,
     update_all_tables: bool,
     skip_before_update: bool,
+    max_workers: int = DEFAULT_SCHEMA_CONCURRENCY,
 ) -> None:
-    src_hash = hash_tree(project.data.path).hex()
+    src_hash = hash_tree(project.data.path, use_cache=True).hex()
     last_update_time, last_update_hash = get_last_update(project, client)
 
     logging.info(f"Templates have hash {src_hash}")
@@ -620,7 +700,14 @@ def update_schema_if_needed(
     if not skip_before_update:
         before_schema_update(client, project)
 
-    update_schemas(client, project, etl_jobs_enabled, delete_extra, update_all_tables)
+    update_schemas(
+        client,
+        project,
+        etl_jobs_enabled,
+        delete_extra,
+        update_all_tables,
+        max_workers,
+    )
     record_update(project, client, src_hash)
 
 
@@ -653,6 +740,12 @@ class UpdateSchemaJob(EtlJob):
             action="store_true",
             help="Don't run before_schema_update tasks",
         )
+        group.add_argument(
+            "--update-schema-concurrency",
+            type=int,
+            default=DEFAULT_SCHEMA_CONCURRENCY,
+            help="Maximum number of concurrent BigQuery requests when deploying schemas",
+        )
 
     def default_dataset(self, context: Context) -> str:
         return context.args.bq_kb_dataset
@@ -675,4 +768,5 @@ class UpdateSchemaJob(EtlJob):
             delete_extra=context.args.update_schema_delete_extra,
             update_all_tables=context.args.update_schema_all_tables,
             skip_before_update=context.args.update_schema_skip_before_update,
+            max_workers=context.args.update_schema_concurrency,
         )
@@ -3,7 +3,7 @@ import logging
 from google.cloud import bigquery
 
 from ..base import Context, EtlJob
-from ..bqhelpers import BigQuery
+from ..bqhelpers import BigQuery, SchemaId
 from ..projectdata import Project
 
 
@@ -59,6 +59,9 @@ class UserReportAggregateJob(EtlJob):
     def default_dataset(self, context: Context) -> str:
         return "webcompat_user_reports"
 
+    def inputs(self, project: Project) -> set[SchemaId]:
+        return {schema.id for schema in project["webcompat_user_reports"]}
+
     def main(self, context: Context) -> None:
         update_user_report_aggregate(
             context.project,
@@ -1,17 +1,24 @@
 import logging
 from enum import Enum
 import argparse
+import itertools
+import multiprocessing
+import os
 import re
 from typing import (
     Annotated,
+    Any,
     Iterable,
     Iterator,
     Optional,
+    TextIO,
     TypeVar,
     Generic,
 )
 from abc import ABC, abstractmethod
-from collections.abc import Mapping
+from collections import deque
+from collections.abc import Mapping, Sequence
+from concurrent.futures import Future, ProcessPoolExecutor
 from dataclasses import asdict, dataclass, field
 from datetime import UTC, datetime
 from pathlib import Path
@@ -22,7 +29,7 @@ from google.cloud import bigquery
 from pydantic import AfterValidator, BaseModel, PlainSerializer
 
 from ..base import Context, EtlJob
-from ..bqhelpers import BigQuery, TableSchema
+from ..bqhelpers import BigQuery, SchemaId, TableSchema
 from ..projectdata import Project
 from .. import github
 from ..serialization import to_naive_datetime, utc_from_naive_datetime
@@ -494,55 +501,121 @@ WHERE rn = 1""")
     def insert_issues(
         self, table: TableSchema, issues: Mapping[int, BaseModel]
     ) -> None:
-        if not issues:
-            return
-        self.bq_client.delete_query(
+        self.bq_client.upsert(
             table,
-            condition="number IN UNNEST(@bug_numbers)",
-            parameters=[
-                bigquery.ArrayQueryParameter(
-                    "bug_numbers", "INTEGER", list(issues.keys())
-                )
-            ],
+            (row.model_dump(mode="json") for row in issues.values()),
+            key=["number"],
         )
-        # write_table here avoids streaming vs insert_rows
-        self.bq_client.write_table(
-            table,
-            table.schema,
-            [row.model_dump(mode="json") for row in issues.values()],
-            overwrite=False,
+
+
+# Number of dump lines sent to a worker at a time
+BACKFILL_CHUNK_LINES = 1000
+
+# The repo used by process_lines in backfill worker processes
+_worker_repo: Optional[SourceRepo] = None
+
+
+def process_lines(
+    repo: SourceRepo, lines: Sequence[str]
+) -> tuple[Optional[datetime], list[dict[str, Any]]]:
+    """Validate and process the issues in some lines of a data dump.
+
+    :returns: A tuple of (latest updated_at of any issue, rows to write)"""
+    rows = []
+    source_time = None
+    for line in lines:
+        issue = github.GitHubIssue.model_validate_json(line)
+        # Skipped issues still count towards the source time; they're
+        # refetched from the API rather than being missing from the dump.
+        if source_time is None or issue.updated_at > source_time:
+            source_time = issue.updated_at
+        if not repo.skip_from_file(issue):
+            rows.append(repo.process_issue(issue).model_dump(mode="json"))
+    return source_time, rows
+
+
+def _init_worker(repo: SourceRepo) -> None:
+    global _worker_repo
+    _worker_repo = repo
+
+
+def _process_lines_worker(
+    lines: Sequence[str],
+) -> tuple[Optional[datetime], list[dict[str, Any]]]:
+    assert _worker_repo is not None
+    return process_lines(_worker_repo, lines)
+
+
+def iter_processed_chunks(
+    repo: SourceRepo, f: TextIO, max_workers: int
+) -> Iterator[tuple[Optional[datetime], list[dict[str, Any]]]]:
+    """Process a data dump in chunks of lines, in order.
+
+    With more than one worker the chunks are processed in a pool of processes,
+    since validating and parsing the issues is CPU bound. Only a bounded number of
+    chunks are in flight, so the dump is never read into memory all at once."""
+    chunks = iter(lambda: list(itertools.islice(f, BACKFILL_CHUNK_LINES)), [])
+    if max_workers <= 1:
+        for lines in chunks:
+            yield process_lines(repo, lines)
+        return
+
+    # The job scheduler runs jobs in threads, so forking isn't safe
+    with ProcessPoolExecutor(
+        max_workers=max_workers,
+        mp_context=multiprocessing.get_context("forkserver"),
+        initializer=_init_worker,
+        initargs=(repo,),
+    ) as executor:
+        pending: deque[Future[tuple[Optional[datetime], list[dict[str, Any]]]]] = (
+            deque()
         )
+        for lines in chunks:
+            pending.append(executor.submit(_process_lines_worker, lines))
+            if len(pending) >= 2 * max_workers:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
 
 
 def load_from_file(
     bq_service: BigQueryService,
     repo: SourceRepo,
     path: Path,
+    max_workers: Optional[int] = None,
 ) -> datetime:
-    """Import issues from a data dump, returning how far up to date the dump is."""
-    logging.info(f"Backfilling from file {path}")
+    """Import issues from a data dump, returning how far up to date the dump is.
+
+    If an issue appears more than once in the dump, the copy with the latest
+    updated_at is kept, rather than the last copy in the file. Copies with the
+    same updated_at are picked between arbitrarily.
+
+    :param max_workers: Number of processes used to parse the dump. Defaults to
+                        one per CPU."""
+    if max_workers is None:
+        max_workers = os.cpu_count() or 1
+    logging.info(f"Backfilling from file {path} using {max_workers} workers")
     if path.suffix in {".zst", ".zstd"}:
         f = zstandard.open(path, "r")
     else:
         f = open(path)
 
-    rows: dict[int, BaseModel] = {}
     source_time = None
-    with f:
-        for line in f:
-            issue = github.GitHubIssue.model_validate_json(line)
-            # Skipped issues still count towards the source time; they're
-            # refetched from the API rather than being missing from the dump.
-            if source_time is None or issue.updated_at > source_time:
-                source_time = issue.updated_at
-            if not repo.skip_from_file(issue):
-                rows[issue.number] = repo.process_issue(issue)
-
-            if len(rows) >= 10000:
-                bq_service.insert_issues(repo.dest_table, rows)
-                rows = {}
 
-    bq_service.insert_issues(repo.dest_table, rows)
+    def rows() -> Iterator[dict[str, Any]]:
+        nonlocal source_time
+        for chunk_time, chunk_rows in iter_processed_chunks(repo, f, max_workers):
+            if chunk_time is not None and (
+                source_time is None or chunk_time > source_time
+            ):
+                source_time = chunk_time
+            yield from chunk_rows
+
+    with f:
+        # The rows are streamed into a staging table and applied with one MERGE
+        bq_service.bq_client.upsert(
+            repo.dest_table, rows(), key=["number"], order_by="updated_at DESC"
+        )
 
     if source_time is None:
         raise ValueError(f"No issues found in {path}")
@@ -615,6 +688,7 @@ def import_repo(
     state: Optional[SourceState],
     backfill: bool,
     backfill_file: Optional[Path],
+    backfill_workers: Optional[int] = None,
 ) -> SourceState:
     source_time = (
         state.source_time.replace(tzinfo=UTC)
@@ -627,7 +701,9 @@ def import_repo(
     if backfill or source_time is None or next_url:
         milestone = None
         if next_url is None and backfill_file is not None:
-            source_time = load_from_file(bq_service, repo, backfill_file)
+            source_time = load_from_file(
+                bq_service, repo, backfill_file, backfill_workers
+            )
             # The dump doesn't contain the content of private issues, so fetch
             # those from the API.
             milestone = repo.private_milestone
@@ -662,6 +738,7 @@ def run(
     backfill: bool = False,
     backfill_files: Optional[Mapping[str, Path]] = None,
     backfill_restart: bool = False,
+    backfill_workers: Optional[int] = None,
 ) -> bool:
     if backfill_files is None:
         backfill_files = {}
@@ -679,7 +756,12 @@ def run(
         )
         try:
             new_states[repo.repo] = import_repo(
-                bq_service, repo, state, backfill, backfill_files.get(repo.repo)
+                bq_service,
+                repo,
+                state,
+                backfill,
+                backfill_files.get(repo.repo),
+                backfill_workers,
             )
         except IncompleteImport as e:
             if isinstance(e.__cause__, Exception):
@@ -743,10 +825,19 @@ class WebBugsJob(EtlJob):
             action="store_true",
             help="Ignore any in-progress backfill.",
         )
+        group.add_argument(
+            "--web-bugs-backfill-workers",
+            action="store",
+            type=int,
+            help="Number of processes used to parse backfill files (defaults to one per CPU)",
+        )
 
     def default_dataset(self, context: Context) -> str:
         return "web_bugs"
 
+    def inputs(self, project: Project) -> set[SchemaId]:
+        return {schema.id for schema in project["web_bugs"]}
+
     def main(self, context: Context) -> bool:
         gh_client = github.GitHub(context.args.github_token)
 
@@ -759,4 +850,5 @@ class WebBugsJob(EtlJob):
             if context.args.web_bugs_backfill_file
             else None,
             backfill_restart=context.args.web_bugs_backfill_restart,
+            backfill_workers=context.args.web_bugs_backfill_workers,
         )
@@ -10,7 +10,8 @@ from webfeatures import FeaturesFile
 from webfeatures.features import Feature, FeatureMoved, FeatureSplit
 
 from ..base import Context, EtlJob, dataset_arg
-from ..bqhelpers import BigQuery, Json
+from ..bqhelpers import BigQuery, Json, SchemaId
+from ..projectdata import Project
 
 
 def get_imported_releases(client: BigQuery) -> dict[str, datetime]:
@@ -349,5 +350,8 @@ class WebFeaturesJob(EtlJob):
     def default_dataset(self, context: Context) -> str:
         return "web_features"
 
+    def inputs(self, project: Project) -> set[SchemaId]:
+        return {schema.id for schema in project["web_features"]}
+
     def main(self, context: Context) -> None:
         update_web_features(context.bq_client, context.args.recreate_web_features)
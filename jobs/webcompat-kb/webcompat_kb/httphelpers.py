@@ -1,19 +1,140 @@
-from datetime import UTC, datetime, timedelta
+import hashlib
+import json
 import logging
+import os
+import pathlib
 import re
+import tempfile
+import threading
 import time
+from contextlib import AbstractContextManager, contextmanager
 from dataclasses import dataclass
+from datetime import UTC, datetime, timedelta
 from typing import Iterator, Mapping, Optional, Sequence
 
 import httpx
 
 Json = Mapping[str, "Json"] | Sequence["Json"] | str | int | float | bool | None
 
+# Response headers kept alongside a cached body. The body is stored decoded, so
+# content-encoding and content-length are deliberately not kept.
+CACHED_HEADERS = ("content-type", "link", "etag", "last-modified")
 
-def get_json(url: str, headers: Optional[Mapping[str, str]] = None) -> Json:
-    resp = httpx.get(url, headers=headers, follow_redirects=True)
-    resp.raise_for_status()
-    return resp.json()
+# Entries that haven't been used for this long are removed when the cache is
+# opened. URLs with a since= parameter change on every run, so without this the
+# cache would grow without bound.
+CACHE_MAX_AGE = timedelta(days=14)
+
+
+def default_cache_dir() -> pathlib.Path:
+    cache_home = os.environ.get("XDG_CACHE_HOME")
+    base = pathlib.Path(cache_home) if cache_home else pathlib.Path.home() / ".cache"
+    return base / "webcompat-kb" / "http"
+
+
+@dataclass
+class HttpStats:
+    requests: int = 0
+    # Requests sent with If-None-Match or If-Modified-Since
+    revalidations: int = 0
+    # 304 responses served from the cache
+    hits: int = 0
+    bytes: int = 0
+    cached_bytes: int = 0
+
+    def __str__(self) -> str:
+        return (
+            f"{self.requests} requests, {self.bytes} bytes, "
+            f"{self.revalidations} revalidated, {self.hits} cache hits "
+            f"({self.cached_bytes} bytes)"
+        )
+
+
+@dataclass
+class CachedResponse:
+    headers: Mapping[str, str]
+    content: bytes
+
+
+class ResponseCache:
+    """On-disk cache of response bodies keyed by URL.
+
+    Entries are only used to revalidate requests, never served without asking
+    the server, so they don't expire. Instead, entries that haven't been read or
+    written within max_age are pruned when the cache is opened. Each entry is a
+    pair of files named after the hash of the URL; writes go via a temporary file
+    so concurrent jobs never see a partial entry."""
+
+    def __init__(self, path: pathlib.Path, max_age: timedelta = CACHE_MAX_AGE):
+        self.path = path
+        self.path.mkdir(parents=True, exist_ok=True)
+        self.prune(max_age)
+
+    def _paths(self, url: str) -> tuple[pathlib.Path, pathlib.Path]:
+        key = hashlib.sha256(url.encode()).hexdigest()
+        return self.path / f"{key}.json", self.path / f"{key}.body"
+
+    def get(self, url: str) -> Optional[CachedResponse]:
+        meta_path, body_path = self._paths(url)
+        try:
+            with open(meta_path) as f:
+                meta = json.load(f)
+            content = body_path.read_bytes()
+        except (OSError, ValueError):
+            return None
+        if meta.get("url") != url or len(content) != meta.get("length"):
+            return None
+        # The metadata mtime records when the entry was last used
+        try:
+            os.utime(meta_path)
+        except OSError:
+            pass
+        return CachedResponse(meta["headers"], content)
+
+    def put(self, url: str, headers: Mapping[str, str], content: bytes) -> None:
+        meta_path, body_path = self._paths(url)
+        meta = {"url": url, "headers": dict(headers), "length": len(content)}
+        # Write the body first so that the metadata never refers to a missing body
+        self._write(body_path, content)
+        self._write(meta_path, json.dumps(meta).encode())
+
+    def prune(self, max_age: timedelta) -> int:
+        """Remove entries last used more than max_age ago, and any leftover
+        temporary files. Returns the number of files removed."""
+        cutoff = time.time() - max_age.total_seconds()
+        removed = 0
+        for path in self.path.iterdir():
+            if path.suffix == ".body":
+                # Bodies are removed with their metadata, or as orphans if the
+                # metadata is missing
+                if path.with_suffix(".json").exists():
+                    continue
+            elif path.suffix != ".json" and not path.name.startswith(".tmp-"):
+                continue
+            try:
+                if path.stat().st_mtime >= cutoff:
+                    continue
+                path.unlink()
+                removed += 1
+                if path.suffix == ".json":
+                    path.with_suffix(".body").unlink(missing_ok=True)
+                    removed += 1
+            except FileNotFoundError:
+                # Removed by a concurrent job
+                pass
+        if removed:
+            logging.info(f"Removed {removed} stale files from HTTP cache {self.path}")
+        return removed
+
+    def _write(self, path: pathlib.Path, data: bytes) -> None:
+        fd, tmp_path = tempfile.mkstemp(dir=self.path, prefix=".tmp-")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
 
 
 @dataclass
@@ -38,20 +159,6 @@ def parse_link_header(link: Optional[str]) -> LinkHeader:
     return rv
 
 
-def get_paginated_json(
-    url: str, headers: Optional[Mapping[str, str]] = None
-) -> Sequence[Json]:
-    data = []
-    next_url: Optional[str] = url
-    while next_url is not None:
-        resp = httpx.get(next_url, headers=headers, follow_redirects=True)
-        resp.raise_for_status()
-        data.extend(resp.json())
-        links = parse_link_header(resp.headers.get("link"))
-        next_url = links.next
-    return data
-
-
 def retry_time(resp: httpx.Response) -> Optional[datetime]:
     """Return how long to wait before retrying a rate-limited response."""
     if resp.status_code not in (403, 429):
@@ -84,28 +191,188 @@ class PaginatedJsonResponse:
     resume_at: Optional[datetime]
 
 
-def iter_paginated_json(
-    url: str, headers: Optional[Mapping[str, str]] = None
-) -> Iterator[PaginatedJsonResponse]:
-    next_url: Optional[str] = url
-    while next_url is not None:
-        resp = httpx.get(next_url, headers=headers, follow_redirects=True)
-
-        resume_at = retry_time(resp)
-        if resume_at is not None:
-            yield PaginatedJsonResponse(
-                data=None, next_url=next_url, resume_at=resume_at
+class HttpClient:
+    """HTTP client shared by everything that fetches external data.
+
+    Requests go through a single httpx.Client, so connections are kept alive and
+    use HTTP/2 where the server supports it. If there's a cache, responses with
+    an ETag or Last-Modified header are stored, and later requests for the same
+    URL are made conditional. A 304 response is replaced with the cached body;
+    for GitHub these don't count against the rate limit."""
+
+    def __init__(
+        self,
+        cache: Optional[ResponseCache] = None,
+        transport: Optional[httpx.BaseTransport] = None,
+    ):
+        self.cache = cache
+        self.client = httpx.Client(
+            http2=True, follow_redirects=True, timeout=60, transport=transport
+        )
+        self.stats = HttpStats()
+        self._lock = threading.Lock()
+
+    def close(self) -> None:
+        self.client.close()
+
+    def get(
+        self, url: str, headers: Optional[Mapping[str, str]] = None
+    ) -> httpx.Response:
+        req_headers = httpx.Headers(headers)
+        cached = self.cache.get(url) if self.cache is not None else None
+        if cached is not None:
+            if "etag" in cached.headers:
+                req_headers["If-None-Match"] = cached.headers["etag"]
+            if "last-modified" in cached.headers:
+                req_headers["If-Modified-Since"] = cached.headers["last-modified"]
+
+        resp = self.client.get(url, headers=req_headers)
+        resp.read()
+
+        with self._lock:
+            self.stats.requests += 1
+            self.stats.bytes += resp.num_bytes_downloaded
+            if cached is not None:
+                self.stats.revalidations += 1
+                if resp.status_code == 304:
+                    self.stats.hits += 1
+                    self.stats.cached_bytes += len(cached.content)
+
+        if cached is not None and resp.status_code == 304:
+            return httpx.Response(
+                200,
+                headers=cached.headers,
+                content=cached.content,
+                request=resp.request,
             )
-            # Add a small offset to reduce the chance of races
-            sleep_seconds = resume_at.timestamp() - datetime.now().timestamp() + 1
-            if sleep_seconds > 0:
-                logging.warning(
-                    f"Rate limited fetching {next_url}; sleeping until {resume_at.isoformat()} ({sleep_seconds:.0f}s)"
-                )
-                time.sleep(sleep_seconds)
-            continue
 
+        if (
+            self.cache is not None
+            and resp.status_code == 200
+            and ("etag" in resp.headers or "last-modified" in resp.headers)
+            and "no-store" not in resp.headers.get("cache-control", "")
+        ):
+            self.cache.put(
+                url,
+                {
+                    name: resp.headers[name]
+                    for name in CACHED_HEADERS
+                    if name in resp.headers
+                },
+                resp.content,
+            )
+        return resp
+
+    def get_json(self, url: str, headers: Optional[Mapping[str, str]] = None) -> Json:
+        resp = self.get(url, headers)
+        resp.raise_for_status()
+        return resp.json()
+
+    def get_text(self, url: str, headers: Optional[Mapping[str, str]] = None) -> str:
+        resp = self.get(url, headers)
         resp.raise_for_status()
-        links = parse_link_header(resp.headers.get("link"))
-        next_url = links.next
-        yield PaginatedJsonResponse(resp.json(), next_url, None)
+        return resp.text
+
+    @contextmanager
+    def iter_lines(
+        self, url: str, headers: Optional[Mapping[str, str]] = None
+    ) -> Iterator[Iterator[str]]:
+        """Stream the lines of a response body, without holding it all in memory.
+
+        The response isn't cached, since that would mean storing the whole body."""
+        with self.client.stream("GET", url, headers=headers) as resp:
+            try:
+                resp.raise_for_status()
+                yield resp.iter_lines()
+            finally:
+                with self._lock:
+                    self.stats.requests += 1
+                    self.stats.bytes += resp.num_bytes_downloaded
+
+    def get_paginated_json(
+        self, url: str, headers: Optional[Mapping[str, str]] = None
+    ) -> Sequence[Json]:
+        data = []
+        next_url: Optional[str] = url
+        while next_url is not None:
+            resp = self.get(next_url, headers)
+            resp.raise_for_status()
+            data.extend(resp.json())
+            links = parse_link_header(resp.headers.get("link"))
+            next_url = links.next
+        return data
+
+    def iter_paginated_json(
+        self, url: str, headers: Optional[Mapping[str, str]] = None
+    ) -> Iterator[PaginatedJsonResponse]:
+        next_url: Optional[str] = url
+        while next_url is not None:
+            resp = self.get(next_url, headers)
+
+            resume_at = retry_time(resp)
+            if resume_at is not None:
+                yield PaginatedJsonResponse(
+                    data=None, next_url=next_url, resume_at=resume_at
+                )
+                # Add a small offset to reduce the chance of races
+                sleep_seconds = resume_at.timestamp() - datetime.now().timestamp() + 1
+                if sleep_seconds > 0:
+                    logging.warning(
+                        f"Rate limited fetching {next_url}; sleeping until {resume_at.isoformat()} ({sleep_seconds:.0f}s)"
+                    )
+                    time.sleep(sleep_seconds)
+                continue
+
+            resp.raise_for_status()
+            links = parse_link_header(resp.headers.get("link"))
+            next_url = links.next
+            yield PaginatedJsonResponse(resp.json(), next_url, None)
+
+
+_default_client: Optional[HttpClient] = None
+_default_client_lock = threading.Lock()
+
+
+def configure(cache_dir: Optional[pathlib.Path]) -> HttpClient:
+    """Replace the shared client with one using cache_dir, or no cache if None."""
+    global _default_client
+    cache = ResponseCache(cache_dir) if cache_dir is not None else None
+    with _default_client_lock:
+        if _default_client is not None:
+            _default_client.close()
+        _default_client = HttpClient(cache)
+        return _default_client
+
+
+def default_client() -> HttpClient:
+    global _default_client
+    with _default_client_lock:
+        if _default_client is None:
+            _default_client = HttpClient()
+        return _default_client
+
+
+def get_json(url: str, headers: Optional[Mapping[str, str]] = None) -> Json:
+    return default_client().get_json(url, headers)
+
+
+def get_text(url: str, headers: Optional[Mapping[str, str]] = None) -> str:
+    return default_client().get_text(url, headers)
+
+
+def iter_lines(
+    url: str, headers: Optional[Mapping[str, str]] = None
+) -> AbstractContextManager[Iterator[str]]:
+    return default_client().iter_lines(url, headers)
+
+
+def get_paginated_json(
+    url: str, headers: Optional[Mapping[str, str]] = None
+) -> Sequence[Json]:
+    return default_client().get_paginated_json(url, headers)
+
+
+def iter_paginated_json(
+    url: str, headers: Optional[Mapping[str, str]] = None
+) -> Iterator[PaginatedJsonResponse]:
+    return default_client().iter_paginated_json(url, headers)
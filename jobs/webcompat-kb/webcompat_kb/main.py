@@ -1,4 +1,5 @@
 import argparse
+import dataclasses
 import logging
 import os
 from typing import Iterable, Optional
@@ -29,6 +30,7 @@ from .base import (
     dataset_arg,
 )
 from .bqhelpers import get_client, BigQuery, DatasetId
+from .scheduler import JobScheduler, job_dependencies
 from . import projectdata
 
 
@@ -44,6 +46,13 @@ class EtlCommand(Command):
             help="Fail immediately if any job fails",
         )
 
+        parser.add_argument(
+            "--max-parallel-jobs",
+            type=int,
+            default=4,
+            help="Maximum number of jobs to run concurrently",
+        )
+
         # Legacy: BigQuery knowledge base dataset id
         parser.add_argument("--bq-kb-dataset", type=dataset_arg, help=argparse.SUPPRESS)
 
@@ -114,24 +123,32 @@ class EtlCommand(Command):
             project=project,
         )
 
-        for job_name, job in jobs.items():
-            logging.info(f"Running job {job_name}")
+        def run_job(job_name: str) -> Optional[bool]:
+            job = jobs[job_name]
             bq_client = BigQuery(
                 client,
                 DatasetId(args.bq_project_id, job.default_dataset(context)),
                 args.write,
                 job.write_targets(project),
             )
-            context.bq_client = bq_client
             try:
-                success = job.main(context)
-                if success is not None and not success:
-                    failed.append(job_name)
-            except Exception as e:
-                if args.pdb or args.fail_on_error:
-                    raise
-                failed.append(job_name)
-                logging.error(e)
+                return job.main(dataclasses.replace(context, bq_client=bq_client))
+            finally:
+                bq_client.log_write_stats()
+
+        scheduler = JobScheduler(
+            job_dependencies(list(jobs.values()), project),
+            max_workers=1 if args.pdb else args.max_parallel_jobs,
+            fail_fast=args.pdb or args.fail_on_error,
+        )
+        results = scheduler.run(run_job)
+
+        for result in results.values():
+            logging.info(
+                f"Job {result.name} {'succeeded' if result.success else 'failed'} in {result.elapsed:.1f}s"
+            )
+            if not result.success:
+                failed.append(result.name)
 
         if failed:
             logging.error(f"{len(failed)} jobs failed: {', '.join(failed)}")
@@ -0,0 +1,157 @@
+import logging
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from dataclasses import dataclass
+from typing import Callable, Mapping, Optional, Sequence
+
+from .base import EtlJob
+from .bqhelpers import SchemaId, SchemaType
+from .etl.update_schema import SchemaCreator
+from .projectdata import Project, ReferenceType
+
+
+@dataclass
+class JobResult:
+    name: str
+    success: bool
+    elapsed: float
+    error: Optional[Exception] = None
+
+
+def get_schema_references(project: Project) -> Mapping[SchemaId, set[SchemaId]]:
+    """Get the schemas that are read by each view and routine.
+
+    This follows references transitively, so if view A reads view B, which in turn
+    reads table C, A references both B and C."""
+    creator = SchemaCreator(project)
+    direct: dict[SchemaId, set[SchemaId]] = {}
+    for dataset_templates in project.data.templates_by_dataset.values():
+        for schema_type, src_templates in [
+            (SchemaType.view, dataset_templates.views),
+            (SchemaType.routine, dataset_templates.routines),
+        ]:
+            assert isinstance(src_templates, list)
+            for template in src_templates:
+                schema_id = SchemaId(
+                    project.id, dataset_templates.id.dataset, template.metadata.name
+                )
+                references = creator.render(schema_id, schema_type, template).references
+                output_id = project.map_schema_id(ReferenceType(schema_type), schema_id)
+                direct[output_id] = (
+                    references.views | references.routines | references.tables
+                )
+
+    rv: dict[SchemaId, set[SchemaId]] = {}
+    for schema_id in direct:
+        seen: set[SchemaId] = set()
+        stack = [schema_id]
+        while stack:
+            for ref in direct.get(stack.pop(), set()):
+                if ref not in seen:
+                    seen.add(ref)
+                    stack.append(ref)
+        rv[schema_id] = seen
+    return rv
+
+
+def job_dependencies(
+    jobs: Sequence[EtlJob], project: Project
+) -> Mapping[str, set[str]]:
+    """Compute the jobs that each job has to wait for before it can start.
+
+    Two jobs conflict if one of them writes a table the other one reads or writes,
+    or if either doesn't declare its inputs. Conflicting jobs run in the order
+    given in jobs, so each job sees the same data as it would if all the jobs ran
+    serially.
+
+    :returns: A mapping from job name to the names of the jobs it depends on."""
+    schema_references = get_schema_references(project)
+
+    reads: dict[str, Optional[set[SchemaId]]] = {}
+    writes: dict[str, set[SchemaId]] = {}
+    for job in jobs:
+        writes[job.name] = job.write_targets(project)
+        inputs = job.inputs(project)
+        if inputs is not None:
+            inputs = inputs.union(
+                *(schema_references.get(item, set()) for item in inputs)
+            )
+        reads[job.name] = inputs
+
+    dependencies: dict[str, set[str]] = {job.name: set() for job in jobs}
+    for i, job in enumerate(jobs):
+        for later_job in jobs[i + 1 :]:
+            job_reads = reads[job.name]
+            later_reads = reads[later_job.name]
+            if (
+                job_reads is None
+                or later_reads is None
+                or writes[job.name] & (writes[later_job.name] | later_reads)
+                or writes[later_job.name] & job_reads
+            ):
+                dependencies[later_job.name].add(job.name)
+
+    return dependencies
+
+
+class JobScheduler:
+    """Run jobs concurrently, starting each job once all its dependencies are done.
+
+    :param dependencies: Mapping from job name to the names of the jobs it depends on.
+                         Jobs are started in the order of this mapping, where their
+                         dependencies allow.
+    :param max_workers: Maximum number of jobs to run at once.
+    :param fail_fast: If a job raises an exception, don't start any more jobs and
+                      re-raise the exception once the running jobs complete. Otherwise
+                      the failure is recorded and all the remaining jobs still run.
+    """
+
+    def __init__(
+        self,
+        dependencies: Mapping[str, set[str]],
+        max_workers: int = 1,
+        fail_fast: bool = False,
+    ):
+        self.dependencies = dependencies
+        self.max_workers = max_workers
+        self.fail_fast = fail_fast
+
+    def run(self, run_job: Callable[[str], Optional[bool]]) -> Mapping[str, JobResult]:
+        results: dict[str, JobResult] = {}
+        pending = list(self.dependencies.keys())
+        running: dict[Future, tuple[str, float]] = {}
+        error: Optional[Exception] = None
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            while pending or running:
+                if error is None:
+                    for name in list(pending):
+                        if len(running) >= self.max_workers:
+                            break
+                        if self.dependencies[name].issubset(results.keys()):
+                            pending.remove(name)
+                            logging.info(f"Running job {name}")
+                            future = executor.submit(run_job, name)
+                            running[future] = (name, time.monotonic())
+                elif not running:
+                    break
+
+                assert running, f"Jobs {', '.join(pending)} have unmet dependencies"
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    name, start = running.pop(future)
+                    elapsed = time.monotonic() - start
+                    try:
+                        success = future.result()
+                    except Exception as e:
+                        logging.error(f"Job {name} failed after {elapsed:.1f}s: {e}")
+                        results[name] = JobResult(name, False, elapsed, e)
+                        if self.fail_fast and error is None:
+                            error = e
+                        continue
+                    results[name] = JobResult(name, success is None or success, elapsed)
+                    logging.info(f"Job {name} completed in {elapsed:.1f}s")
+
+        if error is not None:
+            raise error
+        return results
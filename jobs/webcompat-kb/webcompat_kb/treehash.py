@@ -1,7 +1,20 @@
 import hashlib
+import json
+import logging
 import os
 import stat
-from typing import Self
+import tempfile
+import time
+from typing import Optional, Self
+
+# Name of the hash cache file written in the root of the hashed tree. Files whose
+# names start with this are never included in the hash itself.
+CACHE_FILENAME = ".treehash-cache.json"
+CACHE_VERSION = 1
+# Files modified less than this long before they're hashed could be modified
+# again without their mtime changing, so their digests aren't cached. This is
+# the same approach as git takes with "racy" index entries.
+RACY_INTERVAL_NS = 2_000_000_000
 
 
 class Blob:
@@ -19,26 +32,104 @@ class Blob:
         return hashlib.sha1(self.serialize()).digest()
 
 
+class BlobDigest:
+    """Blob with a known hash, used when the file is unchanged since it was cached."""
+
+    def __init__(self, digest: bytes):
+        self.digest = digest
+
+    def hash(self) -> bytes:
+        return self.digest
+
+
 class Tree:
     """Git-like Tree object
 
-    This represents the content of a directory, using the same representation as git."""
+    This represents the content of a directory, using the same representation as git.
+
+    The hash is computed once and reused, so entries must be added with
+    TreeEntry.append, which resets it."""
 
     def __init__(self) -> None:
         self.contents: list[TreeEntry] = []
+        self._hash: Optional[bytes] = None
 
     def serialize(self) -> bytes:
-        data = b""
-        for item in sorted(self.contents, key=lambda x: x.path):
-            data += b"%b %b\0%b" % (item.mode, os.path.basename(item.path), item.hash())
+        data = b"".join(
+            b"%b %b\0%b" % (item.mode, os.path.basename(item.path), item.hash())
+            for item in sorted(self.contents, key=lambda x: x.path)
+        )
         return b"tree %d\0%b" % (len(data), data)
 
     def hash(self) -> bytes:
-        return hashlib.sha1(self.serialize()).digest()
+        if self._hash is None:
+            self._hash = hashlib.sha1(self.serialize()).digest()
+        return self._hash
+
+
+class HashCache:
+    """Cache of blob hashes keyed by (path, mtime_ns, size).
+
+    The cache is stored as JSON in the root of the tree. Only the entries used
+    while building a tree are written back, so deleted files are dropped."""
+
+    def __init__(self, root: str | os.PathLike):
+        self.root = os.fspath(root)
+        self.path = os.path.join(self.root, CACHE_FILENAME)
+        self.entries: dict[str, tuple[int, int, str]] = {}
+        self.used: dict[str, tuple[int, int, str]] = {}
+        self.misses = 0
+
+        try:
+            with open(self.path) as f:
+                data = json.load(f)
+            if data.get("version") == CACHE_VERSION:
+                self.entries = {
+                    key: (mtime_ns, size, digest)
+                    for key, (mtime_ns, size, digest) in data["files"].items()
+                }
+        except (OSError, ValueError, KeyError, TypeError):
+            pass
+
+    def _key(self, path: bytes | str) -> str:
+        return os.path.relpath(os.fsdecode(path), self.root)
+
+    def get(self, path: bytes | str, st: os.stat_result) -> Optional[bytes]:
+        key = self._key(path)
+        entry = self.entries.get(key)
+        if entry is None or entry[:2] != (st.st_mtime_ns, st.st_size):
+            return None
+        self.used[key] = entry
+        return bytes.fromhex(entry[2])
+
+    def put(self, path: bytes | str, st: os.stat_result, digest: bytes) -> None:
+        self.misses += 1
+        if time.time_ns() - st.st_mtime_ns < RACY_INTERVAL_NS:
+            return
+        self.used[self._key(path)] = (st.st_mtime_ns, st.st_size, digest.hex())
+
+    def save(self) -> None:
+        if self.used == self.entries:
+            return
+        data = json.dumps(
+            {"version": CACHE_VERSION, "files": self.used}, sort_keys=True
+        ).encode()
+        try:
+            fd, tmp_path = tempfile.mkstemp(dir=self.root, prefix=f"{CACHE_FILENAME}.")
+            try:
+                with os.fdopen(fd, "wb") as f:
+                    f.write(data)
+                os.replace(tmp_path, self.path)
+            except BaseException:
+                os.unlink(tmp_path)
+                raise
+        except OSError as e:
+            # The templates may be on a read-only filesystem
+            logging.debug(f"Not writing tree hash cache {self.path}: {e}")
 
 
 class TreeEntry:
-    def __init__(self, path: bytes, mode: bytes, content: Blob | Tree):
+    def __init__(self, path: bytes, mode: bytes, content: Blob | BlobDigest | Tree):
         self.path = path
         self.mode = mode
         self.content = content
@@ -47,7 +138,9 @@ class TreeEntry:
         return self.content.hash()
 
     @classmethod
-    def from_path(cls, path: bytes | str | os.PathLike) -> Self:
+    def from_path(
+        cls, path: bytes | str | os.PathLike, cache: Optional[HashCache] = None
+    ) -> Self:
         st = os.stat(path)
 
         if isinstance(path, os.PathLike):
@@ -58,9 +151,10 @@ class TreeEntry:
             path_bytes = str(path).encode("utf-8")
 
         # These modes match the subset supported by git
+        content: Tree | Blob | BlobDigest
         if stat.S_ISDIR(st.st_mode):
             mode = b"40000"
-            content: Tree | Blob = Tree()
+            content = Tree()
         else:
             if stat.S_IXUSR & st.st_mode:
                 mode = b"100755"
@@ -68,18 +162,25 @@ class TreeEntry:
                 mode = b"120000"
             else:
                 mode = b"100644"
-            with open(path, "rb") as f:
-                content = Blob(f.read())
+            digest = cache.get(path_bytes, st) if cache is not None else None
+            if digest is not None:
+                content = BlobDigest(digest)
+            else:
+                with open(path, "rb") as f:
+                    content = Blob(f.read())
+                if cache is not None:
+                    cache.put(path_bytes, st, content.hash())
         return cls(path_bytes, mode, content)
 
     def append(self, other: Self) -> None:
         assert other != self
-        if isinstance(self.content, Blob):
+        if not isinstance(self.content, Tree):
             raise ValueError("Cannot append to a Blob TreeEntry")
         self.content.contents.append(other)
+        self.content._hash = None
 
 
-def build_tree(root: str | os.PathLike) -> TreeEntry:
+def build_tree(root: str | os.PathLike, cache: Optional[HashCache] = None) -> TreeEntry:
     root_path = str(root)
     root_tree = TreeEntry.from_path(root_path)
     tree_entries = {root_path: root_tree}
@@ -87,14 +188,27 @@ def build_tree(root: str | os.PathLike) -> TreeEntry:
         parent_tree = tree_entries[dir_path]
         assert isinstance(parent_tree.content, Tree)
         for name in dir_names + file_names:
+            # Skip the cache, and any temporary file from a concurrent or
+            # interrupted write of it
+            if dir_path == root_path and name.startswith(CACHE_FILENAME):
+                continue
             path = os.path.join(dir_path, name)
-            tree_entry = TreeEntry.from_path(path)
+            tree_entry = TreeEntry.from_path(path, cache)
             parent_tree.append(tree_entry)
             assert path not in tree_entries
             tree_entries[path] = tree_entry
     return root_tree
 
 
-def hash_tree(path: str | os.PathLike) -> bytes:
-    root_tree = build_tree(path)
-    return root_tree.hash()
+def hash_tree(path: str | os.PathLike, use_cache: bool = False) -> bytes:
+    """Hash a directory in the same way as git hashes a tree.
+
+    :param use_cache: Reuse the hashes of files that haven't changed since the
+                      last call, using a cache stored in the directory."""
+    cache = HashCache(path) if use_cache else None
+    root_tree = build_tree(path, cache)
+    rv = root_tree.hash()
+    if cache is not None:
+        cache.save()
+        logging.debug(f"Hashed {cache.misses} changed files in {path}")
+    return rv
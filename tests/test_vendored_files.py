@@ -0,0 +1,37 @@
+from unittest import TestCase
+
+from docker_etl.file_utils import JOBS_DIR
+
+# Files that jobs keep copies of, so that each job's image builds on its own.
+# Maps the tested original to its copies, relative to the jobs directory.
+VENDORED_FILES = {
+    "dap-collector/dap_collector/dap_client.py": [
+        "ads-attribution-dap-collector/ads_attribution_dap_collector/dap_client.py",
+        "ads-incrementality-dap-collector/"
+        "ads_incrementality_dap_collector/dap_client.py",
+    ],
+    "dap-collector/dap_collector/checkpoint.py": [
+        "dap-collector-ppa-dev/dap_collector_ppa_dev/checkpoint.py",
+        "dap-collector-ppa-prod/dap_collector_ppa_prod/checkpoint.py",
+    ],
+    "extensions/extensions/driver_pool.py": [
+        "release_scraping/release_scraping/driver_pool.py",
+    ],
+}
+
+
+class TestVendoredFiles(TestCase):
+    def test_copies_match(self):
+        for original, copies in VENDORED_FILES.items():
+            expected = (JOBS_DIR / original).read_text()
+            for copy in copies:
+                with self.subTest(copy=copy):
+                    self.assertFalse(
+                        (JOBS_DIR / copy).is_symlink(),
+                        f"{copy} must be a copy of {original}, not a link",
+                    )
+                    self.assertEqual(
+                        (JOBS_DIR / copy).read_text(),
+                        expected,
+                        f"{copy} differs from {original}; copy it over again",
+                    )